@@ -0,0 +1,235 @@
+"""
+Analysis Result Cache
+=====================
+Content-addressed cache for ECU file analysis results.
+
+Customers often upload the same original file several times (page
+refreshes, portal re-orders, comparing services). Results are keyed by
+the SHA-256 of the file bytes plus an analysis version, so a repeated
+upload skips the ECUAnalyzer / DTC engine run entirely.
+
+Tiers:
+- In-process LRU (milliseconds, lost on restart)
+- MongoDB collection `analysis_cache` (shared across workers/deployments)
+
+The analysis version is a hash of the detector sources and the DaVinci
+DTC database, so any change to detector code or dtc_database.json
+invalidates previous entries automatically. dtc_engine reloads
+dtc_database.json when it changes on disk, so the version is
+recomputed when that file's (mtime, size) changes, not only at startup.
+"""
+
+import os
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+# Files whose content determines analysis results
+ANALYSIS_SOURCES = [
+    "ecu_analyzer.py",
+    "ecu_database.py",
+    "dtc_engine.py",
+    "dtc_database.json",
+    "ecu_engine/*.py",
+]
+
+# Sources reloaded at runtime (see dtc_engine.load_davinci_database)
+RELOADED_SOURCES = ["dtc_database.json"]
+
+# Maximum entries kept in the in-process tier
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '256'))
+
+# Result kinds stored in the cache
+KIND_ECU_ANALYSIS = "ecu_analysis"        # ECUAnalyzer.get_display_info()
+KIND_DTC_ANALYSIS = "dtc_analysis"        # DTCDeleteEngine.analyze_file()
+KIND_ENGINE_ANALYSIS = "engine_analysis"  # ECUFileProcessor.analyze_file()
+KIND_CHECKSUM_STATES = "checksum_states"  # ECUFileProcessor.checksum_states(), as dicts
+
+
+def compute_analysis_version(root: Path = ROOT_DIR) -> str:
+    """Hash the detector sources and DTC database into a version string"""
+    digest = hashlib.sha256()
+    for pattern in ANALYSIS_SOURCES:
+        for path in sorted(root.glob(pattern)):
+            digest.update(str(path.relative_to(root)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def reloaded_sources_stamp(root: Path = ROOT_DIR):
+    """(mtime, size) of each runtime-reloaded source, None if missing"""
+    stamp = []
+    for name in RELOADED_SOURCES:
+        try:
+            stat = (root / name).stat()
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def file_sha256(file_data) -> str:
+    """SHA-256 of the raw file bytes"""
+    return hashlib.sha256(file_data).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier (LRU + MongoDB) cache of analysis results.
+
+    Usage:
+        cache = AnalysisCache(db.analysis_cache)
+        result = await cache.get_or_compute(
+            KIND_DTC_ANALYSIS, file_hash, lambda: engine.analyze_file(data)
+        )
+    """
+
+    def __init__(self, collection=None, max_entries: int = ANALYSIS_CACHE_SIZE,
+                 version: Optional[str] = None, root: Path = ROOT_DIR):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.root = root
+        self._fixed_version = version
+        self._version: Optional[str] = None
+        self._stamp = None
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+    @property
+    def version(self) -> str:
+        """Analysis version, recomputed when a reloaded source changes"""
+        if self._fixed_version:
+            return self._fixed_version
+        stamp = reloaded_sources_stamp(self.root)
+        if stamp != self._stamp:
+            previous = self._version
+            self._version = compute_analysis_version(self.root)
+            self._stamp = stamp
+            if previous and previous != self._version:
+                logger.info(f"Analysis cache: version changed to {self._version}")
+        return self._version
+
+    def key(self, kind: str, file_hash: str) -> str:
+        return f"{kind}:{self.version}:{file_hash}"
+
+    # -------------------------------------------------------------------------
+    # In-process tier
+    # -------------------------------------------------------------------------
+
+    def get_local(self, kind: str, file_hash: str) -> Optional[Any]:
+        """Look up a result in the in-process tier only"""
+        key = self.key(kind, file_hash)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            # Callers may modify the result, never hand out the cached object
+            return copy.deepcopy(self._entries[key])
+
+    def set_local(self, kind: str, file_hash: str, result: Any):
+        """Store a result in the in-process tier"""
+        key = self.key(kind, file_hash)
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # -------------------------------------------------------------------------
+    # Both tiers
+    # -------------------------------------------------------------------------
+
+    async def get(self, kind: str, file_hash: str) -> Optional[Any]:
+        """Look up a result, promoting database hits into the in-process tier"""
+        result = self.get_local(kind, file_hash)
+        if result is not None:
+            self.stats["memory_hits"] += 1
+            return result
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one(
+                    {"key": self.key(kind, file_hash)}, {"_id": 0, "result": 1}
+                )
+            except Exception as e:
+                logger.warning(f"Analysis cache lookup failed: {e}")
+                doc = None
+            if doc is not None:
+                self.stats["db_hits"] += 1
+                self.set_local(kind, file_hash, doc["result"])
+                return doc["result"]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, kind: str, file_hash: str, result: Any):
+        """Store a result in both tiers (database errors are logged, not raised)"""
+        self.set_local(kind, file_hash, result)
+
+        if self.collection is None:
+            return
+        try:
+            await self.collection.update_one(
+                {"key": self.key(kind, file_hash)},
+                {"$set": {
+                    "key": self.key(kind, file_hash),
+                    "kind": kind,
+                    "file_hash": file_hash,
+                    "version": self.version,
+                    "result": result,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Analysis cache store failed: {e}")
+
+    async def get_or_compute(self, kind: str, file_hash: str,
+                             compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for a file, computing and storing it on a miss.
+
+        Args:
+            kind: Result kind (KIND_* constant)
+            file_hash: SHA-256 of the file bytes (see file_sha256)
+            compute: Callable producing the result (sync, or returning an awaitable)
+        """
+        result = await self.get(kind, file_hash)
+        if result is not None:
+            return result
+
+        result = compute()
+        if hasattr(result, "__await__"):
+            result = await result
+        await self.set(kind, file_hash, result)
+        return result
+
+    async def init_collection(self):
+        """Create the lookup index and drop entries from older analysis versions"""
+        if self.collection is None:
+            return
+        try:
+            await self.collection.create_index("key", unique=True)
+            removed = await self.collection.delete_many({"version": {"$ne": self.version}})
+            if removed.deleted_count:
+                logger.info(f"Analysis cache: removed {removed.deleted_count} stale entries")
+        except Exception as e:
+            logger.warning(f"Analysis cache init failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            **self.stats,
+        }
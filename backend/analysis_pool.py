@@ -0,0 +1,321 @@
+"""
+Analysis Process Pool
+=====================
+Runs CPU-bound binary analysis and processing off the event loop.
+
+ECUAnalyzer, DTCDeleteEngine, ECUFileProcessor and the legacy
+ECUProcessor are pure Python and take hundreds of milliseconds to
+seconds on large dumps. Running them
+inside `async def` handlers blocks every other request on the worker,
+so handlers await them through this pool instead.
+
+Features:
+- Pre-warmed worker processes (ECU database, definition DB and DaVinci
+  DTC database are loaded once per worker, not per task)
+- Configurable pool size (ANALYSIS_POOL_SIZE, 0 = run in a thread)
+- Backpressure: at most ANALYSIS_POOL_MAX_PENDING queued/running tasks,
+  further submissions fail fast with AnalysisPoolBusy (HTTP 503)
+- Per-task timeout (ANALYSIS_TASK_TIMEOUT seconds, AnalysisTimeout / 504),
+  counted from when a worker slot is free, so time spent queued behind
+  other tasks does not count; a timed-out worker is recycled so it
+  cannot hold a slot forever.
+  ProcessPoolExecutor cannot replace a single worker (losing one breaks
+  the whole executor), so the pool is recycled as a whole: tasks that
+  were running or queued on it are resubmitted to the new pool, and
+  count as "retried", not as failures
+- Tasks take the file as bytes or as the path of a stored upload; a
+  path is memory-mapped in the worker instead of pickling the contents
+  across processes
+- Engines keep per-call state, so each one is used under its own
+  lock. The lock is uncontended in a worker process; with the pool
+  disabled, thread tasks share the engines and take turns
+"""
+
+import os
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Union
+
+from upload_ingest import map_file
+
+logger = logging.getLogger(__name__)
+
+# File contents, or the path of a stored file
+FileInput = Union[bytes, str, Path]
+
+# Pool configuration
+ANALYSIS_POOL_SIZE = int(os.environ.get('ANALYSIS_POOL_SIZE', str(min(4, os.cpu_count() or 1))))
+ANALYSIS_POOL_MAX_PENDING = int(os.environ.get('ANALYSIS_POOL_MAX_PENDING', '32'))
+ANALYSIS_TASK_TIMEOUT = float(os.environ.get('ANALYSIS_TASK_TIMEOUT', '120'))
+
+
+class AnalysisPoolError(Exception):
+    """Base error for pool failures, carries the HTTP status to report"""
+    status_code = 500
+
+
+class AnalysisPoolBusy(AnalysisPoolError):
+    """Too many analysis tasks are already queued"""
+    status_code = 503
+
+
+class AnalysisTimeout(AnalysisPoolError):
+    """An analysis task exceeded its time limit"""
+    status_code = 504
+
+
+# =============================================================================
+# WORKER SIDE
+# =============================================================================
+
+# Per-worker engine instances, created by _init_worker, and their locks
+_worker_state = {}
+_worker_locks = {}
+_init_lock = threading.Lock()
+
+
+def _init_worker():
+    """Load all databases once when a worker process starts"""
+    importlib.import_module("ecu_analyzer")  # compiles detector rules
+    from dtc_engine import DTCDeleteEngine  # loads DaVinci DTC database
+    from ecu_engine import ECUFileProcessor
+    from ecu_processor import ECUProcessor
+
+    _worker_state["dtc_engine"] = DTCDeleteEngine()
+    _worker_state["file_processor"] = ECUFileProcessor()
+    _worker_state["legacy_processor"] = ECUProcessor()
+    _worker_locks.update({name: threading.Lock() for name in _worker_state})
+
+
+@contextmanager
+def _using(name: str):
+    """Hold an engine for one task (engines are not safe to share across threads)"""
+    with _init_lock:
+        if not _worker_state:
+            _init_worker()
+    with _worker_locks[name]:
+        yield _worker_state[name]
+
+
+def _file_data(file_data: FileInput):
+    """File contents of a task argument (a path is memory-mapped)"""
+    if isinstance(file_data, (str, Path)):
+        return map_file(file_data)
+    return file_data
+
+
+def _warm_up() -> int:
+    """No-op task used to spawn (and initialize) every worker at startup"""
+    import time
+    time.sleep(0.1)
+    return os.getpid()
+
+
+def analyze_ecu(file_data: FileInput) -> dict:
+    """Run the real ECU analyzer and return its display info"""
+    from ecu_analyzer import ECUAnalyzer
+
+    analyzer = ECUAnalyzer()
+    analyzer.analyze(_file_data(file_data))
+    return analyzer.get_display_info()
+
+
+def identify_ecu(file_data: FileInput) -> dict:
+    """Quick ECU identification (manufacturer, ECU type, part number) only"""
+    from ecu_analyzer import ECUAnalyzer
+
+    return ECUAnalyzer().identify(_file_data(file_data))
+
+
+def analyze_dtcs(file_data: FileInput) -> dict:
+    """Scan a file for DTCs (DTCDeleteEngine.analyze_file)"""
+    with _using("dtc_engine") as engine:
+        return engine.analyze_file(_file_data(file_data))
+
+
+def delete_dtcs(file_data: FileInput, dtc_codes: List[str], correct_checksum: bool = True):
+    """Delete DTCs from a file (DTCDeleteEngine.delete_dtcs)"""
+    with _using("dtc_engine") as engine:
+        return engine.delete_dtcs(_file_data(file_data), dtc_codes, correct_checksum)
+
+
+def scan_all_dtcs(file_data: FileInput) -> list:
+    """Scan a file for every recognizable DTC (DTCDeleteEngine.scan_all_dtcs)"""
+    with _using("dtc_engine") as engine:
+        return engine.scan_all_dtcs(_file_data(file_data))
+
+
+def engine_analyze(file_data: FileInput) -> dict:
+    """Analyze a file with the ECU processing engine"""
+    with _using("file_processor") as processor:
+        return processor.analyze_file(_file_data(file_data))
+
+
+def engine_checksum_states(file_data: FileInput) -> dict:
+    """Checksum states of an unmodified file, as dicts (ECUFileProcessor.checksum_states)"""
+    with _using("file_processor") as processor:
+        states = processor.checksum_states(_file_data(file_data))
+    return {name: state.model_dump() for name, state in states.items()}
+
+
+def engine_process(file_data: FileInput, modifications: list, filename: str = "unknown.bin",
+                   checksum_states: Optional[dict] = None):
+    """
+    Process a file with the ECU processing engine.
+
+    Args:
+        checksum_states: engine_checksum_states of the file, if cached
+
+    Returns:
+        (ProcessingResult, processed file bytes or None)
+    """
+    from ecu_engine import ChecksumState
+
+    states = {name: ChecksumState(**state) for name, state in (checksum_states or {}).items()}
+    with _using("file_processor") as processor:
+        return processor.process(_file_data(file_data), modifications, filename, states)
+
+
+def legacy_process(file_data: FileInput, services: List[str]) -> dict:
+    """Process a file with the legacy ECUProcessor (paid service requests)"""
+    with _using("legacy_processor") as processor:
+        return processor.process_file(_file_data(file_data), services)
+
+
+# =============================================================================
+# SERVER SIDE
+# =============================================================================
+
+class AnalysisPool:
+    """
+    Managed process pool for binary analysis.
+
+    Usage:
+        analysis_pool = AnalysisPool()
+        analysis_pool.start()                       # app startup
+        info = await analysis_pool.run(analyze_ecu, file_data)
+        analysis_pool.shutdown()                    # app shutdown
+    """
+
+    def __init__(self, max_workers: int = ANALYSIS_POOL_SIZE,
+                 max_pending: int = ANALYSIS_POOL_MAX_PENDING,
+                 task_timeout: float = ANALYSIS_TASK_TIMEOUT):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.task_timeout = task_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        # One slot per worker: a task's timeout starts once it holds one
+        # (threads are not limited when the pool is disabled)
+        self._slots = asyncio.Semaphore(max_workers) if max_workers > 0 else nullcontext()
+        # Bumped on every recycle, so tasks can tell a recycle from a crash
+        self._generation = 0
+        self.stats = {"completed": 0, "rejected": 0, "timeouts": 0, "restarts": 0, "retried": 0, "crashes": 0}
+
+    def start(self):
+        """Create the worker processes and start warming them up"""
+        if self._executor is not None or self.max_workers <= 0:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            # Workers must not inherit the event loop / Mongo client threads
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        for _ in range(self.max_workers):
+            self._executor.submit(_warm_up)
+        logger.info(f"Analysis pool started with {self.max_workers} workers")
+
+    def shutdown(self):
+        """Stop all workers (pending tasks are cancelled)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _recycle(self):
+        """
+        Replace the executor, killing workers that may be stuck.
+
+        Queued tasks are not cancelled: they fail with BrokenProcessPool
+        like the running ones, and run() resubmits them.
+        """
+        executor = self._executor
+        self._executor = None
+        self._generation += 1
+        if executor is not None:
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False)
+        self.stats["restarts"] += 1
+        self.start()
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run func(*args) in a worker and await the result.
+
+        Raises:
+            AnalysisPoolBusy: Too many tasks queued (backpressure)
+            AnalysisTimeout: Task exceeded its timeout
+        """
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise AnalysisPoolBusy("Analysis queue is full, please retry shortly")
+
+        timeout = timeout or self.task_timeout
+        self._pending += 1
+        try:
+            async with self._slots:
+                return await self._run_in_slot(func, args, timeout)
+        finally:
+            self._pending -= 1
+
+    async def _run_in_slot(self, func: Callable, args: tuple, timeout: float) -> Any:
+        """Run a task that holds a worker slot, so it is running, not queued"""
+        crashed = False
+        while True:
+            generation = self._generation
+            try:
+                result = await asyncio.wait_for(self._submit(func, *args), timeout)
+                self.stats["completed"] += 1
+                return result
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logger.error(f"Analysis task {func.__name__} timed out after {timeout:g}s")
+                self._recycle()
+                raise AnalysisTimeout(f"Analysis timed out after {timeout:g}s")
+            except BrokenProcessPool:
+                if self._generation != generation:
+                    # Pool was recycled under us (another task timed out) - resubmit
+                    self.stats["retried"] += 1
+                    continue
+                # A worker died running this or another task - retry once
+                self.stats["crashes"] += 1
+                if crashed:
+                    raise AnalysisPoolError("Analysis worker crashed")
+                crashed = True
+                self._recycle()
+
+    def _submit(self, func: Callable, *args):
+        loop = asyncio.get_running_loop()
+        if self.max_workers <= 0:
+            # Pool disabled - still keep the work off the event loop
+            return loop.run_in_executor(None, func, *args)
+        if self._executor is None:
+            self.start()
+        return loop.run_in_executor(self._executor, func, *args)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "task_timeout": self.task_timeout,
+            **self.stats,
+        }
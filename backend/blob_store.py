@@ -0,0 +1,392 @@
+"""
+Content-Addressed Blob Store
+============================
+ECU files stored once per content, keyed by their SHA-256.
+
+Every upload used to be saved under a fresh UUID, so a common stock
+original (a Hiace or Canter dump) was kept once per customer that
+uploaded it. Blobs live at blobs/<hash[:2]>/<hash>; storing content
+that is already there only drops the spooled copy.
+
+- Named paths (uploads/<file_id>_original.bin, ...) are symlinks to the
+  blob, so existing lookups by path or file_id keep working
+- The blob hash is also the analysis cache key (see analysis_cache), so
+  a duplicate upload is neither stored nor analyzed again
+- Orders, DTC files and service requests register as references
+  ("order:<id>") in the `blobs` collection, one entry per referrer, so
+  adding the same reference twice counts once
+- Customer uploads are referenced by their file id ("upload:<id>")
+  until expire_links() releases them, BLOB_GC_GRACE_HOURS after the
+  upload; it also removes their links once nothing references the blob
+- collect_garbage() removes blobs without references once they are
+  older than BLOB_GC_GRACE_HOURS (uploads that were analyzed but never
+  ordered); storing or linking a blob again restarts its grace period
+- Referenced blobs are also copied, once per content, to a GridFS
+  bucket (chunked documents, streamed in and out) so they survive a
+  redeployment that loses the disk; local_path() restores them
+
+Without a collection, references are not tracked and nothing is
+collected. Without a bucket, blobs only live on disk.
+"""
+
+import os
+import re
+import time
+import tempfile
+import uuid
+import shutil
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from upload_ingest import (
+    MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE, StoredUpload, discard, spool_upload,
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+BLOB_DIR = ROOT_DIR / "blobs"
+
+# Unreferenced blobs younger than this are kept (uploads awaiting an order)
+BLOB_GC_GRACE_HOURS = float(os.environ.get('BLOB_GC_GRACE_HOURS', '72'))
+
+# GridFS bucket and chunk size of durable copies
+BLOB_BUCKET = "blob_files"
+BLOB_CHUNK_SIZE = 255 * 1024
+
+# Referrer kinds
+REF_ORDER = "order"
+REF_DTC_FILE = "dtc_file"
+REF_SERVICE_REQUEST = "service_request"
+REF_DTC_PROCESSED = "dtc_processed"
+REF_UPLOAD = "upload"
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _hash_file(path: Union[str, os.PathLike]):
+    """(SHA-256, size) of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def blob_ref(kind: str, referrer_id: str) -> str:
+    """Reference name of a referrer, e.g. blob_ref(REF_ORDER, order_id)"""
+    return f"{kind}:{referrer_id}"
+
+
+def link_file_id(path: Union[str, os.PathLike]) -> str:
+    """File id a stored name starts with ("<id>.bin", "<id>_original.bin")"""
+    return Path(Path(path).name.split("_", 1)[0]).stem
+
+
+class BlobStore:
+    """
+    Content-addressed file storage with reference tracking.
+
+    Usage:
+        blob_store = BlobStore(BLOB_DIR, db.blobs, AsyncIOMotorGridFSBucket(db, BLOB_BUCKET))
+        upload = await blob_store.ingest(file)
+        blob_store.link(upload.sha256, UPLOAD_DIR / f"{file_id}_original.bin")
+        await blob_store.add_ref(upload.sha256, blob_ref(REF_ORDER, order_id))
+        path = await blob_store.local_path(upload.sha256)
+    """
+
+    def __init__(self, root: Path = BLOB_DIR, collection=None, bucket=None):
+        self.root = Path(root)
+        self.collection = collection
+        self.bucket = bucket
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = {
+            "stored": 0, "deduplicated": 0, "bytes_deduplicated": 0, "collected": 0,
+            "persisted": 0, "restored": 0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Blobs
+    # -------------------------------------------------------------------------
+
+    def path(self, blob_hash: str) -> Path:
+        if not _HASH_RE.match(blob_hash or ""):
+            raise ValueError(f"Invalid blob hash: {blob_hash!r}")
+        return self.root / blob_hash[:2] / blob_hash
+
+    def exists(self, blob_hash: str) -> bool:
+        return self.path(blob_hash).is_file()
+
+    def hash_of(self, path: Union[str, os.PathLike]) -> Optional[str]:
+        """Blob hash behind a named path, or None if it is not a link into the store"""
+        path = Path(path)
+        if not path.is_symlink():
+            return None
+        target = Path(os.readlink(path))
+        if not _HASH_RE.match(target.name):
+            return None
+        return target.name
+
+    async def ingest(self, file, max_size: int = MAX_UPLOAD_SIZE) -> StoredUpload:
+        """
+        Stream an UploadFile into the store.
+
+        Returns:
+            The stored upload (path is the blob)
+
+        Raises:
+            UploadTooLarge: Upload exceeds max_size
+        """
+        spooled = await spool_upload(file, self.tmp_dir, max_size)
+        path = await asyncio.to_thread(self._adopt, spooled.path, spooled.sha256, spooled.size)
+        return StoredUpload(path=path, filename=spooled.filename, size=spooled.size, sha256=spooled.sha256)
+
+    def _adopt(self, tmp_path: Path, blob_hash: str, size: int) -> Path:
+        """Move a spooled file into place, or drop it if the blob exists"""
+        dest = self.path(blob_hash)
+        if dest.is_file():
+            discard(tmp_path)
+            os.utime(dest)
+            self.stats["deduplicated"] += 1
+            self.stats["bytes_deduplicated"] += size
+        else:
+            dest.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, dest)
+            self.stats["stored"] += 1
+        return dest
+
+    def adopt(self, path: Union[str, os.PathLike]) -> str:
+        """
+        Move an existing file into the store, leaving a link in its place.
+
+        Files stored before the blob store (plain files under uploads/)
+        are adopted when something references them.
+
+        Returns:
+            The blob hash
+        """
+        path = Path(path)
+        blob_hash = self.hash_of(path)
+        if blob_hash:
+            return blob_hash
+        blob_hash, size = _hash_file(path)
+        # Second name for the file in the store, so path never goes missing
+        tmp = self.tmp_dir / f".upload-{uuid.uuid4().hex}.part"
+        try:
+            os.link(path, tmp)
+        except OSError:
+            shutil.copy2(path, tmp)
+        self._adopt(tmp, blob_hash, size)
+        self.link(blob_hash, path)
+        return blob_hash
+
+    def put_bytes(self, data) -> str:
+        """
+        Store file contents held in memory (processed files, migrations).
+
+        Returns:
+            The blob hash
+        """
+        blob_hash = hashlib.sha256(data).hexdigest()
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            self._adopt(Path(tmp_name), blob_hash, len(data))
+        except BaseException:
+            discard(tmp_name)
+            raise
+        return blob_hash
+
+    def link(self, blob_hash: str, dest: Path) -> Path:
+        """Make dest a name for a blob (a relative symlink, replacing dest)"""
+        blob = self.path(blob_hash)
+        dest = Path(dest)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.link")
+        os.symlink(os.path.relpath(blob, dest.parent), tmp)
+        os.replace(tmp, dest)
+        os.utime(blob)
+        return dest
+
+    # -------------------------------------------------------------------------
+    # References
+    # -------------------------------------------------------------------------
+
+    async def add_ref(self, blob_hash: str, ref: str, durable: bool = True):
+        """Register a referrer of a blob (idempotent) and make the blob durable"""
+        if self.collection is None:
+            return
+        self.path(blob_hash)  # Validates the hash
+        await self.collection.update_one(
+            {"hash": blob_hash},
+            {
+                "$addToSet": {"refs": ref},
+                "$setOnInsert": {"created_at": datetime.now(timezone.utc).isoformat()},
+            },
+            upsert=True,
+        )
+        if durable:
+            await self.persist(blob_hash)
+
+    async def release(self, blob_hash: str, ref: str):
+        """Drop a referrer; the blob is collected once unreferenced and past its grace period"""
+        if self.collection is None:
+            return
+        await self.collection.update_one({"hash": blob_hash}, {"$pull": {"refs": ref}})
+
+    async def ref_count(self, blob_hash: str) -> int:
+        if self.collection is None:
+            return 0
+        doc = await self.collection.find_one({"hash": blob_hash}, {"_id": 0, "refs": 1})
+        return len(doc.get("refs", [])) if doc else 0
+
+    async def expire_links(self, directory: Path, kind: str, grace_hours: float = BLOB_GC_GRACE_HOURS) -> int:
+        """
+        Release the `kind` references of links in directory older than the
+        grace period (blob_ref(kind, link_file_id(link))), and remove those
+        links, or links whose blob is gone, once the blob is unreferenced.
+
+        Returns:
+            Number of links removed
+        """
+        if self.collection is None:
+            return 0
+        cutoff = time.time() - grace_hours * 3600
+        removed = 0
+        for link, blob_hash, expired in await asyncio.to_thread(self._links, Path(directory), cutoff):
+            if expired:
+                await self.release(blob_hash, blob_ref(kind, link_file_id(link)))
+            if await self.ref_count(blob_hash) == 0:
+                discard(link)
+                removed += 1
+        if removed:
+            logger.info(f"Blob store: removed {removed} expired links from {directory}")
+        return removed
+
+    def _links(self, directory: Path, cutoff: float) -> list:
+        """(link, blob hash, expired) of the links into the store that are expired or dangling"""
+        links = []
+        for path in directory.iterdir():
+            blob_hash = self.hash_of(path)
+            if not blob_hash:
+                continue
+            try:
+                expired = path.lstat().st_mtime < cutoff
+            except OSError:
+                continue
+            if expired or not self.exists(blob_hash):
+                links.append((path, blob_hash, expired))
+        return links
+
+    # -------------------------------------------------------------------------
+    # Durable copies (GridFS)
+    # -------------------------------------------------------------------------
+
+    async def _durable_files(self, blob_hash: str) -> list:
+        return await self.bucket.find({"filename": blob_hash}).to_list(None)
+
+    async def persist(self, blob_hash: str):
+        """Stream a blob into the GridFS bucket, unless it is already there"""
+        if self.bucket is None or await self._durable_files(blob_hash):
+            return
+        path = self.path(blob_hash)
+        with open(path, "rb") as source:
+            await self.bucket.upload_from_stream(
+                blob_hash, source, chunk_size_bytes=BLOB_CHUNK_SIZE,
+                metadata={"size": path.stat().st_size},
+            )
+        self.stats["persisted"] += 1
+
+    async def local_path(self, blob_hash: str) -> Path:
+        """
+        Path of a blob on disk, restored from the GridFS bucket if it is missing.
+
+        Raises:
+            FileNotFoundError: Neither on disk nor in the bucket
+        """
+        path = self.path(blob_hash)
+        if path.is_file():
+            return path
+        if self.bucket is None or not await self._durable_files(blob_hash):
+            raise FileNotFoundError(f"Blob {blob_hash} not found")
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                await self.bucket.download_to_stream_by_name(blob_hash, tmp)
+            restored_hash, size = await asyncio.to_thread(_hash_file, tmp_name)
+            if restored_hash != blob_hash:
+                raise ValueError(f"Blob {blob_hash} is corrupt in the durable store")
+            await asyncio.to_thread(self._adopt, Path(tmp_name), blob_hash, size)
+        except BaseException:
+            discard(tmp_name)
+            raise
+        self.stats["restored"] += 1
+        logger.info(f"Blob store: restored {blob_hash} from the durable store")
+        return path
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    async def collect_garbage(self, grace_hours: float = BLOB_GC_GRACE_HOURS) -> int:
+        """
+        Remove unreferenced blobs older than the grace period.
+
+        Returns:
+            Number of blobs removed
+        """
+        if self.collection is None:
+            return 0
+        referenced = set(await self.collection.distinct("hash", {"refs.0": {"$exists": True}}))
+        cutoff = time.time() - grace_hours * 3600
+        removed = await asyncio.to_thread(self._remove_unreferenced, referenced, cutoff)
+        await self.collection.delete_many({"refs": {"$size": 0}})
+        if self.bucket is not None:
+            cursor = self.bucket.find({"uploadDate": {"$lt": datetime.fromtimestamp(cutoff, timezone.utc)}})
+            async for durable in cursor:
+                if durable.filename not in referenced:
+                    await self.bucket.delete(durable._id)
+        self.stats["collected"] += removed
+        if removed:
+            logger.info(f"Blob store: removed {removed} unreferenced blobs")
+        return removed
+
+    def _remove_unreferenced(self, referenced: set, cutoff: float) -> int:
+        removed = 0
+        for path in self.root.glob("??/*"):
+            try:
+                if path.name not in referenced and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        # Spooled files of interrupted uploads
+        for path in self.tmp_dir.glob(".upload-*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+        return removed
+
+    async def init_collection(self):
+        """Create the lookup index and collect garbage"""
+        if self.collection is None:
+            return
+        try:
+            await self.collection.create_index("hash", unique=True)
+            await self.collect_garbage()
+        except Exception as e:
+            logger.warning(f"Blob store init failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"root": str(self.root), **self.stats}
@@ -0,0 +1,111 @@
+"""
+Customer Order Lookups
+======================
+Portal access to orders by customer email in one indexed query.
+
+Portal orders live in two collections: service_requests (the original
+request form) and orders (the upload flow). Every portal endpoint
+matched `customer_email` with an anchored case-insensitive regex in one
+collection and then the other. A case-insensitive regex cannot use an
+index, so each call scanned both collections. The email was also put
+into the regex unescaped, so "." matched any character.
+
+- Orders store `customer_email_lc`, the trimmed lower-case email
+  (normalize_email), next to the email as entered
+- find_customer_order() / find_customer_orders() query both collections
+  in one aggregate ($unionWith, MongoDB 4.4+) by customer_email_lc,
+  served by the (customer_email_lc, created_at) indexes in db_indexes;
+  service_requests keep precedence, as before
+- backfill_customer_email_lc() sets the field on orders written before
+  it existed (at startup, and migrate_customer_emails.py)
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Collections holding customer orders, in lookup precedence
+ORDER_COLLECTIONS = ("service_requests", "orders")
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def normalize_email(email: Optional[str]) -> str:
+    """Lookup form of an email address (trimmed, lower case)"""
+    return (email or "").strip().lower()
+
+
+def _union_pipeline(match: Dict, sort: Dict, limit: int) -> List[Dict]:
+    """Same match/sort/limit on every order collection, tagged with its source"""
+    def branch(source: int) -> List[Dict]:
+        stages = [{"$match": match}]
+        if sort:
+            stages.append({"$sort": sort})
+        return stages + [{"$limit": limit}, {"$set": {"_source": source}}]
+
+    pipeline = branch(0)
+    for source, name in enumerate(ORDER_COLLECTIONS[1:], start=1):
+        pipeline.append({"$unionWith": {"coll": name, "pipeline": branch(source)}})
+    return pipeline + [{"$sort": {"_source": 1, **sort}}, {"$project": {"_id": 0}}]
+
+
+async def find_customer_order(db, order_id: str, email: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    Order with this id placed with this email, from either collection.
+
+    Returns:
+        (collection name, order), or (None, None) if no order matches
+    """
+    match = {"id": order_id, "customer_email_lc": normalize_email(email)}
+    cursor = db[ORDER_COLLECTIONS[0]].aggregate(_union_pipeline(match, {}, 1))
+    orders = await cursor.to_list(1)
+    if not orders:
+        return None, None
+    order = orders[0]
+    return ORDER_COLLECTIONS[order.pop("_source")], order
+
+
+async def find_customer_orders(db, email: str, limit: int = 100) -> List[Dict]:
+    """
+    Orders placed with this email: up to `limit` per collection, newest
+    first, service_requests before orders.
+    """
+    match = {"customer_email_lc": normalize_email(email)}
+    cursor = db[ORDER_COLLECTIONS[0]].aggregate(_union_pipeline(match, {"created_at": -1}, limit))
+    orders = await cursor.to_list(None)
+    for order in orders:
+        order.pop("_source", None)
+    return orders
+
+
+async def backfill_customer_email_lc(db) -> int:
+    """
+    Set customer_email_lc on orders that do not have it.
+
+    Returns:
+        Number of orders updated
+    """
+    updated = 0
+    for name in ORDER_COLLECTIONS:
+        collection = db[name]
+        cursor = collection.find(
+            {"customer_email": {"$type": "string"}, "customer_email_lc": {"$exists": False}},
+            {"_id": 1, "customer_email": 1},
+        )
+        batch = []
+        async for doc in cursor:
+            batch.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"customer_email_lc": normalize_email(doc["customer_email"])}},
+            ))
+            if len(batch) >= BACKFILL_BATCH_SIZE:
+                updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    if updated:
+        logger.info(f"Set customer_email_lc on {updated} orders")
+    return updated
@@ -0,0 +1,183 @@
+"""
+MongoDB Index Registry
+======================
+Indexes the server's hot lookups rely on, created at startup.
+
+Orders, service requests, DTC files, portal messages and the vehicle
+catalog are looked up by id (or parent id) on nearly every request, but
+nothing declared indexes for them (only import_dpf_database created the
+catalog ones), so each lookup scanned its collection.
+
+- INDEXES lists every required index; compound indexes follow the sort
+  order of the query they serve (e.g. portal messages by order_id,
+  oldest first), so results come back without an in-memory sort
+- ensure_indexes() creates them at startup; creating an index that
+  already exists is a no-op, a failing index is logged and skipped,
+  and an unreachable server ends the run instead of timing out on
+  every index
+- HOT_QUERIES are the lookups as the handlers issue them;
+  explain_hot_queries() reports the winning plan of each and flags
+  collection scans (GET /api/admin/db/query-plans)
+
+Indexes are not unique, so existing duplicates cannot fail startup.
+The analysis cache and blob store create their own indexes.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import ConnectionFailure
+
+logger = logging.getLogger(__name__)
+
+# [(field, 1 ascending / -1 descending), ...]
+IndexKeys = List[Tuple[str, int]]
+
+
+@dataclass
+class IndexSpec:
+    """An index a collection must have"""
+    collection: str
+    keys: IndexKeys
+    unique: bool = False
+
+
+@dataclass
+class HotQuery:
+    """A lookup issued by the handlers (filter values are placeholders)"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[IndexKeys] = None
+    limit: int = 0
+
+
+INDEXES: List[IndexSpec] = [
+    # Orders
+    IndexSpec("orders", [("id", 1)]),
+    IndexSpec("orders", [("file_id", 1), ("download_links", 1)]),
+    IndexSpec("orders", [("created_at", -1)]),
+    IndexSpec("service_requests", [("id", 1)]),
+    IndexSpec("service_requests", [("created_at", -1)]),
+    IndexSpec("contact_messages", [("created_at", -1)]),
+
+    # Portal orders by customer (see customer_orders)
+    IndexSpec("service_requests", [("customer_email_lc", 1), ("created_at", -1)]),
+    IndexSpec("orders", [("customer_email_lc", 1), ("created_at", -1)]),
+
+    # DTC delete engine
+    IndexSpec("dtc_files", [("id", 1)]),
+    IndexSpec("dtc_processed", [("download_id", 1)]),
+    IndexSpec("dtc_orders", [("id", 1)]),
+
+    # Customer portal
+    IndexSpec("portal_accounts", [("email", 1)]),
+    IndexSpec("portal_messages", [("order_id", 1), ("created_at", 1)]),
+
+    # Vehicle catalog
+    IndexSpec("vehicle_types", [("id", 1)]),
+    IndexSpec("vehicle_types", [("order", 1)]),
+    IndexSpec("manufacturers", [("id", 1)]),
+    IndexSpec("manufacturers", [("type_id", 1), ("name", 1)]),
+    IndexSpec("models", [("manufacturer_id", 1), ("name", 1)]),
+    IndexSpec("engines", [("id", 1)]),
+    IndexSpec("engines", [("model_id", 1), ("name", 1)]),
+]
+
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery("order_by_id", "orders", {"id": "order-id"}),
+    HotQuery("order_download_access", "orders",
+             {"file_id": "file-id", "download_links": "service-id", "payment_status": "completed"}),
+    HotQuery("admin_orders", "orders", {}, [("created_at", -1)], limit=50),
+    HotQuery("service_request_by_id", "service_requests", {"id": "request-id"}),
+    HotQuery("admin_service_requests", "service_requests", {}, [("created_at", -1)], limit=1000),
+    HotQuery("contact_messages", "contact_messages", {}, [("created_at", -1)], limit=100),
+    HotQuery("dtc_file_by_id", "dtc_files", {"id": "file-id"}),
+    HotQuery("dtc_download", "dtc_processed", {"download_id": "download-id"}),
+    HotQuery("dtc_order_by_id", "dtc_orders", {"id": "order-id"}),
+    HotQuery("portal_account", "portal_accounts", {"email": "customer@example.com"}),
+    HotQuery("portal_service_requests", "service_requests",
+             {"customer_email_lc": "customer@example.com"}, [("created_at", -1)], limit=100),
+    HotQuery("portal_orders", "orders",
+             {"customer_email_lc": "customer@example.com"}, [("created_at", -1)], limit=100),
+    HotQuery("portal_messages", "portal_messages", {"order_id": "order-id"}, [("created_at", 1)], limit=100),
+    HotQuery("vehicle_types", "vehicle_types", {}, [("order", 1)], limit=100),
+    HotQuery("manufacturers_by_type", "manufacturers", {"type_id": "type-id"}, [("name", 1)], limit=500),
+    HotQuery("models_by_manufacturer", "models", {"manufacturer_id": "manufacturer-id"}, [("name", 1)], limit=500),
+    HotQuery("engines_by_model", "engines", {"model_id": "model-id"}, [("name", 1)], limit=200),
+    HotQuery("engine_by_id", "engines", {"id": "engine-id"}),
+]
+
+
+async def ensure_indexes(db, indexes: List[IndexSpec] = INDEXES) -> List[str]:
+    """
+    Create the registered indexes (existing ones are left as they are).
+
+    Returns:
+        Names of the indexes ensured, as "collection.index_name"
+    """
+    ensured = []
+    for spec in indexes:
+        try:
+            name = await db[spec.collection].create_index(spec.keys, unique=spec.unique)
+            ensured.append(f"{spec.collection}.{name}")
+        except ConnectionFailure as e:
+            logger.warning(f"Index creation stopped, database unreachable: {e}")
+            break
+        except Exception as e:
+            logger.warning(f"Index {spec.collection} {spec.keys} could not be created: {e}")
+    logger.info(f"Ensured {len(ensured)}/{len(indexes)} MongoDB indexes")
+    return ensured
+
+
+def plan_stages(plan: Any) -> List[Tuple[str, Optional[str]]]:
+    """(stage, index name) of every node of a query plan, outermost first"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append((plan["stage"], plan.get("indexName")))
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def summarize_explain(query: HotQuery, explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Winning plan of an explain() result, flagging collection scans"""
+    planner = explain.get("queryPlanner", {})
+    stages = plan_stages(planner.get("winningPlan", {}))
+    execution = explain.get("executionStats", {})
+    return {
+        "name": query.name,
+        "collection": query.collection,
+        "filter": list(query.filter),
+        "sort": query.sort,
+        "stages": [stage for stage, _ in stages],
+        "indexes_used": sorted({index for _, index in stages if index}),
+        "collection_scan": any(stage == "COLLSCAN" for stage, _ in stages),
+        "in_memory_sort": any(stage == "SORT" for stage, _ in stages),
+        "docs_examined": execution.get("totalDocsExamined"),
+        "keys_examined": execution.get("totalKeysExamined"),
+        "returned": execution.get("nReturned"),
+    }
+
+
+async def explain_hot_queries(db, queries: List[HotQuery] = HOT_QUERIES) -> List[Dict[str, Any]]:
+    """Explain every hot query against the live database"""
+    results = []
+    for query in queries:
+        try:
+            cursor = db[query.collection].find(query.filter, {"_id": 0})
+            if query.sort:
+                cursor = cursor.sort(query.sort)
+            if query.limit:
+                cursor = cursor.limit(query.limit)
+            results.append(summarize_explain(query, await cursor.explain()))
+        except Exception as e:
+            logger.warning(f"Explain of {query.name} failed: {e}")
+            results.append({"name": query.name, "collection": query.collection, "error": str(e)})
+    return results
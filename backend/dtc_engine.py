@@ -12,8 +12,20 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import binascii
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+import numpy as np
+
+from ecu_engine.checksum_kernels import (
+    CRC32_IEEE_POLY, crc_patch, crc_register, reflect, word_sum, word_sum_patch, word_xor,
+)
+from ecu_engine.patches import Patch
+from ecu_engine.scanner import SignatureScanner
+
 
 class ChecksumType(Enum):
     CRC16 = "crc16"
@@ -55,12 +67,26 @@ class DTCDeleteResult:
 # Load DaVinci database on module import
 DAVINCI_DATABASE = None
 DAVINCI_CATEGORIES = {}
+DAVINCI_DATABASE_PATH = Path(__file__).parent / "dtc_database.json"
+
+# (mtime, size) of the loaded dtc_database.json, used to detect changes
+_davinci_stamp = None
+
+
+def _database_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        stat = DAVINCI_DATABASE_PATH.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 
 def load_davinci_database():
     """Load the DaVinci DTC database from JSON file"""
-    global DAVINCI_DATABASE, DAVINCI_CATEGORIES
+    global DAVINCI_DATABASE, DAVINCI_CATEGORIES, _davinci_stamp
+    _davinci_stamp = _database_stamp()
     try:
-        db_path = Path(__file__).parent / "dtc_database.json"
+        db_path = DAVINCI_DATABASE_PATH
         if db_path.exists():
             with open(db_path, 'r') as f:
                 data = json.load(f)
@@ -256,22 +282,247 @@ class DTCDatabase:
         return patterns
 
 
+class DTCScanner:
+    """
+    All binary/ASCII patterns of a DTC code list, searched in one pass.
+
+    Replaces one file_data.find() per code and pattern (12,000+ full
+    scans for the DaVinci database) with:
+    - one trie-regex pass for the ASCII patterns (SignatureScanner)
+    - one vectorized lookup pass for the 2-byte OBD-II patterns,
+      stopping as soon as every pattern has been seen
+    """
+
+    # Bytes examined per NumPy batch when looking for 2-byte patterns
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, dtc_codes: List[str], stamp=None):
+        self.stamp = stamp
+        self.codes: List[Tuple[str, List[bytes]]] = []
+        long_patterns = set()
+        short_keys = set()
+
+        for dtc_code in dtc_codes:
+            patterns = [p for p in DTCDatabase.dtc_to_binary(dtc_code) if len(p) >= 2]
+            self.codes.append((dtc_code, patterns))
+            for pattern in patterns:
+                if len(pattern) == 2:
+                    short_keys.add((pattern[0] << 8) | pattern[1])
+                else:
+                    long_patterns.add(pattern)
+
+        self._scanner = SignatureScanner()
+        self._scanner.add_literals(long_patterns)
+        self._scanner.compile()
+        self._long_patterns = long_patterns
+
+        self._short_keys = np.array(sorted(short_keys), dtype=np.int64)
+        self._short_lookup = np.zeros(65536, dtype=bool)
+        self._short_lookup[self._short_keys] = True
+
+    def first_offsets(self, file_data: bytes) -> Dict[bytes, int]:
+        """Offset of the first occurrence of every pattern found in the file"""
+        first = {}
+        result = self._scanner.scan(file_data)
+        for pattern in self._long_patterns:
+            offset = result.find(pattern)
+            if offset != -1:
+                first[pattern] = offset
+
+        arr = np.frombuffer(file_data, dtype=np.uint8)
+        remaining = len(self._short_keys)
+        for start in range(0, max(len(arr) - 1, 0), self.CHUNK_SIZE):
+            chunk = arr[start:start + self.CHUNK_SIZE + 1]
+            values = (chunk[:-1].astype(np.uint16) << 8) | chunk[1:]
+            positions = np.flatnonzero(self._short_lookup[values])
+            keys, index = np.unique(values[positions], return_index=True)
+            for key, pos in zip(keys.tolist(), positions[index].tolist()):
+                pattern = bytes((key >> 8, key & 0xFF))
+                if pattern not in first:
+                    first[pattern] = start + pos
+                    remaining -= 1
+            if not remaining:
+                break
+
+        return first
+
+    def scan(self, file_data: bytes) -> List[Tuple[str, int, bytes]]:
+        """
+        Find every listed DTC present in the file.
+
+        Returns:
+            (code, offset, pattern) per found code, in list order. The
+            pattern is the first of the code's patterns that occurs and
+            the offset its first occurrence (same as trying
+            file_data.find() on each pattern in turn).
+        """
+        first = self.first_offsets(file_data)
+        found = []
+        for dtc_code, patterns in self.codes:
+            for pattern in patterns:
+                if pattern in first:
+                    found.append((dtc_code, first[pattern], pattern))
+                    break
+        return found
+
+
+_dtc_scanner: Optional[DTCScanner] = None
+
+
+def get_dtc_scanner() -> DTCScanner:
+    """
+    DTC scanner for the current database.
+
+    Built once and rebuilt when dtc_database.json changes on disk (the
+    database itself is reloaded at the same time).
+    """
+    global _dtc_scanner
+    if _database_stamp() != _davinci_stamp:
+        load_davinci_database()
+    if _dtc_scanner is None or _dtc_scanner.stamp != _davinci_stamp:
+        codes = DAVINCI_DATABASE or DTCDatabase.DTC_DESCRIPTIONS
+        _dtc_scanner = DTCScanner(list(codes.keys()), stamp=_davinci_stamp)
+    return _dtc_scanner
+
+
+# Detected checksum layouts by file SHA-256 (see detect_checksum_type)
+CHECKSUM_LAYOUT_CACHE_SIZE = 128
+_checksum_layouts: "OrderedDict[str, Tuple[ChecksumType, Dict]]" = OrderedDict()
+_checksum_layout_lock = threading.Lock()
+
+
+class ChecksumProbe:
+    """
+    Checksum location prober for one file.
+    
+    Cumulative 8/16/32-bit word sums (mod 2^32) are computed once, so a
+    sum over data[:k] for any candidate k is a single lookup, and the
+    CRCs of all candidate prefixes are taken in one chained pass.
+    
+    Candidates are probed in a fixed order: the classic locations first
+    (CRC16 / CRC32 at end of file, Bosch 16-bit sums at 0x1FE..0x3FFE),
+    then the end of every power-of-two region for byte/word sums and
+    CRCs, and finally the simple-sum default.
+    """
+    
+    # Classic Bosch 16-bit byte-sum locations
+    BOSCH_OFFSETS = [0x1FE, 0x3FE, 0x7FE, 0xFFE, 0x1FFE, 0x3FFE]
+    
+    # Smallest region whose end is probed in the extended search
+    MIN_REGION = 0x200
+    
+    def __init__(self, data: bytes):
+        self.data = data
+        self.size = len(data)
+        self._sums = {
+            word_size: self._cumulative(data, word_size) for word_size in (1, 2, 4)
+        }
+    
+    @staticmethod
+    def _cumulative(data: bytes, word_size: int) -> np.ndarray:
+        words = np.frombuffer(data, dtype=f"<u{word_size}", count=len(data) // word_size)
+        sums = np.zeros(len(words) + 1, dtype=np.uint32)
+        np.cumsum(words, dtype=np.uint32, out=sums[1:])
+        return sums
+    
+    def prefix_sum(self, end: int, word_size: int = 1) -> int:
+        """Sum (mod 2^32) of the whole words in data[:end]"""
+        return int(self._sums[word_size][end // word_size])
+    
+    def stored(self, offset: int, size: int) -> int:
+        """Little-endian value stored at offset"""
+        return int.from_bytes(self.data[offset:offset + size], 'little')
+    
+    def prefix_crcs(self, ends: List[int], width: int) -> Dict[int, int]:
+        """CRC16 (0x8005, init 0xFFFF) or CRC32 of data[:end] for every end"""
+        results = {}
+        value = 0xFFFF if width == 16 else 0
+        pos = 0
+        view = memoryview(self.data)
+        for end in sorted(set(ends)):
+            if width == 16:
+                value = crc_register(view[pos:end], 16, 0x8005, value)
+            else:
+                value = binascii.crc32(view[pos:end], value)
+            results[end] = value & 0xFFFFFFFF
+            pos = end
+        return results
+    
+    def _region_ends(self) -> List[int]:
+        ends = []
+        region = self.MIN_REGION
+        while region < self.size:
+            ends.append(region)
+            region <<= 1
+        ends.append(self.size)
+        return ends
+    
+    def _result(self, checksum_type: ChecksumType, offset: int, size: int,
+                verified: bool = True, **extra) -> Tuple[ChecksumType, Dict]:
+        details = {
+            "file_size": self.size,
+            "possible_locations": [],
+            "detected_type": checksum_type.value,
+            "checksum_offset": offset,
+            "checksum_size": size,
+            "verified": verified,  # Stored value matched the calculation
+            **extra,
+        }
+        return checksum_type, details
+    
+    def detect(self) -> Tuple[ChecksumType, Dict]:
+        """Probe all candidates, first match wins"""
+        size = self.size
+        ends = self._region_ends()
+        crc16s = self.prefix_crcs([end - 2 for end in ends if end >= 2], 16)
+        crc32s = self.prefix_crcs([end - 4 for end in ends if end >= 4], 32)
+        
+        # Classic: CRC16 / CRC32 over everything before the last 2 / 4 bytes
+        if size >= 4:
+            if self.stored(size - 2, 2) == crc16s[size - 2]:
+                return self._result(ChecksumType.CRC16, size - 2, 2)
+            if self.stored(size - 4, 4) == crc32s[size - 4]:
+                return self._result(ChecksumType.CRC32, size - 4, 4)
+        
+        # Classic: Bosch-style 16-bit byte sums at specific offsets
+        for offset in self.BOSCH_OFFSETS:
+            if offset < size - 2:
+                if self.stored(offset, 2) == self.prefix_sum(offset) & 0xFFFF:
+                    return self._result(ChecksumType.BOSCH_CUSTOM, offset, 2)
+        
+        # Extended: checksum in the last bytes of a power-of-two region.
+        # Erased (0 / all-ones) values match trivially and are skipped.
+        for end in ends:
+            if end < 8:
+                continue
+            off16, off32 = end - 2, end - 4
+            stored16, stored32 = self.stored(off16, 2), self.stored(off32, 4)
+            if stored16 not in (0, 0xFFFF):
+                if stored16 == self.prefix_sum(off16) & 0xFFFF:
+                    return self._result(ChecksumType.BOSCH_CUSTOM, off16, 2)
+                if stored16 == self.prefix_sum(off16, 2) & 0xFFFF:
+                    return self._result(ChecksumType.SIMPLE_SUM, off16, 2, word_size=2)
+                if stored16 == crc16s[off16]:
+                    return self._result(ChecksumType.CRC16, off16, 2)
+            if stored32 not in (0, 0xFFFFFFFF):
+                if stored32 == self.prefix_sum(off32):
+                    return self._result(ChecksumType.SIMPLE_SUM, off32, 4)
+                if stored32 == self.prefix_sum(off32, 4):
+                    return self._result(ChecksumType.SIMPLE_SUM, off32, 4, word_size=4)
+                if stored32 == crc32s[off32]:
+                    return self._result(ChecksumType.CRC32, off32, 4)
+        
+        # Default: assume simple sum at end
+        return self._result(ChecksumType.SIMPLE_SUM, size - 2, 2, verified=False)
+
+
 class ChecksumEngine:
     """Engine for calculating and correcting ECU checksums"""
     
     @staticmethod
     def crc16(data: bytes, poly: int = 0x8005, init: int = 0xFFFF) -> int:
         """Calculate CRC16 checksum"""
-        crc = init
-        for byte in data:
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ poly
-                else:
-                    crc <<= 1
-                crc &= 0xFFFF
-        return crc
+        return crc_register(data, 16, poly, init)
     
     @staticmethod
     def crc32(data: bytes) -> int:
@@ -281,7 +532,7 @@ class ChecksumEngine:
     @staticmethod
     def simple_sum(data: bytes, width: int = 16) -> int:
         """Calculate simple sum checksum"""
-        total = sum(data)
+        total = word_sum(data)
         if width == 8:
             return total & 0xFF
         elif width == 16:
@@ -293,99 +544,133 @@ class ChecksumEngine:
     @staticmethod
     def xor_checksum(data: bytes) -> int:
         """Calculate XOR checksum"""
-        result = 0
-        for byte in data:
-            result ^= byte
-        return result
+        return word_xor(data)
     
     @staticmethod
     def detect_checksum_type(data: bytes) -> Tuple[ChecksumType, Dict]:
         """
         Attempt to detect the checksum type used in the ECU file.
         Returns the detected type and details about its location.
-        """
-        file_size = len(data)
-        details = {
-            "file_size": file_size,
-            "possible_locations": [],
-            "detected_type": ChecksumType.UNKNOWN.value
-        }
-        
-        # Common checksum locations
-        # End of file (last 2 or 4 bytes)
-        if file_size >= 4:
-            # Check if last 2 bytes could be CRC16
-            stored_crc16 = struct.unpack('<H', data[-2:])[0]
-            calc_crc16 = ChecksumEngine.crc16(data[:-2])
-            if stored_crc16 == calc_crc16:
-                details["checksum_offset"] = file_size - 2
-                details["checksum_size"] = 2
-                details["detected_type"] = ChecksumType.CRC16.value
-                return ChecksumType.CRC16, details
-            
-            # Check CRC32
-            stored_crc32 = struct.unpack('<I', data[-4:])[0]
-            calc_crc32 = ChecksumEngine.crc32(data[:-4])
-            if stored_crc32 == calc_crc32:
-                details["checksum_offset"] = file_size - 4
-                details["checksum_size"] = 4
-                details["detected_type"] = ChecksumType.CRC32.value
-                return ChecksumType.CRC32, details
-        
-        # Check for Bosch-style checksums (at specific offsets)
-        bosch_offsets = [0x1FE, 0x3FE, 0x7FE, 0xFFE, 0x1FFE, 0x3FFE]
-        for offset in bosch_offsets:
-            if offset < file_size - 2:
-                stored = struct.unpack('<H', data[offset:offset+2])[0]
-                calc = ChecksumEngine.simple_sum(data[:offset], 16)
-                if stored == calc:
-                    details["checksum_offset"] = offset
-                    details["checksum_size"] = 2
-                    details["detected_type"] = ChecksumType.BOSCH_CUSTOM.value
-                    return ChecksumType.BOSCH_CUSTOM, details
-        
-        # Default: assume simple sum at end
-        details["checksum_offset"] = file_size - 2
-        details["checksum_size"] = 2
-        details["detected_type"] = ChecksumType.SIMPLE_SUM.value
         
-        return ChecksumType.SIMPLE_SUM, details
+        The layout is cached per file hash (analysis and deletion of the
+        same file only probe it once).
+        """
+        file_hash = hashlib.sha256(data).hexdigest()
+        with _checksum_layout_lock:
+            cached = _checksum_layouts.get(file_hash)
+            if cached is not None:
+                _checksum_layouts.move_to_end(file_hash)
+        if cached is None:
+            cached = ChecksumProbe(data).detect()
+            with _checksum_layout_lock:
+                _checksum_layouts[file_hash] = cached
+                while len(_checksum_layouts) > CHECKSUM_LAYOUT_CACHE_SIZE:
+                    _checksum_layouts.popitem(last=False)
+        
+        checksum_type, details = cached
+        # Callers annotate details (e.g. correction errors) - hand out a copy
+        return checksum_type, copy.deepcopy(details)
     
     @staticmethod
-    def correct_checksum(data: bytes, checksum_type: ChecksumType, details: Dict) -> bytes:
+    def correct_checksum(data: bytes, checksum_type: ChecksumType, details: Dict,
+                         patches: Optional[List[Patch]] = None) -> bytes:
         """
         Correct/recalculate the checksum after file modification.
+        
+        If the checksum was verified on the original file and the patches
+        that turned it into data are given, the new checksum is derived
+        from the stored one and the patched bytes alone.
         """
         offset = details.get("checksum_offset", len(data) - 2)
         size = details.get("checksum_size", 2)
         
-        # Create mutable copy
+        new_checksum = None
+        if patches is not None and details.get("verified"):
+            new_checksum = ChecksumEngine._patched_checksum(
+                data, checksum_type, offset, size, details.get("word_size", 1), patches
+            )
+        
+        # Create mutable copy; the checksummed range is read through a view
         modified = bytearray(data)
+        checksummed = memoryview(modified)[:offset]
         
         if checksum_type == ChecksumType.CRC16:
-            new_checksum = ChecksumEngine.crc16(bytes(modified[:offset]))
+            if new_checksum is None:
+                new_checksum = ChecksumEngine.crc16(checksummed)
             modified[offset:offset+2] = struct.pack('<H', new_checksum)
             
         elif checksum_type == ChecksumType.CRC32:
-            new_checksum = ChecksumEngine.crc32(bytes(modified[:offset]))
+            if new_checksum is None:
+                new_checksum = ChecksumEngine.crc32(checksummed)
             modified[offset:offset+4] = struct.pack('<I', new_checksum)
             
+        elif checksum_type == ChecksumType.SIMPLE_SUM and details.get("word_size", 1) > 1:
+            word_size = details["word_size"]
+            if new_checksum is None:
+                new_checksum = word_sum(checksummed, word_size) & ((1 << (size * 8)) - 1)
+            modified[offset:offset+size] = new_checksum.to_bytes(size, 'little')
+            
         elif checksum_type == ChecksumType.SIMPLE_SUM:
-            new_checksum = ChecksumEngine.simple_sum(bytes(modified[:offset]), size * 8)
+            if new_checksum is None:
+                new_checksum = ChecksumEngine.simple_sum(checksummed, size * 8)
             if size == 2:
                 modified[offset:offset+2] = struct.pack('<H', new_checksum & 0xFFFF)
             elif size == 4:
                 modified[offset:offset+4] = struct.pack('<I', new_checksum)
                 
         elif checksum_type == ChecksumType.XOR:
-            new_checksum = ChecksumEngine.xor_checksum(bytes(modified[:offset]))
+            new_checksum = ChecksumEngine.xor_checksum(checksummed)
             modified[offset] = new_checksum
             
         elif checksum_type in [ChecksumType.BOSCH_CUSTOM, ChecksumType.DENSO_CUSTOM]:
-            new_checksum = ChecksumEngine.simple_sum(bytes(modified[:offset]), 16)
+            if new_checksum is None:
+                new_checksum = ChecksumEngine.simple_sum(checksummed, 16)
             modified[offset:offset+2] = struct.pack('<H', new_checksum & 0xFFFF)
         
         return bytes(modified)
+    
+    @staticmethod
+    def _patched_checksum(data: bytes, checksum_type: ChecksumType, offset: int,
+                          size: int, word_size: int, patches: List[Patch]) -> Optional[int]:
+        """
+        Checksum over data[:offset] from the stored (verified) value and
+        the patches, or None if it has to be recalculated.
+        """
+        if any(patch.offset < offset + size and offset < patch.end for patch in patches):
+            return None  # The stored checksum itself was overwritten
+        stored = int.from_bytes(data[offset:offset + size], 'little')
+        
+        # Only bytes inside the checksummed range (whole words) count
+        limit = offset // word_size * word_size
+        pieces = []
+        for patch in patches:
+            n = min(len(patch.old), limit - patch.offset)
+            if n > 0:
+                pieces.append((patch.offset, patch.old[:n], patch.new[:n]))
+        
+        if checksum_type == ChecksumType.CRC16:
+            register = stored
+            for position, old, new in pieces:
+                register = crc_patch(register, 16, 0x8005, offset - position - len(old), old, new)
+            return register
+        
+        if checksum_type == ChecksumType.CRC32:
+            # binascii CRC32: reflected, initial value and output XOR all-ones
+            register = reflect(stored ^ 0xFFFFFFFF, 32)
+            for position, old, new in pieces:
+                register = crc_patch(
+                    register, 32, CRC32_IEEE_POLY, offset - position - len(old), old, new, True
+                )
+            return reflect(register, 32) ^ 0xFFFFFFFF
+        
+        if checksum_type in (ChecksumType.SIMPLE_SUM, ChecksumType.BOSCH_CUSTOM,
+                             ChecksumType.DENSO_CUSTOM):
+            total = stored + sum(
+                word_sum_patch(position, old, new, word_size) for position, old, new in pieces
+            )
+            return total & ((1 << (size * 8)) - 1)
+        
+        return None
 
 
 class DTCDeleteEngine:
@@ -418,45 +703,20 @@ class DTCDeleteEngine:
             "details": checksum_details
         }
         
-        # First, scan using DaVinci database (2000+ codes) for comprehensive detection
-        scanned_codes = set()
-        
-        if DAVINCI_DATABASE:
-            # Scan against DaVinci's comprehensive database
-            for dtc_code in DAVINCI_DATABASE.keys():
-                if dtc_code in scanned_codes:
-                    continue
-                patterns = DTCDatabase.dtc_to_binary(dtc_code)
-                for pattern in patterns:
-                    if len(pattern) >= 2:  # Only search valid patterns
-                        offset = file_data.find(pattern)
-                        if offset != -1:
-                            result["detected_dtcs"].append({
-                                "code": dtc_code,
-                                "description": DAVINCI_DATABASE.get(dtc_code, f'DTC {dtc_code}'),
-                                "offset": offset,
-                                "pattern": pattern.hex()
-                            })
-                            scanned_codes.add(dtc_code)
-                            break  # Found this DTC, move to next
-        
-        # Fallback: scan local DTC descriptions if DaVinci not available
-        if not DAVINCI_DATABASE:
-            for dtc_code in DTCDatabase.DTC_DESCRIPTIONS.keys():
-                if dtc_code in scanned_codes:
-                    continue
-                patterns = DTCDatabase.dtc_to_binary(dtc_code)
-                for pattern in patterns:
-                    offset = file_data.find(pattern)
-                    if offset != -1:
-                        result["detected_dtcs"].append({
-                            "code": dtc_code,
-                            "description": DTCDatabase.get_description(dtc_code),
-                            "offset": offset,
-                            "pattern": pattern.hex()
-                        })
-                        scanned_codes.add(dtc_code)
-                        break  # Found this DTC, move to next
+        # Scan against DaVinci's comprehensive database (2000+ codes) in a
+        # single pass; falls back to local DTC descriptions if DaVinci is
+        # not available
+        for dtc_code, offset, pattern in get_dtc_scanner().scan(file_data):
+            if DAVINCI_DATABASE:
+                description = DAVINCI_DATABASE.get(dtc_code, f'DTC {dtc_code}')
+            else:
+                description = DTCDatabase.get_description(dtc_code)
+            result["detected_dtcs"].append({
+                "code": dtc_code,
+                "description": description,
+                "offset": offset,
+                "pattern": pattern.hex()
+            })
         
         # Sort detected DTCs by code for consistent ordering
         result["detected_dtcs"].sort(key=lambda x: x["code"])
@@ -529,20 +789,27 @@ class DTCDeleteEngine:
         dtcs_not_found = []
         
         modified_data = bytearray(file_data)
+        patches: List[Patch] = []  # Every overwrite, in order (for the checksum)
         
-        for dtc_code in dtc_codes:
-            dtc_code = dtc_code.upper().strip()
-            patterns = DTCDatabase.dtc_to_binary(dtc_code)
-            
+        requested = [
+            (dtc_code, DTCDatabase.dtc_to_binary(dtc_code))
+            for dtc_code in (code.upper().strip() for code in dtc_codes)
+        ]
+        
+        # Patch plan: every occurrence of every requested pattern, one scan
+        scanner = SignatureScanner()
+        for _, patterns in requested:
+            scanner.add_literals(patterns)
+        candidates = scanner.scan(file_data)
+        
+        for dtc_code, patterns in requested:
             found = False
             instance_count = 0
+            description = DTCDatabase.get_description(dtc_code)
             for pattern in patterns:
-                offset = 0
-                while True:
-                    pos = bytes(modified_data).find(pattern, offset)
-                    if pos == -1:
-                        break
-                    
+                pattern_hex = pattern.hex()
+                new_bytes = "FF" * len(pattern)
+                for pos in self._live_matches(modified_data, pattern, candidates.offsets(pattern)):
                     found = True
                     instance_count += 1
                     
@@ -559,18 +826,17 @@ class DTCDeleteEngine:
                         sub_code = f"{dtc_code}-{fault_byte:02d}"
                         
                         # Some ECUs use 2-byte sub-codes
-                        if pos + len(pattern) + 2 <= len(modified_data):
-                            extended_byte = modified_data[pos + len(pattern) + 1]
-                            if extended_byte != 0x00 and extended_byte != 0xFF:
-                                sub_code_hex = f"{fault_byte:02X}{extended_byte:02X}"
+                        extended_byte = modified_data[pos + len(pattern) + 1]
+                        if extended_byte != 0x00 and extended_byte != 0xFF:
+                            sub_code_hex = f"{fault_byte:02X}{extended_byte:02X}"
                     
                     dtc_info = {
                         "code": dtc_code,
-                        "description": DTCDatabase.get_description(dtc_code),
+                        "description": description,
                         "offset": pos,
                         "offset_hex": f"0x{pos:06X}",
-                        "pattern": pattern.hex(),
-                        "original_bytes": modified_data[pos:pos+len(pattern)].hex(),
+                        "pattern": pattern_hex,
+                        "original_bytes": pattern_hex,
                         "instance": instance_count,
                         "sub_code": sub_code,
                         "sub_code_hex": sub_code_hex,
@@ -579,20 +845,16 @@ class DTCDeleteEngine:
                     }
                     dtcs_found.append(dtc_info)
                     
-                    # Delete by replacing with 0xFF (common masking value)
-                    for i in range(len(pattern)):
-                        modified_data[pos + i] = 0xFF
-                    
-                    # Also clear the fault byte/sub-code
-                    if pos + len(pattern) < len(modified_data):
-                        modified_data[pos + len(pattern)] = 0xFF
+                    # Delete by replacing with 0xFF (common masking value),
+                    # also clearing the fault byte/sub-code
+                    end = min(pos + len(pattern) + 1, len(modified_data))
+                    patches.append(Patch(pos, bytes(modified_data[pos:end]), b'\xff' * (end - pos)))
+                    modified_data[pos:end] = b'\xff' * (end - pos)
                     
                     dtc_info_deleted = dtc_info.copy()
-                    dtc_info_deleted["new_bytes"] = "FF" * len(pattern)
+                    dtc_info_deleted["new_bytes"] = new_bytes
                     dtcs_deleted.append(dtc_info_deleted)
                     
-                    offset = pos + len(pattern)
-                    
             if not found:
                 dtcs_not_found.append(dtc_code)
         
@@ -604,12 +866,11 @@ class DTCDeleteEngine:
         if correct_checksum and dtcs_deleted:
             checksum_type, checksum_details = self.checksum_engine.detect_checksum_type(file_data)
             try:
-                modified_data = bytearray(
-                    self.checksum_engine.correct_checksum(
-                        bytes(modified_data), 
-                        checksum_type, 
-                        checksum_details
-                    )
+                modified_data = self.checksum_engine.correct_checksum(
+                    modified_data,
+                    checksum_type,
+                    checksum_details,
+                    patches
                 )
                 checksum_corrected = True
             except Exception as e:
@@ -630,6 +891,32 @@ class DTCDeleteEngine:
             error_message=None if dtcs_deleted else "No requested DTCs found in file"
         )
     
+    @staticmethod
+    def _live_matches(data: bytearray, pattern: bytes, candidates: List[int]):
+        """
+        Non-overlapping occurrences of a pattern in data that is being
+        modified while iterating (same as repeated data.find(pattern, end)).
+
+        candidates are the pattern's offsets in the unmodified file. Earlier
+        deletions only write 0xFF, so they can remove candidates (checked
+        here) but only create new matches for patterns containing 0xFF,
+        which are searched in the live data instead.
+        """
+        size = len(pattern)
+        if 0xFF in pattern:
+            pos = data.find(pattern)
+            while pos != -1:
+                yield pos
+                pos = data.find(pattern, pos + size)
+            return
+        
+        view = memoryview(data)
+        next_free = 0
+        for pos in candidates:
+            if pos >= next_free and view[pos:pos + size] == pattern:
+                yield pos
+                next_free = pos + size
+    
     def scan_all_dtcs(self, file_data: bytes) -> List[Dict]:
         """
         Scan file for all recognizable DTCs.
@@ -655,7 +942,7 @@ class DTCDeleteEngine:
         
         # Also scan for pattern-based DTCs (Pxxxx format)
         # Look for ASCII patterns
-        text_data = file_data.decode('ascii', errors='ignore')
+        text_data = str(file_data, 'ascii', errors='ignore')  # bytes or mmap
         dtc_pattern = re.compile(r'[PCBU][0-9A-Fa-f]{4}')
         
         for match in dtc_pattern.finditer(text_data):
@@ -716,5 +1003,8 @@ class DTCDeleteEngine:
         return 'General'
 
 
+# Build the DTC scanner at import (rebuilt if dtc_database.json changes)
+get_dtc_scanner()
+
 # Create singleton instance
 dtc_delete_engine = DTCDeleteEngine()
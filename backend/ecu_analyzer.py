@@ -22,25 +22,643 @@ Analysis includes:
 
 import re
 import struct
-from typing import Dict, List, Any
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Any, Tuple
+
+from ecu_engine.detectors import DETECTORS, RuleKind
+from ecu_engine.map_discovery import discover_maps
+from ecu_engine.regions import RegionIndex
+from ecu_engine.sequences import find_followed_by
 
 # Import ECU database
 try:
     from ecu_database import (
-        ECU_MANUFACTURER_SIGNATURES,
-        ECU_TYPE_PATTERNS,
-        TRUCK_BRAND_SIGNATURES,
-        TRUCK_ECUS_WITH_SCR,
-        SCR_DCU_SIGNATURES,
-        DPF_DETECTION_PATTERNS,
-        EGR_DETECTION_PATTERNS,
-        SCR_DETECTION_PATTERNS,
+        DPF_TEXT_MARKER_RULES,
+        DENSO_DPF_RULES,
+        EGR_TEXT_MARKER_RULES,
     )
     HAS_ECU_DATABASE = True
 except ImportError:
     HAS_ECU_DATABASE = False
 
 
+# =============================================================================
+# IDENTIFICATION SIGNATURES
+# =============================================================================
+
+# Copyright strings (most reliable manufacturer evidence)
+COPYRIGHT_PATTERNS = [
+    # Bosch
+    (rb"(?i)copyright.*robert\s*bosch", "Bosch"),
+    (rb"(?i)\(c\)\s*robert\s*bosch", "Bosch"),
+    (rb"(?i)bosch\s*gmbh", "Bosch"),
+    (rb"Robert Bosch GmbH", "Bosch"),
+
+    # Continental/Siemens
+    (rb"(?i)copyright.*continental", "Continental"),
+    (rb"(?i)copyright.*siemens", "Siemens/Continental"),
+    (rb"(?i)continental\s*automotive", "Continental"),
+    (rb"Continental AG", "Continental"),
+    (rb"Siemens VDO", "Siemens/Continental"),
+
+    # Denso
+    (rb"(?i)copyright.*denso", "Denso"),
+    (rb"(?i)\(c\)\s*denso", "Denso"),
+    (rb"DENSO CORPORATION", "Denso"),
+    (rb"Denso Corporation", "Denso"),
+
+    # Delphi
+    (rb"(?i)copyright.*delphi", "Delphi"),
+    (rb"Delphi Technologies", "Delphi"),
+    (rb"DELPHI AUTOMOTIVE", "Delphi"),
+
+    # Marelli
+    (rb"(?i)copyright.*marelli", "Marelli"),
+    (rb"(?i)magneti\s*marelli", "Marelli"),
+    (rb"MAGNETI MARELLI", "Marelli"),
+
+    # Hitachi
+    (rb"(?i)copyright.*hitachi", "Hitachi"),
+    (rb"Hitachi Automotive", "Hitachi"),
+    (rb"HITACHI ASTEMO", "Hitachi"),
+
+    # Transtron
+    (rb"(?i)copyright.*transtron", "Transtron"),
+    (rb"TRANSTRON INC", "Transtron"),
+    (rb"Transtron Inc", "Transtron"),
+
+    # Keihin
+    (rb"(?i)copyright.*keihin", "Keihin"),
+    (rb"KEIHIN CORPORATION", "Keihin"),
+
+    # Mitsubishi Electric
+    (rb"(?i)copyright.*mitsubishi", "Mitsubishi Electric"),
+    (rb"MITSUBISHI ELECTRIC", "Mitsubishi Electric"),
+]
+
+# Direct manufacturer names: (signature, manufacturer, vehicle hint)
+MANUFACTURER_SIGNATURES = [
+    # Primary signatures (exact match, high confidence)
+    (b"TRANSTRON", "Transtron", "Subaru/Nissan/Mazda"),
+    (b"Transtron", "Transtron", "Subaru/Nissan/Mazda"),
+    (b"DENSO", "Denso", None),
+    (b"Denso", "Denso", None),
+    (b"BOSCH", "Bosch", None),
+    (b"Bosch", "Bosch", None),
+    (b"CONTINENTAL", "Continental", None),
+    (b"Continental", "Continental", None),
+    (b"SIEMENS", "Siemens/Continental", None),
+    (b"Siemens", "Siemens/Continental", None),
+    (b"DELPHI", "Delphi", None),
+    (b"Delphi", "Delphi", None),
+    (b"MARELLI", "Marelli", None),
+    (b"Marelli", "Marelli", None),
+    (b"HITACHI", "Hitachi", None),
+    (b"Hitachi", "Hitachi", None),
+    (b"KEIHIN", "Keihin", "Honda/Acura"),
+    (b"Keihin", "Keihin", "Honda/Acura"),
+    (b"KEFICO", "Kefico", "Hyundai/Kia"),
+    (b"Kefico", "Kefico", "Hyundai/Kia"),
+    (b"JATCO", "Jatco", "Nissan/Renault CVT"),
+    (b"AISIN", "Aisin", "Toyota Transmission"),
+    (b"CUMMINS", "Cummins", "Commercial/Truck"),
+    (b"Cummins", "Cummins", "Commercial/Truck"),
+    (b"MOTOROLA", "Motorola", None),
+    (b"Visteon", "Visteon", "Ford"),
+    (b"VISTEON", "Visteon", "Ford"),
+    (b"VALEO", "Valeo", None),
+    (b"WABCO", "Wabco", "Commercial/Truck"),
+    (b"KNORR", "Knorr-Bremse", "Commercial/Truck"),
+    (b"ZF Friedrichshafen", "ZF", "Transmission"),
+    (b"WEICHAI", "Weichai", "Chinese Truck"),
+    (b"YUCHAI", "Yuchai", "Chinese Truck"),
+]
+
+# ECU type patterns organized by manufacturer
+# IMPORTANT: More specific patterns should come first
+ECU_FAMILY_PATTERNS = [
+    # ===================
+    # BOSCH ECU Types
+    # ===================
+    # Diesel ECUs - More specific patterns first
+    (rb"EDC17[A-Z]{2}[0-9]{1,2}", "Bosch", "Diesel"),  # EDC17CP52, EDC17C46, etc.
+    (rb"EDC17[A-Z][0-9]{1,2}", "Bosch", "Diesel"),     # EDC17C4, EDC17C5, etc.
+    (rb"EDC17[A-Z]{2}", "Bosch", "Diesel"),            # EDC17CP, EDC17CV, etc.
+    (rb"EDC17", "Bosch", "Diesel"),                     # Fallback
+    (rb"EDC16[A-Z]{0,2}[0-9]{0,2}", "Bosch", "Diesel"),
+    (rb"EDC15[A-Z]{0,2}[0-9]{0,2}", "Bosch", "Diesel"),
+    (rb"MD1[A-Z]{2}[0-9]{0,3}", "Bosch", "Latest Diesel"),
+
+    # Gasoline ECUs
+    (rb"MED17[A-Z]{0,2}[0-9.]{0,4}", "Bosch", "Gasoline"),
+    (rb"MED9[A-Z]{0,2}[0-9.]{0,3}", "Bosch", "Gasoline"),
+    (rb"ME7[A-Z]{0,2}[0-9.]{0,3}", "Bosch", "Gasoline"),
+    (rb"ME17[A-Z]{0,2}[0-9.]{0,3}", "Bosch", "Gasoline"),
+    (rb"MG1[A-Z]{2}[0-9]{0,3}", "Bosch", "Latest Gasoline"),
+    (rb"MEVD17", "Bosch", "Direct Injection"),
+    (rb"MED[0-9]", "Bosch", "Gasoline"),
+
+    # Transmission
+    (rb"GS[0-9]{2}", "Bosch", "Transmission"),
+
+    # ===================
+    # CONTINENTAL/SIEMENS
+    # ===================
+    (rb"SID[0-9]{3}", "Continental", "Diesel"),
+    (rb"SID[0-9]{2}[A-Z]", "Continental", "Diesel"),
+    (rb"SIMOS[0-9]{1,2}[.][0-9]", "Continental", "Gasoline"),
+    (rb"SIMOS\s*[0-9]{1,2}", "Continental", "Gasoline"),
+    (rb"PCR[0-9.]+", "Continental", "Diesel"),
+    (rb"EMS[0-9]{4}", "Continental", None),
+    (rb"SIM[0-9]{2}", "Continental", None),
+
+    # ===================
+    # DELPHI
+    # ===================
+    (rb"DCM[0-9.]+", "Delphi", "Diesel"),
+    (rb"DCM[0-9]{1,2}[A-Z]{0,2}", "Delphi", "Diesel"),
+    (rb"MT[0-9]{2}[A-Z]?", "Delphi", None),
+    (rb"DDCR", "Delphi", "Diesel"),
+
+    # ===================
+    # MARELLI
+    # ===================
+    (rb"IAW[0-9]{2,3}[A-Z]{0,3}", "Marelli", None),
+    (rb"MJD[0-9]{1,2}[A-Z]{0,3}[0-9]{0,2}", "Marelli", None),
+    (rb"IAW\s*[0-9][A-Z][A-Z0-9]", "Marelli", None),
+
+    # ===================
+    # DENSO
+    # ===================
+    (rb"SH7058", "Denso", "SH7058 MCU"),
+    (rb"SH7059", "Denso", "SH7059 MCU"),
+    (rb"SH705[0-9]", "Denso", "SH705x MCU"),
+    (rb"76F00[0-9]+", "Denso", "NEC 76F"),
+    (rb"RH850", "Denso", "RH850 MCU"),
+
+    # ===================
+    # HITACHI
+    # ===================
+    (rb"MEC[0-9]{2}-[0-9]{3}", "Hitachi", None),
+    (rb"MEC[0-9]{5,7}", "Hitachi", None),
+
+    # ===================
+    # MITSUBISHI ELECTRIC
+    # ===================
+    (rb"E6T[0-9]{5}", "Mitsubishi Electric", None),
+    (rb"E5T[0-9]{5}", "Mitsubishi Electric", None),
+    (rb"E2T[0-9]{5}", "Mitsubishi Electric", None),
+
+    # ===================
+    # CUMMINS
+    # ===================
+    (rb"CM[0-9]{3,4}[A-Z]?", "Cummins", "Commercial"),  # CM2150E, CM2250, CM2350, CM870
+    (rb"CM2[0-9]{3}[A-Z]?", "Cummins", "Commercial"),
+
+    # ===================
+    # TRANSMISSION
+    # ===================
+    (rb"[68]HP[0-9]{2}", "ZF", "Transmission"),
+    (rb"JF[0-9]{3}[A-Z]?", "Jatco", "CVT"),
+    (rb"CVT[0-9]", None, "CVT"),
+]
+
+# Manufacturer-specific part number formats: (pattern, vehicle hint, manufacturer hint)
+PART_NUMBER_PATTERNS = [
+    # ===================
+    # MAZDA (Denso) - Priority for the user's file
+    # ===================
+    # Format: S55B-18881-D, PE01-18881-A, SH01-188K2-D, PY01-188K2-B
+    (rb"([A-Z]{1,2}[0-9]{1,2}[A-Z]?-18[0-9]{2}[0-9A-Z]-[A-Z0-9])", "Mazda", "Denso"),
+    (rb"([A-Z]{1,2}[0-9]{1,2}[A-Z]?-188[A-Z][0-9]-[A-Z0-9])", "Mazda", "Denso"),
+    # S55B, PY01, PE01, SH01 style prefixes with dash
+    (rb"(S[0-9]{1,2}[A-Z]-[0-9]{5}-[A-Z])", "Mazda", "Denso"),
+    (rb"(P[EYX][0-9]{2}-[0-9]{5}-[A-Z])", "Mazda", "Denso"),
+    (rb"(SH[0-9]{2}-[0-9]{5}-[A-Z])", "Mazda", "Denso"),
+    # GK6T style calibration/part IDs (must have letters and numbers)
+    (rb"(GK[0-9][A-Z][A-Z0-9]{6,12})", "Mazda", "Denso"),
+    # PE/SH/PY/PX series without dash (continuous)
+    (rb"(P[EYXA][0-9]{2}[A-Z]{2}[0-9]{6,10})", "Mazda", "Denso"),
+    (rb"(SH[0-9]{2}[A-Z]{2}[0-9]{6,10})", "Mazda", "Denso"),
+
+    # ===================
+    # TOYOTA/LEXUS (Denso)
+    # ===================
+    # Format: 89661-12345, 89663-0E090
+    (rb"(89[0-9]{3}-[0-9A-Z]{5})", "Toyota/Lexus", "Denso"),
+    (rb"(89[0-9]{3}-[0-9A-Z]{6,7})", "Toyota/Lexus", "Denso"),
+
+    # ===================
+    # HONDA/ACURA (Keihin/Denso)
+    # ===================
+    # Format: 37820-xxx-xxx, 37805-xxx-xxx
+    (rb"(37820-[A-Z0-9]{3}-[A-Z0-9]{3,4})", "Honda/Acura", "Keihin"),
+    (rb"(37805-[A-Z0-9]{3}-[A-Z0-9]{3,4})", "Honda/Acura", "Keihin"),
+    (rb"(37820[A-Z0-9]{7,10})", "Honda/Acura", "Keihin"),
+
+    # ===================
+    # NISSAN/INFINITI
+    # ===================
+    # Format: 23710-xxxxx, 23703-xxxxx
+    (rb"(23710-[A-Z0-9]{5,7})", "Nissan/Infiniti", "Hitachi"),
+    (rb"(23703-[A-Z0-9]{5,7})", "Nissan/Infiniti", "Hitachi"),
+    (rb"(MEC[0-9]{2}-[0-9]{3}[A-Z0-9]*)", "Nissan/Infiniti", "Hitachi"),
+
+    # ===================
+    # SUBARU
+    # ===================
+    # Format: 22611-xxxxx, 22765-xxxxx
+    (rb"(22611-[A-Z]{2}[0-9]{3,5})", "Subaru", "Denso"),
+    (rb"(22765-[A-Z]{2}[0-9]{3,5})", "Subaru", "Denso"),
+    (rb"(22611[A-Z]{2}[0-9]{3,5})", "Subaru", "Denso"),
+
+    # ===================
+    # MITSUBISHI
+    # ===================
+    # Format: 1860Axxxx, E6Txxxxx
+    (rb"(1860[A-Z][0-9]{3,5})", "Mitsubishi", "Mitsubishi Electric"),
+    (rb"(E[2-6]T[0-9]{5,7})", "Mitsubishi", "Mitsubishi Electric"),
+    (rb"(8631[A-Z][0-9]{3,5})", "Mitsubishi", "Mitsubishi Electric"),
+
+    # ===================
+    # HYUNDAI/KIA (Kefico)
+    # ===================
+    # Format: 39xxx-xxxxx
+    (rb"(39[0-9]{3}-[0-9]{2}[A-Z]{3})", "Hyundai/Kia", "Kefico"),
+    (rb"(39[0-9]{3}-[A-Z0-9]{5})", "Hyundai/Kia", "Kefico"),
+
+    # ===================
+    # VOLKSWAGEN/AUDI
+    # ===================
+    # Format: 03L 906 023, 03G 906 016
+    (rb"(0[0-9][A-Z]\s?[0-9]{3}\s?[0-9]{3}\s?[A-Z]{0,2})", "VW/Audi", None),
+    (rb"(0[0-9][A-Z][0-9]{6}[A-Z]{0,2})", "VW/Audi", None),
+
+    # ===================
+    # BMW
+    # ===================
+    # Format: 779xxxxx, DME-xxxxx
+    (rb"(779[0-9]{5,7})", "BMW", None),
+    (rb"(DME-[A-Z0-9]{5,10})", "BMW", None),
+    (rb"(MSS[0-9]{2})", "BMW", None),
+
+    # ===================
+    # MERCEDES
+    # ===================
+    # Format: A276 xxx xx xx
+    (rb"(A[0-9]{3}\s?[0-9]{3}\s?[0-9]{2}\s?[0-9]{2})", "Mercedes", None),
+
+    # ===================
+    # BOSCH GENERIC
+    # ===================
+    # Format: 0 281 xxx xxx (EDC), 0 261 xxx xxx (ME)
+    (rb"(0\s?281\s?[0-9]{3}\s?[0-9]{3})", None, "Bosch"),
+    (rb"(0\s?261\s?[0-9]{3}\s?[0-9]{3})", None, "Bosch"),
+    (rb"(0281[0-9]{6})", None, "Bosch"),
+    (rb"(0261[0-9]{6})", None, "Bosch"),
+    # Bosch internal (1037xxx)
+    (rb"(1037[3-5][0-9]{5})", None, "Bosch"),
+
+    # ===================
+    # CONTINENTAL/SIEMENS
+    # ===================
+    (rb"(5WS[0-9]{5,8})", None, "Continental"),
+    (rb"(5WP[0-9]{5,8})", None, "Continental"),
+    (rb"(A2C[0-9]{8,10})", None, "Continental"),
+
+    # ===================
+    # DELPHI
+    # ===================
+    (rb"(28[0-9]{6,8})", None, "Delphi"),
+
+    # ===================
+    # TRUCK/COMMERCIAL
+    # ===================
+    (rb"(CM[0-9]{3,4}[A-Z]?)", None, "Cummins"),
+    (rb"(4921[0-9]{3,5})", None, "Cummins"),
+    (rb"(51[0-9]{8})", "MAN", None),
+    (rb"(21[0-9]{8})", "Volvo", None),
+]
+
+CALIBRATION_PATTERNS = [
+    # Explicit CAL ID markers
+    rb"CAL[\s_\-]?ID[:\s=]+([A-Z0-9_\-]{6,25})",
+    rb"CALID[:\s=]+([A-Z0-9_\-]{6,25})",
+    rb"Calibration[:\s]+([A-Z0-9_\-]{8,25})",
+
+    # Software calibration patterns
+    rb"SW[:\s_]?CAL[:\s=]+([A-Z0-9_\-]{6,20})",
+    rb"CAL[:\s=]+([A-Z0-9]{8,20})",
+
+    # Common calibration ID formats
+    rb"([A-Z]{2,4}[0-9]{2}[A-Z0-9]{8,15})",  # Like GK6TS55BT4LA
+]
+
+# Version patterns are matched case-insensitively
+SOFTWARE_VERSION_PATTERNS = [
+    rb"SW[:\s_\-]?(?:VER|VERSION|NUM|NO)?[:\s=]*([0-9]+\.[0-9]+\.?[0-9]*)",
+    rb"SOFTWARE[:\s]+([0-9]+\.[0-9]+\.?[0-9]*)",
+    rb"SW[:\s]*([0-9]{2,4}\.[0-9]{2,4})",
+    rb"(?:Ver|Version)[:\s]*([0-9]+\.[0-9]+\.?[0-9]*)",
+]
+
+HARDWARE_VERSION_PATTERNS = [
+    rb"HW[:\s_\-]?(?:VER|VERSION|NUM|NO)?[:\s=]*([0-9]+\.[0-9]+\.?[0-9]*)",
+    rb"HARDWARE[:\s]+([0-9]+\.[0-9]+\.?[0-9]*)",
+    rb"HW[:\s]*([A-Z]?[0-9]{2,4})",
+]
+
+PROCESSOR_PATTERNS = [
+    # Infineon TriCore (Bosch, Continental)
+    (rb"TC3[0-9]{2}", "Infineon TriCore TC3xx (AURIX 2G)"),
+    (rb"TC2[0-9]{2}", "Infineon TriCore TC2xx (AURIX)"),
+    (rb"TC1797", "Infineon TriCore TC1797"),
+    (rb"TC1796", "Infineon TriCore TC1796"),
+    (rb"TC1767", "Infineon TriCore TC1767"),
+    (rb"TC17[0-9]{2}", "Infineon TriCore TC17xx"),
+    (rb"TriCore", "Infineon TriCore"),
+    (rb"TRICORE", "Infineon TriCore"),
+
+    # Renesas (Denso, Hitachi)
+    (rb"RH850", "Renesas RH850"),
+    (rb"rh850", "Renesas RH850"),
+    (rb"SH7058", "Renesas SH7058"),
+    (rb"SH7059", "Renesas SH7059"),
+    (rb"SH7055", "Renesas SH7055"),
+    (rb"SH705[0-9]", "Renesas SH705x"),
+    (rb"SH7[0-9]{3}", "Renesas SuperH"),
+    (rb"V850", "Renesas V850"),
+    (rb"78K", "Renesas 78K"),
+
+    # NXP/Freescale
+    (rb"MPC5[0-9]{3}", "NXP MPC5xxx"),
+    (rb"MPC56[0-9]{2}", "NXP MPC56xx"),
+    (rb"MPC57[0-9]{2}", "NXP MPC57xx"),
+    (rb"S12X", "Freescale S12X"),
+    (rb"MC9S12", "Freescale S12"),
+
+    # ST Microelectronics
+    (rb"SPC5[0-9]", "ST SPC5xx"),
+    (rb"ST10F", "ST ST10F"),
+    (rb"ST10", "ST ST10"),
+
+    # Infineon C16x (older)
+    (rb"C167", "Infineon C167"),
+    (rb"C166", "Infineon C166"),
+    (rb"XC16[0-9]", "Infineon XC16x"),
+
+    # NEC
+    (rb"76F00[0-9]+", "NEC 76F00xx"),
+    (rb"uPD70", "NEC 70xx"),
+    (rb"uPD78", "NEC 78K"),
+
+    # Fujitsu
+    (rb"MB91F", "Fujitsu MB91F"),
+    (rb"MB90F", "Fujitsu MB90F"),
+    (rb"FR60", "Fujitsu FR60"),
+    (rb"FR80", "Fujitsu FR80"),
+
+    # Motorola (legacy)
+    (rb"68HC12", "Motorola 68HC12"),
+    (rb"68HC11", "Motorola 68HC11"),
+    (rb"MC68HC", "Motorola 68HC"),
+
+    # ARM
+    (rb"Cortex-R", "ARM Cortex-R"),
+    (rb"Cortex-M", "ARM Cortex-M"),
+    (rb"ARM7", "ARM7"),
+    (rb"ARM9", "ARM9"),
+
+    # Texas Instruments
+    (rb"TMS470", "TI TMS470"),
+    (rb"TMS570", "TI TMS570"),
+    (rb"Hercules", "TI Hercules"),
+]
+
+# VIN pattern: 17 characters, no I, O, Q
+VIN_PATTERN = rb"([A-HJ-NPR-Z0-9]{17})"
+
+
+# =============================================================================
+# MAP/BLOCK MARKERS: (marker, score)
+# =============================================================================
+
+DPF_FALLBACK_MARKERS = [
+    (b'DPF', 45), (b'dpf', 40), (b'DpF', 40),
+    (b'FAP', 45), (b'Fap', 40), (b'fap', 35),
+    (b'SOOT', 30), (b'REGEN', 30),
+]
+
+EGR_FALLBACK_MARKERS = [
+    (b'EGR', 50), (b'egr', 45), (b'Egr', 45),
+    (b'AGR', 50), (b'agr', 45), (b'Agr', 45),
+]
+
+SCR_STRONG_MARKERS = [
+    (b'DENOXTRONIC', 70),      # Bosch SCR system name
+    (b'Denoxtronic', 70),
+    (b'UREA_DOSING', 65),       # Urea dosing specific
+    (b'REDUCTANT_CTRL', 65),    # Reductant controller
+    (b'NOX_SENSOR_', 60),       # NOx sensor with suffix
+    (b'SCR_CATALYST', 60),      # SCR catalyst specific
+    (b'ADBLUE_TANK', 60),       # AdBlue tank specific
+    (b'DEF_TANK_', 55),         # DEF tank with suffix
+]
+
+LAMBDA_MARKERS = [
+    (b'LAMBDA', 50), (b'Lambda', 45), (b'lambda', 40),
+    (b'O2_', 45), (b'O2S', 45), (b'O2 SENSOR', 50),
+    (b'OXYGEN', 40), (b'oxygen', 35),
+    (b'LSU', 40), (b'WIDEBAND', 45),
+    (b'HEGO', 45), (b'UEGO', 45),
+]
+
+SPEED_LIMITER_MARKERS = [
+    (b'VMAX', 55), (b'V_MAX', 55), (b'SPEED_LIM', 60),
+    (b'SPEED_LIMIT', 60), (b'SPEEDLIM', 55),
+    (b'LIMITER', 45), (b'limiter', 40),
+    (b'TOP_SPEED', 50), (b'TOPSPEED', 50),
+]
+
+CATALYST_MARKERS = [
+    (b'CAT_', 50), (b'_CAT', 50), (b'CATALYST', 55),
+    (b'KAT_', 50), (b'_KAT', 50), (b'KATALYSATOR', 55),
+    (b'TWC', 45), (b'THREE_WAY', 50),
+    (b'CAT_DIAG', 55), (b'CATDIAG', 50),
+]
+
+SWIRL_FLAP_MARKERS = [
+    (b'SWIRL', 55), (b'swirl', 50),
+    (b'DRALLKLAPPEN', 60), (b'Drallklappen', 55),
+    (b'TUMBLE', 50), (b'tumble', 45),
+    (b'INTAKE_FLAP', 55), (b'INTAKEFLAP', 50),
+]
+
+START_STOP_MARKERS = [
+    (b'START_STOP', 60), (b'STARTSTOP', 55),
+    (b'MSA', 50), (b'AUTO_STOP', 55),
+    (b'ENGINE_RESTART', 50), (b'ECO_STOP', 50),
+    (b'ISG', 45),  # Intelligent Stop & Go
+]
+
+IMMO_MARKERS = [
+    (b'IMMO', 55), (b'immo', 50),
+    (b'IMMOBILIZER', 60), (b'IMMOBILISER', 60),
+    (b'WFS', 50),  # Wegfahrsperre (German for immobilizer)
+    (b'HOT_START', 50), (b'HOTSTART', 50),
+    (b'TRANSPONDER', 55),
+]
+
+DTC_MARKERS = [
+    (b'DTC', 50), (b'dtc', 45),
+    (b'FAULT', 45), (b'fault', 40),
+    (b'ERROR_CODE', 50), (b'ERRORCODE', 50),
+    (b'P0', 45), (b'P1', 45), (b'P2', 45),  # OBD-II codes
+    (b'U0', 40), (b'U1', 40),  # Network codes
+    (b'OBD', 50), (b'obd', 45),
+    (b'DIAG', 45),
+]
+
+TUNING_MARKERS = [
+    (b'TORQUE', 55), (b'torque', 50),
+    (b'TQ_', 50), (b'_TQ', 50),
+    (b'INJECTION', 50), (b'injection', 45),
+    (b'RAIL_P', 50), (b'RAILP', 50),
+    (b'BOOST', 55), (b'boost', 50),
+    (b'TURBO', 50), (b'turbo', 45),
+    (b'IQ_', 50), (b'_IQ', 50),  # Injection Quantity
+    (b'SOI_', 50), (b'_SOI', 50),  # Start of Injection
+]
+
+# Discovered 2D maps needed before they count as a tuning indicator; only
+# smooth, sized, non-flat candidates count (stock EDC16/EDC17 dumps hold
+# hundreds of lower-scoring candidates)
+TUNING_MIN_DISCOVERED_MAPS = 10
+TUNING_MIN_MAP_SCORE = 0.9
+
+# EDC17 DPF switch (4081 followed by 15 within 6 bytes)
+DPF_SWITCH_VALUE = struct.pack('<H', 4081)
+DPF_SWITCH_FOLLOWER = struct.pack('<H', 15)
+DPF_SWITCH_WINDOW = 6
+
+# Map boundary markers (7FFF/8000)
+MAP_BOUNDARY_PATTERNS = [
+    struct.pack('<HH', 32767, 32768),
+    struct.pack('<HH', 32768, 32767),
+]
+
+
+# =============================================================================
+# DETECTOR RULES
+# =============================================================================
+# The tables above compiled once, at import, into the shared detector
+# registry; one scan per file answers them and the ecu_database tables
+
+COPYRIGHT_RULES = DETECTORS.add_rules(
+    "copyright", COPYRIGHT_PATTERNS, fields=("pattern", "label"), kind=RuleKind.REGEX
+)
+MANUFACTURER_RULES = DETECTORS.add_rules(
+    "manufacturer", MANUFACTURER_SIGNATURES, fields=("pattern", "label", "hint")
+)
+ECU_FAMILY_RULES = DETECTORS.add_rules(
+    "ecu_family", ECU_FAMILY_PATTERNS, fields=("pattern", "label", "hint"), kind=RuleKind.REGEX
+)
+PART_NUMBER_RULES = DETECTORS.add_rules(
+    "part_number", PART_NUMBER_PATTERNS, fields=("pattern", "hint", "label"), kind=RuleKind.REGEX
+)
+CALIBRATION_RULES = DETECTORS.add_rules(
+    "calibration", CALIBRATION_PATTERNS, kind=RuleKind.REGEX
+)
+SOFTWARE_VERSION_RULES = DETECTORS.add_rules(
+    "software_version", SOFTWARE_VERSION_PATTERNS, kind=RuleKind.REGEX, flags=re.IGNORECASE
+)
+HARDWARE_VERSION_RULES = DETECTORS.add_rules(
+    "hardware_version", HARDWARE_VERSION_PATTERNS, kind=RuleKind.REGEX, flags=re.IGNORECASE
+)
+PROCESSOR_RULES = DETECTORS.add_rules(
+    "processor", PROCESSOR_PATTERNS, fields=("pattern", "label"), kind=RuleKind.REGEX
+)
+VIN_RULE, = DETECTORS.add_rules("vin", [VIN_PATTERN], kind=RuleKind.REGEX)
+
+DPF_FALLBACK_RULES = DETECTORS.add_rules("dpf_fallback", DPF_FALLBACK_MARKERS, fields=("pattern", "score"))
+EGR_FALLBACK_RULES = DETECTORS.add_rules("egr_fallback", EGR_FALLBACK_MARKERS, fields=("pattern", "score"))
+SCR_STRONG_RULES = DETECTORS.add_rules("scr_strong", SCR_STRONG_MARKERS, fields=("pattern", "score"))
+LAMBDA_RULES = DETECTORS.add_rules("lambda", LAMBDA_MARKERS, fields=("pattern", "score"))
+SPEED_LIMITER_RULES = DETECTORS.add_rules("speed_limiter", SPEED_LIMITER_MARKERS, fields=("pattern", "score"))
+CATALYST_RULES = DETECTORS.add_rules("catalyst", CATALYST_MARKERS, fields=("pattern", "score"))
+SWIRL_FLAP_RULES = DETECTORS.add_rules("swirl_flaps", SWIRL_FLAP_MARKERS, fields=("pattern", "score"))
+START_STOP_RULES = DETECTORS.add_rules("start_stop", START_STOP_MARKERS, fields=("pattern", "score"))
+IMMO_RULES = DETECTORS.add_rules("immo", IMMO_MARKERS, fields=("pattern", "score"))
+DTC_RULES = DETECTORS.add_rules("dtc", DTC_MARKERS, fields=("pattern", "score"))
+TUNING_RULES = DETECTORS.add_rules("tuning", TUNING_MARKERS, fields=("pattern", "score"))
+
+DPF_SWITCH_RULE, = DETECTORS.add_rules("dpf_switch", [DPF_SWITCH_VALUE])
+MAP_BOUNDARY_RULES = DETECTORS.add_rules("map_boundary", MAP_BOUNDARY_PATTERNS)
+
+
+# String filters used on extracted text
+RELEVANT_STRING_KEYWORDS = (
+    # Manufacturers
+    "BOSCH", "DENSO", "DELPHI", "SIEMENS", "CONTINENTAL", "MARELLI",
+    "HITACHI", "KEIHIN", "KEFICO", "TRANSTRON", "CUMMINS",
+    
+    # ECU related
+    "ECU", "ENGINE", "CONTROL", "MODULE", "SYSTEM",
+    "CALIBRATION", "CAL", "VERSION", "VER",
+    
+    # Functions
+    "DPF", "EGR", "SCR", "ADBLUE", "LAMBDA", "BOOST",
+    "INJECTION", "DIESEL", "GASOLINE", "TURBO",
+    
+    # Vehicle brands
+    "TOYOTA", "HONDA", "NISSAN", "MAZDA", "SUBARU", "MITSUBISHI",
+    "HYUNDAI", "KIA", "FORD", "BMW", "MERCEDES", "VW", "AUDI",
+    
+    # Technical
+    "OBD", "CAN", "DIAG", "FLASH", "EEPROM", "MAP",
+    "Copyright", "HARDWARE", "SOFTWARE",
+)
+STRUCTURED_ID_REGEX = re.compile(r"^[A-Z0-9][A-Z0-9\-_]{5,20}[A-Z0-9]$")
+PART_NUMBER_SEPARATOR_REGEX = re.compile(r'[\s\-]')
+NON_DIGIT_REGEX = re.compile(r'[^0-9]')
+
+
+# Analysis stages, in the order they run
+STAGE_IDENTIFICATION = "identification"   # Manufacturer, ECU type, part number
+STAGE_DETAILS = "details"                 # Calibration, versions, processor, VIN, strings
+STAGE_SERVICES = "services"               # Map detection for the available services
+ANALYSIS_STAGES = (STAGE_IDENTIFICATION, STAGE_DETAILS, STAGE_SERVICES)
+
+# Display fields (see get_display_info) completed by each stage
+ANALYSIS_STAGE_FIELDS = {
+    STAGE_IDENTIFICATION: (
+        "file_size_mb", "manufacturer", "ecu_type", "ecu_generation",
+        "flash_type", "part_number", "vehicle_info",
+    ),
+    STAGE_DETAILS: (
+        "calibration_id", "software_version", "hardware_version",
+        "processor", "vin", "strings", "confidence",
+    ),
+    STAGE_SERVICES: ("detected_maps", "available_services"),
+}
+
+# Detector groups the identification stage reads
+IDENTIFICATION_GROUPS = ("copyright", "manufacturer", "ecu_family", "part_number")
+
+# Build the full scanner and the two staged ones now, not on first use
+DETECTORS.compile()
+DETECTORS.compile(IDENTIFICATION_GROUPS)
+DETECTORS.compile(g for g in DETECTORS.groups() if g not in IDENTIFICATION_GROUPS)
+
+
+@dataclass
+class ExtractedString:
+    """Readable ASCII string found in the binary"""
+    text: str
+    upper: str
+    offset: int
+
+
 class ECUAnalyzer:
     """Professional ECU Binary File Analyzer"""
     
@@ -48,6 +666,9 @@ class ECUAnalyzer:
         self.results = {}
         self._file_data = None
         self._extracted_strings = []
+        self._strings = []
+        self.regions = None
+        self._scan = None
     
     def analyze(self, file_data: bytes) -> Dict:
         """
@@ -59,6 +680,44 @@ class ECUAnalyzer:
         Returns:
             Dictionary containing all analysis results
         """
+        # Single pass over the file for every known signature;
+        # all detectors below read their hits from this scan
+        self._start(file_data, scan_groups=None)
+        for stage in ANALYSIS_STAGES:
+            self._run_stage(stage)
+        return self.results
+    
+    def identify(self, file_data: bytes) -> Dict:
+        """
+        Quick identification only: manufacturer, ECU type and part number.
+        
+        Only the identification signatures are scanned, so this returns
+        in a fraction of the time of analyze(). The values are the same
+        analyze() reports.
+        
+        Returns:
+            The display fields of the identification stage
+        """
+        self._start(file_data, scan_groups=IDENTIFICATION_GROUPS)
+        return self._run_stage(STAGE_IDENTIFICATION)
+    
+    def analyze_stages(self, file_data: bytes) -> Iterator[Tuple[str, Dict]]:
+        """
+        Staged analysis - yields each stage's results as soon as it is done.
+        
+        The identification stage only scans the identification
+        signatures; the rest of the file scan happens when the next
+        stage needs it. Once all stages are done, self.results holds
+        the same results as analyze().
+        
+        Yields:
+            (stage, display fields of that stage) in ANALYSIS_STAGES order
+        """
+        self._start(file_data, scan_groups=IDENTIFICATION_GROUPS)
+        for stage in ANALYSIS_STAGES:
+            yield stage, self._run_stage(stage)
+    
+    def _start(self, file_data: bytes, scan_groups):
         self._file_data = file_data
         file_size = len(file_data)
         
@@ -83,48 +742,64 @@ class ECUAnalyzer:
             "detected_maps": {},
             "available_services": []
         }
+        self._extracted_strings = []
+        self._strings = []
         
-        # Step 1: Extract readable strings from binary
-        self._extracted_strings = self._extract_strings(file_data)
-        
-        # Step 2: Analyze file size for ECU generation hints
-        self._analyze_file_size(file_size)
-        
-        # Step 3: Detect manufacturer (highest priority - most reliable)
-        self._detect_manufacturer_comprehensive(file_data)
-        
-        # Step 4: Detect ECU type/family
-        self._detect_ecu_type(file_data)
-        
-        # Step 5: Extract part numbers using manufacturer-specific patterns
-        self._detect_part_number_professional(file_data)
-        
-        # Step 6: Detect calibration ID
-        self._detect_calibration_id(file_data)
-        
-        # Step 7: Detect software/hardware versions
-        self._detect_versions(file_data)
-        
-        # Step 8: Detect processor/MCU
-        self._detect_processor(file_data)
-        
-        # Step 9: Strict VIN detection (only high confidence)
-        self._detect_vin_strict(file_data)
+        self.regions = RegionIndex(file_data)
+        self._scan = DETECTORS.scan(file_data, regions=self.regions, groups=scan_groups)
+    
+    def _run_stage(self, stage: str) -> Dict:
+        """Run one analysis stage and return its display fields"""
+        file_data = self._file_data
         
-        # Step 10: Set ECU type if still missing
-        if not self.results["ecu_type"] and self.results["manufacturer"]:
-            self.results["ecu_type"] = f"{self.results['manufacturer']} ECU"
+        if stage == STAGE_IDENTIFICATION:
+            # Analyze file size for ECU generation hints
+            self._analyze_file_size(len(file_data))
+            
+            # Detect manufacturer (highest priority - most reliable)
+            self._detect_manufacturer_comprehensive(file_data)
+            
+            # Detect ECU type/family
+            self._detect_ecu_type(file_data)
+            
+            # Extract part numbers using manufacturer-specific patterns
+            self._detect_part_number_professional(file_data)
+            
+            # Set ECU type if still missing
+            if not self.results["ecu_type"] and self.results["manufacturer"]:
+                self.results["ecu_type"] = f"{self.results['manufacturer']} ECU"
         
-        # Step 11: Filter and store interesting strings
-        self.results["strings"] = self._filter_relevant_strings()
+        elif stage == STAGE_DETAILS:
+            # Extract readable strings from binary
+            self._extracted_strings = self._extract_strings(file_data)
+            
+            # Detect calibration ID
+            self._detect_calibration_id(file_data)
+            
+            # Detect software/hardware versions
+            self._detect_versions(file_data)
+            
+            # Detect processor/MCU
+            self._detect_processor(file_data)
+            
+            # Strict VIN detection (only high confidence)
+            self._detect_vin_strict(file_data)
+            
+            # Filter and store interesting strings
+            self.results["strings"] = self._filter_relevant_strings()
+            
+            # Calculate confidence level
+            self._calculate_confidence()
         
-        # Step 12: NEW - Detect maps/blocks for available services
-        self._detect_available_maps(file_data)
+        elif stage == STAGE_SERVICES:
+            # Detect maps/blocks for available services
+            self._detect_available_maps(file_data)
         
-        # Step 13: Calculate confidence level
-        self._calculate_confidence()
+        else:
+            raise ValueError(f"Unknown analysis stage: {stage}")
         
-        return self.results
+        display = self.get_display_info()
+        return {field: display[field] for field in ANALYSIS_STAGE_FIELDS[stage]}
     
     def get_display_info(self) -> Dict:
         """
@@ -203,200 +878,27 @@ class ECUAnalyzer:
         """
         
         # Method 1: Copyright strings (highest confidence)
-        copyright_patterns = [
-            # Bosch
-            (rb"(?i)copyright.*robert\s*bosch", "Bosch"),
-            (rb"(?i)\(c\)\s*robert\s*bosch", "Bosch"),
-            (rb"(?i)bosch\s*gmbh", "Bosch"),
-            (rb"Robert Bosch GmbH", "Bosch"),
-            
-            # Continental/Siemens
-            (rb"(?i)copyright.*continental", "Continental"),
-            (rb"(?i)copyright.*siemens", "Siemens/Continental"),
-            (rb"(?i)continental\s*automotive", "Continental"),
-            (rb"Continental AG", "Continental"),
-            (rb"Siemens VDO", "Siemens/Continental"),
-            
-            # Denso
-            (rb"(?i)copyright.*denso", "Denso"),
-            (rb"(?i)\(c\)\s*denso", "Denso"),
-            (rb"DENSO CORPORATION", "Denso"),
-            (rb"Denso Corporation", "Denso"),
-            
-            # Delphi
-            (rb"(?i)copyright.*delphi", "Delphi"),
-            (rb"Delphi Technologies", "Delphi"),
-            (rb"DELPHI AUTOMOTIVE", "Delphi"),
-            
-            # Marelli
-            (rb"(?i)copyright.*marelli", "Marelli"),
-            (rb"(?i)magneti\s*marelli", "Marelli"),
-            (rb"MAGNETI MARELLI", "Marelli"),
-            
-            # Hitachi
-            (rb"(?i)copyright.*hitachi", "Hitachi"),
-            (rb"Hitachi Automotive", "Hitachi"),
-            (rb"HITACHI ASTEMO", "Hitachi"),
-            
-            # Transtron
-            (rb"(?i)copyright.*transtron", "Transtron"),
-            (rb"TRANSTRON INC", "Transtron"),
-            (rb"Transtron Inc", "Transtron"),
-            
-            # Keihin
-            (rb"(?i)copyright.*keihin", "Keihin"),
-            (rb"KEIHIN CORPORATION", "Keihin"),
-            
-            # Mitsubishi Electric
-            (rb"(?i)copyright.*mitsubishi", "Mitsubishi Electric"),
-            (rb"MITSUBISHI ELECTRIC", "Mitsubishi Electric"),
-        ]
-        
-        for pattern, manufacturer in copyright_patterns:
-            if re.search(pattern, file_data):
-                self.results["manufacturer"] = manufacturer
+        for rule in COPYRIGHT_RULES:
+            if self._scan.search(rule):
+                self.results["manufacturer"] = rule.label
                 self.results["confidence"] = "high"
                 return
         
         # Method 2: Direct manufacturer name detection (case sensitive first)
-        manufacturer_signatures = [
-            # Primary signatures (exact match, high confidence)
-            (b"TRANSTRON", "Transtron", "Subaru/Nissan/Mazda"),
-            (b"Transtron", "Transtron", "Subaru/Nissan/Mazda"),
-            (b"DENSO", "Denso", None),
-            (b"Denso", "Denso", None),
-            (b"BOSCH", "Bosch", None),
-            (b"Bosch", "Bosch", None),
-            (b"CONTINENTAL", "Continental", None),
-            (b"Continental", "Continental", None),
-            (b"SIEMENS", "Siemens/Continental", None),
-            (b"Siemens", "Siemens/Continental", None),
-            (b"DELPHI", "Delphi", None),
-            (b"Delphi", "Delphi", None),
-            (b"MARELLI", "Marelli", None),
-            (b"Marelli", "Marelli", None),
-            (b"HITACHI", "Hitachi", None),
-            (b"Hitachi", "Hitachi", None),
-            (b"KEIHIN", "Keihin", "Honda/Acura"),
-            (b"Keihin", "Keihin", "Honda/Acura"),
-            (b"KEFICO", "Kefico", "Hyundai/Kia"),
-            (b"Kefico", "Kefico", "Hyundai/Kia"),
-            (b"JATCO", "Jatco", "Nissan/Renault CVT"),
-            (b"AISIN", "Aisin", "Toyota Transmission"),
-            (b"CUMMINS", "Cummins", "Commercial/Truck"),
-            (b"Cummins", "Cummins", "Commercial/Truck"),
-            (b"MOTOROLA", "Motorola", None),
-            (b"Visteon", "Visteon", "Ford"),
-            (b"VISTEON", "Visteon", "Ford"),
-            (b"VALEO", "Valeo", None),
-            (b"WABCO", "Wabco", "Commercial/Truck"),
-            (b"KNORR", "Knorr-Bremse", "Commercial/Truck"),
-            (b"ZF Friedrichshafen", "ZF", "Transmission"),
-            (b"WEICHAI", "Weichai", "Chinese Truck"),
-            (b"YUCHAI", "Yuchai", "Chinese Truck"),
-        ]
-        
-        for signature, manufacturer, vehicle_hint in manufacturer_signatures:
-            if signature in file_data:
-                self.results["manufacturer"] = manufacturer
-                if vehicle_hint:
-                    self.results["vehicle_info"] = vehicle_hint
+        for rule in MANUFACTURER_RULES:
+            if self._scan.contains(rule):
+                self.results["manufacturer"] = rule.label
+                if rule.hint:
+                    self.results["vehicle_info"] = rule.hint
                 return
     
     def _detect_ecu_type(self, file_data: bytes):
         """Detect specific ECU type/family from known patterns"""
         
-        # ECU type patterns organized by manufacturer
-        # IMPORTANT: More specific patterns should come first
-        ecu_patterns = [
-            # ===================
-            # BOSCH ECU Types
-            # ===================
-            # Diesel ECUs - More specific patterns first
-            (rb"EDC17[A-Z]{2}[0-9]{1,2}", "Bosch", "Diesel"),  # EDC17CP52, EDC17C46, etc.
-            (rb"EDC17[A-Z][0-9]{1,2}", "Bosch", "Diesel"),     # EDC17C4, EDC17C5, etc.
-            (rb"EDC17[A-Z]{2}", "Bosch", "Diesel"),            # EDC17CP, EDC17CV, etc.
-            (rb"EDC17", "Bosch", "Diesel"),                     # Fallback
-            (rb"EDC16[A-Z]{0,2}[0-9]{0,2}", "Bosch", "Diesel"),
-            (rb"EDC15[A-Z]{0,2}[0-9]{0,2}", "Bosch", "Diesel"),
-            (rb"MD1[A-Z]{2}[0-9]{0,3}", "Bosch", "Latest Diesel"),
-            
-            # Gasoline ECUs
-            (rb"MED17[A-Z]{0,2}[0-9.]{0,4}", "Bosch", "Gasoline"),
-            (rb"MED9[A-Z]{0,2}[0-9.]{0,3}", "Bosch", "Gasoline"),
-            (rb"ME7[A-Z]{0,2}[0-9.]{0,3}", "Bosch", "Gasoline"),
-            (rb"ME17[A-Z]{0,2}[0-9.]{0,3}", "Bosch", "Gasoline"),
-            (rb"MG1[A-Z]{2}[0-9]{0,3}", "Bosch", "Latest Gasoline"),
-            (rb"MEVD17", "Bosch", "Direct Injection"),
-            (rb"MED[0-9]", "Bosch", "Gasoline"),
-            
-            # Transmission
-            (rb"GS[0-9]{2}", "Bosch", "Transmission"),
-            
-            # ===================
-            # CONTINENTAL/SIEMENS
-            # ===================
-            (rb"SID[0-9]{3}", "Continental", "Diesel"),
-            (rb"SID[0-9]{2}[A-Z]", "Continental", "Diesel"),
-            (rb"SIMOS[0-9]{1,2}[.][0-9]", "Continental", "Gasoline"),
-            (rb"SIMOS\s*[0-9]{1,2}", "Continental", "Gasoline"),
-            (rb"PCR[0-9.]+", "Continental", "Diesel"),
-            (rb"EMS[0-9]{4}", "Continental", None),
-            (rb"SIM[0-9]{2}", "Continental", None),
-            
-            # ===================
-            # DELPHI
-            # ===================
-            (rb"DCM[0-9.]+", "Delphi", "Diesel"),
-            (rb"DCM[0-9]{1,2}[A-Z]{0,2}", "Delphi", "Diesel"),
-            (rb"MT[0-9]{2}[A-Z]?", "Delphi", None),
-            (rb"DDCR", "Delphi", "Diesel"),
-            
-            # ===================
-            # MARELLI
-            # ===================
-            (rb"IAW[0-9]{2,3}[A-Z]{0,3}", "Marelli", None),
-            (rb"MJD[0-9]{1,2}[A-Z]{0,3}[0-9]{0,2}", "Marelli", None),
-            (rb"IAW\s*[0-9][A-Z][A-Z0-9]", "Marelli", None),
-            
-            # ===================
-            # DENSO
-            # ===================
-            (rb"SH7058", "Denso", "SH7058 MCU"),
-            (rb"SH7059", "Denso", "SH7059 MCU"),
-            (rb"SH705[0-9]", "Denso", "SH705x MCU"),
-            (rb"76F00[0-9]+", "Denso", "NEC 76F"),
-            (rb"RH850", "Denso", "RH850 MCU"),
-            
-            # ===================
-            # HITACHI
-            # ===================
-            (rb"MEC[0-9]{2}-[0-9]{3}", "Hitachi", None),
-            (rb"MEC[0-9]{5,7}", "Hitachi", None),
-            
-            # ===================
-            # MITSUBISHI ELECTRIC
-            # ===================
-            (rb"E6T[0-9]{5}", "Mitsubishi Electric", None),
-            (rb"E5T[0-9]{5}", "Mitsubishi Electric", None),
-            (rb"E2T[0-9]{5}", "Mitsubishi Electric", None),
-            
-            # ===================
-            # CUMMINS
-            # ===================
-            (rb"CM[0-9]{3,4}[A-Z]?", "Cummins", "Commercial"),  # CM2150E, CM2250, CM2350, CM870
-            (rb"CM2[0-9]{3}[A-Z]?", "Cummins", "Commercial"),
-            
-            # ===================
-            # TRANSMISSION
-            # ===================
-            (rb"[68]HP[0-9]{2}", "ZF", "Transmission"),
-            (rb"JF[0-9]{3}[A-Z]?", "Jatco", "CVT"),
-            (rb"CVT[0-9]", None, "CVT"),
-        ]
-        
-        for pattern, mfr_hint, ecu_category in ecu_patterns:
-            match = re.search(pattern, file_data)
+        # Patterns are ordered most specific first (see ECU_FAMILY_PATTERNS)
+        for rule in ECU_FAMILY_RULES:
+            mfr_hint, ecu_category = rule.label, rule.hint
+            match = self._scan.search(rule)
             if match:
                 ecu_type = match.group(0).decode("utf-8", errors="ignore")
                 
@@ -421,129 +923,9 @@ class ECUAnalyzer:
         Only returns validated part numbers, no garbage.
         """
         
-        # =====================================================================
-        # MANUFACTURER-SPECIFIC PART NUMBER PATTERNS
-        # =====================================================================
-        
-        part_patterns = [
-            # ===================
-            # MAZDA (Denso) - Priority for the user's file
-            # ===================
-            # Format: S55B-18881-D, PE01-18881-A, SH01-188K2-D, PY01-188K2-B
-            (rb"([A-Z]{1,2}[0-9]{1,2}[A-Z]?-18[0-9]{2}[0-9A-Z]-[A-Z0-9])", "Mazda", "Denso"),
-            (rb"([A-Z]{1,2}[0-9]{1,2}[A-Z]?-188[A-Z][0-9]-[A-Z0-9])", "Mazda", "Denso"),
-            # S55B, PY01, PE01, SH01 style prefixes with dash
-            (rb"(S[0-9]{1,2}[A-Z]-[0-9]{5}-[A-Z])", "Mazda", "Denso"),
-            (rb"(P[EYX][0-9]{2}-[0-9]{5}-[A-Z])", "Mazda", "Denso"),
-            (rb"(SH[0-9]{2}-[0-9]{5}-[A-Z])", "Mazda", "Denso"),
-            # GK6T style calibration/part IDs (must have letters and numbers)
-            (rb"(GK[0-9][A-Z][A-Z0-9]{6,12})", "Mazda", "Denso"),
-            # PE/SH/PY/PX series without dash (continuous)
-            (rb"(P[EYXA][0-9]{2}[A-Z]{2}[0-9]{6,10})", "Mazda", "Denso"),
-            (rb"(SH[0-9]{2}[A-Z]{2}[0-9]{6,10})", "Mazda", "Denso"),
-            
-            # ===================
-            # TOYOTA/LEXUS (Denso)
-            # ===================
-            # Format: 89661-12345, 89663-0E090
-            (rb"(89[0-9]{3}-[0-9A-Z]{5})", "Toyota/Lexus", "Denso"),
-            (rb"(89[0-9]{3}-[0-9A-Z]{6,7})", "Toyota/Lexus", "Denso"),
-            
-            # ===================
-            # HONDA/ACURA (Keihin/Denso)
-            # ===================
-            # Format: 37820-xxx-xxx, 37805-xxx-xxx
-            (rb"(37820-[A-Z0-9]{3}-[A-Z0-9]{3,4})", "Honda/Acura", "Keihin"),
-            (rb"(37805-[A-Z0-9]{3}-[A-Z0-9]{3,4})", "Honda/Acura", "Keihin"),
-            (rb"(37820[A-Z0-9]{7,10})", "Honda/Acura", "Keihin"),
-            
-            # ===================
-            # NISSAN/INFINITI
-            # ===================
-            # Format: 23710-xxxxx, 23703-xxxxx
-            (rb"(23710-[A-Z0-9]{5,7})", "Nissan/Infiniti", "Hitachi"),
-            (rb"(23703-[A-Z0-9]{5,7})", "Nissan/Infiniti", "Hitachi"),
-            (rb"(MEC[0-9]{2}-[0-9]{3}[A-Z0-9]*)", "Nissan/Infiniti", "Hitachi"),
-            
-            # ===================
-            # SUBARU
-            # ===================
-            # Format: 22611-xxxxx, 22765-xxxxx
-            (rb"(22611-[A-Z]{2}[0-9]{3,5})", "Subaru", "Denso"),
-            (rb"(22765-[A-Z]{2}[0-9]{3,5})", "Subaru", "Denso"),
-            (rb"(22611[A-Z]{2}[0-9]{3,5})", "Subaru", "Denso"),
-            
-            # ===================
-            # MITSUBISHI
-            # ===================
-            # Format: 1860Axxxx, E6Txxxxx
-            (rb"(1860[A-Z][0-9]{3,5})", "Mitsubishi", "Mitsubishi Electric"),
-            (rb"(E[2-6]T[0-9]{5,7})", "Mitsubishi", "Mitsubishi Electric"),
-            (rb"(8631[A-Z][0-9]{3,5})", "Mitsubishi", "Mitsubishi Electric"),
-            
-            # ===================
-            # HYUNDAI/KIA (Kefico)
-            # ===================
-            # Format: 39xxx-xxxxx
-            (rb"(39[0-9]{3}-[0-9]{2}[A-Z]{3})", "Hyundai/Kia", "Kefico"),
-            (rb"(39[0-9]{3}-[A-Z0-9]{5})", "Hyundai/Kia", "Kefico"),
-            
-            # ===================
-            # VOLKSWAGEN/AUDI
-            # ===================
-            # Format: 03L 906 023, 03G 906 016
-            (rb"(0[0-9][A-Z]\s?[0-9]{3}\s?[0-9]{3}\s?[A-Z]{0,2})", "VW/Audi", None),
-            (rb"(0[0-9][A-Z][0-9]{6}[A-Z]{0,2})", "VW/Audi", None),
-            
-            # ===================
-            # BMW
-            # ===================
-            # Format: 779xxxxx, DME-xxxxx
-            (rb"(779[0-9]{5,7})", "BMW", None),
-            (rb"(DME-[A-Z0-9]{5,10})", "BMW", None),
-            (rb"(MSS[0-9]{2})", "BMW", None),
-            
-            # ===================
-            # MERCEDES
-            # ===================
-            # Format: A276 xxx xx xx
-            (rb"(A[0-9]{3}\s?[0-9]{3}\s?[0-9]{2}\s?[0-9]{2})", "Mercedes", None),
-            
-            # ===================
-            # BOSCH GENERIC
-            # ===================
-            # Format: 0 281 xxx xxx (EDC), 0 261 xxx xxx (ME)
-            (rb"(0\s?281\s?[0-9]{3}\s?[0-9]{3})", None, "Bosch"),
-            (rb"(0\s?261\s?[0-9]{3}\s?[0-9]{3})", None, "Bosch"),
-            (rb"(0281[0-9]{6})", None, "Bosch"),
-            (rb"(0261[0-9]{6})", None, "Bosch"),
-            # Bosch internal (1037xxx)
-            (rb"(1037[3-5][0-9]{5})", None, "Bosch"),
-            
-            # ===================
-            # CONTINENTAL/SIEMENS
-            # ===================
-            (rb"(5WS[0-9]{5,8})", None, "Continental"),
-            (rb"(5WP[0-9]{5,8})", None, "Continental"),
-            (rb"(A2C[0-9]{8,10})", None, "Continental"),
-            
-            # ===================
-            # DELPHI
-            # ===================
-            (rb"(28[0-9]{6,8})", None, "Delphi"),
-            
-            # ===================
-            # TRUCK/COMMERCIAL
-            # ===================
-            (rb"(CM[0-9]{3,4}[A-Z]?)", None, "Cummins"),
-            (rb"(4921[0-9]{3,5})", None, "Cummins"),
-            (rb"(51[0-9]{8})", "MAN", None),
-            (rb"(21[0-9]{8})", "Volvo", None),
-        ]
-        
-        for pattern, vehicle_hint, mfr_hint in part_patterns:
-            matches = re.finditer(pattern, file_data)
-            for match in matches:
+        for rule in PART_NUMBER_RULES:
+            vehicle_hint, mfr_hint = rule.hint, rule.label
+            for match in self._scan.finditer(rule):
                 part_num = match.group(1).decode("utf-8", errors="ignore").strip()
                 
                 # VALIDATION: Skip obvious garbage
@@ -566,10 +948,10 @@ class ECUAnalyzer:
             return False
         
         # Remove spaces/dashes for digit analysis
-        clean = re.sub(r'[\s\-]', '', part_num)
+        clean = PART_NUMBER_SEPARATOR_REGEX.sub('', part_num)
         
         # Reject sequential digits (0123456789, 9876543210)
-        digits_only = re.sub(r'[^0-9]', '', clean)
+        digits_only = NON_DIGIT_REGEX.sub('', clean)
         if len(digits_only) >= 5:
             for i in range(len(digits_only) - 4):
                 window = digits_only[i:i+5]
@@ -603,22 +985,8 @@ class ECUAnalyzer:
     def _detect_calibration_id(self, file_data: bytes):
         """Detect calibration ID from common patterns"""
         
-        cal_patterns = [
-            # Explicit CAL ID markers
-            rb"CAL[\s_\-]?ID[:\s=]+([A-Z0-9_\-]{6,25})",
-            rb"CALID[:\s=]+([A-Z0-9_\-]{6,25})",
-            rb"Calibration[:\s]+([A-Z0-9_\-]{8,25})",
-            
-            # Software calibration patterns
-            rb"SW[:\s_]?CAL[:\s=]+([A-Z0-9_\-]{6,20})",
-            rb"CAL[:\s=]+([A-Z0-9]{8,20})",
-            
-            # Common calibration ID formats
-            rb"([A-Z]{2,4}[0-9]{2}[A-Z0-9]{8,15})",  # Like GK6TS55BT4LA
-        ]
-        
-        for pattern in cal_patterns:
-            match = re.search(pattern, file_data)
+        for rule in CALIBRATION_RULES:
+            match = self._scan.search(rule)
             if match:
                 cal_id = match.group(1).decode("utf-8", errors="ignore").strip()
                 
@@ -636,28 +1004,15 @@ class ECUAnalyzer:
         """Detect software and hardware version strings"""
         
         # Software version patterns
-        sw_patterns = [
-            rb"SW[:\s_\-]?(?:VER|VERSION|NUM|NO)?[:\s=]*([0-9]+\.[0-9]+\.?[0-9]*)",
-            rb"SOFTWARE[:\s]+([0-9]+\.[0-9]+\.?[0-9]*)",
-            rb"SW[:\s]*([0-9]{2,4}\.[0-9]{2,4})",
-            rb"(?:Ver|Version)[:\s]*([0-9]+\.[0-9]+\.?[0-9]*)",
-        ]
-        
-        for pattern in sw_patterns:
-            match = re.search(pattern, file_data, re.IGNORECASE)
+        for rule in SOFTWARE_VERSION_RULES:
+            match = self._scan.search(rule)
             if match:
                 self.results["software_version"] = match.group(1).decode("utf-8", errors="ignore")
                 break
         
         # Hardware version patterns
-        hw_patterns = [
-            rb"HW[:\s_\-]?(?:VER|VERSION|NUM|NO)?[:\s=]*([0-9]+\.[0-9]+\.?[0-9]*)",
-            rb"HARDWARE[:\s]+([0-9]+\.[0-9]+\.?[0-9]*)",
-            rb"HW[:\s]*([A-Z]?[0-9]{2,4})",
-        ]
-        
-        for pattern in hw_patterns:
-            match = re.search(pattern, file_data, re.IGNORECASE)
+        for rule in HARDWARE_VERSION_RULES:
+            match = self._scan.search(rule)
             if match:
                 self.results["hardware_version"] = match.group(1).decode("utf-8", errors="ignore")
                 break
@@ -665,76 +1020,9 @@ class ECUAnalyzer:
     def _detect_processor(self, file_data: bytes):
         """Comprehensive processor/MCU detection"""
         
-        processor_patterns = [
-            # Infineon TriCore (Bosch, Continental)
-            (rb"TC3[0-9]{2}", "Infineon TriCore TC3xx (AURIX 2G)"),
-            (rb"TC2[0-9]{2}", "Infineon TriCore TC2xx (AURIX)"),
-            (rb"TC1797", "Infineon TriCore TC1797"),
-            (rb"TC1796", "Infineon TriCore TC1796"),
-            (rb"TC1767", "Infineon TriCore TC1767"),
-            (rb"TC17[0-9]{2}", "Infineon TriCore TC17xx"),
-            (rb"TriCore", "Infineon TriCore"),
-            (rb"TRICORE", "Infineon TriCore"),
-            
-            # Renesas (Denso, Hitachi)
-            (rb"RH850", "Renesas RH850"),
-            (rb"rh850", "Renesas RH850"),
-            (rb"SH7058", "Renesas SH7058"),
-            (rb"SH7059", "Renesas SH7059"),
-            (rb"SH7055", "Renesas SH7055"),
-            (rb"SH705[0-9]", "Renesas SH705x"),
-            (rb"SH7[0-9]{3}", "Renesas SuperH"),
-            (rb"V850", "Renesas V850"),
-            (rb"78K", "Renesas 78K"),
-            
-            # NXP/Freescale
-            (rb"MPC5[0-9]{3}", "NXP MPC5xxx"),
-            (rb"MPC56[0-9]{2}", "NXP MPC56xx"),
-            (rb"MPC57[0-9]{2}", "NXP MPC57xx"),
-            (rb"S12X", "Freescale S12X"),
-            (rb"MC9S12", "Freescale S12"),
-            
-            # ST Microelectronics
-            (rb"SPC5[0-9]", "ST SPC5xx"),
-            (rb"ST10F", "ST ST10F"),
-            (rb"ST10", "ST ST10"),
-            
-            # Infineon C16x (older)
-            (rb"C167", "Infineon C167"),
-            (rb"C166", "Infineon C166"),
-            (rb"XC16[0-9]", "Infineon XC16x"),
-            
-            # NEC
-            (rb"76F00[0-9]+", "NEC 76F00xx"),
-            (rb"uPD70", "NEC 70xx"),
-            (rb"uPD78", "NEC 78K"),
-            
-            # Fujitsu
-            (rb"MB91F", "Fujitsu MB91F"),
-            (rb"MB90F", "Fujitsu MB90F"),
-            (rb"FR60", "Fujitsu FR60"),
-            (rb"FR80", "Fujitsu FR80"),
-            
-            # Motorola (legacy)
-            (rb"68HC12", "Motorola 68HC12"),
-            (rb"68HC11", "Motorola 68HC11"),
-            (rb"MC68HC", "Motorola 68HC"),
-            
-            # ARM
-            (rb"Cortex-R", "ARM Cortex-R"),
-            (rb"Cortex-M", "ARM Cortex-M"),
-            (rb"ARM7", "ARM7"),
-            (rb"ARM9", "ARM9"),
-            
-            # Texas Instruments
-            (rb"TMS470", "TI TMS470"),
-            (rb"TMS570", "TI TMS570"),
-            (rb"Hercules", "TI Hercules"),
-        ]
-        
-        for pattern, processor_name in processor_patterns:
-            if re.search(pattern, file_data):
-                self.results["processor"] = processor_name
+        for rule in PROCESSOR_RULES:
+            if self._scan.search(rule):
+                self.results["processor"] = rule.label
                 return
         
         # Infer from manufacturer if not directly detected
@@ -760,13 +1048,9 @@ class ECUAnalyzer:
         Real VINs have very specific structure and validation rules.
         """
         
-        # VIN pattern: 17 characters, no I, O, Q
-        vin_pattern = rb"([A-HJ-NPR-Z0-9]{17})"
-        matches = re.findall(vin_pattern, file_data)
-        
-        for v in matches:
+        for match in self._scan.finditer(VIN_RULE):
             try:
-                vin = v.decode("utf-8")
+                vin = match.group(1).decode("utf-8")
                 
                 # ===== STRICT VALIDATION RULES =====
                 
@@ -838,44 +1122,31 @@ class ECUAnalyzer:
                 continue
     
     def _extract_strings(self, file_data: bytes) -> List[str]:
-        """Extract readable ASCII strings from binary data"""
+        """
+        Extract readable ASCII strings from binary data.
         
-        strings = []
-        current = b""
-        
-        for byte in file_data:
-            if 32 <= byte <= 126:  # Printable ASCII
-                current += bytes([byte])
-            else:
-                if len(current) >= 4:
-                    try:
-                        s = current.decode("ascii").strip()
-                        if s and len(s) >= 4 and len(s) <= 100:
-                            if any(c.isalpha() for c in s):
-                                strings.append(s)
-                    except Exception:
-                        pass
-                current = b""
-        
-        # Handle last string
-        if len(current) >= 4:
-            try:
-                s = current.decode("ascii").strip()
-                if s and len(s) >= 4 and len(s) <= 100:
-                    if any(c.isalpha() for c in s):
-                        strings.append(s)
-            except Exception:
-                pass
+        Printable runs come from the signature scan (one regex pass over the
+        file). Each unique string is kept with its file offset and uppercase
+        form in self._strings, so later steps don't decode it again.
+        """
         
-        # Remove duplicates while preserving order
+        strings = []
         seen = set()
-        unique = []
-        for s in strings:
-            if s not in seen:
-                seen.add(s)
-                unique.append(s)
         
-        return unique
+        for offset, run in self._scan.printable_runs():
+            s = run.decode("ascii").strip()
+            if len(s) > 100 or s in seen:
+                continue
+            if len(s) >= 4 and any(c.isalpha() for c in s):
+                seen.add(s)
+                strings.append(ExtractedString(
+                    text=s,
+                    upper=s.upper(),
+                    offset=offset + len(run) - len(run.lstrip()),
+                ))
+        
+        self._strings = strings
+        return [s.text for s in strings]
     
     def _is_garbage_string(self, s: str) -> bool:
         """Check if a string looks like garbage/random data"""
@@ -905,33 +1176,11 @@ class ECUAnalyzer:
     def _filter_relevant_strings(self) -> List[str]:
         """Filter and return the most relevant strings for display"""
         
-        keywords = [
-            # Manufacturers
-            "BOSCH", "DENSO", "DELPHI", "SIEMENS", "CONTINENTAL", "MARELLI",
-            "HITACHI", "KEIHIN", "KEFICO", "TRANSTRON", "CUMMINS",
-            
-            # ECU related
-            "ECU", "ENGINE", "CONTROL", "MODULE", "SYSTEM",
-            "CALIBRATION", "CAL", "VERSION", "VER",
-            
-            # Functions
-            "DPF", "EGR", "SCR", "ADBLUE", "LAMBDA", "BOOST",
-            "INJECTION", "DIESEL", "GASOLINE", "TURBO",
-            
-            # Vehicle brands
-            "TOYOTA", "HONDA", "NISSAN", "MAZDA", "SUBARU", "MITSUBISHI",
-            "HYUNDAI", "KIA", "FORD", "BMW", "MERCEDES", "VW", "AUDI",
-            
-            # Technical
-            "OBD", "CAN", "DIAG", "FLASH", "EEPROM", "MAP",
-            "Copyright", "HARDWARE", "SOFTWARE",
-        ]
-        
         relevant = []
         seen = set()
         
-        for s in self._extracted_strings:
-            s_clean = s.strip()
+        for string in self._strings:
+            s_clean = string.text
             
             if s_clean in seen or len(s_clean) < 4:
                 continue
@@ -942,13 +1191,13 @@ class ECUAnalyzer:
             seen.add(s_clean)
             
             # Check if contains keyword
-            s_upper = s_clean.upper()
-            if any(kw in s_upper for kw in keywords):
+            s_upper = string.upper
+            if any(kw in s_upper for kw in RELEVANT_STRING_KEYWORDS):
                 relevant.append(s_clean)
                 continue
             
             # Keep structured identifiers
-            if re.match(r"^[A-Z0-9][A-Z0-9\-_]{5,20}[A-Z0-9]$", s_clean):
+            if STRUCTURED_ID_REGEX.match(s_clean):
                 # Additional check - must have letters and numbers
                 has_letter = any(c.isalpha() for c in s_clean)
                 has_digit = any(c.isdigit() for c in s_clean)
@@ -993,7 +1242,7 @@ class ECUAnalyzer:
         available_services = []
         
         # Get all strings for string-based detection
-        all_strings_upper = " ".join(self._extracted_strings).upper()
+        all_strings_upper = " ".join(s.upper for s in self._strings)
         
         # =====================================================================
         # DPF (Diesel Particulate Filter) Detection
@@ -1165,11 +1414,12 @@ class ECUAnalyzer:
         # Use database patterns if available
         if HAS_ECU_DATABASE:
             # Check text markers from database
-            for marker, score in DPF_DETECTION_PATTERNS.get("dpf_text_markers", []):
-                count = file_data.count(marker)
+            for rule in DPF_TEXT_MARKER_RULES:
+                marker, score = rule.pattern, rule.score
+                count = self._scan.count(rule)
                 if count > 0:
                     # Verify word boundary for short markers
-                    idx = file_data.find(marker)
+                    idx = self._scan.find(rule)
                     if idx >= 0:
                         before = file_data[max(0,idx-1):idx]
                         after = file_data[idx+len(marker):idx+len(marker)+1]
@@ -1183,32 +1433,27 @@ class ECUAnalyzer:
                             break
             
             # Check Denso-specific patterns
-            for pattern, score in DPF_DETECTION_PATTERNS.get("denso_dpf_patterns", []):
-                if pattern in file_data:
+            for rule in DENSO_DPF_RULES:
+                if self._scan.contains(rule):
                     indicators.append("Denso DPF map pattern")
-                    confidence_score += score
+                    confidence_score += rule.score
                     break
         
         # =================================================================
         # METHOD 1: EDC17 DPF Switch Pattern (4081 + 15 sequence)
         # =================================================================
-        val_4081 = struct.pack('<H', 4081)
-        val_15 = struct.pack('<H', 15)
-        
-        for i in range(min(len(file_data) - 10, 500000)):  # Limit search for performance
-            if file_data[i:i+2] == val_4081:
-                if val_15 in file_data[i+2:i+8]:
-                    indicators.append("EDC17 DPF switch area (4081+15)")
-                    confidence_score += 50
-                    break
+        switches = find_followed_by(
+            file_data, DPF_SWITCH_VALUE, DPF_SWITCH_FOLLOWER, DPF_SWITCH_WINDOW,
+            first_offsets=self._scan.offsets(DPF_SWITCH_RULE),
+        )
+        if switches:
+            indicators.append("EDC17 DPF switch area (4081+15)")
+            confidence_score += 50
         
         # =================================================================
         # METHOD 2: Map Boundary Markers (7FFF/8000)
         # =================================================================
-        pattern_7fff_8000 = struct.pack('<HH', 32767, 32768)
-        pattern_8000_7fff = struct.pack('<HH', 32768, 32767)
-        
-        count_boundaries = file_data.count(pattern_7fff_8000) + file_data.count(pattern_8000_7fff)
+        count_boundaries = sum(self._scan.count(rule) for rule in MAP_BOUNDARY_RULES)
         
         if count_boundaries >= 5:
             indicators.append(f"Map boundaries (7FFF/8000): {count_boundaries}x")
@@ -1221,15 +1466,10 @@ class ECUAnalyzer:
         # METHOD 3: Direct text markers (fallback)
         # =================================================================
         if confidence_score == 0:
-            dpf_markers = [
-                (b'DPF', 45), (b'dpf', 40), (b'DpF', 40),
-                (b'FAP', 45), (b'Fap', 40), (b'fap', 35),
-                (b'SOOT', 30), (b'REGEN', 30),
-            ]
-            for marker, score in dpf_markers:
-                if marker in file_data:
-                    indicators.append(f"Text marker '{marker.decode()}'")
-                    confidence_score += score
+            for rule in DPF_FALLBACK_RULES:
+                if self._scan.contains(rule):
+                    indicators.append(f"Text marker '{rule.pattern.decode()}'")
+                    confidence_score += rule.score
                     break
         
         # Determine confidence
@@ -1259,10 +1499,11 @@ class ECUAnalyzer:
         
         # Use database patterns if available
         if HAS_ECU_DATABASE:
-            for marker, score in EGR_DETECTION_PATTERNS.get("egr_text_markers", []):
-                count = file_data.count(marker)
+            for rule in EGR_TEXT_MARKER_RULES:
+                marker, score = rule.pattern, rule.score
+                count = self._scan.count(rule)
                 if count > 0:
-                    idx = file_data.find(marker)
+                    idx = self._scan.find(rule)
                     if idx >= 0:
                         before = file_data[max(0,idx-1):idx]
                         after = file_data[idx+len(marker):idx+len(marker)+1]
@@ -1277,14 +1518,10 @@ class ECUAnalyzer:
         
         # Fallback direct text markers
         if confidence_score == 0:
-            egr_markers = [
-                (b'EGR', 50), (b'egr', 45), (b'Egr', 45),
-                (b'AGR', 50), (b'agr', 45), (b'Agr', 45),
-            ]
-            for marker, score in egr_markers:
-                if marker in file_data:
-                    indicators.append(f"Text marker '{marker.decode()}'")
-                    confidence_score += score
+            for rule in EGR_FALLBACK_RULES:
+                if self._scan.contains(rule):
+                    indicators.append(f"Text marker '{rule.pattern.decode()}'")
+                    confidence_score += rule.score
                     break
         
         # Check extracted strings
@@ -1436,20 +1673,10 @@ class ECUAnalyzer:
         # These must be VERY specific - avoid short generic patterns
         # =================================================================
         if confidence_score < 60:
-            strong_scr_markers = [
-                (b'DENOXTRONIC', 70),      # Bosch SCR system name
-                (b'Denoxtronic', 70),
-                (b'UREA_DOSING', 65),       # Urea dosing specific
-                (b'REDUCTANT_CTRL', 65),    # Reductant controller
-                (b'NOX_SENSOR_', 60),       # NOx sensor with suffix
-                (b'SCR_CATALYST', 60),      # SCR catalyst specific
-                (b'ADBLUE_TANK', 60),       # AdBlue tank specific
-                (b'DEF_TANK_', 55),         # DEF tank with suffix
-            ]
-            for marker, score in strong_scr_markers:
-                if marker in file_data:
-                    indicators.append(f"SCR marker: {marker.decode()}")
-                    confidence_score += score
+            for rule in SCR_STRONG_RULES:
+                if self._scan.contains(rule):
+                    indicators.append(f"SCR marker: {rule.pattern.decode()}")
+                    confidence_score += rule.score
                     break
         
         # =================================================================
@@ -1479,19 +1706,11 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Lambda/O2 text markers
-        lambda_markers = [
-            (b'LAMBDA', 50), (b'Lambda', 45), (b'lambda', 40),
-            (b'O2_', 45), (b'O2S', 45), (b'O2 SENSOR', 50),
-            (b'OXYGEN', 40), (b'oxygen', 35),
-            (b'LSU', 40), (b'WIDEBAND', 45),
-            (b'HEGO', 45), (b'UEGO', 45),
-        ]
-        
-        for marker, score in lambda_markers:
-            count = file_data.count(marker)
+        for rule in LAMBDA_RULES:
+            count = self._scan.count(rule)
             if count > 0:
-                indicators.append(f"Lambda marker '{marker.decode()}': {count}x")
-                confidence_score += score
+                indicators.append(f"Lambda marker '{rule.pattern.decode()}': {count}x")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1526,17 +1745,10 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Speed limiter markers
-        speed_markers = [
-            (b'VMAX', 55), (b'V_MAX', 55), (b'SPEED_LIM', 60),
-            (b'SPEED_LIMIT', 60), (b'SPEEDLIM', 55),
-            (b'LIMITER', 45), (b'limiter', 40),
-            (b'TOP_SPEED', 50), (b'TOPSPEED', 50),
-        ]
-        
-        for marker, score in speed_markers:
-            if marker in file_data:
-                indicators.append(f"Speed marker '{marker.decode()}'")
-                confidence_score += score
+        for rule in SPEED_LIMITER_RULES:
+            if self._scan.contains(rule):
+                indicators.append(f"Speed marker '{rule.pattern.decode()}'")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1571,17 +1783,10 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Catalyst markers
-        cat_markers = [
-            (b'CAT_', 50), (b'_CAT', 50), (b'CATALYST', 55),
-            (b'KAT_', 50), (b'_KAT', 50), (b'KATALYSATOR', 55),
-            (b'TWC', 45), (b'THREE_WAY', 50),
-            (b'CAT_DIAG', 55), (b'CATDIAG', 50),
-        ]
-        
-        for marker, score in cat_markers:
-            if marker in file_data:
-                indicators.append(f"Catalyst marker '{marker.decode()}'")
-                confidence_score += score
+        for rule in CATALYST_RULES:
+            if self._scan.contains(rule):
+                indicators.append(f"Catalyst marker '{rule.pattern.decode()}'")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1616,17 +1821,10 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Swirl flaps markers
-        swirl_markers = [
-            (b'SWIRL', 55), (b'swirl', 50),
-            (b'DRALLKLAPPEN', 60), (b'Drallklappen', 55),
-            (b'TUMBLE', 50), (b'tumble', 45),
-            (b'INTAKE_FLAP', 55), (b'INTAKEFLAP', 50),
-        ]
-        
-        for marker, score in swirl_markers:
-            if marker in file_data:
-                indicators.append(f"Swirl flaps marker '{marker.decode()}'")
-                confidence_score += score
+        for rule in SWIRL_FLAP_RULES:
+            if self._scan.contains(rule):
+                indicators.append(f"Swirl flaps marker '{rule.pattern.decode()}'")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1661,17 +1859,10 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Start/stop markers
-        ss_markers = [
-            (b'START_STOP', 60), (b'STARTSTOP', 55),
-            (b'MSA', 50), (b'AUTO_STOP', 55),
-            (b'ENGINE_RESTART', 50), (b'ECO_STOP', 50),
-            (b'ISG', 45),  # Intelligent Stop & Go
-        ]
-        
-        for marker, score in ss_markers:
-            if marker in file_data:
-                indicators.append(f"Start/Stop marker '{marker.decode()}'")
-                confidence_score += score
+        for rule in START_STOP_RULES:
+            if self._scan.contains(rule):
+                indicators.append(f"Start/Stop marker '{rule.pattern.decode()}'")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1706,18 +1897,10 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Hot start / Immo markers
-        immo_markers = [
-            (b'IMMO', 55), (b'immo', 50),
-            (b'IMMOBILIZER', 60), (b'IMMOBILISER', 60),
-            (b'WFS', 50),  # Wegfahrsperre (German for immobilizer)
-            (b'HOT_START', 50), (b'HOTSTART', 50),
-            (b'TRANSPONDER', 55),
-        ]
-        
-        for marker, score in immo_markers:
-            if marker in file_data:
-                indicators.append(f"Immo marker '{marker.decode()}'")
-                confidence_score += score
+        for rule in IMMO_RULES:
+            if self._scan.contains(rule):
+                indicators.append(f"Immo marker '{rule.pattern.decode()}'")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1753,21 +1936,11 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # DTC markers
-        dtc_markers = [
-            (b'DTC', 50), (b'dtc', 45),
-            (b'FAULT', 45), (b'fault', 40),
-            (b'ERROR_CODE', 50), (b'ERRORCODE', 50),
-            (b'P0', 45), (b'P1', 45), (b'P2', 45),  # OBD-II codes
-            (b'U0', 40), (b'U1', 40),  # Network codes
-            (b'OBD', 50), (b'obd', 45),
-            (b'DIAG', 45),
-        ]
-        
-        for marker, score in dtc_markers:
-            count = file_data.count(marker)
+        for rule in DTC_RULES:
+            count = self._scan.count(rule)
             if count > 0:
-                indicators.append(f"DTC marker '{marker.decode()}': {count}x")
-                confidence_score += score
+                indicators.append(f"DTC marker '{rule.pattern.decode()}': {count}x")
+                confidence_score += rule.score
                 break
         
         # Check strings
@@ -1809,24 +1982,20 @@ class ECUAnalyzer:
         confidence_score = 0
         
         # Tuning-related markers
-        tuning_markers = [
-            (b'TORQUE', 55), (b'torque', 50),
-            (b'TQ_', 50), (b'_TQ', 50),
-            (b'INJECTION', 50), (b'injection', 45),
-            (b'RAIL_P', 50), (b'RAILP', 50),
-            (b'BOOST', 55), (b'boost', 50),
-            (b'TURBO', 50), (b'turbo', 45),
-            (b'IQ_', 50), (b'_IQ', 50),  # Injection Quantity
-            (b'SOI_', 50), (b'_SOI', 50),  # Start of Injection
-        ]
-        
-        for marker, score in tuning_markers:
-            count = file_data.count(marker)
+        for rule in TUNING_RULES:
+            count = self._scan.count(rule)
             if count > 0:
-                indicators.append(f"Tuning marker '{marker.decode()}': {count}x")
-                confidence_score += score
+                indicators.append(f"Tuning marker '{rule.pattern.decode()}': {count}x")
+                confidence_score += rule.score
                 break
         
+        # Axis-backed 2D maps found by structural discovery
+        maps = discover_maps(file_data, regions=self.regions)
+        map_count = sum(1 for candidate in maps if candidate.score >= TUNING_MIN_MAP_SCORE)
+        if map_count >= TUNING_MIN_DISCOVERED_MAPS:
+            indicators.append(f"2D maps with axes: {map_count}")
+            confidence_score += 30
+        
         # Check strings
         tuning_strings = ["TORQUE", "INJECTION", "RAIL_PRESSURE", "BOOST", "TURBO_CTRL"]
         for s in tuning_strings:
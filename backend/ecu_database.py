@@ -3,8 +3,13 @@ Professional ECU Database
 =========================
 Comprehensive database of ECU types, manufacturers, and their characteristics.
 Built from research of professional tuning databases (WinOLS, mappacks, tuning forums).
+
+The DPF and EGR marker tables are also registered as compiled detector
+rules (see the end of this module), read by ECUAnalyzer.
 """
 
+from ecu_engine.detectors import DETECTORS
+
 # ECU Manufacturer Signatures - Binary patterns to identify manufacturer
 ECU_MANUFACTURER_SIGNATURES = {
     "Bosch": [
@@ -263,3 +268,21 @@ ECU_MAP_CHARACTERISTICS = {
         "value_range": (0, 65535),
     },
 }
+
+
+# =============================================================================
+# COMPILED DETECTOR RULES
+# =============================================================================
+# The marker tables ECUAnalyzer reads, as rules in the shared detector
+# registry - compiled once, matched in the same file scan as the
+# ECUAnalyzer tables
+
+DPF_TEXT_MARKER_RULES = DETECTORS.add_rules(
+    "dpf_text_markers", DPF_DETECTION_PATTERNS["dpf_text_markers"], fields=("pattern", "score")
+)
+DENSO_DPF_RULES = DETECTORS.add_rules(
+    "denso_dpf_patterns", DPF_DETECTION_PATTERNS["denso_dpf_patterns"], fields=("pattern", "score")
+)
+EGR_TEXT_MARKER_RULES = DETECTORS.add_rules(
+    "egr_text_markers", EGR_DETECTION_PATTERNS["egr_text_markers"], fields=("pattern", "score")
+)
@@ -11,6 +11,13 @@ Components:
 - MapModifier: Apply modifications (DPF off, EGR off, etc.)
 - ChecksumCalculator: Recalculate checksums after modification
 - ECUFileProcessor: Main orchestrator for file processing
+- SignatureScanner: Single-pass multi-pattern search over binary files
+- DetectorRegistry: Detector tables compiled once into shared, counted rules
+- RegionIndex: Per-file block map (empty / code / calibration / ASCII)
+- find_followed_by: "Value A followed by value B within N bytes" search
+- discover_maps: Ranked catalogue of 2D maps found by axis detection
+- PatchPlan: Modifications recorded as patches against the original file
+- discover_checksum: Checksum definition search over known-good files
 
 Supported ECU Families (Initial):
 - Bosch EDC17 (most common diesel ECU)
@@ -28,13 +35,21 @@ from .models import (
     ModificationRule,
     ProcessingResult,
     ChecksumAlgorithm,
+    ChecksumState,
     ModificationType,
 )
 from .database import ECUDefinitionDB
-from .map_locator import MapLocator
+from .map_locator import MapLocator, MapView
 from .map_modifier import MapModifier
 from .checksum import ChecksumCalculator
 from .processor import ECUFileProcessor
+from .scanner import SignatureScanner, ScanResult
+from .detectors import DETECTORS, DetectorRegistry, DetectorRule, DetectorScan, RuleKind
+from .regions import RegionIndex, RegionType
+from .sequences import find_followed_by, literal_offsets
+from .map_discovery import MapCandidate, discover_maps
+from .patches import Patch, PatchConflictError, PatchPlan
+from .checksum_discovery import DiscoveredChecksum, discover_checksum
 
 __version__ = "1.0.0"
 __all__ = [
@@ -43,10 +58,30 @@ __all__ = [
     "ModificationRule",
     "ProcessingResult",
     "ChecksumAlgorithm",
+    "ChecksumState",
     "ModificationType",
     "ECUDefinitionDB",
     "MapLocator",
+    "MapView",
     "MapModifier",
     "ChecksumCalculator",
     "ECUFileProcessor",
+    "SignatureScanner",
+    "ScanResult",
+    "DETECTORS",
+    "DetectorRegistry",
+    "DetectorRule",
+    "DetectorScan",
+    "RuleKind",
+    "RegionIndex",
+    "RegionType",
+    "find_followed_by",
+    "literal_offsets",
+    "MapCandidate",
+    "discover_maps",
+    "Patch",
+    "PatchConflictError",
+    "PatchPlan",
+    "DiscoveredChecksum",
+    "discover_checksum",
 ]
@@ -14,11 +14,36 @@ Supported algorithms:
 
 NOTE: Checksum algorithms are often proprietary and may need
 reverse engineering from sample files.
+
+The byte crunching is done by checksum_kernels (zlib / NumPy).
+
+After a modification only a few hundred bytes change. Given the
+original file's ChecksumState and the patch list, update_checksum_incremental
+derives the new checksum from the old one in time proportional to the
+patches instead of re-reading the whole range.
 """
 
 import struct
-from typing import Optional, List, Tuple, Dict
-from .models import ChecksumAlgorithm, ChecksumType
+from typing import Iterable, Optional, List, Tuple, Dict
+from .models import ChecksumAlgorithm, ChecksumState, ChecksumType
+from .patches import Patch
+from .checksum_kernels import (
+    CRC32_IEEE_POLY,
+    crc_patch,
+    crc_register,
+    crc_table,
+    reflect,
+    word_sum_at,
+    word_sum_patch,
+    word_xor,
+)
+
+# Word size of the summing checksum types
+_SUM_WORD_SIZES = {
+    ChecksumType.SUM8: 1,
+    ChecksumType.SUM16: 2,
+    ChecksumType.SUM32: 4,
+}
 
 
 class ChecksumCalculator:
@@ -35,31 +60,13 @@ class ChecksumCalculator:
         # CRC16 lookup table
         self._crc16_table = self._generate_crc16_table()
     
-    def _generate_crc32_table(self, polynomial: int = 0x04C11DB7) -> List[int]:
+    def _generate_crc32_table(self, polynomial: int = CRC32_IEEE_POLY) -> List[int]:
         """Generate CRC32 lookup table."""
-        table = []
-        for i in range(256):
-            crc = i << 24
-            for _ in range(8):
-                if crc & 0x80000000:
-                    crc = (crc << 1) ^ polynomial
-                else:
-                    crc <<= 1
-            table.append(crc & 0xFFFFFFFF)
-        return table
+        return list(crc_table(32, polynomial & 0xFFFFFFFF))
     
     def _generate_crc16_table(self, polynomial: int = 0x8005) -> List[int]:
         """Generate CRC16 lookup table."""
-        table = []
-        for i in range(256):
-            crc = i << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ polynomial
-                else:
-                    crc <<= 1
-            table.append(crc & 0xFFFF)
-        return table
+        return list(crc_table(16, polynomial & 0xFFFF))
     
     def calculate_checksum(
         self,
@@ -76,18 +83,10 @@ class ChecksumCalculator:
         Returns:
             Calculated checksum value
         """
-        # Determine range to calculate
-        start = algorithm.calc_start
-        end = algorithm.calc_end if algorithm.calc_end else len(file_data)
-        
-        # Handle multi-block checksums
-        if algorithm.blocks:
-            data_chunks = []
-            for block_start, block_end in algorithm.blocks:
-                data_chunks.append(file_data[block_start:block_end])
-            data = b''.join(data_chunks)
-        else:
-            data = file_data[start:end]
+        # Views of the range(s) to calculate - blocks are streamed through
+        # the checksum one after the other, never copied or joined
+        view = memoryview(file_data)
+        data = [view[start:end] for start, end in self.checksum_ranges(len(file_data), algorithm)]
         
         # Calculate based on type
         if algorithm.checksum_type == ChecksumType.CRC32:
@@ -109,20 +108,26 @@ class ChecksumCalculator:
         else:
             raise ValueError(f"Unknown checksum type: {algorithm.checksum_type}")
     
+    def _chain_crc(
+        self,
+        blocks: List[memoryview],
+        width: int,
+        polynomial: int,
+        algorithm: ChecksumAlgorithm
+    ) -> int:
+        """CRC register after feeding the blocks in order."""
+        crc = algorithm.initial_value & ((1 << width) - 1)
+        for block in blocks:
+            crc = crc_register(block, width, polynomial, crc, algorithm.reflect_in)
+        return crc
+    
     def _calc_crc32(
         self,
-        data: bytes,
+        blocks: List[memoryview],
         algorithm: ChecksumAlgorithm
     ) -> int:
         """Calculate CRC32 checksum."""
-        crc = algorithm.initial_value
-        
-        for byte in data:
-            if algorithm.reflect_in:
-                byte = self._reflect(byte, 8)
-            
-            table_idx = ((crc >> 24) ^ byte) & 0xFF
-            crc = ((crc << 8) ^ self._crc32_table[table_idx]) & 0xFFFFFFFF
+        crc = self._chain_crc(blocks, 32, CRC32_IEEE_POLY, algorithm)
         
         if algorithm.reflect_out:
             crc = self._reflect(crc, 32)
@@ -131,48 +136,36 @@ class ChecksumCalculator:
     
     def _calc_crc16(
         self,
-        data: bytes,
+        blocks: List[memoryview],
         algorithm: ChecksumAlgorithm
     ) -> int:
         """Calculate CRC16 checksum."""
-        crc = algorithm.initial_value & 0xFFFF
-        
-        for byte in data:
-            if algorithm.reflect_in:
-                byte = self._reflect(byte, 8)
-            
-            table_idx = ((crc >> 8) ^ byte) & 0xFF
-            crc = ((crc << 8) ^ self._crc16_table[table_idx]) & 0xFFFF
+        crc = self._chain_crc(blocks, 16, 0x8005, algorithm)
         
         if algorithm.reflect_out:
             crc = self._reflect(crc, 16)
         
         return crc ^ (algorithm.xor_out & 0xFFFF)
     
-    def _calc_sum(self, data: bytes, word_size: int) -> int:
+    def _calc_sum(self, blocks: List[memoryview], word_size: int) -> int:
         """Calculate simple sum checksum."""
-        total = 0
         mask = (1 << (word_size * 8)) - 1
-        
-        for i in range(0, len(data), word_size):
-            if i + word_size <= len(data):
-                if word_size == 1:
-                    total += data[i]
-                elif word_size == 2:
-                    total += struct.unpack('<H', data[i:i+2])[0]
-                elif word_size == 4:
-                    total += struct.unpack('<I', data[i:i+4])[0]
-        
+        # Words run across block boundaries; a trailing partial word is ignored
+        whole = sum(len(block) for block in blocks) // word_size * word_size
+        total = position = 0
+        for block in blocks:
+            total += word_sum_at(block[:max(whole - position, 0)], position, word_size)
+            position += len(block)
         return total & mask
     
-    def _calc_xor(self, data: bytes) -> int:
+    def _calc_xor(self, blocks: List[memoryview]) -> int:
         """Calculate XOR checksum."""
-        result = 0
-        for byte in data:
-            result ^= byte
-        return result
+        value = 0
+        for block in blocks:
+            value ^= word_xor(block)
+        return value
     
-    def _calc_bosch_edc17(self, data: bytes, algorithm: ChecksumAlgorithm) -> int:
+    def _calc_bosch_edc17(self, blocks: List[memoryview], algorithm: ChecksumAlgorithm) -> int:
         """
         Calculate Bosch EDC17 checksum.
         
@@ -181,42 +174,42 @@ class ChecksumCalculator:
         """
         # EDC17 typically uses standard CRC32 with IEEE polynomial
         # but with specific initial value and XOR
-        polynomial = algorithm.polynomial or 0x04C11DB7
-        crc = algorithm.initial_value
-        
-        # Generate table with correct polynomial if different
-        if polynomial != 0x04C11DB7:
-            table = self._generate_crc32_table(polynomial)
-        else:
-            table = self._crc32_table
-        
-        for byte in data:
-            if algorithm.reflect_in:
-                byte = self._reflect(byte, 8)
-            table_idx = ((crc >> 24) ^ byte) & 0xFF
-            crc = ((crc << 8) ^ table[table_idx]) & 0xFFFFFFFF
+        polynomial = algorithm.polynomial or CRC32_IEEE_POLY
+        crc = self._chain_crc(blocks, 32, polynomial, algorithm)
         
         if algorithm.reflect_out:
             crc = self._reflect(crc, 32)
         
         return crc ^ algorithm.xor_out
     
-    def _calc_bosch_med17(self, data: bytes, algorithm: ChecksumAlgorithm) -> int:
+    def _calc_bosch_med17(self, blocks: List[memoryview], algorithm: ChecksumAlgorithm) -> int:
         """
         Calculate Bosch MED17 checksum.
         
         MED17 (petrol) uses similar algorithm to EDC17 but may have
         different parameters.
         """
-        return self._calc_bosch_edc17(data, algorithm)
+        return self._calc_bosch_edc17(blocks, algorithm)
     
     def _reflect(self, value: int, bits: int) -> int:
         """Reflect (reverse) bits in a value."""
-        result = 0
-        for i in range(bits):
-            if value & (1 << i):
-                result |= 1 << (bits - 1 - i)
-        return result
+        return reflect(value, bits)
+    
+    def locate_checksum(self, file_data: bytes, algorithm: ChecksumAlgorithm) -> Optional[int]:
+        """Offset of the stored checksum, or None if it cannot be located."""
+        if algorithm.offset is not None:
+            return algorithm.offset
+        if algorithm.search_pattern:
+            pos = file_data.find(algorithm.search_pattern)
+            if pos != -1:
+                return pos + len(algorithm.search_pattern)
+        return None
+    
+    def checksum_ranges(self, file_size: int, algorithm: ChecksumAlgorithm) -> List[Tuple[int, int]]:
+        """Byte ranges the checksum is calculated over."""
+        if algorithm.blocks:
+            return list(algorithm.blocks)
+        return [(algorithm.calc_start, algorithm.calc_end if algorithm.calc_end else file_size)]
     
     def verify_checksum(
         self,
@@ -234,21 +227,15 @@ class ChecksumCalculator:
             Tuple of (is_valid, stored_checksum, calculated_checksum)
         """
         # Find stored checksum location
-        if algorithm.offset is not None:
-            offset = algorithm.offset
-        elif algorithm.search_pattern:
-            pos = file_data.find(algorithm.search_pattern)
-            if pos == -1:
-                return False, 0, 0
-            offset = pos + len(algorithm.search_pattern)
-        else:
+        offset = self.locate_checksum(file_data, algorithm)
+        if offset is None:
             return False, 0, 0
         
-        # Read stored checksum (assume 4 bytes for CRC32)
-        stored = struct.unpack('<I', file_data[offset:offset+4])[0]
+        # Read stored checksum
+        stored = self._read_stored(file_data, offset, algorithm)
         
-        # Calculate expected checksum
-        calculated = self.calculate_checksum(file_data, algorithm)
+        # Calculate expected checksum (stored bytes count as zeros, as in update_checksum)
+        calculated = self._value_without_storage(file_data, algorithm, offset)
         
         return stored == calculated, stored, calculated
     
@@ -268,25 +255,187 @@ class ChecksumCalculator:
             Tuple of (success, new_checksum_value)
         """
         # Find checksum location
-        if algorithm.offset is not None:
-            offset = algorithm.offset
-        elif algorithm.search_pattern:
-            pos = file_data.find(algorithm.search_pattern)
-            if pos == -1:
-                return False, 0
-            offset = pos + len(algorithm.search_pattern)
-        else:
+        offset = self.locate_checksum(file_data, algorithm)
+        if offset is None:
             return False, 0
         
         # Temporarily zero out checksum location for calculation
-        original_checksum_bytes = bytes(file_data[offset:offset+4])
-        file_data[offset:offset+4] = b'\x00\x00\x00\x00'
+        size = algorithm.checksum_size
+        file_data[offset:offset+size] = bytes(size)
         
         # Calculate new checksum
-        new_checksum = self.calculate_checksum(bytes(file_data), algorithm)
+        new_checksum = self.calculate_checksum(file_data, algorithm)
         
         # Write new checksum
-        file_data[offset:offset+4] = struct.pack('<I', new_checksum)
+        file_data[offset:offset+size] = self._pack(new_checksum, algorithm)
+        
+        return True, new_checksum
+    
+    def _read_stored(self, file_data: bytes, offset: int, algorithm: ChecksumAlgorithm) -> int:
+        """Checksum value stored at offset."""
+        return int.from_bytes(file_data[offset:offset+algorithm.checksum_size], algorithm.byte_order)
+    
+    def _pack(self, value: int, algorithm: ChecksumAlgorithm) -> bytes:
+        """Checksum value as stored in the file."""
+        size = algorithm.checksum_size
+        return (value & ((1 << (8 * size)) - 1)).to_bytes(size, algorithm.byte_order)
+    
+    def _value_without_storage(
+        self,
+        file_data: bytes,
+        algorithm: ChecksumAlgorithm,
+        offset: int
+    ) -> int:
+        """Checksum with the stored bytes zeroed, without copying the file."""
+        stored = bytes(file_data[offset:offset+algorithm.checksum_size])
+        return self.patch_checksum(
+            self.calculate_checksum(file_data, algorithm),
+            len(file_data),
+            algorithm,
+            [Patch(offset, stored, bytes(len(stored)))],
+        )
+    
+    # =========================================================================
+    # INCREMENTAL UPDATES
+    # =========================================================================
+    
+    def checksum_state(
+        self,
+        file_data: bytes,
+        algorithm: ChecksumAlgorithm
+    ) -> Optional[ChecksumState]:
+        """
+        Checksum state of an unmodified file.
+        
+        The value is the one update_checksum would write for this file
+        (stored checksum bytes zeroed). Keep it to update the checksum of
+        patched copies with update_checksum_incremental.
+        
+        Returns:
+            ChecksumState, or None if the checksum cannot be located
+        """
+        offset = self.locate_checksum(file_data, algorithm)
+        if offset is None:
+            return None
+        return ChecksumState(
+            name=algorithm.name,
+            offset=offset,
+            value=self._value_without_storage(file_data, algorithm, offset),
+            file_size=len(file_data),
+        )
+    
+    def patch_checksum(
+        self,
+        value: int,
+        file_size: int,
+        algorithm: ChecksumAlgorithm,
+        patches: Iterable[Patch]
+    ) -> int:
+        """
+        Checksum after patches, derived from the checksum before them.
+        
+        Args:
+            value: calculate_checksum result before the patches
+            file_size: Size of the file
+            algorithm: Checksum algorithm definition
+            patches: Changes in the order they were made, each old being
+                the bytes it replaced (PatchPlan.merged(), not
+                PatchPlan.patches, whose old bytes are always the original)
+            
+        Returns:
+            calculate_checksum result after the patches
+        """
+        # Patched pieces as (position in the checksummed stream, old, new)
+        segments = []
+        position = 0
+        for start, end in self.checksum_ranges(file_size, algorithm):
+            start, end = min(start, file_size), min(end, file_size)
+            segments.append((start, end, position))
+            position += max(end - start, 0)
+        length = position
+        
+        pieces = []
+        for patch in patches:
+            for start, end, position in segments:
+                lo, hi = max(patch.offset, start), min(patch.end, end)
+                if lo < hi:
+                    a, b = lo - patch.offset, hi - patch.offset
+                    pieces.append((position + lo - start, patch.old[a:b], patch.new[a:b]))
+        
+        checksum_type = algorithm.checksum_type
+        if checksum_type in _SUM_WORD_SIZES:
+            word_size = _SUM_WORD_SIZES[checksum_type]
+            whole = length // word_size * word_size  # Trailing partial word is ignored
+            for position, old, new in pieces:
+                n = max(min(len(old), whole - position), 0)
+                value += word_sum_patch(position, old[:n], new[:n], word_size)
+            return value & ((1 << (word_size * 8)) - 1)
+        
+        if checksum_type == ChecksumType.XOR:
+            for _, old, new in pieces:
+                value ^= word_xor(old) ^ word_xor(new)
+            return value
+        
+        if checksum_type == ChecksumType.CRC32:
+            width, polynomial, xor_out = 32, CRC32_IEEE_POLY, algorithm.xor_out
+        elif checksum_type == ChecksumType.CRC16:
+            width, polynomial, xor_out = 16, 0x8005, algorithm.xor_out & 0xFFFF
+        elif checksum_type in (ChecksumType.BOSCH_EDC17, ChecksumType.BOSCH_MED17):
+            width, polynomial, xor_out = 32, algorithm.polynomial or CRC32_IEEE_POLY, algorithm.xor_out
+        else:
+            raise ValueError(f"Unknown checksum type: {checksum_type}")
+        
+        register = value ^ xor_out
+        if algorithm.reflect_out:
+            register = self._reflect(register, width)
+        for position, old, new in pieces:
+            register = crc_patch(
+                register, width, polynomial, length - position - len(old),
+                old, new, algorithm.reflect_in
+            )
+        if algorithm.reflect_out:
+            register = self._reflect(register, width)
+        return register ^ xor_out
+    
+    def update_checksum_incremental(
+        self,
+        file_data: bytearray,
+        algorithm: ChecksumAlgorithm,
+        state: ChecksumState,
+        patches: Iterable[Patch]
+    ) -> Tuple[bool, int]:
+        """
+        Update checksum in a patched file from the original's state.
+        
+        Gives the same result as update_checksum, but only the patched
+        bytes are read. Falls back to update_checksum if the state does
+        not belong to a file of this size.
+        
+        Args:
+            file_data: Bytearray of the patched file (will be modified)
+            algorithm: Checksum algorithm definition
+            state: checksum_state of the original file
+            patches: Patches turning the original into file_data, in the
+                order they were made (from a plan: PatchPlan.merged())
+            
+        Returns:
+            Tuple of (success, new_checksum_value)
+        """
+        if state.file_size != len(file_data) or state.name != algorithm.name:
+            return self.update_checksum(file_data, algorithm)
+        
+        # The stored checksum counts as zeros on both sides - leave it out
+        storage_start, storage_end = state.offset, state.offset + algorithm.checksum_size
+        clipped = []
+        for patch in patches:
+            for lo, hi in ((patch.offset, min(patch.end, storage_start)),
+                           (max(patch.offset, storage_end), patch.end)):
+                if lo < hi:
+                    a, b = lo - patch.offset, hi - patch.offset
+                    clipped.append(Patch(lo, patch.old[a:b], patch.new[a:b]))
+        
+        new_checksum = self.patch_checksum(state.value, len(file_data), algorithm, clipped)
+        file_data[storage_start:storage_end] = self._pack(new_checksum, algorithm)
         
         return True, new_checksum
     
@@ -298,6 +447,9 @@ class ChecksumCalculator:
         - Values that look like CRC32 (specific patterns)
         - Locations that change when file is modified
         - Common checksum positions (end of file, end of sections)
+        
+        checksum_discovery.discover_checksum does the full search and
+        returns a ready-to-use ChecksumAlgorithm.
         """
         candidates = []
         file_size = len(file_data)
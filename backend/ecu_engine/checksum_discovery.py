@@ -0,0 +1,369 @@
+"""
+ECU Processing Engine - Checksum Discovery
+===========================================
+Find the checksum definition of an unknown ECU variant.
+
+Given one or (better) several known-good files of the same family,
+discovery tries every combination of:
+
+- algorithm: CRC32 (IEEE and other 32-bit polynomials), CRC16, SUM8,
+  SUM16, SUM32 and XOR, each with every initial value / reflection /
+  output XOR variant the ChecksumCalculator supports
+- range: every power-of-two aligned region of 16 KiB (MIN_REGION) and
+  up, and the whole file
+- storage: at the end or the start of the region, either outside the
+  range or inside it (counted as zeros, as update_checksum does)
+- storage byte order: little and big endian
+
+Nothing is re-read per candidate:
+- Sums and XORs come from prefix arrays, so any range is one lookup
+- CRC registers are taken at every range boundary in one chained pass;
+  the register of any range is then two prefixes and a zero-byte shift
+  (checksum_kernels.crc_shift), and init / reflection / output XOR
+  variants are derived from that register
+
+The kernels (one per polynomial and input reflection, one per sum
+width) run in a process pool. A definition found in every file is
+reported as a ready-to-use ChecksumAlgorithm, with a confidence that
+accounts for how many candidates were tested against how few checksum
+bits (a 16-bit match in one file is likely a coincidence, a 32-bit
+match in two files is not).
+
+Usage:
+    results = discover_checksum([file_a, file_b])
+    if results:
+        algorithm = results[0].algorithm
+        print(results[0].confidence)
+
+    python -m ecu_engine.checksum_discovery dump1.bin dump2.bin
+"""
+
+import json
+import multiprocessing
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .checksum_kernels import CRC32_IEEE_POLY, crc_patch, crc_register, crc_shift, reflect, word_sum_patch
+from .models import ChecksumAlgorithm, ChecksumType
+
+
+# Smallest aligned region tried as a checksum range (16 KiB; 4 KiB
+# regions quadruple the search time on 2 MB dumps)
+MIN_REGION = 0x4000
+
+# 32-bit polynomials tried besides IEEE (Castagnoli, CRC-32Q)
+CRC32_POLYNOMIALS = [CRC32_IEEE_POLY, 0x1EDC6F41, 0x814141AB]
+
+# Polynomial of ChecksumType.CRC16
+CRC16_POLY = 0x8005
+
+BYTE_ORDERS = ("little", "big")
+
+# Sum types by word size
+SUM_TYPES = {1: ChecksumType.SUM8, 2: ChecksumType.SUM16, 4: ChecksumType.SUM32}
+
+# Candidate key: (checksum_type, polynomial, initial_value, xor_out, reflect_in,
+#                 reflect_out, calc_start, calc_end, offset, checksum_size, byte_order)
+CandidateKey = Tuple
+
+
+@dataclass
+class DiscoveredChecksum:
+    """A checksum definition that verifies on the searched files"""
+    algorithm: ChecksumAlgorithm
+    confidence: float                 # 0..1
+    files_matched: int
+    files_searched: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        algorithm = self.algorithm.model_dump(mode="json")
+        return {
+            "algorithm": algorithm,
+            "confidence": self.confidence,
+            "files_matched": self.files_matched,
+            "files_searched": self.files_searched,
+        }
+
+
+def _layouts(file_size: int, checksum_size: int) -> List[Tuple[int, int, int]]:
+    """Candidate (storage offset, calc_start, calc_end) for one storage size"""
+    regions = {(0, file_size)}
+    region = MIN_REGION
+    while region < file_size:
+        for start in range(0, file_size, region):
+            regions.add((start, min(start + region, file_size)))
+        region <<= 1
+
+    layouts = set()
+    for start, end in regions:
+        if end - start < 2 * checksum_size:
+            continue
+        tail = end - checksum_size
+        layouts.update([
+            (tail, start, tail),                      # After the range
+            (tail, start, end),                       # Last bytes of the range
+            (start, start + checksum_size, end),      # Before the range
+            (start, start, end),                      # First bytes of the range
+        ])
+    return sorted(layouts)
+
+
+def _stored_values(data, offset: int, size: int) -> List[Tuple[str, int]]:
+    """(byte order, value) of a stored checksum, erased values left out"""
+    raw = bytes(data[offset:offset + size])
+    erased = (0, (1 << (8 * size)) - 1)
+    values = []
+    for byte_order in BYTE_ORDERS:
+        value = int.from_bytes(raw, byte_order)
+        if value not in erased and (size > 1 or byte_order == "little"):
+            values.append((byte_order, value))
+    return values
+
+
+# =============================================================================
+# KERNELS (run in the pool)
+# =============================================================================
+
+def _search_crc(data, width: int, polynomial: int, reflect_in: bool) -> Tuple[List[CandidateKey], int]:
+    """All CRC variants of one polynomial / input reflection"""
+    size = width // 8
+    mask = (1 << width) - 1
+    layouts = _layouts(len(data), size)
+    view = memoryview(data)
+
+    # Zero-init register at every boundary, in one chained pass
+    boundaries = sorted({b for _, start, end in layouts for b in (start, end)})
+    prefixes = []
+    register, position = 0, 0
+    for boundary in boundaries:
+        register = crc_register(view[position:boundary], width, polynomial, register, reflect_in)
+        prefixes.append(register)
+        position = boundary
+
+    def prefix(boundary: int) -> int:
+        return prefixes[bisect_left(boundaries, boundary)]
+
+    if width == 16:
+        checksum_type, key_polynomial = ChecksumType.CRC16, None
+    elif polynomial == CRC32_IEEE_POLY:
+        checksum_type, key_polynomial = ChecksumType.CRC32, None
+    else:
+        checksum_type, key_polynomial = ChecksumType.BOSCH_EDC17, polynomial
+
+    matches = []
+    tests = 0
+    for offset, start, end in layouts:
+        stored = _stored_values(data, offset, size)
+        if not stored:
+            continue
+        length = end - start
+        register = prefix(end) ^ crc_shift(prefix(start), width, polynomial, length)
+        if start <= offset < end:
+            # Stored bytes count as zeros
+            raw = bytes(data[offset:offset + size])
+            register = crc_patch(register, width, polynomial, end - offset - size,
+                                 raw, bytes(size), reflect_in)
+        for init in (0, mask):
+            with_init = register ^ crc_shift(init, width, polynomial, length)
+            for reflect_out in (False, True):
+                out = reflect(with_init, width) if reflect_out else with_init
+                for xor_out in (0, mask):
+                    value = out ^ xor_out
+                    for byte_order, stored_value in stored:
+                        tests += 1
+                        if value == stored_value:
+                            matches.append((checksum_type, key_polynomial, init, xor_out, reflect_in,
+                                            reflect_out, start, end, offset, size, byte_order))
+    return matches, tests
+
+
+def _search_sum(data, word_size: int) -> Tuple[List[CandidateKey], int]:
+    """Word sums (SUM8/16/32) stored in word_size bytes"""
+    size = word_size
+    mask = (1 << (8 * size)) - 1
+    words = np.frombuffer(data, dtype=f"<u{word_size}", count=len(data) // word_size)
+    sums = np.zeros(len(words) + 1, dtype=np.uint32)
+    np.cumsum(words, dtype=np.uint32, out=sums[1:])
+
+    checksum_type = SUM_TYPES[word_size]
+    matches = []
+    tests = 0
+    for offset, start, end in _layouts(len(data), size):
+        if start % word_size:
+            continue  # Prefix sums are aligned to the file
+        stored = _stored_values(data, offset, size)
+        if not stored:
+            continue
+        whole_end = start + (end - start) // word_size * word_size
+        total = int(sums[whole_end // word_size]) - int(sums[start // word_size])
+        if start <= offset < whole_end:
+            # Stored bytes count as zeros
+            raw = bytes(data[offset:min(offset + size, whole_end)])
+            total += word_sum_patch(offset - start, raw, bytes(len(raw)), word_size)
+        value = total & mask
+        for byte_order, stored_value in stored:
+            tests += 1
+            if value == stored_value:
+                matches.append((checksum_type, None, 0, 0, False, False,
+                                start, end, offset, size, byte_order))
+    return matches, tests
+
+
+def _search_xor(data) -> Tuple[List[CandidateKey], int]:
+    """Byte XOR stored in one byte"""
+    prefix = np.zeros(len(data) + 1, dtype=np.uint8)
+    np.bitwise_xor.accumulate(np.frombuffer(data, dtype=np.uint8), out=prefix[1:])
+
+    matches = []
+    tests = 0
+    for offset, start, end in _layouts(len(data), 1):
+        stored = _stored_values(data, offset, 1)
+        if not stored:
+            continue
+        value = int(prefix[end]) ^ int(prefix[start])
+        if start <= offset < end:
+            value ^= data[offset]
+        tests += 1
+        if value == stored[0][1]:
+            matches.append((ChecksumType.XOR, None, 0, 0, False, False,
+                            start, end, offset, 1, "little"))
+    return matches, tests
+
+
+def _kernels() -> List[Tuple]:
+    kernels = [("sum", 1), ("sum", 2), ("sum", 4), ("xor",)]
+    for reflect_in in (False, True):
+        kernels.append(("crc", 16, CRC16_POLY, reflect_in))
+        for polynomial in CRC32_POLYNOMIALS:
+            kernels.append(("crc", 32, polynomial, reflect_in))
+    return kernels
+
+
+def _run_kernel(file_index: int, data: bytes, kernel: Tuple):
+    """
+    Pool task: one kernel over one file.
+
+    Returns:
+        (file index, checksum size, matching candidate keys, candidates tested)
+    """
+    if kernel[0] == "sum":
+        size = kernel[1]
+        matches, tests = _search_sum(data, kernel[1])
+    elif kernel[0] == "xor":
+        size = 1
+        matches, tests = _search_xor(data)
+    else:
+        size = kernel[1] // 8
+        matches, tests = _search_crc(data, *kernel[1:])
+    return file_index, size, matches, tests
+
+
+# =============================================================================
+# DISCOVERY
+# =============================================================================
+
+def _to_algorithm(key: CandidateKey) -> ChecksumAlgorithm:
+    (checksum_type, polynomial, init, xor_out, reflect_in, reflect_out,
+     start, end, offset, size, byte_order) = key
+    return ChecksumAlgorithm(
+        checksum_type=checksum_type,
+        name=f"Discovered {checksum_type.value.upper()} at 0x{offset:X}",
+        offset=offset,
+        checksum_size=size,
+        byte_order=byte_order,
+        calc_start=start,
+        calc_end=end,
+        polynomial=polynomial,
+        initial_value=init,
+        xor_out=xor_out,
+        reflect_in=reflect_in,
+        reflect_out=reflect_out,
+    )
+
+
+def _confidence(size: int, files_matched: int, files_searched: int, tests: float) -> float:
+    """
+    Chance that the match is real.
+
+    With `tests` candidates of this size tried per file, about
+    tests / 2**(8*size*k) of them match all k files by coincidence.
+    """
+    false_matches = tests * 2.0 ** (-8 * size * files_matched)
+    return round(files_matched / files_searched * max(0.0, 1.0 - false_matches), 4)
+
+
+def discover_checksum(
+    files: Sequence[bytes],
+    workers: Optional[int] = None,
+    min_confidence: float = 0.5,
+    limit: int = 10
+) -> List[DiscoveredChecksum]:
+    """
+    Search known-good files for their checksum definition.
+
+    Args:
+        files: Contents of one or more known-good files of one ECU family
+        workers: Process pool size (None = CPU count, 0 = run in this process)
+        min_confidence: Leave out results below this confidence
+        limit: Return at most this many results
+
+    Returns:
+        DiscoveredChecksums, most confident first
+    """
+    files = [bytes(data) for data in files]
+    tasks = [(index, data, kernel) for index, data in enumerate(files) for kernel in _kernels()]
+
+    if workers == 0:
+        results = [_run_kernel(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = list(executor.map(_run_kernel, *zip(*tasks)))
+
+    matched_in: Dict[CandidateKey, set] = defaultdict(set)
+    tests_by_size: Dict[int, int] = defaultdict(int)
+    for file_index, size, matches, tests in results:
+        for key in matches:
+            matched_in[key].add(file_index)
+        tests_by_size[size] += tests
+
+    found = []
+    for key, file_indexes in matched_in.items():
+        size = key[9]
+        tests = tests_by_size[size] / len(files)
+        confidence = _confidence(size, len(file_indexes), len(files), tests)
+        if confidence >= min_confidence:
+            found.append(DiscoveredChecksum(
+                algorithm=_to_algorithm(key),
+                confidence=confidence,
+                files_matched=len(file_indexes),
+                files_searched=len(files),
+            ))
+
+    # Most confident first; prefer the narrowest range among equals
+    found.sort(key=lambda d: (-d.confidence, d.algorithm.calc_end - d.algorithm.calc_start))
+    return found[:limit]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Discover the checksum of known-good ECU files")
+    parser.add_argument("files", nargs="+", help="Known-good files of one ECU family")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (0 = no pool)")
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    contents = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    results = discover_checksum(contents, workers=args.workers, limit=args.limit)
+    print(json.dumps([result.to_dict() for result in results], indent=2))
@@ -0,0 +1,350 @@
+"""
+ECU Processing Engine - Checksum Kernels
+=========================================
+Fast building blocks shared by every checksum path.
+
+The checksum classes describe *what* is checksummed (ranges, storage,
+parameters); these kernels do the byte crunching:
+
+- CRC32 with the IEEE polynomial runs in zlib, in every reflection mode
+  (non-reflected input is the reflected CRC of bit-reversed bytes)
+- CRC16-CCITT (0x1021) runs in binascii.crc_hqx
+- Any other polynomial uses a NumPy block kernel: the CRC of every
+  256-byte block is computed in parallel, then the blocks are folded
+  together with a precomputed "advance by one block" table
+- Word sums and XORs are NumPy frombuffer reductions
+- Every kernel reads memoryviews in place and can be chained across
+  blocks (crc_register's init, word_sum_at's position), so multi-block
+  checksums never join their blocks into one copy
+- Patched data can be re-checksummed from the old value in time
+  proportional to the patch (crc_patch, word_sum_patch)
+
+All kernels are bit-identical to the byte-by-byte reference loops they
+replace; tests/test_checksum_kernels.py holds the reference matrix.
+"""
+
+import zlib
+import binascii
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+# Standard CRC32 (IEEE 802.3) polynomial, the one zlib implements
+CRC32_IEEE_POLY = 0x04C11DB7
+
+# CRC16-CCITT polynomial, the one binascii.crc_hqx implements
+CRC16_CCITT_POLY = 0x1021
+
+# Block size of the NumPy CRC kernel (bytes)
+CRC_BLOCK_SIZE = 256
+
+# Below this size the plain table loop beats NumPy's per-call overhead
+_VECTOR_MIN_SIZE = 4 * CRC_BLOCK_SIZE
+
+# Largest piece fed to a CRC kernel at once (bounds the copies needed for
+# bit-reversed input); a multiple of CRC_BLOCK_SIZE
+STREAM_CHUNK_SIZE = 1 << 18
+
+# Bit-reversal of every byte value, usable with bytes.translate
+REFLECT8 = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def reflect(value: int, bits: int) -> int:
+    """Reflect (reverse) the low `bits` bits of a value."""
+    return int(format(value & ((1 << bits) - 1), f"0{bits}b")[::-1], 2)
+
+
+def _byte_view(data) -> memoryview:
+    """Zero-copy unsigned byte view of any buffer."""
+    view = memoryview(data)
+    return view if view.format == "B" else view.cast("B")
+
+
+# =============================================================================
+# CRC
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def crc_table(width: int, poly: int) -> Tuple[int, ...]:
+    """MSB-first CRC lookup table for a register of `width` bits."""
+    mask = (1 << width) - 1
+    top = 1 << (width - 1)
+    table = []
+    for i in range(256):
+        crc = i << (width - 8)
+        for _ in range(8):
+            if crc & top:
+                crc = (crc << 1) ^ poly
+            else:
+                crc <<= 1
+        table.append(crc & mask)
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def _advance_tables(width: int, poly: int, nbytes: int) -> np.ndarray:
+    """
+    Tables advancing a CRC register over `nbytes` zero bytes.
+
+    The CRC is linear, so the register after the zeros is the XOR of
+    tables[k][byte k of the register] over the register's bytes.
+    """
+    table = crc_table(width, poly)
+    shift = width - 8
+    mask = (1 << width) - 1
+
+    def advance_bit(register: int) -> int:
+        for _ in range(nbytes):
+            register = ((register << 8) ^ table[register >> shift]) & mask
+        return register
+
+    columns = [advance_bit(1 << bit) for bit in range(width)]
+    tables = np.zeros((width // 8, 256), dtype=np.uint32)
+    for k in range(width // 8):
+        for value in range(256):
+            out = 0
+            for bit in range(8):
+                if value >> bit & 1:
+                    out ^= columns[8 * k + bit]
+            tables[k, value] = out
+    return tables
+
+
+def _crc_loop(data: bytes, width: int, poly: int, crc: int) -> int:
+    table = crc_table(width, poly)
+    shift = width - 8
+    mask = (1 << width) - 1
+    for byte in data:
+        crc = ((crc << 8) ^ table[((crc >> shift) ^ byte) & 0xFF]) & mask
+    return crc
+
+
+def _crc_vector(data: bytes, width: int, poly: int, crc: int) -> int:
+    """CRC of all blocks in parallel, then folded in order."""
+    table = np.array(crc_table(width, poly), dtype=np.uint32)
+    shift = np.uint32(width - 8)
+    mask = np.uint32((1 << width) - 1)
+    eight = np.uint32(8)
+
+    n_blocks = len(data) // CRC_BLOCK_SIZE
+    blocks = np.frombuffer(data, dtype=np.uint8, count=n_blocks * CRC_BLOCK_SIZE)
+    blocks = blocks.reshape(n_blocks, CRC_BLOCK_SIZE)
+
+    registers = np.zeros(n_blocks, dtype=np.uint32)
+    for column in blocks.T:
+        index = (registers >> shift) ^ column
+        registers = ((registers << eight) & mask) ^ table[index]
+
+    advance = _advance_tables(width, poly, CRC_BLOCK_SIZE).tolist()
+    crc &= (1 << width) - 1
+    if width == 16:
+        low, high = advance
+        for block_crc in registers.tolist():
+            crc = low[crc & 0xFF] ^ high[crc >> 8] ^ block_crc
+    else:
+        b0, b1, b2, b3 = advance
+        for block_crc in registers.tolist():
+            crc = (b0[crc & 0xFF] ^ b1[(crc >> 8) & 0xFF]
+                   ^ b2[(crc >> 16) & 0xFF] ^ b3[crc >> 24] ^ block_crc)
+
+    return _crc_loop(data[n_blocks * CRC_BLOCK_SIZE:], width, poly, crc)
+
+
+def crc_register(data, width: int, poly: int, init: int,
+                 reflect_in: bool = False) -> int:
+    """
+    MSB-first CRC register after feeding data (no output reflection/XOR).
+
+    The register can be chained: feeding a stream block by block, with
+    each block's result as the next init, gives the stream's register.
+
+    Args:
+        data: Bytes to checksum (any buffer; memoryviews are not copied)
+        width: Register width in bits (16 or 32)
+        poly: Generator polynomial (normal, MSB-first form)
+        init: Initial register value
+        reflect_in: Bit-reverse each input byte before feeding it
+
+    Returns:
+        Final register value (init itself, unmasked, for empty data)
+    """
+    if not len(data):
+        return init
+    mask = (1 << width) - 1
+    poly &= mask
+    data = _byte_view(data)
+
+    if len(data) > STREAM_CHUNK_SIZE:
+        # Chain the register through chunks, so translated copies stay small
+        for start in range(0, len(data), STREAM_CHUNK_SIZE):
+            init = crc_register(data[start:start + STREAM_CHUNK_SIZE], width, poly, init, reflect_in)
+        return init
+
+    if width == 32 and poly == CRC32_IEEE_POLY:
+        # zlib is the reflected CRC: reflect the register and feed it
+        # bit-reversed bytes to get the MSB-first register
+        if not reflect_in:
+            data = bytes(data).translate(REFLECT8)
+        value = zlib.crc32(data, reflect(init, 32) ^ 0xFFFFFFFF) ^ 0xFFFFFFFF
+        return reflect(value, 32)
+
+    if reflect_in:
+        data = bytes(data).translate(REFLECT8)
+    if width == 16 and poly == CRC16_CCITT_POLY:
+        return binascii.crc_hqx(data, init & mask)
+    if width in (16, 32) and len(data) >= _VECTOR_MIN_SIZE:
+        return _crc_vector(data, width, poly, init & mask)
+    return _crc_loop(data, width, poly, init & mask)
+
+
+def crc(data, width: int, poly: int, init: int = 0, reflect_in: bool = False,
+        reflect_out: bool = False, xor_out: int = 0) -> int:
+    """Parameterized CRC (Rocksoft model) built on crc_register."""
+    register = crc_register(data, width, poly, init, reflect_in)
+    if reflect_out:
+        register = reflect(register, width)
+    return register ^ xor_out
+
+
+# =============================================================================
+# SUMS / XOR
+# =============================================================================
+
+_WORD_DTYPES = {1: "u1", 2: "u2", 4: "u4"}
+
+
+def _words(data, word_size: int, byteorder: str) -> np.ndarray:
+    """Whole words of data (a trailing partial word is ignored)."""
+    prefix = "<" if byteorder == "little" else ">"
+    count = len(data) // word_size
+    return np.frombuffer(data, dtype=prefix + _WORD_DTYPES[word_size], count=count)
+
+
+def word_sum(data, word_size: int = 1, byteorder: str = "little") -> int:
+    """Sum of the unsigned words of data, not truncated."""
+    if not len(data):
+        return 0
+    return int(_words(data, word_size, byteorder).sum(dtype=np.uint64))
+
+
+def word_sum_at(data, position: int, word_size: int = 1,
+                byteorder: str = "little") -> int:
+    """
+    word_sum contribution of data placed at `position` of a longer stream.
+
+    Blocks of a stream can be summed one at a time with this, even when
+    a word straddles two blocks (every byte of the block counts).
+    """
+    if word_size == 1 or not len(data):
+        return word_sum(data)
+    view = _byte_view(data)
+    head = min(-position % word_size, len(view))
+    body = (len(view) - head) // word_size * word_size
+    total = word_sum(view[head:head + body], word_size, byteorder)
+    for start, end in ((0, head), (head + body, len(view))):
+        if start < end:
+            piece = view[start:end]
+            total += word_sum_patch(position + start, bytes(len(piece)), piece,
+                                    word_size, byteorder)
+    return total
+
+
+def word_xor(data, word_size: int = 1, byteorder: str = "little") -> int:
+    """XOR of the unsigned words of data."""
+    if len(data) < word_size:
+        return 0
+    return int(np.bitwise_xor.reduce(_words(data, word_size, byteorder)))
+
+
+# =============================================================================
+# INCREMENTAL UPDATES
+# =============================================================================
+
+# Zero-byte operators are kept for runs of up to 2**ZERO_OPERATOR_LEVELS bytes
+ZERO_OPERATOR_LEVELS = 40
+
+
+def _apply_operator(operator: Tuple[int, ...], register: int) -> int:
+    """Apply a GF(2) linear map given as the images of each register bit."""
+    out = 0
+    bit = 0
+    while register:
+        if register & 1:
+            out ^= operator[bit]
+        register >>= 1
+        bit += 1
+    return out
+
+
+@lru_cache(maxsize=None)
+def _zero_operators(width: int, poly: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Operators advancing a register over 2**i zero bytes, for every i.
+
+    Feeding zeros is linear in the register, so each operator is the
+    register's image of every single bit, and the operator for 2n
+    zeros is the one for n zeros applied twice.
+    """
+    table = crc_table(width, poly)
+    shift = width - 8
+    mask = (1 << width) - 1
+    one_byte = tuple(
+        ((1 << bit << 8) ^ table[(1 << bit) >> shift]) & mask for bit in range(width)
+    )
+    operators = [one_byte]
+    for _ in range(ZERO_OPERATOR_LEVELS - 1):
+        last = operators[-1]
+        operators.append(tuple(_apply_operator(last, column) for column in last))
+    return tuple(operators)
+
+
+def crc_shift(register: int, width: int, poly: int, nbytes: int) -> int:
+    """Register after feeding `nbytes` zero bytes, in O(log nbytes)."""
+    mask = (1 << width) - 1
+    register &= mask
+    operators = _zero_operators(width, poly & mask)
+    level = 0
+    while nbytes and register:
+        if nbytes & 1:
+            register = _apply_operator(operators[level], register)
+        nbytes >>= 1
+        level += 1
+    return register
+
+
+def crc_patch(register: int, width: int, poly: int, tail: int, old, new,
+              reflect_in: bool = False) -> int:
+    """
+    Register of a stream after replacing `old` by `new` inside it.
+
+    The CRC register is linear in the data: the change is the CRC of
+    old XOR new (from a zero register) advanced over the `tail` bytes
+    that follow the patch. Cost depends on the patch, not the stream.
+    """
+    if not len(old):
+        return register
+    delta = np.bitwise_xor(np.frombuffer(old, dtype=np.uint8),
+                           np.frombuffer(new, dtype=np.uint8)).tobytes()
+    change = crc_register(delta, width, poly, 0, reflect_in)
+    return register ^ crc_shift(change, width, poly, tail)
+
+
+def word_sum_patch(position: int, old, new, word_size: int = 1,
+                   byteorder: str = "little") -> int:
+    """
+    Change of word_sum when `old` at stream `position` is replaced by `new`.
+
+    A word sum is a byte sum weighted by each byte's place in its word,
+    so neighbouring bytes of a partially patched word are not needed.
+    """
+    if not len(old):
+        return 0
+    diff = np.frombuffer(new, dtype=np.uint8).astype(np.int64) \
+        - np.frombuffer(old, dtype=np.uint8)
+    if word_size == 1:
+        return int(diff.sum())
+    places = (position + np.arange(len(diff))) % word_size
+    if byteorder != "little":
+        places = word_size - 1 - places
+    return sum(int(diff[places == place].sum()) << (8 * place) for place in range(word_size))
@@ -12,6 +12,7 @@ Each ECU type needs:
 """
 
 from typing import Dict, List, Optional
+from .scanner import SignatureScanner
 from .models import (
     ECUDefinition,
     ECUManufacturer,
@@ -34,7 +35,12 @@ class ECUDefinitionDB:
     
     def __init__(self):
         self._definitions: Dict[str, ECUDefinition] = {}
+        # Combined identification index (rebuilt when definitions change)
+        self._id_scanner: Optional[SignatureScanner] = None
+        self._id_definitions: List[ECUDefinition] = []
+        self._id_owners: Dict[bytes, List[int]] = {}
         self._load_builtin_definitions()
+        self._build_identification_index()
     
     def _load_builtin_definitions(self):
         """Load built-in ECU definitions"""
@@ -539,31 +545,60 @@ class ECUDefinitionDB:
         """Get ECU definition by ID"""
         return self._definitions.get(ecu_id)
     
+    def _build_identification_index(self):
+        """
+        Index the identification patterns of all definitions.
+        
+        Every distinct pattern is registered once in a SignatureScanner and
+        mapped to the definitions (by position) that list it, so
+        identification is one scan of the file no matter how many
+        definitions are loaded.
+        """
+        scanner = SignatureScanner()
+        owners: Dict[bytes, List[int]] = {}
+        definitions = list(self._definitions.values())
+        for index, definition in enumerate(definitions):
+            for pattern in definition.identification_patterns:
+                owners.setdefault(pattern, []).append(index)
+                if pattern:
+                    scanner.add_literal(pattern)
+        scanner.compile()
+        
+        self._id_definitions = definitions
+        self._id_owners = owners
+        self._id_scanner = scanner
+    
     def identify_ecu(self, file_data: bytes) -> Optional[ECUDefinition]:
         """
         Identify ECU type from binary file data.
         Returns the most specific matching definition.
         """
+        if self._id_scanner is None:
+            self._build_identification_index()
+        scan = self._id_scanner.scan(file_data)
+        
+        # Per-definition pattern match count and specificity
+        # (longer patterns = more specific), from one scan of the file
+        pattern_matches: Dict[int, int] = {}
+        specificity: Dict[int, int] = {}
+        for pattern, indexes in self._id_owners.items():
+            if pattern and not scan.contains(pattern):
+                continue
+            for index in indexes:
+                pattern_matches[index] = pattern_matches.get(index, 0) + 1
+                specificity[index] = specificity.get(index, 0) + len(pattern)
+        
         matches = []
         file_size = len(file_data)
         
-        for ecu_id, definition in self._definitions.items():
+        for index in sorted(pattern_matches):
+            definition = self._id_definitions[index]
             # Check file size range
             min_size, max_size = definition.file_size_range
             if min_size > 0 and max_size > 0:
                 if not (min_size <= file_size <= max_size):
                     continue
-            
-            # Check identification patterns
-            pattern_matches = 0
-            for pattern in definition.identification_patterns:
-                if pattern in file_data:
-                    pattern_matches += 1
-            
-            if pattern_matches > 0:
-                # Score based on specificity (longer patterns = more specific)
-                specificity = sum(len(p) for p in definition.identification_patterns if p in file_data)
-                matches.append((definition, pattern_matches, specificity))
+            matches.append((definition, pattern_matches[index], specificity[index]))
         
         if not matches:
             return None
@@ -586,6 +621,7 @@ class ECUDefinitionDB:
     def add_definition(self, definition: ECUDefinition):
         """Add or update an ECU definition"""
         self._definitions[definition.id] = definition
+        self._id_scanner = None
     
     def get_supported_modifications(self, ecu_id: str) -> List[ModificationType]:
         """Get list of supported modifications for an ECU"""
@@ -0,0 +1,349 @@
+"""
+ECU Processing Engine - Detector Registry
+==========================================
+Detection rules compiled once, at import, and shared by every consumer.
+
+Detector tables (copyright strings, ECU family regexes, text markers,
+...) are registered as groups of DetectorRule objects. A rule is a
+literal or regex signature together with its priority in the group
+(table order - most specific first) and what a match stands for
+(label, product, hint, score).
+
+- Every distinct (pattern, flags) is compiled once; rules that use the
+  same pattern - in any group, registered by any module - share it
+- All groups feed one SignatureScanner, so a file is walked once for
+  the ECUAnalyzer tables and the ecu_database tables together
+- A scan can start with a few groups (e.g. quick identification); the
+  remaining groups are scanned together on the first query that needs
+  them, so staged callers still walk the file at most twice
+- Queries made through a DetectorScan are counted and timed per rule;
+  stats() reports calls, hits and time spent for every rule
+
+Counters live in the process that runs the queries (each analysis
+pool worker keeps its own).
+
+Usage:
+    RULES = DETECTORS.add_rules("copyright", COPYRIGHT_PATTERNS,
+                                fields=("pattern", "label"), kind=RuleKind.REGEX)
+    scan = DETECTORS.scan(file_data, regions=regions)
+    for rule in RULES:
+        if scan.search(rule):
+            print(rule.label)
+    DETECTORS.stats("copyright")
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .scanner import ScanResult, SignatureScanner
+
+
+class RuleKind(str, Enum):
+    """How a rule's pattern is matched"""
+    LITERAL = "literal"
+    REGEX = "regex"
+
+
+@dataclass(eq=False)
+class DetectorRule:
+    """One signature of a detector table"""
+    group: str
+    pattern: bytes
+    kind: RuleKind = RuleKind.LITERAL
+    flags: int = 0
+    priority: int = 0                   # Position in the group, 0 is tried first
+    label: Optional[str] = None         # What a match identifies (manufacturer, processor, ...)
+    product: Optional[str] = None       # ECU type a match identifies
+    hint: Optional[str] = None          # Vehicle or category hint
+    score: int = 0                      # Confidence a match contributes
+    regex: Optional[re.Pattern] = field(default=None, repr=False)
+
+    # Counters (queries made through DetectorScan)
+    calls: int = 0
+    hits: int = 0
+    seconds: float = 0.0
+
+    def reset_stats(self):
+        self.calls = self.hits = 0
+        self.seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "group": self.group,
+            "priority": self.priority,
+            "pattern": self.pattern.decode("ascii", errors="backslashreplace"),
+            "kind": self.kind.value,
+            "calls": self.calls,
+            "hits": self.hits,
+            "seconds": round(self.seconds, 6),
+        }
+
+
+class DetectorScan:
+    """
+    Rule queries against the scans of one file, counted and timed per rule.
+
+    A query that finds anything counts as a hit. Literal rules answer
+    offsets/find/contains/count, regex rules search/finditer.
+    """
+
+    def __init__(self, registry: "DetectorRegistry", data, regions=None,
+                 groups: Optional[Iterable[str]] = None):
+        self._registry = registry
+        self._data = data
+        self._regions = regions
+        self._results: List[Tuple[FrozenSet[str], ScanResult]] = []
+        self.extend(groups)
+
+    @property
+    def data(self):
+        return self._data
+
+    def extend(self, groups: Optional[Iterable[str]] = None):
+        """Scan for the given groups (default: every group) not scanned yet."""
+        wanted = set(self._registry.groups() if groups is None else groups)
+        for scanned, _ in self._results:
+            wanted -= scanned
+        if not wanted:
+            return
+        runs = self._results[0][1].printable_runs() if self._results else None
+        result = self._registry._scan_groups(frozenset(wanted), self._data, self._regions, runs)
+        self._results.append((frozenset(wanted), result))
+
+    def printable_runs(self) -> List[Tuple[int, bytes]]:
+        if not self._results:
+            self.extend()
+        return self._results[0][1].printable_runs()
+
+    def _result(self, rule: DetectorRule) -> ScanResult:
+        for scanned, result in self._results:
+            if rule.group in scanned:
+                return result
+        if rule.group not in self._registry.groups():
+            raise ValueError(f"Rule group {rule.group!r} is not registered")
+        self.extend()
+        return self._results[-1][1]
+
+    # -------------------------------------------------------------------------
+    # Literal rules
+    # -------------------------------------------------------------------------
+
+    def offsets(self, rule: DetectorRule) -> List[int]:
+        """All (overlapping) offsets of a literal rule, in file order."""
+        self._expect(rule, RuleKind.LITERAL)
+        result = self._result(rule)
+        start = time.perf_counter()
+        offsets = result.offsets(rule.pattern)
+        self._record(rule, start, bool(offsets))
+        return offsets
+
+    def find(self, rule: DetectorRule) -> int:
+        """Offset of the first occurrence of a literal rule, or -1."""
+        offsets = self.offsets(rule)
+        return offsets[0] if offsets else -1
+
+    def contains(self, rule: DetectorRule) -> bool:
+        return bool(self.offsets(rule))
+
+    def count(self, rule: DetectorRule) -> int:
+        """Non-overlapping occurrences of a literal rule (same as bytes.count)."""
+        self._expect(rule, RuleKind.LITERAL)
+        result = self._result(rule)
+        start = time.perf_counter()
+        count = result.count(rule.pattern)
+        self._record(rule, start, count > 0)
+        return count
+
+    # -------------------------------------------------------------------------
+    # Regex rules
+    # -------------------------------------------------------------------------
+
+    def search(self, rule: DetectorRule) -> Optional[re.Match]:
+        """First match of a regex rule, same as re.search."""
+        self._expect(rule, RuleKind.REGEX)
+        result = self._result(rule)
+        start = time.perf_counter()
+        match = result.search(rule.pattern, rule.flags)
+        self._record(rule, start, match is not None)
+        return match
+
+    def finditer(self, rule: DetectorRule) -> Iterator[re.Match]:
+        """Non-overlapping matches of a regex rule, same as re.finditer."""
+        self._expect(rule, RuleKind.REGEX)
+        result = self._result(rule)
+        rule.calls += 1
+        start = time.perf_counter()
+        matches = result.finditer(rule.pattern, rule.flags)
+        rule.seconds += time.perf_counter() - start
+        return self._timed(rule, matches)
+
+    @staticmethod
+    def _timed(rule: DetectorRule, matches: Iterator[re.Match]) -> Iterator[re.Match]:
+        # Time is only counted while the scan is producing matches,
+        # not while the caller works on them
+        first = True
+        while True:
+            start = time.perf_counter()
+            match = next(matches, None)
+            rule.seconds += time.perf_counter() - start
+            if match is None:
+                return
+            if first:
+                rule.hits += 1
+                first = False
+            yield match
+
+    @staticmethod
+    def _record(rule: DetectorRule, start: float, hit: bool):
+        rule.seconds += time.perf_counter() - start
+        rule.calls += 1
+        if hit:
+            rule.hits += 1
+
+    @staticmethod
+    def _expect(rule: DetectorRule, kind: RuleKind):
+        if rule.kind != kind:
+            raise ValueError(f"{rule.group} rule {rule.pattern!r} is a {rule.kind.value} rule")
+
+
+class DetectorRegistry:
+    """
+    Detector tables compiled into shared rules and one scanner.
+
+    Usage:
+        registry = DetectorRegistry()
+        markers = registry.add_rules("egr", [(b"EGR", 50)], fields=("pattern", "score"))
+        scan = registry.scan(file_data)
+        scan.count(markers[0])
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, List[DetectorRule]] = {}
+        self._compiled: Dict[Tuple[bytes, int], re.Pattern] = {}
+        self._scanners: Dict[FrozenSet[str], SignatureScanner] = {}
+        self.scans = 0
+        self.scan_seconds = 0.0
+
+    def add_rules(
+        self,
+        group: str,
+        entries: Iterable,
+        fields: Sequence[str] = ("pattern",),
+        kind: RuleKind = RuleKind.LITERAL,
+        flags: int = 0,
+    ) -> List[DetectorRule]:
+        """
+        Register a detector table as a group of rules.
+
+        Args:
+            group: Group name (replaces an earlier group of that name)
+            entries: Patterns, or tuples whose items map onto fields
+            fields: DetectorRule field names for the tuple items
+            kind: Whether the patterns are literals or regexes
+            flags: re flags for regex patterns
+
+        Returns:
+            The rules, in priority order
+        """
+        rules = []
+        for priority, entry in enumerate(entries):
+            values = dict(zip(fields, entry if isinstance(entry, tuple) else (entry,)))
+            rule = DetectorRule(group=group, kind=kind, flags=flags, priority=priority, **values)
+            if kind == RuleKind.REGEX:
+                rule.regex = self._compile(rule.pattern, flags)
+            rules.append(rule)
+        self._groups[group] = rules
+        self._scanners = {}
+        return rules
+
+    def rules(self, group: str) -> List[DetectorRule]:
+        """Rules of a group in priority order"""
+        return self._groups.get(group, [])
+
+    def groups(self) -> List[str]:
+        return list(self._groups)
+
+    def _compile(self, pattern: bytes, flags: int) -> re.Pattern:
+        key = (pattern, flags)
+        if key not in self._compiled:
+            self._compiled[key] = re.compile(pattern, flags)
+        return self._compiled[key]
+
+    # -------------------------------------------------------------------------
+    # Scanning
+    # -------------------------------------------------------------------------
+
+    def compile(self, groups: Optional[Iterable[str]] = None) -> SignatureScanner:
+        """
+        Build the scanner for a set of groups (done automatically on first scan).
+
+        Args:
+            groups: Groups to include (default: every registered group)
+        """
+        key = frozenset(self._groups if groups is None else groups)
+        if key not in self._scanners:
+            scanner = SignatureScanner()
+            for group in sorted(key):
+                for rule in self.rules(group):
+                    if rule.kind == RuleKind.REGEX:
+                        scanner.add_pattern(rule.pattern, rule.flags, rule.regex)
+                    else:
+                        scanner.add_literal(rule.pattern)
+            scanner.compile()
+            self._scanners[key] = scanner
+        return self._scanners[key]
+
+    def scan(self, data, regions=None, groups: Optional[Iterable[str]] = None) -> DetectorScan:
+        """
+        Scan a file for the registered rules.
+
+        Args:
+            data: File contents (bytes, bytearray or memoryview)
+            regions: Optional RegionIndex of the file (erased flash is skipped)
+            groups: Only scan these groups now (default: every group);
+                the others are scanned on the first query that needs them
+        """
+        return DetectorScan(self, data, regions, groups)
+
+    def _scan_groups(self, groups: FrozenSet[str], data, regions, printable_runs) -> ScanResult:
+        scanner = self.compile(groups)
+        start = time.perf_counter()
+        result = scanner.scan(data, regions=regions, printable_runs=printable_runs)
+        self.scan_seconds += time.perf_counter() - start
+        self.scans += 1
+        return result
+
+    # -------------------------------------------------------------------------
+    # Statistics
+    # -------------------------------------------------------------------------
+
+    def stats(self, group: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scan totals and per-rule counters, slowest rule first.
+
+        Args:
+            group: Only report the rules of this group
+        """
+        if group is None:
+            rules = [rule for rules in self._groups.values() for rule in rules]
+        else:
+            rules = self.rules(group)
+        return {
+            "scans": self.scans,
+            "scan_seconds": round(self.scan_seconds, 6),
+            "rules": [rule.stats() for rule in sorted(rules, key=lambda r: -r.seconds)],
+        }
+
+    def reset_stats(self):
+        self.scans = 0
+        self.scan_seconds = 0.0
+        for rules in self._groups.values():
+            for rule in rules:
+                rule.reset_stats()
+
+
+# Process-wide registry shared by ECUAnalyzer and ecu_database
+DETECTORS = DetectorRegistry()
@@ -0,0 +1,256 @@
+"""
+ECU Processing Engine - Map Discovery
+======================================
+Find 2D maps in a binary without knowing where they are.
+
+Calibration maps are stored with their axes in front of the table:
+
+    inline:  [nx] [x axis: nx values] [ny] [y axis: ny values] [table]
+    grouped: [nx] [ny] [x axis] [y axis] [table]
+
+The table has ny rows of nx cells, all values share one cell type
+(8-bit, or 16-bit in either byte order).
+
+Discovery works on every calibration range of the file at once:
+1. The values are decoded with a NumPy view for each cell type
+2. The length of the strictly increasing run starting at every
+   position is computed in one sliding pass
+3. Positions holding a plausible axis length whose axes are increasing
+   for at least that many values are candidate headers (axes that run
+   on into each other are counters, not axes)
+4. Each candidate table is scored on smoothness (second differences
+   against first differences), size and whether it is flat;
+   overlapping candidates are resolved in favour of the better score
+
+Usage:
+    catalogue = discover_maps(file_data)
+    for candidate in catalogue[:10]:
+        print(candidate.table_offset, candidate.shape, candidate.score)
+"""
+
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .models import MapDefinition, MapType
+from .regions import DEFAULT_BLOCK_SIZE, RegionIndex, RegionType
+
+
+# Axis lengths considered plausible
+MIN_AXIS_LENGTH = 4
+MAX_AXIS_LENGTH = 32
+
+# Tables whose mean second difference exceeds this multiple of their mean
+# first difference are treated as noise rather than a map (smooth maps
+# score close to 0, random data about 1.7)
+MAX_ROUGHNESS = 1.0
+
+# Calibration ranges closer than this are searched as one range
+RANGE_MERGE_GAP = 4 * DEFAULT_BLOCK_SIZE
+
+# Cell types tried: (data size, byte order)
+CELL_TYPES = [(1, "little"), (2, "little"), (2, "big")]
+
+LAYOUTS = ("inline", "grouped")
+
+
+@dataclass
+class MapCandidate:
+    """A 2D map found by discovery"""
+    offset: int                 # Start of the map header (first axis length)
+    table_offset: int
+    rows: int                   # y axis length
+    columns: int                # x axis length
+    data_size: int
+    byte_order: str
+    layout: str
+    x_axis_offset: int
+    y_axis_offset: int
+    x_axis: List[int] = field(default_factory=list)
+    y_axis: List[int] = field(default_factory=list)
+    roughness: float = 0.0
+    score: float = 0.0
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.columns
+
+    @property
+    def end(self) -> int:
+        return self.table_offset + self.rows * self.columns * self.data_size
+
+    def to_map_definition(self, map_type: MapType, name: Optional[str] = None) -> MapDefinition:
+        """MapDefinition describing this map's table at its fixed offset"""
+        return MapDefinition(
+            map_type=map_type,
+            name=name or f"map_0x{self.table_offset:X}",
+            offset=self.table_offset,
+            rows=self.rows,
+            columns=self.columns,
+            data_size=self.data_size,
+            byte_order=self.byte_order,
+            x_axis_offset=self.x_axis_offset,
+            y_axis_offset=self.y_axis_offset,
+            x_axis_size=self.columns,
+            y_axis_size=self.rows,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["end"] = self.end
+        return result
+
+
+def _increasing_runs(values: np.ndarray) -> np.ndarray:
+    """Length of the strictly increasing run starting at every position"""
+    n = len(values)
+    positions = np.arange(n, dtype=np.int64)
+    run_end = np.full(n, n - 1, dtype=np.int64)
+    breaks = np.flatnonzero(values[1:] <= values[:-1])
+    run_end[breaks] = breaks
+    run_end = np.minimum.accumulate(run_end[::-1])[::-1]
+    return run_end - positions + 1
+
+
+def _headers(values: np.ndarray, runs: np.ndarray, layout: str) -> Tuple[np.ndarray, ...]:
+    """
+    Candidate headers for one layout.
+
+    Returns:
+        (start, nx, ny, x_start, y_start, table_start) arrays, in cells
+    """
+    n = len(values)
+    plausible = (values >= MIN_AXIS_LENGTH) & (values <= MAX_AXIS_LENGTH)
+    start = np.flatnonzero(plausible)
+    nx = values[start]
+
+    if layout == "grouped":
+        keep = start + 1 < n
+        start, nx = start[keep], nx[keep]
+        ny = values[start + 1]
+        keep = plausible[start + 1]
+        start, nx, ny = start[keep], nx[keep], ny[keep]
+        x_start = start + 2
+        y_start = x_start + nx
+    else:
+        x_start = start + 1
+        ny_at = x_start + nx
+        keep = ny_at < n
+        start, nx, x_start, ny_at = start[keep], nx[keep], x_start[keep], ny_at[keep]
+        keep = plausible[ny_at]
+        start, nx, x_start, ny_at = start[keep], nx[keep], x_start[keep], ny_at[keep]
+        ny = values[ny_at]
+        y_start = ny_at + 1
+
+    table_start = y_start + ny
+    keep = table_start + nx * ny <= n
+    keep[keep] &= runs[x_start[keep]] >= nx[keep]
+    keep[keep] &= runs[y_start[keep]] >= ny[keep]
+    # Axes that run on into each other are an index table
+    if layout == "grouped":
+        keep[keep] &= runs[x_start[keep]] < nx[keep] + ny[keep]
+    else:
+        keep[keep] &= runs[start[keep]] < table_start[keep] - start[keep]
+    return (start[keep], nx[keep], ny[keep], x_start[keep], y_start[keep], table_start[keep])
+
+
+def _roughness(table: np.ndarray) -> float:
+    """Mean second difference relative to the mean first difference (0 for flat or linear)"""
+    curvature = slope = 0.0
+    for axis in (0, 1):
+        steps = np.diff(table, axis=axis)
+        slope += np.abs(steps).mean()
+        curvature += np.abs(np.diff(steps, axis=axis)).mean()
+    return float(curvature / slope) if slope else 0.0
+
+
+def _score(rows: int, columns: int, roughness: float, flat: bool) -> float:
+    smoothness = 1.0 - roughness / MAX_ROUGHNESS
+    size = min(1.0, rows * columns / 64)
+    return round(0.4 * smoothness + 0.3 * size + (0.0 if flat else 0.3), 3)
+
+
+def _scan_range(data, start: int, end: int, data_size: int, byte_order: str) -> List[MapCandidate]:
+    """All candidates of one cell type inside one byte range"""
+    if data_size > 1 and start % data_size:
+        start += data_size - start % data_size
+    count = (end - start) // data_size
+    if count < 2 + 2 * MIN_AXIS_LENGTH + MIN_AXIS_LENGTH ** 2:
+        return []
+
+    endian = ">" if byte_order == "big" else "<"
+    values = np.frombuffer(data, dtype=f"{endian}u{data_size}", count=count, offset=start)
+    values = values.astype(np.int64)
+    runs = _increasing_runs(values)
+
+    candidates = []
+    for layout in LAYOUTS:
+        for header, nx, ny, x_start, y_start, table_start in zip(
+            *(array.tolist() for array in _headers(values, runs, layout))
+        ):
+            table = values[table_start:table_start + nx * ny].reshape(ny, nx)
+            roughness = _roughness(table)
+            if roughness > MAX_ROUGHNESS:
+                continue
+            flat = bool(table.min() == table.max())
+            candidates.append(MapCandidate(
+                offset=start + header * data_size,
+                table_offset=start + table_start * data_size,
+                rows=ny,
+                columns=nx,
+                data_size=data_size,
+                byte_order=byte_order,
+                layout=layout,
+                x_axis_offset=start + x_start * data_size,
+                y_axis_offset=start + y_start * data_size,
+                x_axis=values[x_start:x_start + nx].tolist(),
+                y_axis=values[y_start:y_start + ny].tolist(),
+                roughness=round(roughness, 4),
+                score=_score(ny, nx, roughness, flat),
+            ))
+    return candidates
+
+
+def _select(candidates: List[MapCandidate]) -> List[MapCandidate]:
+    """Best-scoring candidates that do not overlap a better one"""
+    ranked = sorted(candidates, key=lambda c: (-c.score, -c.rows * c.columns, c.offset))
+    starts: List[int] = []
+    ends: List[int] = []
+    selected = []
+    for candidate in ranked:
+        i = bisect_left(starts, candidate.offset)
+        if i > 0 and ends[i - 1] > candidate.offset:
+            continue
+        if i < len(starts) and starts[i] < candidate.end:
+            continue
+        starts.insert(i, candidate.offset)
+        ends.insert(i, candidate.end)
+        selected.append(candidate)
+    return selected
+
+
+def discover_maps(data, regions: Optional[RegionIndex] = None,
+                  limit: Optional[int] = None) -> List[MapCandidate]:
+    """
+    Ranked catalogue of 2D maps in a binary.
+
+    Args:
+        data: File contents (bytes, bytearray or memoryview)
+        regions: RegionIndex of the file, if already built
+        limit: Return at most this many maps
+
+    Returns:
+        Non-overlapping MapCandidates, best score first
+    """
+    if regions is None:
+        regions = RegionIndex(data)
+
+    candidates = []
+    for start, end in regions.ranges(RegionType.CALIBRATION, min_gap=RANGE_MERGE_GAP):
+        for data_size, byte_order in CELL_TYPES:
+            candidates.extend(_scan_range(data, start, end, data_size, byte_order))
+
+    catalogue = _select(candidates)
+    return catalogue[:limit] if limit is not None else catalogue
@@ -12,7 +12,79 @@ binary ECU files. Maps can be found by:
 
 import struct
 from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+from .map_discovery import MapCandidate, discover_maps
 from .models import MapDefinition, MapType, ECUDefinition
+from .sequences import find_followed_by
+
+
+def map_dtype(data_size: int, is_signed: bool = False, byte_order: str = "little") -> Optional[np.dtype]:
+    """NumPy dtype for map cells, or None for unsupported cell sizes"""
+    if data_size not in (1, 2, 4):
+        return None
+    endian = ">" if byte_order == "big" else "<"
+    return np.dtype(f"{endian}{'i' if is_signed else 'u'}{data_size}")
+
+
+class MapView:
+    """
+    Lazy, typed view of a map inside the file buffer.
+    
+    Locating a map only records where it is; cells are decoded when
+    `array` (a zero-copy NumPy view with the map's dtype, endianness
+    and shape) or `tolist()` is first used.
+    """
+    
+    def __init__(self, file_data, offset: int, rows: int, columns: int, dtype: np.dtype):
+        self._file_data = file_data
+        self.offset = offset
+        self.rows = rows
+        self.columns = columns
+        self.dtype = np.dtype(dtype)
+        self._array: Optional[np.ndarray] = None
+    
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.columns
+    
+    @property
+    def nbytes(self) -> int:
+        return self.rows * self.columns * self.dtype.itemsize
+    
+    @property
+    def array(self) -> np.ndarray:
+        """Read-only (rows, columns) array over the file buffer"""
+        if self._array is None:
+            array = np.frombuffer(
+                self._file_data, dtype=self.dtype,
+                count=self.rows * self.columns, offset=self.offset,
+            ).reshape(self.rows, self.columns)
+            array.flags.writeable = False
+            self._array = array
+        return self._array
+    
+    def tolist(self) -> List[List[int]]:
+        """Map values as nested Python lists"""
+        return self.array.tolist()
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def __getitem__(self, index):
+        return self.array[index]
+    
+    def __iter__(self):
+        return iter(self.tolist())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MapView):
+            other = other.tolist()
+        return self.tolist() == other
+    
+    def __repr__(self) -> str:
+        return f"MapView(offset=0x{self.offset:X}, shape={self.shape}, dtype={self.dtype})"
 
 
 class MapLocator:
@@ -98,48 +170,23 @@ class MapLocator:
         
         return results
     
-    def _read_map_at_offset(self, file_data: bytes, offset: int, map_def: MapDefinition) -> Optional[List[List[int]]]:
+    def _read_map_at_offset(self, file_data: bytes, offset: int, map_def: MapDefinition) -> Optional[MapView]:
         """
-        Read map data at a specific offset.
+        Get a lazy view of the map at a specific offset.
+        
+        Only the bounds are checked here, no cells are decoded.
         
         Returns:
-            2D list of map values, or None if invalid
+            MapView of the map values, or None if invalid
         """
-        try:
-            map_data = []
-            pos = offset
-            
-            # Determine struct format
-            if map_def.data_size == 1:
-                fmt = 'b' if map_def.is_signed else 'B'
-            elif map_def.data_size == 2:
-                fmt = '<h' if map_def.is_signed else '<H'
-                if map_def.byte_order == "big":
-                    fmt = '>h' if map_def.is_signed else '>H'
-            elif map_def.data_size == 4:
-                fmt = '<i' if map_def.is_signed else '<I'
-                if map_def.byte_order == "big":
-                    fmt = '>i' if map_def.is_signed else '>I'
-            else:
-                return None
-            
-            # Read map values
-            for row in range(map_def.rows):
-                row_data = []
-                for col in range(map_def.columns):
-                    if pos + map_def.data_size > len(file_data):
-                        return None
-                    
-                    value = struct.unpack(fmt, file_data[pos:pos + map_def.data_size])[0]
-                    row_data.append(value)
-                    pos += map_def.data_size
-                
-                map_data.append(row_data)
-            
-            return map_data
-            
-        except Exception:
+        dtype = map_dtype(map_def.data_size, map_def.is_signed, map_def.byte_order)
+        if dtype is None or offset < 0:
+            return None
+        
+        view = MapView(file_data, offset, map_def.rows, map_def.columns, dtype)
+        if offset + view.nbytes > len(file_data):
             return None
+        return view
     
     def _find_pattern(self, file_data: bytes, pattern: bytes) -> List[int]:
         """
@@ -177,7 +224,7 @@ class MapLocator:
             for offset in dpf_switches:
                 results.append({
                     "offset": offset,
-                    "data": [[struct.unpack('<H', file_data[offset:offset+2])[0]]],
+                    "data": MapView(file_data, offset, 1, 1, map_dtype(2)),
                     "map_def": map_def,
                     "method": "structural_analysis",
                     "pattern": "EDC17_DPF_SWITCH",
@@ -193,20 +240,11 @@ class MapLocator:
         - Value 4081 (0x0FF1 in LE) followed by 15 (0x000F)
         - This indicates the DPF switch/enable area
         """
-        locations = []
         val_4081 = struct.pack('<H', 4081)  # 0xF1 0x0F
         val_15 = struct.pack('<H', 15)      # 0x0F 0x00
         
-        # Search in first 500KB (switch usually in calibration area)
-        search_limit = min(len(file_data) - 10, 500_000)
-        
-        for i in range(search_limit):
-            if file_data[i:i+2] == val_4081:
-                # Check if 15 follows within next 6 bytes
-                if val_15 in file_data[i+2:i+8]:
-                    locations.append(i)
-        
-        return locations
+        # 15 must follow within the next 6 bytes
+        return find_followed_by(file_data, val_4081, val_15, within=6)
     
     def find_dtc_table(self, file_data: bytes) -> List[Dict[str, Any]]:
         """
@@ -273,6 +311,15 @@ class MapLocator:
         
         return clusters
     
+    def discover_maps(self, file_data: bytes, limit: Optional[int] = None) -> List[MapCandidate]:
+        """
+        Find 2D maps without a definition (axis + smooth table discovery).
+        
+        Returns:
+            Ranked catalogue of MapCandidates, best score first
+        """
+        return discover_maps(file_data, limit=limit)
+    
     def analyze_map_structure(self, file_data: bytes, offset: int, size_hint: int = 256) -> Dict[str, Any]:
         """
         Analyze the structure of data at a given offset.
@@ -10,11 +10,19 @@ This module handles the actual modifications:
 - Apply tuning changes
 
 IMPORTANT: Always work on a copy of the file data!
+
+Every method only reads and writes file_data through len(), slicing,
+find() and slice assignment, so a PatchPlan can be passed instead of a
+bytearray to record the changes as patches against the original.
 """
 
-import struct
 import copy
+import math
 from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+from .map_locator import map_dtype
 from .models import MapDefinition, MapType, ModificationRule, ModificationType
 
 
@@ -106,34 +114,39 @@ class MapModifier:
         # Apply the modification
         if rule.zero_fill or map_def.zero_fill:
             # Fill entire map with zeros
-            for i in range(map_size):
-                file_data[offset + i] = 0x00
+            new_data = bytes(map_size)
+            file_data[offset:offset + map_size] = new_data
             method = "zero_fill"
             
         elif rule.set_value is not None:
             # Set all cells to specific value
-            self._set_map_value(file_data, offset, map_def, rule.set_value)
+            new_data = self._set_map_value(file_data, offset, map_def, rule.set_value)
             method = f"set_value={rule.set_value}"
             
         elif map_def.off_value is not None:
             # Use map's defined "off" value
-            self._set_map_value(file_data, offset, map_def, map_def.off_value)
+            new_data = self._set_map_value(file_data, offset, map_def, map_def.off_value)
             method = f"off_value={map_def.off_value}"
             
         elif rule.multiply_by is not None:
             # Multiply all values
-            self._multiply_map_values(file_data, offset, map_def, rule.multiply_by)
+            new_data = self._multiply_map_values(file_data, offset, map_def, rule.multiply_by)
             method = f"multiply={rule.multiply_by}"
             
         elif rule.nop_fill:
             # Fill with NOP instructions (for code areas)
-            for i in range(map_size):
-                file_data[offset + i] = 0x90  # x86 NOP
+            new_data = b'\x90' * map_size  # x86 NOP
+            file_data[offset:offset + map_size] = new_data
             method = "nop_fill"
             
         else:
             return {"error": "No modification method specified", "offset": offset}
         
+        # file_data may be a PatchPlan, whose reads return the original
+        if new_data is None:
+            new_data = b''
+        modified_preview = (new_data[:16] + bytes(file_data[offset + len(new_data):offset + 16]))[:16]
+        
         return {
             "success": True,
             "map_type": map_def.map_type.value,
@@ -142,39 +155,52 @@ class MapModifier:
             "size": map_size,
             "method": method,
             "original_preview": original_data[:16].hex(),
-            "modified_preview": bytes(file_data[offset:offset + 16]).hex(),
+            "modified_preview": modified_preview.hex(),
         }
     
+    def _map_cells(
+        self,
+        file_data: bytearray,
+        offset: int,
+        map_def: MapDefinition,
+        is_signed: bool
+    ) -> Optional[np.ndarray]:
+        """Writable NumPy array over a copy of the map's bytes."""
+        dtype = map_dtype(map_def.data_size, is_signed, map_def.byte_order)
+        if dtype is None:
+            return None
+        size = map_def.rows * map_def.columns * dtype.itemsize
+        return np.frombuffer(bytearray(file_data[offset:offset + size]), dtype=dtype)
+    
     def _set_map_value(
         self,
         file_data: bytearray,
         offset: int,
         map_def: MapDefinition,
         value: int
-    ):
-        """Set all cells in a map to a specific value."""
-        pos = offset
-        
-        # Determine format string
-        if map_def.data_size == 1:
-            fmt = 'B'
-        elif map_def.data_size == 2:
-            fmt = '<H' if map_def.byte_order == "little" else '>H'
-        elif map_def.data_size == 4:
-            fmt = '<I' if map_def.byte_order == "little" else '>I'
-        else:
-            return
+    ) -> Optional[bytes]:
+        """
+        Set all cells in a map to a specific value.
         
-        packed_value = struct.pack(fmt.replace('<', '').replace('>', ''), value)
-        if '<' in fmt or map_def.byte_order == "little":
-            packed_value = struct.pack('<' + fmt.replace('<', '').replace('>', ''), value)
-        else:
-            packed_value = struct.pack('>' + fmt.replace('<', '').replace('>', ''), value)
+        Accepts anything that fits the cell either signed or unsigned
+        (e.g. -1 or 0xFFFF for a 16-bit cell); the two's complement
+        bit pattern is written.
+        
+        Returns:
+            The new map bytes, or None for unsupported cell sizes
+        """
+        cells = self._map_cells(file_data, offset, map_def, is_signed=False)
+        if cells is None:
+            return None
+        
+        bits = map_def.data_size * 8
+        if not -(1 << (bits - 1)) <= value < (1 << bits):
+            raise ValueError(f"Value {value} does not fit a {map_def.data_size}-byte map cell")
         
-        for _ in range(map_def.rows * map_def.columns):
-            for i, byte in enumerate(packed_value):
-                file_data[pos + i] = byte
-            pos += map_def.data_size
+        cells.fill(value & ((1 << bits) - 1))
+        new_data = cells.tobytes()
+        file_data[offset:offset + len(new_data)] = new_data
+        return new_data
     
     def _multiply_map_values(
         self,
@@ -182,38 +208,28 @@ class MapModifier:
         offset: int,
         map_def: MapDefinition,
         multiplier: float
-    ):
-        """Multiply all values in a map by a factor."""
-        pos = offset
-        
-        # Determine format strings
-        if map_def.data_size == 1:
-            read_fmt = 'B'
-            write_fmt = 'B'
-        elif map_def.data_size == 2:
-            read_fmt = '<H' if map_def.byte_order == "little" else '>H'
-            write_fmt = read_fmt
-        elif map_def.data_size == 4:
-            read_fmt = '<I' if map_def.byte_order == "little" else '>I'
-            write_fmt = read_fmt
-        else:
-            return
+    ) -> Optional[bytes]:
+        """
+        Multiply all values in a map by a factor.
         
-        for _ in range(map_def.rows * map_def.columns):
-            # Read current value
-            current = struct.unpack(read_fmt, bytes(file_data[pos:pos + map_def.data_size]))[0]
-            
-            # Apply multiplier with bounds checking
-            new_value = int(current * multiplier)
-            max_value = (2 ** (map_def.data_size * 8)) - 1
-            new_value = max(0, min(new_value, max_value))
-            
-            # Write new value
-            packed = struct.pack(write_fmt, new_value)
-            for i, byte in enumerate(packed):
-                file_data[pos + i] = byte
-            
-            pos += map_def.data_size
+        Results are truncated toward zero and saturate at the limits of
+        the cell type (signed or unsigned, per the map definition).
+        
+        Returns:
+            The new map bytes, or None for unsupported cell sizes
+        """
+        cells = self._map_cells(file_data, offset, map_def, map_def.is_signed)
+        if cells is None:
+            return None
+        if not math.isfinite(multiplier):
+            raise ValueError(f"Invalid multiplier: {multiplier}")
+        
+        limits = np.iinfo(cells.dtype)
+        scaled = np.trunc(cells.astype(np.float64) * multiplier)
+        cells[:] = np.clip(scaled, limits.min, limits.max)
+        new_data = cells.tobytes()
+        file_data[offset:offset + len(new_data)] = new_data
+        return new_data
     
     def remove_dtc(
         self,
@@ -245,8 +261,7 @@ class MapModifier:
                 break
             
             # Zero out the DTC code
-            for i in range(len(dtc_bytes)):
-                file_data[pos + i] = 0x00
+            file_data[pos:pos + len(dtc_bytes)] = bytes(len(dtc_bytes))
             
             removed_count += 1
             pos += 1
@@ -130,6 +130,8 @@ class ChecksumAlgorithm(BaseModel):
     # Location
     offset: Optional[int] = None
     search_pattern: Optional[bytes] = None
+    checksum_size: int = 4                # Bytes stored
+    byte_order: str = "little"            # "little" or "big"
     
     # Range to calculate
     calc_start: int = 0
@@ -149,6 +151,14 @@ class ChecksumAlgorithm(BaseModel):
         arbitrary_types_allowed = True
 
 
+class ChecksumState(BaseModel):
+    """Checksum of an unmodified file, for incremental updates"""
+    name: str                             # ChecksumAlgorithm name
+    offset: int                           # Where the checksum is stored
+    value: int                            # Checksum with the stored bytes zeroed
+    file_size: int
+
+
 class ECUDefinition(BaseModel):
     """Complete definition for an ECU type"""
     id: str                               # Unique ID (e.g., "bosch_edc17c54")
@@ -194,6 +204,7 @@ class ProcessingResult(BaseModel):
     maps_modified: List[Dict[str, Any]] = []
     dtcs_removed: List[str] = []
     checksum_updated: bool = False
+    patches: List[Dict[str, Any]] = []    # (offset, old, new, source) against the original
     
     # Errors and warnings
     errors: List[str] = []
@@ -0,0 +1,278 @@
+"""
+ECU Processing Engine - Patch Plans
+====================================
+Modifications recorded as patches against the unmodified file.
+
+Instead of editing a working copy in turn, each modification writes
+into a PatchPlan. The plan behaves like the file buffer for the
+operations modifiers use (len, slicing, find, slice assignment), but
+reads always see the original and writes are recorded as
+(offset, old bytes, new bytes) patches tagged with the modification
+that made them.
+
+Once every modification has run:
+1. conflicts() lists places where two modifications write different
+   bytes to the same location (resolve_conflicts() keeps the later
+   modification's bytes instead, describe_overrides() reports it)
+2. apply() builds the result in a single pass over the patches
+3. ranges() tells which parts of the file changed, so only the
+   checksums covering them need to be recomputed
+4. merged() gives the net change as non-overlapping patches (original
+   bytes to final bytes); overlapping writes, agreeing ones from two
+   modifications or repeated ones from one, become a single patch
+
+The patch list (to_list, from merged) is a compact, auditable record
+of exactly what was changed, each byte reported once.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PatchConflictError(ValueError):
+    """Two modifications write different bytes to the same location"""
+
+    def __init__(self, conflicts: List[Tuple["Patch", "Patch"]]):
+        self.conflicts = conflicts
+        details = ", ".join(
+            f"0x{a.offset:X} ({a.source} vs {b.source})" for a, b in conflicts[:5]
+        )
+        super().__init__(f"Conflicting modifications at {details}")
+
+
+def describe_overrides(resolved: List[Tuple["Patch", "Patch"]]) -> List[str]:
+    """
+    Warnings for the (kept, dropped) pairs of PatchPlan.resolve_conflicts(),
+    one per pair of modifications.
+    """
+    overridden: Dict[Tuple[str, str], List[int]] = {}
+    for kept, dropped in resolved:
+        overridden.setdefault((dropped.source, kept.source), []).append(dropped.offset)
+    return [
+        f"{kept_source} overrides {dropped_source} at {len(offsets)} location(s) "
+        f"starting 0x{offsets[0]:X}"
+        for (dropped_source, kept_source), offsets in overridden.items()
+    ]
+
+
+@dataclass(frozen=True)
+class Patch:
+    """One contiguous change against the original file"""
+    offset: int
+    old: bytes
+    new: bytes
+    source: str = ""
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.new)
+
+    def disagrees(self, other: "Patch") -> bool:
+        """True if both patches write to a common byte with different values"""
+        lo, hi = max(self.offset, other.offset), min(self.end, other.end)
+        if lo >= hi:
+            return False
+        return (self.new[lo - self.offset:hi - self.offset]
+                != other.new[lo - other.offset:hi - other.offset])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "offset": self.offset,
+            "old": self.old.hex(),
+            "new": self.new.hex(),
+            "source": self.source,
+        }
+
+
+class PatchPlan:
+    """
+    Patches against an immutable original file.
+
+    Usage:
+        plan = PatchPlan(file_data)
+        plan.source = "dpf_off"
+        map_modifier.apply_dpf_off(plan, found_maps)
+        result = plan.apply()
+    """
+
+    def __init__(self, original: bytes):
+        self.original = original if isinstance(original, bytes) else bytes(original)
+        self.patches: List[Patch] = []
+        self.source = ""  # Tag for the patches recorded next
+
+    # -------------------------------------------------------------------------
+    # Buffer interface used by the modifiers
+    # -------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.original)
+
+    def __getitem__(self, index):
+        return self.original[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.original))
+            if step != 1:
+                raise ValueError("Patches must be contiguous")
+            value = bytes(value)
+            if len(value) != max(stop - start, 0):
+                raise ValueError("Patches cannot change the file size")
+            self.add(start, value)
+        else:
+            if index < 0:
+                index += len(self.original)
+            self.add(index, bytes([value]))
+
+    def find(self, sub, start: int = 0, end: Optional[int] = None) -> int:
+        if end is None:
+            return self.original.find(sub, start)
+        return self.original.find(sub, start, end)
+
+    # -------------------------------------------------------------------------
+    # Patches
+    # -------------------------------------------------------------------------
+
+    def add(self, offset: int, new: bytes, source: Optional[str] = None) -> Optional[Patch]:
+        """
+        Record new bytes at an offset.
+
+        Returns:
+            The recorded Patch, or None if the bytes are unchanged
+            (original bytes over earlier patches are recorded, since
+            they undo them)
+        """
+        if offset < 0 or offset + len(new) > len(self.original):
+            raise ValueError(f"Patch at 0x{offset:X} extends beyond file")
+        old = self.original[offset:offset + len(new)]
+        if old == new and not self.touches(offset, offset + len(new)):
+            return None
+        patch = Patch(offset, old, bytes(new), self.source if source is None else source)
+        self.patches.append(patch)
+        return patch
+
+    def override(self, offset: int, new: bytes, source: Optional[str] = None) -> Optional[Patch]:
+        """
+        Record a final write (such as a checksum) that wins over earlier patches.
+
+        Earlier patches keep only their bytes outside the written range,
+        as on a working copy, so the override never conflicts.
+        """
+        end = offset + len(new)
+        patches = []
+        for patch in self.patches:
+            if patch.offset < end and offset < patch.end:
+                if patch.offset < offset:
+                    patches.append(self._trim(patch, patch.offset, offset))
+                if end < patch.end:
+                    patches.append(self._trim(patch, end, patch.end))
+            else:
+                patches.append(patch)
+        self.patches = patches
+        return self.add(offset, new, source)
+
+    def _trim(self, patch: Patch, start: int, end: int) -> Patch:
+        """The part of a patch over [start, end)"""
+        return Patch(start, self.original[start:end],
+                     patch.new[start - patch.offset:end - patch.offset], patch.source)
+
+    def conflicts(self) -> List[Tuple[Patch, Patch]]:
+        """
+        Overlapping patches from different sources that disagree.
+
+        Overlaps within one source are not conflicts - the later write
+        wins, as it would on a working copy.
+        """
+        ordered = sorted(self.patches, key=lambda p: p.offset)
+        conflicts = []
+        for i, patch in enumerate(ordered):
+            for other in ordered[i + 1:]:
+                if other.offset >= patch.end:
+                    break
+                if other.source != patch.source and patch.disagrees(other):
+                    conflicts.append((patch, other))
+        return conflicts
+
+    def resolve_conflicts(self) -> List[Tuple[Patch, Patch]]:
+        """
+        Drop patches overridden by a later source's conflicting patches.
+
+        The later write wins, as it would on a working copy.
+
+        Returns:
+            (kept, dropped) pairs for every dropped patch
+        """
+        kept: List[Patch] = []
+        dropped = []
+        for patch in reversed(self.patches):
+            clash = next((
+                other for other in kept
+                if other.source != patch.source and other.disagrees(patch)
+            ), None)
+            if clash is None:
+                kept.append(patch)
+            else:
+                dropped.append((clash, patch))
+        self.patches = kept[::-1]
+        return dropped[::-1]
+
+    def apply(self) -> bytearray:
+        """
+        Build the modified file in one pass.
+
+        Raises:
+            PatchConflictError: If two modifications disagree
+        """
+        conflicts = self.conflicts()
+        if conflicts:
+            raise PatchConflictError(conflicts)
+        data = bytearray(self.original)
+        for patch in self.patches:
+            data[patch.offset:patch.end] = patch.new
+        return data
+
+    def ranges(self) -> List[Tuple[int, int]]:
+        """Merged (start, end) byte ranges touched by the patches"""
+        merged: List[Tuple[int, int]] = []
+        for patch in sorted(self.patches, key=lambda p: p.offset):
+            if merged and patch.offset <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], patch.end))
+            else:
+                merged.append((patch.offset, patch.end))
+        return merged
+
+    def touches(self, start: int, end: int) -> bool:
+        """True if any patch overlaps [start, end)"""
+        return any(p.offset < end and start < p.end for p in self.patches)
+
+    def merged(self) -> List[Patch]:
+        """
+        Net changes as non-overlapping patches, in file order.
+
+        Each merged patch goes from the original bytes to the final ones
+        over one of ranges(), tagged with every source that wrote there
+        ("dpf_off,dtc_off"). Patch deltas only add up when patches do
+        not overlap, so incremental checksums take this list.
+
+        Raises:
+            PatchConflictError: If two modifications disagree
+        """
+        conflicts = self.conflicts()
+        if conflicts:
+            raise PatchConflictError(conflicts)
+        merged = []
+        for start, end in self.ranges():
+            data = bytearray(self.original[start:end])
+            sources: List[str] = []
+            for patch in self.patches:
+                if patch.offset < end and start < patch.end:
+                    data[patch.offset - start:patch.end - start] = patch.new
+                    if patch.source not in sources:
+                        sources.append(patch.source)
+            old, new = self.original[start:end], bytes(data)
+            if old != new:
+                merged.append(Patch(start, old, new, ",".join(sources)))
+        return merged
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [patch.to_dict() for patch in self.merged()]
@@ -6,18 +6,20 @@ Orchestrates the complete ECU file processing workflow.
 Workflow:
 1. Load and identify ECU file
 2. Find maps based on ECU definition
-3. Apply requested modifications
-4. Update checksums
-5. Validate and save result
+3. Record requested modifications as patches against the original
+4. Check for conflicts and apply all patches in one pass
+5. Update the checksums covering patched bytes from the patches alone
+6. Validate and save result
 """
 
 import time
 import copy
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 
 from .models import (
+    ChecksumState,
     ECUDefinition,
     ProcessingResult,
     ModificationType,
@@ -27,6 +29,7 @@ from .database import ECUDefinitionDB
 from .map_locator import MapLocator
 from .map_modifier import MapModifier
 from .checksum import ChecksumCalculator
+from .patches import PatchPlan, describe_overrides
 
 
 class ECUFileProcessor:
@@ -56,7 +59,8 @@ class ECUFileProcessor:
         self,
         file_data: bytes,
         modifications: List[ModificationType],
-        original_filename: str = "unknown.bin"
+        original_filename: str = "unknown.bin",
+        checksum_states: Optional[Dict[str, ChecksumState]] = None
     ) -> ProcessingResult:
         """
         Process an ECU file with requested modifications.
@@ -65,11 +69,14 @@ class ECUFileProcessor:
             file_data: Raw binary ECU file data
             modifications: List of modifications to apply
             original_filename: Original filename for logging
+            checksum_states: checksum_states() of this file, if cached (saves
+                a pass over each checksummed range)
             
         Returns:
             ProcessingResult with details of what was done
         """
         start_time = time.time()
+        self._current_file = None
         
         result = ProcessingResult(
             success=False,
@@ -111,24 +118,42 @@ class ECUFileProcessor:
             if not self._found_maps:
                 result.warnings.append("No maps found - using pattern-based modification")
             
-            # Step 4: Create working copy
-            self._current_file = bytearray(file_data)
-            
-            # Step 5: Apply modifications
+            # Step 4: Record every modification as patches against the original
+            plan = PatchPlan(file_data)
             for mod_type in modifications:
-                mod_result = self._apply_modification(mod_type, ecu_definition)
+                plan.source = mod_type.value
+                mod_result = self._apply_modification(mod_type, ecu_definition, plan)
                 if mod_result:
                     result.modifications_applied.append(mod_type.value)
                     result.maps_modified.extend(mod_result.get("maps", []))
-                    result.dtcs_removed.extend(mod_result.get("dtcs", []))
+                    for dtc in mod_result.get("dtcs", []):
+                        if dtc not in result.dtcs_removed:
+                            result.dtcs_removed.append(dtc)
+            
+            # Step 5: Apply all patches in one pass; where two modifications
+            # disagree about the same bytes, the later one wins
+            result.warnings.extend(describe_overrides(plan.resolve_conflicts()))
+            self._current_file = plan.apply()
             
-            # Step 6: Update checksums
+            # Step 6: Update the checksums covering patched bytes
             if ecu_definition.checksums:
                 for checksum_def in ecu_definition.checksums:
-                    success, new_checksum = self.checksum_calc.update_checksum(
-                        self._current_file,
-                        checksum_def
-                    )
+                    ranges = self.checksum_calc.checksum_ranges(len(file_data), checksum_def)
+                    if not any(plan.touches(start, end) for start, end in ranges):
+                        continue
+                    
+                    state = (checksum_states or {}).get(checksum_def.name)
+                    if state is None:
+                        state = self.checksum_calc.checksum_state(file_data, checksum_def)
+                    if state is None:
+                        success, new_checksum = False, 0
+                    else:
+                        success, new_checksum = self.checksum_calc.update_checksum_incremental(
+                            self._current_file,
+                            checksum_def,
+                            state,
+                            plan.merged()  # Deltas only add up without overlaps
+                        )
                     if success:
                         result.checksum_updated = True
                         result.maps_modified.append({
@@ -136,11 +161,16 @@ class ECUFileProcessor:
                             "name": checksum_def.name,
                             "value": f"0x{new_checksum:08X}"
                         })
+                        offset = self.checksum_calc.locate_checksum(self._current_file, checksum_def)
+                        size = checksum_def.checksum_size
+                        plan.override(offset, bytes(self._current_file[offset:offset + size]), source="checksum")
                     else:
                         result.warnings.append(f"Could not update checksum: {checksum_def.name}")
             else:
                 result.warnings.append("No checksum definition for this ECU - checksum not updated")
             
+            result.patches = plan.to_list()
+            
             # Step 7: Finalize
             result.success = len(result.modifications_applied) > 0
             result.processed_size = len(self._current_file)
@@ -152,13 +182,30 @@ class ECUFileProcessor:
             result.errors.append(f"Processing error: {str(e)}")
             return result
     
+    def process(
+        self,
+        file_data: bytes,
+        modifications: List[ModificationType],
+        original_filename: str = "unknown.bin",
+        checksum_states: Optional[Dict[str, ChecksumState]] = None
+    ) -> Tuple[ProcessingResult, Optional[bytes]]:
+        """
+        process_file() and the processed file it produced, in one call.
+        
+        Returns:
+            (ProcessingResult, processed file as bytes or None)
+        """
+        result = self.process_file(file_data, modifications, original_filename, checksum_states)
+        return result, self.get_processed_file()
+    
     def _apply_modification(
         self,
         mod_type: ModificationType,
-        ecu_definition: ECUDefinition
+        ecu_definition: ECUDefinition,
+        plan: PatchPlan
     ) -> Optional[Dict[str, Any]]:
         """
-        Apply a single modification type.
+        Record a single modification type in the patch plan.
         
         Returns:
             Dictionary with modification details or None if failed
@@ -168,7 +215,7 @@ class ECUFileProcessor:
         
         if mod_type == ModificationType.DPF_OFF:
             # Apply DPF OFF
-            mods = self.map_modifier.apply_dpf_off(self._current_file, self._found_maps)
+            mods = self.map_modifier.apply_dpf_off(plan, self._found_maps)
             for mod in mods:
                 if mod.get("type") == "DTC_REMOVAL":
                     dtcs_removed.append(mod.get("dtc"))
@@ -177,7 +224,7 @@ class ECUFileProcessor:
         
         elif mod_type == ModificationType.EGR_OFF:
             # Apply EGR OFF
-            mods = self.map_modifier.apply_egr_off(self._current_file, self._found_maps)
+            mods = self.map_modifier.apply_egr_off(plan, self._found_maps)
             for mod in mods:
                 if mod.get("type") == "DTC_REMOVAL":
                     dtcs_removed.append(mod.get("dtc"))
@@ -191,7 +238,7 @@ class ECUFileProcessor:
                 "P2002", "P2003", "P244A", "P244B", "P2458", "P2463",  # DPF
                 "P20EE", "P2201", "P2202", "P2203",  # SCR/NOx
             ]
-            results = self.map_modifier.remove_dtcs_by_list(self._current_file, emission_dtcs)
+            results = self.map_modifier.remove_dtcs_by_list(plan, emission_dtcs)
             for r in results:
                 if r.get("success"):
                     dtcs_removed.append(r.get("dtc_code"))
@@ -202,7 +249,7 @@ class ECUFileProcessor:
                 for map_info in self._found_maps[MapType.SCR_SWITCH]:
                     offset = map_info.get("offset")
                     if offset:
-                        self._current_file[offset:offset+2] = b'\x00\x00'
+                        plan[offset:offset+2] = b'\x00\x00'
                         maps_modified.append({
                             "type": "SCR_SWITCH",
                             "offset": offset,
@@ -211,7 +258,7 @@ class ECUFileProcessor:
             
             # Remove SCR-related DTCs
             scr_dtcs = ["P20EE", "P2201", "P2202", "P2203", "P2BAF", "P2BA9"]
-            results = self.map_modifier.remove_dtcs_by_list(self._current_file, scr_dtcs)
+            results = self.map_modifier.remove_dtcs_by_list(plan, scr_dtcs)
             for r in results:
                 if r.get("success"):
                     dtcs_removed.append(r.get("dtc_code"))
@@ -219,7 +266,7 @@ class ECUFileProcessor:
         else:
             # Use generic rule-based modification
             _, mods = self.map_modifier.apply_modification(
-                self._current_file,
+                plan,
                 mod_type,
                 self._found_maps,
                 ecu_definition.modification_rules
@@ -273,6 +320,24 @@ class ECUFileProcessor:
             return ecu_def.supported_modifications
         return []
     
+    def checksum_states(self, file_data: bytes) -> Dict[str, ChecksumState]:
+        """
+        ChecksumCalculator.checksum_state of an unmodified file, by checksum name.
+        
+        One pass over each checksummed range; cache the result per file
+        (see process_file's checksum_states) so processing the same
+        original again only reads the patched bytes.
+        """
+        ecu_def = self.ecu_db.identify_ecu(file_data)
+        if not ecu_def:
+            return {}
+        states = {}
+        for checksum_def in ecu_def.checksums:
+            state = self.checksum_calc.checksum_state(file_data, checksum_def)
+            if state is not None:
+                states[checksum_def.name] = state
+        return states
+    
     def analyze_file(self, file_data: bytes) -> Dict[str, Any]:
         """
         Analyze an ECU file without modifying it.
@@ -0,0 +1,184 @@
+"""
+ECU Processing Engine - Region Index
+=====================================
+Per-file map of what each part of an ECU binary contains.
+
+ECU dumps are typically 25-60% erased flash (runs of 0xFF or 0x00).
+The index classifies fixed-size blocks in one NumPy pass so detectors
+can restrict their searches to the regions that can actually hold what
+they are looking for.
+
+Block types:
+- EMPTY: Every byte is 0xFF or every byte is 0x00 (erased flash)
+- ASCII: Mostly printable text (identification strings, part numbers)
+- CODE: High byte entropy (machine code, compressed data)
+- CALIBRATION: Everything else (maps, axes, constants)
+"""
+
+from enum import Enum
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class RegionType(str, Enum):
+    """Classification of a block of the binary"""
+    EMPTY = "empty"
+    CODE = "code"
+    CALIBRATION = "calibration"
+    ASCII = "ascii"
+
+
+# Block size used for classification (bytes)
+DEFAULT_BLOCK_SIZE = 256
+
+# Blocks with at least this fraction of printable bytes are ASCII
+ASCII_RATIO = 0.9
+
+# Blocks with at least this Shannon entropy (bits/byte) are code
+CODE_ENTROPY = 6.0
+
+# Blocks processed per NumPy batch (bounds histogram memory)
+_BATCH_BLOCKS = 4096
+
+_TYPE_CODES = {
+    RegionType.EMPTY: 0,
+    RegionType.CODE: 1,
+    RegionType.CALIBRATION: 2,
+    RegionType.ASCII: 3,
+}
+_CODE_TYPES = {code: region for region, code in _TYPE_CODES.items()}
+
+NON_EMPTY = (RegionType.CODE, RegionType.CALIBRATION, RegionType.ASCII)
+
+
+class RegionIndex:
+    """
+    Block classification of one binary file.
+
+    Usage:
+        regions = RegionIndex(file_data)
+        for start, end in regions.ranges(RegionType.CALIBRATION):
+            ...
+        regions.non_empty_ranges()          # skip erased flash
+        regions.block_type(offset)          # RegionType at an offset
+    """
+
+    def __init__(self, data, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.size = len(data)
+        self.block_size = block_size
+
+        arr = np.frombuffer(data, dtype=np.uint8)
+        n_blocks = -(-self.size // block_size)
+        self.types = np.empty(n_blocks, dtype=np.uint8)
+        self.entropy = np.zeros(n_blocks, dtype=np.float32)
+
+        n_full = self.size // block_size
+        for start in range(0, n_full, _BATCH_BLOCKS):
+            stop = min(start + _BATCH_BLOCKS, n_full)
+            blocks = arr[start * block_size:stop * block_size].reshape(-1, block_size)
+            self._classify(blocks, start)
+
+        if n_full < n_blocks:
+            self._classify(arr[n_full * block_size:].reshape(1, -1), n_full)
+
+    def _classify(self, blocks: np.ndarray, first: int):
+        """Classify a batch of equally sized blocks"""
+        n, width = blocks.shape
+        end = first + n
+
+        low = blocks.min(axis=1)
+        high = blocks.max(axis=1)
+        empty = (low == high) & ((low == 0x00) | (low == 0xFF))
+
+        types = np.full(n, _TYPE_CODES[RegionType.EMPTY], dtype=np.uint8)
+        self.types[first:end] = types
+        used = np.flatnonzero(~empty)
+        if not len(used):
+            return
+        blocks = blocks[used]
+        m = len(used)
+
+        printable = ((blocks - 0x20) < 0x5F).sum(axis=1) / width
+
+        # Per-block byte histograms in a single bincount (erased blocks skipped)
+        ids = (np.arange(m, dtype=np.int32) * 256)[:, None] + blocks
+        counts = np.bincount(ids.ravel(), minlength=m * 256).reshape(m, 256)
+        p = counts[counts > 0] / width
+        rows = np.repeat(np.arange(m), (counts > 0).sum(axis=1))
+        entropy = -np.bincount(rows, weights=p * np.log2(p), minlength=m)
+        self.entropy[first + used] = entropy
+
+        used_types = np.full(m, _TYPE_CODES[RegionType.CALIBRATION], dtype=np.uint8)
+        used_types[entropy >= CODE_ENTROPY] = _TYPE_CODES[RegionType.CODE]
+        used_types[printable >= ASCII_RATIO] = _TYPE_CODES[RegionType.ASCII]
+        self.types[first + used] = used_types
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def block_type(self, offset: int) -> RegionType:
+        """Region type of the block containing an offset"""
+        return _CODE_TYPES[int(self.types[offset // self.block_size])]
+
+    def _mask(self, types: Iterable[RegionType]) -> np.ndarray:
+        codes = [_TYPE_CODES[RegionType(t)] for t in types]
+        return np.isin(self.types, codes)
+
+    def ranges(self, *types: RegionType, start: int = 0, end: Optional[int] = None,
+               min_gap: int = 0) -> List[Tuple[int, int]]:
+        """
+        Byte ranges covered by blocks of the given types.
+
+        Args:
+            types: Region types to include (default: all non-empty)
+            start, end: Clip the result to this byte range
+            min_gap: Merge ranges separated by fewer than this many bytes
+
+        Returns:
+            Sorted list of (start, end) byte ranges
+        """
+        mask = self._mask(types or NON_EMPTY)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+        end = self.size if end is None else min(end, self.size)
+
+        ranges = []
+        for first, last in zip(edges[::2], edges[1::2]):
+            lo = max(int(first) * self.block_size, start)
+            hi = min(int(last) * self.block_size, end)
+            if lo >= hi:
+                continue
+            if ranges and lo - ranges[-1][1] < min_gap:
+                ranges[-1] = (ranges[-1][0], hi)
+            else:
+                ranges.append((lo, hi))
+        return ranges
+
+    def non_empty_ranges(self, start: int = 0, end: Optional[int] = None,
+                         min_gap: int = 0) -> List[Tuple[int, int]]:
+        """Byte ranges that are not erased flash"""
+        return self.ranges(*NON_EMPTY, start=start, end=end, min_gap=min_gap)
+
+    def filter_offsets(self, offsets, *types: RegionType) -> List[int]:
+        """Keep only offsets that fall in blocks of the given types"""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if not len(offsets):
+            return []
+        keep = self._mask(types or NON_EMPTY)[offsets // self.block_size]
+        return offsets[keep].tolist()
+
+    def is_empty(self, start: int, end: int) -> bool:
+        """True if every block overlapping [start, end) is erased flash"""
+        first = start // self.block_size
+        last = -(-end // self.block_size)
+        return bool((self.types[first:last] == _TYPE_CODES[RegionType.EMPTY]).all())
+
+    def summary(self) -> dict:
+        """Fraction of the file in each region type"""
+        counts = np.bincount(self.types, minlength=len(_TYPE_CODES))
+        total = max(len(self.types), 1)
+        return {
+            region.value: round(float(counts[code]) / total, 3)
+            for region, code in _TYPE_CODES.items()
+        }
@@ -0,0 +1,559 @@
+"""
+ECU Processing Engine - Signature Scanner
+==========================================
+Single-pass multi-pattern search over ECU binary files.
+
+Detectors register their signatures once (at import time) and every
+file is then walked a single time; all detectors read their hits from
+the resulting ScanResult instead of re-searching the binary for each
+signature.
+
+How it works:
+1. Literal signatures are compiled into one trie-shaped regex - an
+   Aho-Corasick style automaton executed by the C regex engine - so
+   every position is checked against all signatures at once.
+   One- and two-byte literals (e.g. binary DTC codes) are resolved with
+   a NumPy lookup table instead, since they hit far too often to be
+   walked one match at a time.
+2. Regex patterns are anchored on their literal prefix. The anchors are
+   found by the literal pass and the compiled pattern is only tried at
+   those offsets, lazily, when a detector asks for it.
+3. Patterns without a usable prefix that can only match printable text
+   (VIN, part numbers) are searched inside the printable ASCII runs of
+   the file, which are extracted once per scan. Anything else is run on
+   its own against the file.
+4. Given a RegionIndex, the literal pass and the printable-run
+   extraction skip erased flash (0xFF / 0x00 blocks).
+
+Results are identical to calling re.search / re.finditer / bytes.find /
+bytes.count directly on the file data.
+"""
+
+import re
+from bisect import bisect_left
+from heapq import merge
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+    from re._constants import (
+        LITERAL, IN, RANGE, SUBPATTERN, BRANCH, MAX_REPEAT, MIN_REPEAT,
+        CATEGORY, CATEGORY_DIGIT,
+    )
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+    from sre_constants import (
+        LITERAL, IN, RANGE, SUBPATTERN, BRANCH, MAX_REPEAT, MIN_REPEAT,
+        CATEGORY, CATEGORY_DIGIT,
+    )
+
+
+# Maximum number of literal prefixes a pattern may expand to before it is
+# treated as unanchored (e.g. a leading [A-Z] class)
+MAX_ANCHOR_PREFIXES = 16
+
+# Above this many anchor hits a plain regex search is cheaper than probing
+MAX_ANCHOR_PROBES = 20_000
+
+# Printable ASCII runs shorter than this are not considered text
+MIN_PRINTABLE_RUN = 4
+
+PRINTABLE_RUN_REGEX = re.compile(rb"[\x20-\x7e]{%d,}" % MIN_PRINTABLE_RUN)
+
+
+def extract_printable_runs(data, min_length: int = MIN_PRINTABLE_RUN) -> List[Tuple[int, bytes]]:
+    """
+    Find all runs of printable ASCII in one regex pass.
+
+    Args:
+        data: File contents (bytes, bytearray or memoryview)
+        min_length: Minimum run length
+
+    Returns:
+        List of (offset, run bytes) in file order
+    """
+    regex = PRINTABLE_RUN_REGEX
+    if min_length != MIN_PRINTABLE_RUN:
+        regex = re.compile(rb"[\x20-\x7e]{%d,}" % min_length)
+    return [(m.start(), m.group()) for m in regex.finditer(memoryview(data))]
+
+
+def _build_trie_regex(literals: Set[bytes]) -> bytes:
+    """
+    Build a regex that matches the longest registered literal at a position.
+
+    The regex mirrors a trie: shared prefixes are matched once and
+    terminal nodes become greedy optional groups, so the engine walks
+    each position like a state machine instead of trying every literal.
+    """
+    trie: Dict = {}
+    for literal in literals:
+        node = trie
+        for byte in literal:
+            node = node.setdefault(byte, {})
+        node[None] = True
+
+    def emit(node: Dict) -> bytes:
+        branches = [
+            re.escape(bytes([byte])) + emit(child)
+            for byte, child in sorted((k, v) for k, v in node.items() if k is not None)
+        ]
+        if not branches:
+            return b""
+        body = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+        if None in node:
+            return b"(?:" + body + b")?"
+        return body
+
+    return emit(trie)
+
+
+def _expand_class(items) -> Optional[List[int]]:
+    """Expand a character class into its byte values (None if too wide)."""
+    values = []
+    for op, av in items:
+        if op == LITERAL:
+            values.append(av)
+        elif op == RANGE:
+            values.extend(range(av[0], av[1] + 1))
+        else:
+            return None
+        if len(values) > MAX_ANCHOR_PREFIXES:
+            return None
+    return values
+
+
+def _prefixes(items) -> Tuple[List[bytes], bool]:
+    """
+    Extract the literal prefixes every match of a parsed pattern starts with.
+
+    Returns:
+        (prefixes, complete) - complete is False when the walk stopped
+        early, meaning nothing may be appended after these prefixes.
+    """
+    prefixes = [b""]
+    for op, av in items:
+        if op == LITERAL:
+            prefixes = [p + bytes([av]) for p in prefixes]
+        elif op == IN:
+            values = _expand_class(av)
+            if values is None or len(prefixes) * len(values) > MAX_ANCHOR_PREFIXES:
+                return prefixes, False
+            prefixes = [p + bytes([v]) for p in prefixes for v in values]
+        elif op == SUBPATTERN:
+            inner, complete = _prefixes(av[-1])
+            if len(prefixes) * len(inner) > MAX_ANCHOR_PREFIXES:
+                return prefixes, False
+            prefixes = [p + i for p in prefixes for i in inner]
+            if not complete:
+                return prefixes, False
+        elif op == BRANCH:
+            alternatives = []
+            for branch in av[1]:
+                alternatives.extend(_prefixes(branch)[0])
+            if b"" in alternatives or len(prefixes) * len(alternatives) > MAX_ANCHOR_PREFIXES:
+                return prefixes, False
+            return [p + a for p in prefixes for a in alternatives], False
+        elif op in (MAX_REPEAT, MIN_REPEAT) and av[0] >= 1:
+            # At least one repetition is required - take it and stop
+            inner, _ = _prefixes(av[2])
+            if len(prefixes) * len(inner) > MAX_ANCHOR_PREFIXES:
+                return prefixes, False
+            return [p + i for p in prefixes for i in inner], False
+        else:
+            return prefixes, False
+    return prefixes, True
+
+
+def _is_printable(items) -> bool:
+    """True if every byte a parsed pattern can match is printable ASCII."""
+    for op, av in items:
+        if op == LITERAL:
+            if not 0x20 <= av <= 0x7E:
+                return False
+        elif op == IN:
+            for item_op, item_av in av:
+                if item_op == LITERAL:
+                    if not 0x20 <= item_av <= 0x7E:
+                        return False
+                elif item_op == RANGE:
+                    if not (0x20 <= item_av[0] and item_av[1] <= 0x7E):
+                        return False
+                elif not (item_op == CATEGORY and item_av == CATEGORY_DIGIT):
+                    return False
+        elif op == SUBPATTERN:
+            if not _is_printable(av[-1]):
+                return False
+        elif op == BRANCH:
+            if not all(_is_printable(branch) for branch in av[1]):
+                return False
+        elif op in (MAX_REPEAT, MIN_REPEAT):
+            if not _is_printable(av[2]):
+                return False
+        else:
+            return False
+    return True
+
+
+def literal_prefixes(pattern: bytes, flags: int = 0) -> Tuple[List[bytes], bool]:
+    """
+    Get the literal prefixes a regex pattern is anchored on.
+
+    Returns:
+        (prefixes, case_insensitive) - prefixes is empty if the pattern
+        has no usable anchor. Case-insensitive prefixes are lowercased.
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    case_insensitive = bool(parsed.state.flags & re.IGNORECASE)
+    prefixes, _ = _prefixes(list(parsed))
+    if not prefixes or any(not p for p in prefixes):
+        return [], case_insensitive
+    if case_insensitive:
+        prefixes = sorted({p.lower() for p in prefixes})
+    return prefixes, case_insensitive
+
+
+class _LiteralSet:
+    """A compiled set of literals searched in one pass."""
+
+    def __init__(self, literals: Set[bytes]):
+        self.short = sorted(l for l in literals if len(l) <= 2)
+        long_literals = {l for l in literals if len(l) > 2}
+
+        self.regex = None
+        self.prefix_map: Dict[bytes, List[bytes]] = {}
+        # Literals made only of erased-flash bytes can match outside windows
+        self.fill_only = sorted(l for l in long_literals if not l.strip(b"\x00\xff"))
+        self.max_length = max(map(len, long_literals), default=0)
+        if long_literals:
+            self.regex = re.compile(_build_trie_regex(long_literals))
+            # The automaton reports the longest literal at a position; every
+            # registered literal that is a prefix of it matches there too
+            for literal in long_literals:
+                self.prefix_map[literal] = [
+                    literal[:n] for n in range(1, len(literal) + 1)
+                    if literal[:n] in literals
+                ]
+
+    def scan(self, data, windows: Optional[List[Tuple[int, int]]] = None) -> Dict[bytes, List[int]]:
+        """
+        Find all (overlapping) occurrences of every literal.
+
+        Args:
+            data: Bytes to search
+            windows: Optional (start, end) byte ranges that can contain
+                matches; the long-literal pass only searches inside them
+        """
+        hits: Dict[bytes, List[int]] = {}
+
+        if self.regex is not None:
+            search = self.regex.search
+            prefix_map = self.prefix_map
+            for win_start, win_end in windows or [(0, len(data))]:
+                pos = win_start
+                while True:
+                    match = search(data, pos, win_end)
+                    if match is None:
+                        break
+                    start = match.start()
+                    for literal in prefix_map[match.group()]:
+                        hits.setdefault(literal, []).append(start)
+                    pos = start + 1
+
+            if windows is not None:
+                for literal in self.fill_only:
+                    self._scan_full(data, literal, hits)
+
+        if self.short:
+            self._scan_short(data, hits)
+
+        return hits
+
+    @staticmethod
+    def _scan_full(data, literal: bytes, hits: Dict[bytes, List[int]]):
+        overlapping = re.compile(b"(?=" + re.escape(literal) + b")")
+        offsets = [m.start() for m in overlapping.finditer(data)]
+        if offsets:
+            hits[literal] = offsets
+        else:
+            hits.pop(literal, None)
+
+    def _scan_short(self, data, hits: Dict[bytes, List[int]]):
+        """Resolve 1- and 2-byte literals with a vectorized lookup table."""
+        arr = np.frombuffer(data, dtype=np.uint8)
+        one = [l for l in self.short if len(l) == 1]
+        two = [l for l in self.short if len(l) == 2]
+
+        if one and len(arr):
+            self._collect(arr, [l[0] for l in one], one, 256, hits)
+
+        if two and len(arr) >= 2:
+            values = (arr[:-1].astype(np.uint16) << 8) | arr[1:]
+            self._collect(values, [(l[0] << 8) | l[1] for l in two], two, 65536, hits)
+
+    @staticmethod
+    def _collect(values: np.ndarray, keys: List[int], literals: List[bytes],
+                 table_size: int, hits: Dict[bytes, List[int]]):
+        lookup = np.zeros(table_size, dtype=bool)
+        lookup[keys] = True
+        positions = np.flatnonzero(lookup[values])
+        if not len(positions):
+            return
+
+        found = values[positions]
+        order = np.argsort(found, kind="stable")
+        found = found[order]
+        positions = positions[order]
+        boundaries = np.flatnonzero(np.diff(found)) + 1
+        by_key = dict(zip(keys, literals))
+        for group_values, group_positions in zip(
+            np.split(found, boundaries), np.split(positions, boundaries)
+        ):
+            hits[by_key[int(group_values[0])]] = group_positions.tolist()
+
+
+class _PatternRule:
+    """A compiled regex with the literal prefixes it is anchored on."""
+
+    def __init__(self, pattern: bytes, flags: int, regex: Optional[re.Pattern] = None):
+        self.regex = regex if regex is not None else re.compile(pattern, flags)
+        self.anchors, self.case_insensitive = literal_prefixes(pattern, flags)
+
+        # Text-only patterns can be searched inside the printable runs alone
+        parsed = sre_parse.parse(pattern, flags)
+        self.min_width = parsed.getwidth()[0]
+        self.text_only = (
+            self.min_width >= MIN_PRINTABLE_RUN and _is_printable(list(parsed))
+        )
+
+
+class ScanResult:
+    """
+    Hits of one scan over one file.
+
+    Literal queries are answered from the precomputed hit lists; regex
+    queries are verified lazily at their anchor offsets and cached.
+    Unregistered signatures fall back to searching the data directly.
+    """
+
+    def __init__(self, scanner: "SignatureScanner", data,
+                 hits: Dict[bytes, List[int]], ci_hits: Dict[bytes, List[int]],
+                 regions=None, printable_runs: Optional[List[Tuple[int, bytes]]] = None):
+        self._scanner = scanner
+        self._data = data
+        self._hits = hits
+        self._ci_hits = ci_hits
+        self._searches: Dict[Tuple[bytes, int], Optional[re.Match]] = {}
+        self._printable_runs = printable_runs
+        self._regions = regions
+
+    @property
+    def data(self):
+        return self._data
+
+    def printable_runs(self) -> List[Tuple[int, bytes]]:
+        """Printable ASCII runs of the file as (offset, bytes), extracted once."""
+        if self._printable_runs is None:
+            if self._regions is None:
+                self._printable_runs = extract_printable_runs(self._data)
+            else:
+                # Erased flash is never printable, runs lie inside non-empty ranges
+                data = memoryview(self._data)
+                self._printable_runs = [
+                    (start + offset, run)
+                    for start, end in self._regions.non_empty_ranges()
+                    for offset, run in extract_printable_runs(data[start:end])
+                ]
+        return self._printable_runs
+
+    # -------------------------------------------------------------------------
+    # Literal queries
+    # -------------------------------------------------------------------------
+
+    def offsets(self, literal: bytes) -> List[int]:
+        """All (overlapping) offsets of a literal, in file order."""
+        if literal in self._scanner._literals:
+            return self._hits.get(literal, [])
+        return self._scanner._find_all(self._data, literal)
+
+    def find(self, literal: bytes) -> int:
+        """Offset of the first occurrence of a literal, or -1."""
+        offsets = self.offsets(literal)
+        return offsets[0] if offsets else -1
+
+    def contains(self, literal: bytes) -> bool:
+        """True if the literal occurs anywhere in the file."""
+        return bool(self.offsets(literal))
+
+    def count(self, literal: bytes) -> int:
+        """Number of non-overlapping occurrences (same as bytes.count)."""
+        if not literal:
+            return self._data.count(literal)
+        count = 0
+        next_free = 0
+        for offset in self.offsets(literal):
+            if offset >= next_free:
+                count += 1
+                next_free = offset + len(literal)
+        return count
+
+    # -------------------------------------------------------------------------
+    # Regex queries
+    # -------------------------------------------------------------------------
+
+    def search(self, pattern: bytes, flags: int = 0) -> Optional[re.Match]:
+        """First (leftmost) match of a pattern, same as re.search."""
+        key = (pattern, flags)
+        if key not in self._searches:
+            self._searches[key] = next(self.finditer(pattern, flags), None)
+        return self._searches[key]
+
+    def finditer(self, pattern: bytes, flags: int = 0) -> Iterator[re.Match]:
+        """Non-overlapping matches of a pattern, same as re.finditer."""
+        rule = self._scanner._patterns.get((pattern, flags))
+        if rule is None:
+            rule = self._scanner._rule(pattern, flags)
+            return rule.regex.finditer(self._data)
+
+        anchors = self._anchor_offsets(rule)
+        if anchors is None and rule.text_only:
+            return self._search_runs(rule.regex, rule.min_width)
+        if anchors is None or len(anchors) > MAX_ANCHOR_PROBES:
+            return rule.regex.finditer(self._data)
+        return self._probe(rule.regex, anchors)
+
+    def _anchor_offsets(self, rule: _PatternRule) -> Optional[List[int]]:
+        if not rule.anchors:
+            return None
+        hits = self._ci_hits if rule.case_insensitive else self._hits
+        lists = [hits[a] for a in rule.anchors if a in hits]
+        if len(lists) == 1:
+            return lists[0]
+        return sorted(set(merge(*lists)))
+
+    def _search_runs(self, regex: re.Pattern, min_width: int) -> Iterator[re.Match]:
+        # A text-only match can never cross a non-printable byte, so searching
+        # each run (bounded by pos/endpos on the full data) gives the same spans
+        data = self._data
+        for offset, run in self.printable_runs():
+            if len(run) >= min_width:
+                yield from regex.finditer(data, offset, offset + len(run))
+
+    def _probe(self, regex: re.Pattern, anchors: List[int]) -> Iterator[re.Match]:
+        match_at = regex.match
+        data = self._data
+        next_free = 0
+        index = 0
+        while index < len(anchors):
+            offset = anchors[index]
+            if offset >= next_free:
+                match = match_at(data, offset)
+                if match is not None:
+                    yield match
+                    next_free = max(match.end(), offset + 1)
+                    index = bisect_left(anchors, next_free, index)
+                    continue
+            index += 1
+
+
+class SignatureScanner:
+    """
+    Registry of signatures that are searched together in one pass.
+
+    Usage:
+        scanner = SignatureScanner()
+        scanner.add_literal(b"DENSO")
+        scanner.add_pattern(rb"EDC17[A-Z]{2}[0-9]{1,2}")
+        result = scanner.scan(file_data)
+        result.contains(b"DENSO"), result.search(rb"EDC17[A-Z]{2}[0-9]{1,2}")
+    """
+
+    def __init__(self):
+        self._literals: Set[bytes] = set()
+        self._ci_literals: Set[bytes] = set()
+        self._patterns: Dict[Tuple[bytes, int], _PatternRule] = {}
+        self._literal_set: Optional[_LiteralSet] = None
+        self._ci_literal_set: Optional[_LiteralSet] = None
+
+    def add_literal(self, literal: bytes):
+        """Register a literal byte signature."""
+        if literal and literal not in self._literals:
+            self._literals.add(literal)
+            self._literal_set = None
+
+    def add_literals(self, literals):
+        """Register several literal byte signatures."""
+        for literal in literals:
+            self.add_literal(literal)
+
+    def add_pattern(self, pattern: bytes, flags: int = 0, regex: Optional[re.Pattern] = None):
+        """Register a regex pattern (bytes) with optional re flags (and its compiled form)."""
+        key = (pattern, flags)
+        if key in self._patterns:
+            return
+        rule = self._rule(pattern, flags, regex)
+        self._patterns[key] = rule
+        if rule.case_insensitive:
+            self._ci_literals.update(rule.anchors)
+            self._ci_literal_set = None
+        else:
+            for anchor in rule.anchors:
+                self.add_literal(anchor)
+
+    def add_patterns(self, patterns, flags: int = 0):
+        """Register several regex patterns sharing the same flags."""
+        for pattern in patterns:
+            self.add_pattern(pattern, flags)
+
+    def compile(self):
+        """Build the automata (done automatically on first scan)."""
+        if self._literal_set is None:
+            self._literal_set = _LiteralSet(self._literals)
+        if self._ci_literal_set is None:
+            self._ci_literal_set = _LiteralSet(self._ci_literals)
+
+    def scan(self, data, regions=None, printable_runs=None) -> ScanResult:
+        """
+        Scan a file once for all registered signatures.
+
+        Args:
+            data: File contents (bytes, bytearray or memoryview)
+            regions: Optional RegionIndex of the file; erased flash is
+                skipped (results are identical, only faster)
+            printable_runs: Printable runs already extracted from the
+                same data by an earlier scan, if any
+
+        Returns:
+            ScanResult answering literal and regex queries for this file
+        """
+        self.compile()
+        hits = self._literal_set.scan(data, self._windows(regions, self._literal_set))
+        ci_hits = {}
+        if self._ci_literals:
+            ci_hits = self._ci_literal_set.scan(
+                bytes(data).lower(), self._windows(regions, self._ci_literal_set)
+            )
+        return ScanResult(self, data, hits, ci_hits, regions, printable_runs)
+
+    @staticmethod
+    def _windows(regions, literal_set: _LiteralSet) -> Optional[List[Tuple[int, int]]]:
+        """Non-empty ranges widened so every match touching them fits inside"""
+        if regions is None:
+            return None
+        margin = max(literal_set.max_length - 1, 0)
+        windows = []
+        for start, end in regions.non_empty_ranges(min_gap=2 * margin + 1):
+            windows.append((max(start - margin, 0), min(end + margin, regions.size)))
+        return windows
+
+    @staticmethod
+    def _rule(pattern: bytes, flags: int, regex: Optional[re.Pattern] = None) -> _PatternRule:
+        return _PatternRule(pattern, flags, regex)
+
+    @staticmethod
+    def _find_all(data, literal: bytes) -> List[int]:
+        overlapping = re.compile(b"(?=" + re.escape(literal) + b")")
+        offsets = [m.start() for m in overlapping.finditer(data)]
+        return offsets
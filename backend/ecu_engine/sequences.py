@@ -0,0 +1,94 @@
+"""
+ECU Processing Engine - Sequence Search
+========================================
+Structural "value A followed by value B within N bytes" queries.
+
+Used for signatures that are not a single literal, such as the EDC17
+DPF switch (4081 followed by 15). Both values are located over the
+whole file with NumPy stride comparisons, then paired with a sorted
+search, so no per-offset Python work is done.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def literal_offsets(data, literal: bytes, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+    """
+    All (overlapping) offsets of a literal, in file order.
+
+    Args:
+        data: File contents (bytes, bytearray or memoryview)
+        literal: Non-empty byte string to look for
+        start: First offset to consider
+        end: Matches must end at or before this offset (default: end of data)
+
+    Returns:
+        Sorted int64 array of offsets
+    """
+    if not literal:
+        raise ValueError("literal must not be empty")
+    end = len(data) if end is None else min(end, len(data))
+    count = end - start - len(literal) + 1
+    if start < 0 or count <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    window = np.frombuffer(data, dtype=np.uint8, count=end - start, offset=start)
+    mask = window[:count] == literal[0]
+    for k in range(1, len(literal)):
+        mask &= window[k:k + count] == literal[k]
+    return np.flatnonzero(mask) + start
+
+
+def find_followed_by(
+    data,
+    first: bytes,
+    second: bytes,
+    within: int,
+    start: int = 0,
+    end: Optional[int] = None,
+    first_offsets: Optional[Sequence[int]] = None,
+) -> List[int]:
+    """
+    Offsets of `first` that are followed by `second` within `within` bytes.
+
+    `second` must lie entirely inside the `within` bytes that directly
+    follow `first`, i.e. inside data[i + len(first):i + len(first) + within].
+
+    Args:
+        data: File contents (bytes, bytearray or memoryview)
+        first: Leading value
+        second: Value that has to follow it
+        within: Size of the window after `first`, in bytes
+        start: First offset of `first` to consider
+        end: Offsets of `first` must be below this (default: whole file)
+        first_offsets: Already known offsets of `first` (e.g. from a
+            ScanResult), to skip searching for it again
+
+    Returns:
+        Matching offsets of `first`, in file order
+    """
+    if first_offsets is None:
+        firsts = literal_offsets(data, first, start)
+    else:
+        firsts = np.asarray(first_offsets, dtype=np.int64)
+        firsts = firsts[firsts >= start]
+    if end is not None:
+        firsts = firsts[firsts < end]
+
+    span = within - len(second)
+    if span < 0 or not len(firsts):
+        return []
+
+    seconds = literal_offsets(data, second, int(firsts[0]) + len(first))
+    if not len(seconds):
+        return []
+
+    # First `second` at or after the window start must also start
+    # early enough to end inside the window
+    window_starts = firsts + len(first)
+    index = np.searchsorted(seconds, window_starts)
+    found = index < len(seconds)
+    found[found] = seconds[index[found]] <= window_starts[found] + span
+    return firsts[found].tolist()
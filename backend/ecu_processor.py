@@ -9,6 +9,10 @@ from typing import Dict, List, Tuple
 from enum import Enum
 import logging
 
+from ecu_engine.checksum_kernels import word_sum, word_xor
+from ecu_engine.map_discovery import discover_maps
+from ecu_engine.patches import PatchPlan, describe_overrides
+
 logger = logging.getLogger(__name__)
 
 
@@ -332,8 +336,19 @@ class MapLocator:
                     "confidence": 0.60,
                     "action": action.value
                 })
+                if len(found_maps) == 5:
+                    break
         
-        return found_maps[:5]  # Return top 5 candidates
+        return found_maps
+    
+    @staticmethod
+    def discover_maps(file_data: bytes, limit: int = 5) -> List[Dict]:
+        """
+        Axis-backed 2D maps found by structural discovery (info only).
+        These are generic calibration tables, not maps tied to an action,
+        so they must never be handed to ECUModifier.
+        """
+        return [candidate.to_dict() for candidate in discover_maps(file_data, limit=limit)]
 
 
 class ECUModifier:
@@ -444,19 +459,14 @@ class ChecksumCalculator:
     @staticmethod
     def _bosch_edc16_checksum(file_data: bytes) -> int:
         """Bosch EDC16 checksum algorithm"""
-        checksum = 0
-        for i in range(0, len(file_data) - 4, 4):
-            word = struct.unpack('>I', file_data[i:i+4])[0]
-            checksum ^= word
-        return checksum & 0xFFFFFFFF
+        # Big-endian words starting below len - 4 (all of them are whole)
+        words = -(-(len(file_data) - 4) // 4) if len(file_data) > 4 else 0
+        return word_xor(file_data[:words * 4], 4, "big")
     
     @staticmethod
     def _bosch_edc17_checksum(file_data: bytes) -> int:
         """Bosch EDC17 checksum algorithm"""
-        checksum = 0xFFFFFFFF
-        for byte in file_data[:-4]:
-            checksum = (checksum + byte) & 0xFFFFFFFF
-        return checksum
+        return (0xFFFFFFFF + word_sum(file_data[:-4])) & 0xFFFFFFFF
     
     @staticmethod
     def _generic_checksum(file_data: bytes) -> int:
@@ -468,7 +478,7 @@ class ChecksumCalculator:
     def fix_checksum(file_data: bytearray, ecu_type: ECUType) -> bytearray:
         """Recalculate and fix checksum"""
         # Calculate new checksum
-        new_checksum = ChecksumCalculator.calculate_checksum(bytes(file_data[:-4]), ecu_type)
+        new_checksum = ChecksumCalculator.calculate_checksum(memoryview(file_data)[:-4], ecu_type)
         
         # Write checksum to last 4 bytes
         file_data[-4:] = struct.pack('>I', new_checksum)
@@ -498,6 +508,7 @@ class ECUProcessor:
             "available_services": [],
             "pricing": [],
             "total_if_all_selected": 0.0,
+            "discovered_maps": [],
             "warnings": []
         }
         
@@ -510,6 +521,9 @@ class ECUProcessor:
             result["warnings"].append("Could not reliably identify ECU type")
             return result
         
+        # Informational map catalogue (never modified by the legacy path)
+        result["discovered_maps"] = self.map_locator.discover_maps(file_data)
+        
         # Step 2: Detect available systems
         available_systems = self.analyzer.detect_available_systems(file_data, ecu_type)
         
@@ -604,6 +618,7 @@ class ECUProcessor:
             "actions_applied": [],
             "warnings": [],
             "processed_file": None,
+            "patches": [],
             "confidence_level": None
         }
         
@@ -617,43 +632,43 @@ class ECUProcessor:
             result["confidence_level"] = ConfidenceLevel.VERY_LOW.value
             return result
         
-        # Convert to mutable bytearray
-        modified_data = bytearray(file_data)
+        # Every action records patches against the original file
+        plan = PatchPlan(file_data)
         
         # Step 2: Process each selected action
         action_confidences = []
         
         for action_str in selected_actions:
+            plan.source = action_str
             try:
                 action = ProcessingAction(action_str)
                 
                 # Handle DTC removal
                 if action == ProcessingAction.DTC_SINGLE or action == ProcessingAction.DTC_MULTIPLE:
-                    modified_data = self.modifier.remove_dtc_codes(modified_data, ecu_type)
+                    self.modifier.remove_dtc_codes(plan, ecu_type)
                     result["actions_applied"].append(action_str)
                     action_confidences.append(0.95)
-                # Handle Checksum correction
+                # Handle Checksum correction (done once, after all patches)
                 elif action == ProcessingAction.CHECKSUM:
-                    modified_data = self.checksum_calc.fix_checksum(modified_data, ecu_type)
                     result["actions_applied"].append(action_str)
                     action_confidences.append(0.98)
                 # Handle EGR+DPF combo
                 elif action == ProcessingAction.EGR_DPF_COMBO:
                     # Process both EGR and DPF
-                    egr_maps = self.map_locator.find_maps(bytes(modified_data), ecu_type, ProcessingAction.EGR_REMOVAL)
-                    dpf_maps = self.map_locator.find_maps(bytes(modified_data), ecu_type, ProcessingAction.DPF_REMOVAL)
+                    egr_maps = self.map_locator.find_maps(file_data, ecu_type, ProcessingAction.EGR_REMOVAL)
+                    dpf_maps = self.map_locator.find_maps(file_data, ecu_type, ProcessingAction.DPF_REMOVAL)
                     
                     if egr_maps:
-                        modified_data = self.modifier.apply_egr_removal(modified_data, egr_maps)
+                        self.modifier.apply_egr_removal(plan, egr_maps)
                     if dpf_maps:
-                        modified_data = self.modifier.apply_dpf_removal(modified_data, dpf_maps)
+                        self.modifier.apply_dpf_removal(plan, dpf_maps)
                     
                     result["actions_applied"].append(action_str)
                     avg_confidence = np.mean([m["confidence"] for m in (egr_maps + dpf_maps)] or [0.70])
                     action_confidences.append(avg_confidence)
                 else:
                     # Find maps for this action
-                    maps = self.map_locator.find_maps(bytes(modified_data), ecu_type, action)
+                    maps = self.map_locator.find_maps(file_data, ecu_type, action)
                     
                     if not maps:
                         result["warnings"].append(f"No maps found for {action_str}")
@@ -662,13 +677,13 @@ class ECUProcessor:
                     
                     # Apply modification
                     if action == ProcessingAction.DPF_REMOVAL:
-                        modified_data = self.modifier.apply_dpf_removal(modified_data, maps)
+                        self.modifier.apply_dpf_removal(plan, maps)
                     elif action == ProcessingAction.ADBLUE_REMOVAL:
-                        modified_data = self.modifier.apply_adblue_removal(modified_data, maps)
+                        self.modifier.apply_adblue_removal(plan, maps)
                     elif action == ProcessingAction.EGR_REMOVAL:
-                        modified_data = self.modifier.apply_egr_removal(modified_data, maps)
+                        self.modifier.apply_egr_removal(plan, maps)
                     elif action == ProcessingAction.IMMO_OFF:
-                        modified_data = self.modifier.apply_immo_off(modified_data, maps)
+                        self.modifier.apply_immo_off(plan, maps)
                     
                     result["actions_applied"].append(action_str)
                     avg_map_confidence = np.mean([m["confidence"] for m in maps])
@@ -679,9 +694,15 @@ class ECUProcessor:
                 result["warnings"].append(f"Error with {action_str}: {str(e)}")
                 action_confidences.append(0.20)
         
-        # Step 3: Fix checksum
+        # Where two actions disagree about the same bytes, the later one wins
+        result["warnings"].extend(describe_overrides(plan.resolve_conflicts()))
+        
+        # Step 3: Apply all patches in one pass, then fix the checksum once
+        modified_data = plan.apply()
         try:
             modified_data = self.checksum_calc.fix_checksum(modified_data, ecu_type)
+            if len(file_data) >= 4:
+                plan.override(len(file_data) - 4, bytes(modified_data[-4:]), source="checksum")
         except Exception as e:
             result["warnings"].append(f"Checksum correction may have failed: {str(e)}")
         
@@ -704,6 +725,7 @@ class ECUProcessor:
             result["confidence_level"] = ConfidenceLevel.VERY_LOW.value
         
         result["processed_file"] = bytes(modified_data)
+        result["patches"] = plan.to_list()
         result["success"] = len(result["actions_applied"]) > 0
         
         return result
@@ -0,0 +1,47 @@
+"""
+Migrate Customer Emails to their Lookup Form
+Sets customer_email_lc on service_requests and orders written before it existed
+
+The server also runs this at startup; run it by hand to migrate ahead of
+a deployment.
+
+Usage:
+    python migrate_customer_emails.py
+"""
+
+import asyncio
+import os
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+from customer_orders import backfill_customer_email_lc
+from db_indexes import INDEXES, ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+# Load environment
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'test_database')
+
+
+async def migrate_customer_emails():
+    """Backfill customer_email_lc and create its indexes"""
+
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    updated = await backfill_customer_email_lc(db)
+    logger.info(f"Updated {updated} orders")
+
+    await ensure_indexes(db, [spec for spec in INDEXES if spec.keys[0][0] == "customer_email_lc"])
+    client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(migrate_customer_emails())
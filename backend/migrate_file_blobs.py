@@ -0,0 +1,96 @@
+"""
+Migrate Stored File Contents into the Blob Store
+Moves `file_content_b64` out of dtc_files and dtc_processed documents
+
+Those documents used to carry the whole file as base64 so it survived a
+redeployment. The blob store keeps it instead (on disk, with a durable
+GridFS copy), and the document only keeps its `file_hash`.
+
+Documents are migrated one at a time, so only one file is in memory.
+The server also migrates a document on first use (migrate_document).
+
+Usage:
+    python migrate_file_blobs.py [--dry-run]
+"""
+
+import asyncio
+import base64
+import os
+import sys
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Optional
+
+from blob_store import BlobStore, blob_ref, BLOB_BUCKET, REF_DTC_FILE, REF_DTC_PROCESSED
+
+logger = logging.getLogger(__name__)
+
+# Load environment
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'test_database')
+
+# (collection, id field, referrer kind) of documents with stored files
+FILE_COLLECTIONS = [
+    ("dtc_files", "id", REF_DTC_FILE),
+    ("dtc_processed", "download_id", REF_DTC_PROCESSED),
+]
+
+
+async def migrate_document(blob_store: BlobStore, collection, query: dict, ref: str) -> Optional[str]:
+    """
+    Move the base64 file content of one document into the blob store.
+
+    Returns:
+        The blob hash, or None if the document has no file content
+    """
+    doc = await collection.find_one(
+        {**query, "file_content_b64": {"$exists": True}}, {"file_content_b64": 1}
+    )
+    if not doc:
+        return None
+    data = base64.b64decode(doc["file_content_b64"])
+    blob_hash = await asyncio.to_thread(blob_store.put_bytes, data)
+    await blob_store.add_ref(blob_hash, ref)
+    await collection.update_one(
+        {"_id": doc["_id"]},
+        {"$set": {"file_hash": blob_hash}, "$unset": {"file_content_b64": ""}},
+    )
+    return blob_hash
+
+
+async def migrate_file_blobs(dry_run: bool = False):
+    """Migrate every document that still carries its file as base64"""
+
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    blob_store = BlobStore(ROOT_DIR / "blobs", db.blobs, AsyncIOMotorGridFSBucket(db, bucket_name=BLOB_BUCKET))
+
+    for name, id_field, kind in FILE_COLLECTIONS:
+        collection = db[name]
+        # Ids only - the file contents are loaded one document at a time
+        ids = await collection.distinct(id_field, {"file_content_b64": {"$exists": True}})
+        logger.info(f"{name}: {len(ids)} documents with base64 file content")
+        if dry_run:
+            continue
+
+        migrated = 0
+        for doc_id in ids:
+            try:
+                if await migrate_document(blob_store, collection, {id_field: doc_id}, blob_ref(kind, doc_id)):
+                    migrated += 1
+            except Exception as e:
+                logger.error(f"{name} {doc_id}: migration failed: {e}")
+        logger.info(f"{name}: migrated {migrated} documents")
+
+    logger.info(f"Blob store: {blob_store.get_stats()}")
+    client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(migrate_file_blobs(dry_run="--dry-run" in sys.argv))
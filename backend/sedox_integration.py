@@ -20,6 +20,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
 
+from upload_ingest import write_file
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -285,8 +287,7 @@ class SedoxIntegration:
         safe_filename = f"{order_id}_{filename}"
         save_path = save_dir / safe_filename
         
-        with open(save_path, "wb") as f:
-            f.write(file_data)
+        await asyncio.to_thread(write_file, save_path, file_data)
         
         logger.info(f"Processed file saved: {save_path}")
         
@@ -1,25 +1,26 @@
 from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 import os
+import asyncio
 import logging
-import base64
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 from enum import Enum
-import shutil
 import json
 
 # Import AI ECU Processor (mock - for fallback)
-from ecu_processor import ECUProcessor, ConfidenceLevel
+from ecu_processor import ConfidenceLevel
 
 # Import Real ECU Analyzer
-from ecu_analyzer import ECUAnalyzer
+from ecu_analyzer import (
+    ANALYSIS_STAGES, ANALYSIS_STAGE_FIELDS, STAGE_IDENTIFICATION, STAGE_SERVICES,
+)
 
 # Import Email Service
 from email_service import send_order_confirmation, send_download_ready_email, test_email_connection
@@ -33,6 +34,39 @@ from ecu_engine import ECUFileProcessor, ECUDefinitionDB, ModificationType as En
 # Import DTC Delete Engine
 from dtc_engine import dtc_delete_engine, DTCDatabase
 
+# Import Analysis Result Cache
+from analysis_cache import (
+    AnalysisCache,
+    KIND_ECU_ANALYSIS, KIND_DTC_ANALYSIS, KIND_ENGINE_ANALYSIS, KIND_CHECKSUM_STATES,
+)
+
+# Import Upload Ingestion (chunked, hashed, size-limited uploads)
+from upload_ingest import (
+    StoredUpload, UploadError, MAX_UPLOAD_SIZE, MAX_ADMIN_UPLOAD_SIZE, write_file,
+)
+
+# Import Content-Addressed Blob Store (deduplicated file storage)
+from blob_store import (
+    BlobStore, blob_ref, BLOB_BUCKET, REF_ORDER, REF_DTC_FILE, REF_DTC_PROCESSED, REF_SERVICE_REQUEST,
+    REF_UPLOAD,
+)
+from migrate_file_blobs import migrate_document
+
+# Import MongoDB Index Registry (indexes of hot lookups, query plan checks)
+from db_indexes import ensure_indexes, explain_hot_queries
+
+# Import Customer Order Lookups (portal access by normalized email)
+from customer_orders import (
+    normalize_email, find_customer_order, find_customer_orders, backfill_customer_email_lc,
+)
+
+# Import Analysis Process Pool (CPU-bound work off the event loop)
+from analysis_pool import (
+    AnalysisPool, AnalysisPoolError,
+    analyze_ecu, identify_ecu, analyze_dtcs, delete_dtcs, scan_all_dtcs, engine_analyze, engine_process,
+    engine_checksum_states, legacy_process,
+)
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -42,15 +76,22 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Content-addressed cache of analysis results (LRU + MongoDB)
+analysis_cache = AnalysisCache(db.analysis_cache)
+
+# Uploaded files, stored once per content (named paths link into it),
+# with durable copies of referenced files in GridFS
+blob_store = BlobStore(ROOT_DIR / "blobs", db.blobs, AsyncIOMotorGridFSBucket(db, bucket_name=BLOB_BUCKET))
+
+# Worker processes for binary analysis/processing (started on app startup)
+analysis_pool = AnalysisPool()
+
 # Create uploads and processed directories (relative to server.py location)
 UPLOAD_DIR = ROOT_DIR / "uploads"
 PROCESSED_DIR = ROOT_DIR / "processed"
 UPLOAD_DIR.mkdir(exist_ok=True)
 PROCESSED_DIR.mkdir(exist_ok=True)
 
-# Initialize AI ECU Processor
-ecu_processor = ECUProcessor()
-
 # Initialize NEW ECU Processing Engine
 ecu_file_processor = ECUFileProcessor()
 ecu_definition_db = ECUDefinitionDB()
@@ -702,6 +743,238 @@ async def calculate_price(service_ids: List[str]):
     return calculate_pricing(service_ids)
 
 
+# File extensions accepted for ECU uploads
+ALLOWED_ECU_EXTENSIONS = [".bin", ".hex", ".ecu", ".ori", ".mod", ".frf", ".sgm"]
+
+
+async def store_upload(file: UploadFile, dest: Path, max_size: int = MAX_UPLOAD_SIZE) -> StoredUpload:
+    """
+    Stream an upload into the blob store and name it dest.
+    
+    Rejected uploads (see upload_ingest) become HTTP errors.
+    """
+    try:
+        upload = await blob_store.ingest(file, max_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    blob_store.link(upload.sha256, dest)
+    return upload
+
+
+async def reference_upload(upload: StoredUpload, file_id: str):
+    """Keep a customer upload until it expires (see BlobStore.expire_links)"""
+    await blob_store.add_ref(upload.sha256, blob_ref(REF_UPLOAD, file_id), durable=False)
+
+
+async def reference_uploaded_file(file_id: str, ref: str):
+    """Register ref as a referrer of the original uploaded as file_id"""
+    paths = list(UPLOAD_DIR.glob(f"{file_id}_original*")) + list(UPLOAD_DIR.glob(f"{file_id}.*"))
+    for path in paths:
+        blob_hash = await asyncio.to_thread(blob_store.adopt, path)
+        await blob_store.add_ref(blob_hash, ref)
+
+
+async def stored_file_path(collection, query: dict, doc: dict, ref: str) -> Path:
+    """
+    Local path of the file stored with a document (dtc_files, dtc_processed).
+
+    The document keeps the blob hash of its file ("file_hash"); the blob
+    is restored from its durable copy if the disk lost it. Documents that
+    still carry the file as base64 are migrated on first use.
+    """
+    blob_hash = doc.get("file_hash") or await migrate_document(blob_store, collection, query, ref)
+    if not blob_hash:
+        raise HTTPException(status_code=404, detail="File data not found. Please re-upload the file.")
+    try:
+        return await blob_store.local_path(blob_hash)
+    except FileNotFoundError:
+        logger.error(f"Blob {blob_hash} missing on disk and in the durable store")
+        raise HTTPException(status_code=404, detail="File data not found. Please re-upload the file.")
+
+
+async def store_uploaded_ecu_file(file: UploadFile) -> Tuple[str, StoredUpload]:
+    """
+    Validate an uploaded ECU file and store it as the original.
+    
+    Returns:
+        (new file ID, stored upload)
+    """
+    # Validate file extension
+    file_ext = Path(file.filename).suffix.lower()
+    
+    if file_ext not in ALLOWED_ECU_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Only ECU files ({', '.join(ALLOWED_ECU_EXTENSIONS)}) are allowed."
+        )
+    
+    # Generate file ID and save original file
+    file_id = str(uuid.uuid4())
+    original_filename = f"{file_id}_original{file_ext}"
+    original_filepath = UPLOAD_DIR / original_filename
+    
+    upload = await store_upload(file, original_filepath)
+    await reference_upload(upload, file_id)
+    return file_id, upload
+
+
+def build_available_options(detected_services: list, file_id: str) -> list:
+    """Priced service options for the services the analyzer detected"""
+    # Define all possible services with CORRECT pricing (matching SERVICE_PRICING)
+    all_services = {
+        "dpf_off": {"service_name": "DPF Removal", "price": 248.0},
+        "egr_off": {"service_name": "EGR Removal", "price": 50.0},
+        "dpf_egr_off": {"service_name": "DPF & EGR Combo", "price": 248.0},  # Combo deal
+        "adblue_off": {"service_name": "AdBlue/SCR Removal", "price": 698.0},
+        "dtc_off": {"service_name": "DTC/Error Code Removal", "price": 10.0},  # Base price for 1 DTC
+        "lambda_off": {"service_name": "Lambda/O2 Sensor Removal", "price": 50.0},
+        "cat_off": {"service_name": "Catalyst Removal", "price": 50.0},
+        "speed_limiter": {"service_name": "Speed Limiter Removal", "price": 30.0},
+        "start_stop_off": {"service_name": "Start/Stop Disable", "price": 40.0},
+        "swirl_off": {"service_name": "Swirl Flaps Removal", "price": 40.0},
+        "hot_start": {"service_name": "Hot Start Fix / Immo", "price": 70.0},
+        "stage_tuning": {"service_name": "Stage 1/2 Tuning", "price": 248.0},
+    }
+    
+    # Check if DPF was detected
+    dpf_detected = any(s.get('service_id') == 'dpf_off' for s in detected_services)
+    egr_detected = any(s.get('service_id') == 'egr_off' for s in detected_services)
+    
+    dpf_confidence = "low"
+    dpf_indicators = []
+    egr_confidence = "low"
+    egr_indicators = []
+    
+    for s in detected_services:
+        if s.get('service_id') == 'dpf_off':
+            dpf_confidence = s.get('confidence', 'low')
+            dpf_indicators = s.get('indicators', [])
+        if s.get('service_id') == 'egr_off':
+            egr_confidence = s.get('confidence', 'low')
+            egr_indicators = s.get('indicators', [])
+    
+    # Build available options - ONLY show what was actually detected
+    available_options = []
+    
+    # Add DPF if detected
+    if dpf_detected:
+        available_options.append({
+            "service_id": "dpf_off",
+            "service_name": all_services["dpf_off"]["service_name"],
+            "price": all_services["dpf_off"]["price"],
+            "file_id": f"{file_id}_dpf_off",
+            "detected": True,
+            "confidence": dpf_confidence,
+            "indicators": dpf_indicators
+        })
+    
+    # Add EGR if detected
+    if egr_detected:
+        available_options.append({
+            "service_id": "egr_off",
+            "service_name": all_services["egr_off"]["service_name"],
+            "price": all_services["egr_off"]["price"],
+            "file_id": f"{file_id}_egr_off",
+            "detected": True,
+            "confidence": egr_confidence,
+            "indicators": egr_indicators
+        })
+    
+    # Add DPF & EGR Combo only if BOTH are detected
+    if dpf_detected and egr_detected:
+        combo_confidence = min(dpf_confidence, egr_confidence, key=lambda x: {"high": 0, "medium": 1, "low": 2}.get(x, 3))
+        available_options.append({
+            "service_id": "dpf_egr_off",
+            "service_name": all_services["dpf_egr_off"]["service_name"],
+            "price": all_services["dpf_egr_off"]["price"],
+            "file_id": f"{file_id}_dpf_egr_off",
+            "detected": True,
+            "confidence": combo_confidence,
+            "indicators": ["DPF + EGR both detected in file"]
+        })
+    
+    # Add other detected services
+    for detected_svc in detected_services:
+        service_id = detected_svc.get('service_id', '')
+        # Skip DPF and EGR as they're handled above
+        if service_id in ['dpf_off', 'egr_off']:
+            continue
+        if service_id in all_services:
+            svc_info = all_services[service_id]
+            available_options.append({
+                "service_id": service_id,
+                "service_name": svc_info["service_name"],
+                "price": svc_info["price"],
+                "file_id": f"{file_id}_{service_id}",
+                "detected": True,
+                "confidence": detected_svc.get('confidence', 'low'),
+                "indicators": detected_svc.get('indicators', [])
+            })
+    
+    # Sort: DPF/EGR/Combo first (by service_id), then by confidence
+    def sort_key(x):
+        # Priority order for DPF-related services
+        priority = {
+            "dpf_off": 0,
+            "egr_off": 1, 
+            "dpf_egr_off": 2
+        }
+        service_priority = priority.get(x.get('service_id', ''), 10)
+        confidence_order = {"high": 0, "medium": 1, "low": 2}
+        conf_priority = confidence_order.get(x.get('confidence', 'low'), 3)
+        return (service_priority, conf_priority)
+    
+    available_options.sort(key=sort_key)
+    return available_options
+
+
+def build_analysis_metadata(display_info: dict) -> dict:
+    """ECU metadata shown with the analysis (only the fields that were found)"""
+    # Add metadata if found
+    metadata = {}
+    if display_info.get('calibration_id'):
+        metadata['calibration_id'] = display_info['calibration_id']
+    if display_info.get('software_version'):
+        metadata['software_version'] = display_info['software_version']
+    if display_info.get('hardware_version'):
+        metadata['hardware_version'] = display_info['hardware_version']
+    if display_info.get('part_number'):
+        metadata['part_number'] = display_info['part_number']
+    if display_info.get('vin'):
+        metadata['vin'] = display_info['vin']
+    if display_info.get('processor'):
+        metadata['processor'] = display_info['processor']
+    if display_info.get('ecu_generation'):
+        metadata['ecu_generation'] = display_info['ecu_generation']
+    if display_info.get('flash_type'):
+        metadata['flash_type'] = display_info['flash_type']
+    if display_info.get('vehicle_info'):
+        metadata['vehicle_info'] = display_info['vehicle_info']
+    if display_info.get('strings'):
+        metadata['strings'] = display_info['strings']
+    return metadata
+
+
+def build_analysis_response(file_id: str, filename: str, display_info: dict, detected_dtcs: list) -> dict:
+    """Response body of the file analysis endpoints"""
+    available_options = build_available_options(display_info.get('available_services', []), file_id)
+    
+    return {
+        "success": True,
+        "file_id": file_id,
+        "original_filename": filename,
+        "file_size_mb": display_info['file_size_mb'],
+        "detected_ecu": display_info['ecu_type'],
+        "detected_manufacturer": display_info['manufacturer'],
+        "metadata": build_analysis_metadata(display_info),
+        "available_options": available_options,
+        "detected_maps": display_info.get('detected_maps', {}),
+        "detected_dtcs": detected_dtcs,
+        "total_services_detected": len(available_options),
+        "message": f"File analyzed! {len(available_options)} service(s) detected based on ECU content."
+    }
+
+
 @api_router.post("/analyze-and-process-file")
 async def analyze_and_process_file(file: UploadFile = File(...)):
     """
@@ -709,202 +982,131 @@ async def analyze_and_process_file(file: UploadFile = File(...)):
     Uses real ECU analyzer to detect manufacturer and ECU type
     """
     try:
-        # Read file
-        file_data = await file.read()
+        file_id, upload = await store_uploaded_ecu_file(file)
         
-        # Validate file extension
-        allowed_extensions = [".bin", ".hex", ".ecu", ".ori", ".mod", ".frf", ".sgm"]
-        file_ext = Path(file.filename).suffix.lower()
-        
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Only ECU files ({', '.join(allowed_extensions)}) are allowed."
-            )
-        
-        # Generate file ID and save original file
-        file_id = str(uuid.uuid4())
-        original_filename = f"{file_id}_original{file_ext}"
-        original_filepath = UPLOAD_DIR / original_filename
-        
-        with open(original_filepath, "wb") as f:
-            f.write(file_data)
-        
-        # Use real ECU Analyzer
-        analyzer = ECUAnalyzer()
-        analyzer.analyze(file_data)
-        display_info = analyzer.get_display_info()
-        
-        # Get detected services from analyzer
-        detected_services = display_info.get('available_services', [])
-        
-        # Define all possible services with CORRECT pricing (matching SERVICE_PRICING)
-        all_services = {
-            "dpf_off": {"service_name": "DPF Removal", "price": 248.0},
-            "egr_off": {"service_name": "EGR Removal", "price": 50.0},
-            "dpf_egr_off": {"service_name": "DPF & EGR Combo", "price": 248.0},  # Combo deal
-            "adblue_off": {"service_name": "AdBlue/SCR Removal", "price": 698.0},
-            "dtc_off": {"service_name": "DTC/Error Code Removal", "price": 10.0},  # Base price for 1 DTC
-            "lambda_off": {"service_name": "Lambda/O2 Sensor Removal", "price": 50.0},
-            "cat_off": {"service_name": "Catalyst Removal", "price": 50.0},
-            "speed_limiter": {"service_name": "Speed Limiter Removal", "price": 30.0},
-            "start_stop_off": {"service_name": "Start/Stop Disable", "price": 40.0},
-            "swirl_off": {"service_name": "Swirl Flaps Removal", "price": 40.0},
-            "hot_start": {"service_name": "Hot Start Fix / Immo", "price": 70.0},
-            "stage_tuning": {"service_name": "Stage 1/2 Tuning", "price": 248.0},
-        }
-        
-        # Check if DPF was detected
-        dpf_detected = any(s.get('service_id') == 'dpf_off' for s in detected_services)
-        egr_detected = any(s.get('service_id') == 'egr_off' for s in detected_services)
-        
-        dpf_confidence = "low"
-        dpf_indicators = []
-        egr_confidence = "low"
-        egr_indicators = []
-        
-        for s in detected_services:
-            if s.get('service_id') == 'dpf_off':
-                dpf_confidence = s.get('confidence', 'low')
-                dpf_indicators = s.get('indicators', [])
-            if s.get('service_id') == 'egr_off':
-                egr_confidence = s.get('confidence', 'low')
-                egr_indicators = s.get('indicators', [])
-        
-        # Build available options - ONLY show what was actually detected
-        available_options = []
-        
-        # Add DPF if detected
-        if dpf_detected:
-            available_options.append({
-                "service_id": "dpf_off",
-                "service_name": all_services["dpf_off"]["service_name"],
-                "price": all_services["dpf_off"]["price"],
-                "file_id": f"{file_id}_dpf_off",
-                "detected": True,
-                "confidence": dpf_confidence,
-                "indicators": dpf_indicators
-            })
-        
-        # Add EGR if detected
-        if egr_detected:
-            available_options.append({
-                "service_id": "egr_off",
-                "service_name": all_services["egr_off"]["service_name"],
-                "price": all_services["egr_off"]["price"],
-                "file_id": f"{file_id}_egr_off",
-                "detected": True,
-                "confidence": egr_confidence,
-                "indicators": egr_indicators
-            })
-        
-        # Add DPF & EGR Combo only if BOTH are detected
-        if dpf_detected and egr_detected:
-            combo_confidence = min(dpf_confidence, egr_confidence, key=lambda x: {"high": 0, "medium": 1, "low": 2}.get(x, 3))
-            available_options.append({
-                "service_id": "dpf_egr_off",
-                "service_name": all_services["dpf_egr_off"]["service_name"],
-                "price": all_services["dpf_egr_off"]["price"],
-                "file_id": f"{file_id}_dpf_egr_off",
-                "detected": True,
-                "confidence": combo_confidence,
-                "indicators": ["DPF + EGR both detected in file"]
-            })
-        
-        # Add other detected services
-        for detected_svc in detected_services:
-            service_id = detected_svc.get('service_id', '')
-            # Skip DPF and EGR as they're handled above
-            if service_id in ['dpf_off', 'egr_off']:
-                continue
-            if service_id in all_services:
-                svc_info = all_services[service_id]
-                available_options.append({
-                    "service_id": service_id,
-                    "service_name": svc_info["service_name"],
-                    "price": svc_info["price"],
-                    "file_id": f"{file_id}_{service_id}",
-                    "detected": True,
-                    "confidence": detected_svc.get('confidence', 'low'),
-                    "indicators": detected_svc.get('indicators', [])
-                })
-        
-        # Sort: DPF/EGR/Combo first (by service_id), then by confidence
-        def sort_key(x):
-            # Priority order for DPF-related services
-            priority = {
-                "dpf_off": 0,
-                "egr_off": 1, 
-                "dpf_egr_off": 2
-            }
-            service_priority = priority.get(x.get('service_id', ''), 10)
-            confidence_order = {"high": 0, "medium": 1, "low": 2}
-            conf_priority = confidence_order.get(x.get('confidence', 'low'), 3)
-            return (service_priority, conf_priority)
-        
-        available_options.sort(key=sort_key)
-        
-        # Build ECU info string
-        ecu_info = display_info['ecu_type']
-        if display_info['manufacturer'] and display_info['manufacturer'] != 'Unknown':
-            if display_info['manufacturer'] not in ecu_info:
-                ecu_info = f"{display_info['manufacturer']} - {ecu_info}"
-        
-        # Add metadata if found
-        metadata = {}
-        if display_info.get('calibration_id'):
-            metadata['calibration_id'] = display_info['calibration_id']
-        if display_info.get('software_version'):
-            metadata['software_version'] = display_info['software_version']
-        if display_info.get('hardware_version'):
-            metadata['hardware_version'] = display_info['hardware_version']
-        if display_info.get('part_number'):
-            metadata['part_number'] = display_info['part_number']
-        if display_info.get('vin'):
-            metadata['vin'] = display_info['vin']
-        if display_info.get('processor'):
-            metadata['processor'] = display_info['processor']
-        if display_info.get('ecu_generation'):
-            metadata['ecu_generation'] = display_info['ecu_generation']
-        if display_info.get('flash_type'):
-            metadata['flash_type'] = display_info['flash_type']
-        if display_info.get('vehicle_info'):
-            metadata['vehicle_info'] = display_info['vehicle_info']
-        if display_info.get('strings'):
-            metadata['strings'] = display_info['strings']
+        # Use real ECU Analyzer (cached by file content)
+        file_hash = upload.sha256
+        file_path = str(upload.path)
+        display_info = await analysis_cache.get_or_compute(
+            KIND_ECU_ANALYSIS, file_hash, lambda: analysis_pool.run(analyze_ecu, file_path)
+        )
         
         # Scan for DTCs using the DTC Engine with DaVinci database
         detected_dtcs = []
         try:
-            from dtc_engine import DTCDeleteEngine
-            dtc_engine = DTCDeleteEngine()
-            dtc_analysis = dtc_engine.analyze_file(file_data)
+            dtc_analysis = await analysis_cache.get_or_compute(
+                KIND_DTC_ANALYSIS, file_hash, lambda: analysis_pool.run(analyze_dtcs, file_path)
+            )
             detected_dtcs = dtc_analysis.get("detected_dtcs", [])
         except Exception as dtc_err:
             logger.warning(f"DTC scan warning: {dtc_err}")
         
-        return {
-            "success": True,
-            "file_id": file_id,
-            "original_filename": file.filename,
-            "file_size_mb": display_info['file_size_mb'],
-            "detected_ecu": display_info['ecu_type'],
-            "detected_manufacturer": display_info['manufacturer'],
-            "metadata": metadata,
-            "available_options": available_options,
-            "detected_maps": display_info.get('detected_maps', {}),
-            "detected_dtcs": detected_dtcs,
-            "total_services_detected": len(available_options),
-            "message": f"File analyzed! {len(available_options)} service(s) detected based on ECU content."
-        }
+        return build_analysis_response(file_id, file.filename, display_info, detected_dtcs)
         
     except HTTPException:
         raise
+    except AnalysisPoolError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.error(f"Error analyzing file: {e}")
         raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
 
+def _analysis_event(stage: str, data) -> str:
+    return json.dumps({"stage": stage, "data": data}) + "\n"
+
+
+def _stage_event(stage: str, display_info: dict, file_id: str) -> str:
+    data = {field: display_info[field] for field in ANALYSIS_STAGE_FIELDS[stage]}
+    if stage == STAGE_SERVICES:
+        data["available_options"] = build_available_options(data["available_services"], file_id)
+    return _analysis_event(stage, data)
+
+
+async def stream_file_analysis(file_id: str, upload: StoredUpload):
+    """
+    NDJSON events of a file analysis, each stage as soon as it is ready.
+    
+    Quick identification, the full analysis and the DTC scan run on the
+    analysis pool at the same time. Events are always emitted in this
+    order: identification, details, services, dtcs, then complete (the
+    same body /analyze-and-process-file returns). Identification goes out
+    as soon as it is known; a DTC scan that finishes first is held back
+    until the services event. A cached analysis yields all analyzer
+    stages at once.
+    """
+    file_hash = upload.sha256
+    file_path = str(upload.path)
+    tasks = {}
+    if analysis_cache.get_local(KIND_ECU_ANALYSIS, file_hash) is None:
+        tasks[STAGE_IDENTIFICATION] = asyncio.create_task(analysis_pool.run(identify_ecu, file_path))
+    tasks["analysis"] = asyncio.create_task(analysis_cache.get_or_compute(
+        KIND_ECU_ANALYSIS, file_hash, lambda: analysis_pool.run(analyze_ecu, file_path)
+    ))
+    tasks["dtcs"] = asyncio.create_task(analysis_cache.get_or_compute(
+        KIND_DTC_ANALYSIS, file_hash, lambda: analysis_pool.run(analyze_dtcs, file_path)
+    ))
+    
+    display_info = None
+    detected_dtcs = []
+    identified = False
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            identification = tasks.get(STAGE_IDENTIFICATION)
+            if identification in done and display_info is None and tasks["analysis"] not in done:
+                # Identification errors surface through the full analysis
+                if identification.exception() is None:
+                    identified = True
+                    yield _analysis_event(STAGE_IDENTIFICATION, identification.result())
+            if tasks["analysis"] in done:
+                display_info = tasks["analysis"].result()
+                # Identification is only worth waiting for while this runs
+                pending.discard(identification)
+                for stage in ANALYSIS_STAGES:
+                    if not (stage == STAGE_IDENTIFICATION and identified):
+                        yield _stage_event(stage, display_info, file_id)
+            # DTCs follow the analyzer stages, whichever finished first
+            if display_info is not None and tasks["dtcs"].done():
+                try:
+                    detected_dtcs = tasks["dtcs"].result().get("detected_dtcs", [])
+                except Exception as dtc_err:
+                    logger.warning(f"DTC scan warning: {dtc_err}")
+                yield _analysis_event("dtcs", {"detected_dtcs": detected_dtcs})
+                break
+        
+        yield _analysis_event("complete", build_analysis_response(file_id, upload.filename, display_info, detected_dtcs))
+        
+    except Exception as e:
+        # Headers are already sent, so errors are reported in the stream
+        logger.error(f"Error analyzing file: {e}")
+        status_code = e.status_code if isinstance(e, AnalysisPoolError) else 500
+        yield json.dumps({"stage": "error", "status_code": status_code,
+                          "detail": f"File processing failed: {str(e)}"}) + "\n"
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+@api_router.post("/analyze-and-process-file/stream")
+async def analyze_and_process_file_stream(file: UploadFile = File(...)):
+    """
+    Analyze ECU file, streaming results stage by stage (NDJSON)
+    
+    Same analysis as /analyze-and-process-file, but manufacturer, ECU type
+    and part number arrive as soon as they are identified instead of after
+    the full analysis. Each line is {"stage": ..., "data": ...}; the last
+    line is the "complete" event (or an "error" event).
+    """
+    file_id, upload = await store_uploaded_ecu_file(file)
+    
+    return StreamingResponse(
+        stream_file_analysis(file_id, upload),
+        media_type="application/x-ndjson",
+    )
+
+
 @api_router.post("/purchase-processed-file")
 async def purchase_processed_file(
     background_tasks: BackgroundTasks,
@@ -958,6 +1160,7 @@ async def purchase_processed_file(
             "file_id": file_id,
             "customer_name": customer_name,
             "customer_email": customer_email,
+            "customer_email_lc": normalize_email(customer_email),
             "customer_phone": customer_phone,
             "vehicle_make": vehicle_data.get("vehicle_make"),
             "vehicle_model": vehicle_data.get("vehicle_model"),
@@ -976,6 +1179,7 @@ async def purchase_processed_file(
         }
         
         await db.orders.insert_one(order_doc)
+        await reference_uploaded_file(file_id, blob_ref(REF_ORDER, order_id))
         
         # ==================== SEDOX INTEGRATION ====================
         sedox_project_id = None
@@ -1183,6 +1387,7 @@ async def create_order_json(request: CreateOrderRequest):
             "file_id": request.file_id,
             "customer_name": request.customer_name,
             "customer_email": request.customer_email.lower().strip(),
+            "customer_email_lc": normalize_email(request.customer_email),
             "vehicle_make": request.vehicle_info.get("vehicle_make") or request.vehicle_info.get("manufacturer"),
             "vehicle_model": request.vehicle_info.get("vehicle_model") or request.vehicle_info.get("model"),
             "vehicle_year": request.vehicle_info.get("vehicle_year") or request.vehicle_info.get("year"),
@@ -1200,6 +1405,7 @@ async def create_order_json(request: CreateOrderRequest):
         }
         
         await db.orders.insert_one(order_doc)
+        await reference_uploaded_file(request.file_id, blob_ref(REF_ORDER, order_id))
         
         logger.info(f"Order created: {order_id} for {request.customer_email}")
         
@@ -1324,10 +1530,8 @@ async def upload_file(file: UploadFile = File(...)):
     
     # Save file
     try:
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        file_size = filepath.stat().st_size
+        upload = await store_upload(file, filepath)
+        await reference_upload(upload, file_id)
         
         return {
             "success": True,
@@ -1335,9 +1539,11 @@ async def upload_file(file: UploadFile = File(...)):
             "original_filename": file.filename,
             "stored_filename": filename,
             "filepath": str(filepath),
-            "size": file_size,
+            "size": upload.size,
             "uploaded_at": datetime.now(timezone.utc).isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
@@ -1358,6 +1564,7 @@ async def create_service_request(
     
     # Handle file uploads
     uploaded_files = []
+    blob_hashes = []
     if files:
         for file in files:
             # Validate file extension
@@ -1373,15 +1580,15 @@ async def create_service_request(
             filepath = UPLOAD_DIR / filename
             
             # Save file
-            with open(filepath, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            upload = await store_upload(file, filepath)
+            blob_hashes.append(upload.sha256)
             
             uploaded_files.append({
                 "file_id": file_id,
                 "original_filename": file.filename,
                 "stored_filename": filename,
                 "filepath": str(filepath),
-                "size": filepath.stat().st_size,
+                "size": upload.size,
                 "uploaded_at": datetime.now(timezone.utc).isoformat()
             })
     
@@ -1392,12 +1599,15 @@ async def create_service_request(
     
     # Convert to dict and serialize datetime to ISO string for MongoDB
     doc = request_obj.model_dump()
+    doc['customer_email_lc'] = normalize_email(doc['customer_email'])
     doc['created_at'] = doc['created_at'].isoformat()
     doc['updated_at'] = doc['updated_at'].isoformat()
     if doc.get('payment_date'):
         doc['payment_date'] = doc['payment_date'].isoformat()
     
     await db.service_requests.insert_one(doc)
+    for blob_hash in blob_hashes:
+        await blob_store.add_ref(blob_hash, blob_ref(REF_SERVICE_REQUEST, request_obj.id))
     return request_obj
 
 
@@ -1597,11 +1807,10 @@ async def admin_upload_processed_file(
     filepath = PROCESSED_DIR / processed_filename
     
     # Save the uploaded file
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    upload = await store_upload(file, filepath, MAX_ADMIN_UPLOAD_SIZE)
+    await blob_store.add_ref(upload.sha256, blob_ref(REF_SERVICE_REQUEST, request_id))
     
-    file_size = len(content)
+    file_size = upload.size
     
     # Create processed file info
     processed_file_info = {
@@ -1701,20 +1910,15 @@ async def process_ecu_files_background(request_id: str):
                     all_warnings.append(f"File {uploaded_file['original_filename']} not found")
                     continue
                 
-                # Read file data
-                with open(filepath, "rb") as f:
-                    file_data = f.read()
-                
                 # Update status
                 await db.service_requests.update_one(
                     {"id": request_id},
                     {"$set": {"processing_status": "processing"}}
                 )
                 
-                # Process with AI
-                result = ecu_processor.process_file(
-                    file_data,
-                    request["selected_services"]
+                # Process with AI (in the analysis pool, the worker maps the file)
+                result = await analysis_pool.run(
+                    legacy_process, str(filepath), request["selected_services"]
                 )
                 
                 if result["success"] and result["processed_file"]:
@@ -1722,8 +1926,7 @@ async def process_ecu_files_background(request_id: str):
                     processed_filename = f"processed_{uploaded_file['original_filename']}"
                     processed_filepath = PROCESSED_DIR / f"{request_id}_{uploaded_file['file_id']}_{processed_filename}"
                     
-                    with open(processed_filepath, "wb") as f:
-                        f.write(result["processed_file"])
+                    await asyncio.to_thread(write_file, processed_filepath, result["processed_file"])
                     
                     processed_files.append({
                         "file_id": str(uuid.uuid4()),
@@ -1746,6 +1949,9 @@ async def process_ecu_files_background(request_id: str):
                     all_warnings.append(f"Processing failed for {uploaded_file['original_filename']}")
                     all_warnings.extend(result.get("warnings", []))
                     
+            except AnalysisPoolError as e:
+                logger.error(f"Analysis pool error processing file: {e}")
+                all_warnings.append(f"Error processing {uploaded_file.get('original_filename', 'unknown')}: {str(e)}")
             except Exception as e:
                 logger.error(f"Error processing file: {e}")
                 all_warnings.append(f"Error processing {uploaded_file.get('original_filename', 'unknown')}: {str(e)}")
@@ -2224,17 +2430,7 @@ async def portal_login_password(login_data: PortalPasswordLoginRequest):
     )
     
     # Get all orders for this email
-    orders_from_requests = await db.service_requests.find(
-        {"customer_email": {"$regex": f"^{email}$", "$options": "i"}},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    orders_from_orders = await db.orders.find(
-        {"customer_email": {"$regex": f"^{email}$", "$options": "i"}},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    all_orders = orders_from_requests + orders_from_orders
+    all_orders = await find_customer_orders(db, email)
     
     logging.info(f"Portal login successful for: {email}, found {len(all_orders)} orders")
     
@@ -2373,20 +2569,8 @@ async def portal_login_email(login_data: PortalEmailLoginRequest):
     """
     email = login_data.email.strip().lower()
     
-    # Get all orders from service_requests collection
-    orders_sr = await db.service_requests.find(
-        {"customer_email": {"$regex": f"^{email}$", "$options": "i"}},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    # Get all orders from orders collection (new flow)
-    orders_new = await db.orders.find(
-        {"customer_email": {"$regex": f"^{email}$", "$options": "i"}},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    # Combine and sort by date
-    all_orders = orders_sr + orders_new
+    # Get all orders from both collections, sorted by date
+    all_orders = await find_customer_orders(db, email)
     all_orders.sort(key=lambda x: x.get('created_at', ''), reverse=True)
     
     if not all_orders:
@@ -2415,18 +2599,8 @@ async def portal_login(login_data: PortalLoginRequest):
     email = login_data.email.strip().lower()
     order_id = login_data.order_id.strip()
     
-    # Search in service_requests collection
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    # Also search in orders collection (for orders created via new flow)
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    # Search service_requests and orders (new flow) collections
+    _, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Invalid email or order number")
@@ -2451,18 +2625,8 @@ async def get_portal_order(order_id: str, email: str):
     """
     email = email.strip().lower()
     
-    # Search in service_requests
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    # Also search in orders collection
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    # Search service_requests and orders (new flow) collections
+    _, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Order not found or access denied")
@@ -2489,16 +2653,7 @@ async def send_portal_message(msg_data: PortalMessageRequest):
     order_id = msg_data.order_id.strip()
     
     # Verify order access
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    _, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Order not found or access denied")
@@ -2553,16 +2708,7 @@ async def portal_upload_file(
     email = email.strip().lower()
     
     # Verify order access
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    collection, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Order not found or access denied")
@@ -2582,33 +2728,26 @@ async def portal_upload_file(
     filename = f"{file_id}_portal{file_ext}"
     filepath = UPLOAD_DIR / filename
     
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    upload = await store_upload(file, filepath)
     
     file_info = {
         "file_id": file_id,
         "original_filename": file.filename,
         "stored_filename": filename,
         "filepath": str(filepath),
-        "size": len(content),
+        "size": upload.size,
         "uploaded_via": "portal",
         "uploaded_at": datetime.now(timezone.utc).isoformat()
     }
     
-    # Update order with new file
-    # Try service_requests first
-    result = await db.service_requests.update_one(
+    # Update order with new file (in the collection it was found in)
+    await db[collection].update_one(
         {"id": order_id},
         {"$push": {"uploaded_files": file_info}}
     )
+    ref = blob_ref(REF_SERVICE_REQUEST if collection == "service_requests" else REF_ORDER, order_id)
     
-    if result.modified_count == 0:
-        # Try orders collection
-        await db.orders.update_one(
-            {"id": order_id},
-            {"$push": {"uploaded_files": file_info}}
-        )
+    await blob_store.add_ref(upload.sha256, ref)
     
     return {
         "success": True,
@@ -2624,16 +2763,7 @@ async def get_portal_invoice(order_id: str, email: str):
     email = email.strip().lower()
     
     # Verify order access
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    _, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Order not found or access denied")
@@ -2701,16 +2831,7 @@ async def portal_download_file(order_id: str, file_id: str, email: str):
     email = email.strip().lower()
     
     # Verify order access
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    _, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Order not found or access denied")
@@ -2744,16 +2865,7 @@ async def get_portal_messages(order_id: str, email: str):
     email = email.strip().lower()
     
     # Verify order access
-    order = await db.service_requests.find_one({
-        "id": order_id,
-        "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-    }, {"_id": 0})
-    
-    if not order:
-        order = await db.orders.find_one({
-            "id": order_id,
-            "customer_email": {"$regex": f"^{email}$", "$options": "i"}
-        }, {"_id": 0})
+    _, order = await find_customer_order(db, order_id, email)
     
     if not order:
         raise HTTPException(status_code=401, detail="Order not found or access denied")
@@ -2872,9 +2984,7 @@ async def admin_upload_modified_file(
     filename = f"{file_id}_modified{file_ext}"
     filepath = UPLOAD_DIR / filename
     
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    upload = await store_upload(file, filepath, MAX_ADMIN_UPLOAD_SIZE)
     
     # Update order with modified file
     update_data = {
@@ -2885,6 +2995,7 @@ async def admin_upload_modified_file(
     }
     
     # Try updating in orders collection
+    ref = blob_ref(REF_ORDER, order_id)
     result = await db.orders.update_one(
         {"id": order_id},
         {"$set": update_data}
@@ -2892,6 +3003,7 @@ async def admin_upload_modified_file(
     
     if result.modified_count == 0:
         # Try service_requests collection
+        ref = blob_ref(REF_SERVICE_REQUEST, order_id)
         result = await db.service_requests.update_one(
             {"id": order_id},
             {"$set": update_data}
@@ -2900,6 +3012,7 @@ async def admin_upload_modified_file(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    await blob_store.add_ref(upload.sha256, ref)
     logging.info(f"Admin uploaded modified file for order: {order_id}")
     
     return {"success": True, "filename": filename}
@@ -3073,9 +3186,7 @@ async def create_portal_order(
     filename = f"{file_id}_original{file_ext}"
     filepath = UPLOAD_DIR / filename
     
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    upload = await store_upload(file, filepath)
     
     # Calculate price based on services
     service_prices = {
@@ -3090,6 +3201,7 @@ async def create_portal_order(
         "id": order_id,
         "customer_name": name,
         "customer_email": email,
+        "customer_email_lc": normalize_email(email),
         "vehicle_info": f"{vehicle_info.get('year', '')} {vehicle_info.get('make', '')} {vehicle_info.get('model', '')}".strip(),
         "vehicle": vehicle_info,
         "services": services_list,
@@ -3105,6 +3217,7 @@ async def create_portal_order(
     }
     
     await db.orders.insert_one(order)
+    await blob_store.add_ref(upload.sha256, blob_ref(REF_ORDER, order_id))
     
     logging.info(f"New order created from portal: {order_id} for {email}")
     
@@ -3185,17 +3298,28 @@ async def analyze_ecu_file_engine(
     Analyze an ECU file using the new processing engine.
     Returns detailed analysis without modifying the file.
     """
+    # The file is only kept while it is analyzed
+    filepath = UPLOAD_DIR / f"{uuid.uuid4()}_engine{Path(file.filename).suffix}"
     try:
-        file_data = await file.read()
-        analysis = ecu_file_processor.analyze_file(file_data)
+        upload = await store_upload(file, filepath)
+        analysis = await analysis_cache.get_or_compute(
+            KIND_ENGINE_ANALYSIS, upload.sha256,
+            lambda: analysis_pool.run(engine_analyze, str(upload.path))
+        )
         
         return {
             "success": True,
             "filename": file.filename,
             "analysis": analysis
         }
+    except HTTPException:
+        raise
+    except AnalysisPoolError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        filepath.unlink(missing_ok=True)
 
 
 @api_router.post("/engine/process")
@@ -3216,9 +3340,9 @@ async def process_ecu_file_engine(
     
     Returns processed file for download.
     """
+    # The original is only kept while it is processed
+    filepath = UPLOAD_DIR / f"{uuid.uuid4()}_engine{Path(file.filename).suffix}"
     try:
-        file_data = await file.read()
-        
         # Parse modifications
         mod_list = [m.strip() for m in modifications.split(",") if m.strip()]
         mod_types = []
@@ -3231,18 +3355,27 @@ async def process_ecu_file_engine(
         if not mod_types:
             raise HTTPException(status_code=400, detail="No valid modifications specified")
         
+        upload = await store_upload(file, filepath)
+        
+        # Checksum states of the original, cached per file hash, so only
+        # the patched bytes are read to update checksums
+        checksum_states = await analysis_cache.get_or_compute(
+            KIND_CHECKSUM_STATES, upload.sha256,
+            lambda: analysis_pool.run(engine_checksum_states, str(upload.path))
+        )
+        
         # Process file
-        result = ecu_file_processor.process_file(file_data, mod_types, file.filename)
+        result, processed_data = await analysis_pool.run(
+            engine_process, str(upload.path), mod_types, file.filename, checksum_states
+        )
         
         if result.success:
             # Save processed file
-            processed_data = ecu_file_processor.get_processed_file()
             if processed_data:
                 output_filename = f"processed_{file.filename}"
                 output_path = PROCESSED_DIR / output_filename
                 
-                with open(output_path, 'wb') as f:
-                    f.write(processed_data)
+                await asyncio.to_thread(write_file, output_path, processed_data)
                 
                 # Store result in database
                 processing_record = {
@@ -3254,6 +3387,7 @@ async def process_ecu_file_engine(
                     "modifications_applied": result.modifications_applied,
                     "dtcs_removed": result.dtcs_removed,
                     "checksum_updated": result.checksum_updated,
+                    "patches": result.patches,
                     "processing_time_ms": result.processing_time_ms,
                     "created_at": datetime.now(timezone.utc).isoformat()
                 }
@@ -3281,8 +3415,12 @@ async def process_ecu_file_engine(
         
     except HTTPException:
         raise
+    except AnalysisPoolError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        filepath.unlink(missing_ok=True)
 
 
 @api_router.get("/engine/download/{filename}")
@@ -3334,24 +3472,24 @@ async def dtc_engine_upload(file: UploadFile = File(...)):
         # Generate unique file ID
         file_id = str(uuid.uuid4())
         
-        # Read file content
-        content = await file.read()
-        
         # Save file to disk (for processing)
         file_path = UPLOAD_DIR / f"{file_id}_dtc_original{Path(file.filename).suffix}"
-        with open(file_path, "wb") as f:
-            f.write(content)
+        upload = await store_upload(file, file_path)
         
-        # Analyze file for DTCs
-        analysis = dtc_delete_engine.analyze_file(content)
+        # Analyze file for DTCs (cached by file content)
+        analysis = await analysis_cache.get_or_compute(
+            KIND_DTC_ANALYSIS, upload.sha256,
+            lambda: analysis_pool.run(analyze_dtcs, str(file_path))
+        )
         
-        # Store file info AND content in database (for persistence across deployments)
+        # Store file info in database; the content stays in the blob store
+        # (durable across deployments once referenced)
         await db.dtc_files.insert_one({
             "id": file_id,
             "original_filename": file.filename,
             "file_path": str(file_path),
-            "file_size": len(content),
-            "file_content_b64": base64.b64encode(content).decode('utf-8'),  # Store file content
+            "file_size": upload.size,
+            "file_hash": upload.sha256,
             "analysis": {
                 "file_size": analysis["file_size"],
                 "detected_dtcs": analysis["detected_dtcs"],
@@ -3360,6 +3498,7 @@ async def dtc_engine_upload(file: UploadFile = File(...)):
             },
             "created_at": datetime.now(timezone.utc).isoformat()
         })
+        await blob_store.add_ref(upload.sha256, blob_ref(REF_DTC_FILE, file_id))
         
         return {
             "success": True,
@@ -3372,6 +3511,10 @@ async def dtc_engine_upload(file: UploadFile = File(...)):
                 "ecu_info": analysis["ecu_info"]
             }
         }
+    except HTTPException:
+        raise
+    except AnalysisPoolError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.error(f"DTC upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3440,8 +3583,9 @@ async def dtc_engine_process(request: DTCProcessRequest):
     try:
         logger.info(f"Processing DTC deletion for file_id: {request.file_id}, DTCs: {request.dtc_codes}")
         
-        # Get file info from database
-        file_doc = await db.dtc_files.find_one({"id": request.file_id}, {"_id": 0})
+        # Get file info from database (never the legacy base64 content)
+        query = {"id": request.file_id}
+        file_doc = await db.dtc_files.find_one(query, {"_id": 0, "file_content_b64": 0})
         if not file_doc:
             logger.error(f"File not found in database: {request.file_id}")
             raise HTTPException(status_code=404, detail=f"File not found: {request.file_id}")
@@ -3451,29 +3595,13 @@ async def dtc_engine_process(request: DTCProcessRequest):
         if request.order_id:
             order_doc = await db.dtc_orders.find_one({"id": request.order_id}, {"_id": 0})
         
-        # Read original file - try disk first, then restore from database
-        file_path = Path(file_doc["file_path"])
-        if file_path.exists():
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-        elif file_doc.get("file_content_b64"):
-            # Restore from database if file not on disk (e.g., after redeployment)
-            file_data = base64.b64decode(file_doc["file_content_b64"])
-            # Re-save to disk for processing
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(file_path, "wb") as f:
-                f.write(file_data)
-            logger.info(f"Restored file from database: {file_path}")
-        else:
-            logger.error(f"File not found on disk and no backup in database: {file_path}")
-            raise HTTPException(status_code=404, detail=f"File data not found. Please re-upload the file.")
-        
-        with open(file_path, "rb") as f:
-            file_data = f.read()
+        # Original file - from disk, restored from the durable store if needed
+        file_path = await stored_file_path(db.dtc_files, query, file_doc, blob_ref(REF_DTC_FILE, request.file_id))
         
         # Process file - delete DTCs
-        result = dtc_delete_engine.delete_dtcs(
-            file_data,
+        result = await analysis_pool.run(
+            delete_dtcs,
+            str(file_path),
             request.dtc_codes,
             request.correct_checksum
         )
@@ -3483,16 +3611,15 @@ async def dtc_engine_process(request: DTCProcessRequest):
         if result.success and result.modified_data:
             download_id = str(uuid.uuid4())
             modified_path = PROCESSED_DIR / f"{download_id}_dtc_deleted.bin"
-            with open(modified_path, "wb") as f:
-                f.write(result.modified_data)
+            modified_hash = await asyncio.to_thread(blob_store.put_bytes, result.modified_data)
+            blob_store.link(modified_hash, modified_path)
             
-            # Store in database WITH file content for persistence
             await db.dtc_processed.insert_one({
                 "download_id": download_id,
                 "original_file_id": request.file_id,
                 "original_filename": file_doc["original_filename"],
                 "modified_path": str(modified_path),
-                "file_content_b64": base64.b64encode(result.modified_data).decode('utf-8'),  # Store processed file
+                "file_hash": modified_hash,
                 "dtcs_deleted": [{"code": d["code"], "description": d.get("description", "")} for d in result.dtcs_deleted],
                 "dtcs_not_found": result.dtcs_not_found,
                 "checksum_corrected": result.checksum_corrected,
@@ -3500,6 +3627,7 @@ async def dtc_engine_process(request: DTCProcessRequest):
                 "order_id": request.order_id,
                 "created_at": datetime.now(timezone.utc).isoformat()
             })
+            await blob_store.add_ref(modified_hash, blob_ref(REF_DTC_PROCESSED, download_id))
             
             # Update order status
             if request.order_id:
@@ -3547,6 +3675,8 @@ async def dtc_engine_process(request: DTCProcessRequest):
         }
     except HTTPException:
         raise
+    except AnalysisPoolError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.error(f"DTC processing error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3556,24 +3686,13 @@ async def dtc_engine_process(request: DTCProcessRequest):
 async def dtc_engine_download(download_id: str):
     """Download the modified file"""
     try:
-        # Get file info from database
-        file_doc = await db.dtc_processed.find_one({"download_id": download_id}, {"_id": 0})
+        # Get file info from database (never the legacy base64 content)
+        query = {"download_id": download_id}
+        file_doc = await db.dtc_processed.find_one(query, {"_id": 0, "file_content_b64": 0})
         if not file_doc:
             raise HTTPException(status_code=404, detail="Download not found")
         
-        file_path = Path(file_doc["modified_path"])
-        
-        # Try to restore from database if file not on disk
-        if not file_path.exists():
-            if file_doc.get("file_content_b64"):
-                # Restore from database
-                file_data = base64.b64decode(file_doc["file_content_b64"])
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(file_path, "wb") as f:
-                    f.write(file_data)
-                logger.info(f"Restored processed file from database: {file_path}")
-            else:
-                raise HTTPException(status_code=404, detail="File not found and no backup available")
+        file_path = await stored_file_path(db.dtc_processed, query, file_doc, blob_ref(REF_DTC_PROCESSED, download_id))
         
         # Generate download filename
         original_name = file_doc.get("original_filename", "file")
@@ -3596,21 +3715,16 @@ async def dtc_engine_download(download_id: str):
 async def dtc_engine_scan_all(file_id: str):
     """Scan file for all recognizable DTCs"""
     try:
-        # Get file info from database
-        file_doc = await db.dtc_files.find_one({"id": file_id}, {"_id": 0})
+        # Get file info from database (never the legacy base64 content)
+        query = {"id": file_id}
+        file_doc = await db.dtc_files.find_one(query, {"_id": 0, "file_content_b64": 0})
         if not file_doc:
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Read file
-        file_path = Path(file_doc["file_path"])
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="File data not found")
-        
-        with open(file_path, "rb") as f:
-            file_data = f.read()
+        file_path = await stored_file_path(db.dtc_files, query, file_doc, blob_ref(REF_DTC_FILE, file_id))
         
         # Scan for all DTCs
-        all_dtcs = dtc_delete_engine.scan_all_dtcs(file_data)
+        all_dtcs = await analysis_pool.run(scan_all_dtcs, str(file_path))
         
         return {
             "success": True,
@@ -3620,6 +3734,8 @@ async def dtc_engine_scan_all(file_id: str):
         }
     except HTTPException:
         raise
+    except AnalysisPoolError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logger.error(f"DTC scan error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3947,6 +4063,21 @@ async def get_sitemap():
     return Response(content=sitemap_content, media_type="application/xml")
 
 
+@api_router.get("/admin/db/query-plans")
+async def get_query_plans():
+    """
+    Explain the registered hot queries (see db_indexes)
+    Admin endpoint to spot lookups that scan a whole collection
+    """
+    plans = await explain_hot_queries(db)
+    return {
+        "success": True,
+        "queries": plans,
+        "collection_scans": [plan["name"] for plan in plans if plan.get("collection_scan")],
+        "errors": [plan["name"] for plan in plans if plan.get("error")],
+    }
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -3965,6 +4096,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def init_db_indexes():
+    await ensure_indexes(db)
+    try:
+        await backfill_customer_email_lc(db)
+    except Exception as e:
+        logger.warning(f"customer_email_lc backfill failed: {e}")
+
+@app.on_event("startup")
+async def init_analysis_cache():
+    await analysis_cache.init_collection()
+
+@app.on_event("startup")
+async def init_blob_store():
+    try:
+        await blob_store.expire_links(UPLOAD_DIR, REF_UPLOAD)
+    except Exception as e:
+        logger.warning(f"Expiring uploads failed: {e}")
+    await blob_store.init_collection()
+
+@app.on_event("startup")
+async def start_analysis_pool():
+    analysis_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_analysis_pool():
+    analysis_pool.shutdown()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
@@ -0,0 +1,152 @@
+"""
+Upload Ingestion
+================
+Stores uploaded ECU files without holding them in memory.
+
+`await file.read()` returns the whole upload as one bytes object, and
+the handlers then wrote it out with a blocking open().write() on the
+event loop. spool_upload() instead copies the upload in chunks, in a
+worker thread, to a temporary file; BlobStore.ingest (see blob_store)
+then renames it into the store under its hash:
+
+- SHA-256 and size are computed while copying (the hash is the blob
+  name and the analysis cache key, so the file is never read again)
+- Uploads over the endpoint's size limit are rejected (HTTP 413) up
+  front when the size is known, otherwise as soon as the limit is
+  crossed, and the partial file is removed
+- Files only appear under their final name once complete (renamed into
+  place), so a stored file is never partial; write_file() does the same
+  for contents held in memory
+- Stored files are memory-mapped for the analyzers (map_file); the
+  analysis pool workers map them by path instead of receiving a pickled
+  copy of the bytes
+
+Configuration:
+- MAX_UPLOAD_SIZE_MB: customer ECU uploads (default 32)
+- MAX_ADMIN_UPLOAD_SIZE_MB: admin uploads of processed files (default 64)
+- UPLOAD_CHUNK_SIZE: copy chunk in bytes (default 1 MiB)
+"""
+
+import os
+import mmap
+import asyncio
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Tuple, Union
+
+MB = 1024 * 1024
+
+# Per-endpoint size limits
+MAX_UPLOAD_SIZE = int(float(os.environ.get('MAX_UPLOAD_SIZE_MB', '32')) * MB)
+MAX_ADMIN_UPLOAD_SIZE = int(float(os.environ.get('MAX_ADMIN_UPLOAD_SIZE_MB', '64')) * MB)
+
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(MB)))
+
+
+class UploadError(Exception):
+    """Base error for rejected uploads, carries the HTTP status to report"""
+    status_code = 400
+
+
+class UploadTooLarge(UploadError):
+    """Upload exceeds the endpoint's size limit"""
+    status_code = 413
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File too large. Maximum size is {max_size / MB:g} MB.")
+
+
+@dataclass
+class StoredUpload:
+    """An upload that has been written to storage"""
+    path: Path
+    filename: str       # Name the client sent
+    size: int
+    sha256: str
+
+
+def map_file(path: Union[str, os.PathLike]):
+    """
+    Memory-map a file read-only.
+
+    The map supports len, slicing, find and the buffer protocol (re,
+    hashlib, memoryview), like bytes. It is released when dropped.
+    Empty files (which cannot be mapped) return b"".
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _copy_to_temp(source: BinaryIO, directory: Path, max_size: int) -> Tuple[str, int, str]:
+    """Copy source to a new temporary file in directory, hashing as it goes"""
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                digest.update(chunk)
+                tmp.write(chunk)
+    except BaseException:
+        discard(tmp_name)
+        raise
+    return tmp_name, size, digest.hexdigest()
+
+
+def write_file(dest: Union[str, os.PathLike], data: bytes) -> Path:
+    """
+    Write data to dest through a temporary file renamed into place.
+
+    Stored files are often symlinks into the blob store (see blob_store);
+    open(dest, "wb") would follow the link and overwrite the shared blob,
+    the rename replaces the link instead.
+    """
+    dest = Path(dest)
+    fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_name, dest)
+    except BaseException:
+        discard(tmp_name)
+        raise
+    return dest
+
+
+def discard(path: Union[str, os.PathLike]):
+    """Remove a file if it exists"""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+async def spool_upload(file, directory: Path, max_size: int = MAX_UPLOAD_SIZE) -> StoredUpload:
+    """
+    Stream an UploadFile into a new temporary file in directory.
+
+    The caller moves the file into place (or discards it).
+
+    Raises:
+        UploadTooLarge: Upload exceeds max_size
+    """
+    _check_size(file, max_size)
+    tmp_name, size, sha256 = await asyncio.to_thread(_copy_to_temp, file.file, Path(directory), max_size)
+    return StoredUpload(path=Path(tmp_name), filename=file.filename, size=size, sha256=sha256)
+
+
+def _check_size(file, max_size: int):
+    known_size = getattr(file, "size", None)
+    if known_size is not None and known_size > max_size:
+        raise UploadTooLarge(max_size)
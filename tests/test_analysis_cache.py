@@ -0,0 +1,81 @@
+"""
+Analysis Cache Tests
+Tests the content-addressed LRU tier and version-based invalidation
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from analysis_cache import AnalysisCache, compute_analysis_version, file_sha256, KIND_DTC_ANALYSIS
+
+
+class TestAnalysisCache:
+    """Test analysis result cache (in-process tier)"""
+
+    def test_01_hit_skips_compute(self):
+        """Test a repeated file is served from the cache"""
+        cache = AnalysisCache(version="v1")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"detected_dtcs": [{"code": "P0420"}]}
+
+        file_hash = file_sha256(b"\x00\x01ECU")
+        first = asyncio.run(cache.get_or_compute(KIND_DTC_ANALYSIS, file_hash, compute))
+        second = asyncio.run(cache.get_or_compute(KIND_DTC_ANALYSIS, file_hash, compute))
+
+        assert first == second
+        assert len(calls) == 1
+        assert cache.stats["memory_hits"] == 1
+        print("✓ Cached result returned without recomputing")
+
+    def test_02_results_are_copies(self):
+        """Test callers cannot mutate the cached entry"""
+        cache = AnalysisCache(version="v1")
+        cache.set_local(KIND_DTC_ANALYSIS, "abc", {"detected_dtcs": []})
+        cache.get_local(KIND_DTC_ANALYSIS, "abc")["detected_dtcs"].append("P0001")
+        assert cache.get_local(KIND_DTC_ANALYSIS, "abc") == {"detected_dtcs": []}
+        print("✓ Cache hands out copies")
+
+    def test_03_lru_eviction(self):
+        """Test least recently used entries are evicted"""
+        cache = AnalysisCache(max_entries=2, version="v1")
+        cache.set_local(KIND_DTC_ANALYSIS, "a", 1)
+        cache.set_local(KIND_DTC_ANALYSIS, "b", 2)
+        cache.get_local(KIND_DTC_ANALYSIS, "a")
+        cache.set_local(KIND_DTC_ANALYSIS, "c", 3)
+        assert cache.get_local(KIND_DTC_ANALYSIS, "a") == 1
+        assert cache.get_local(KIND_DTC_ANALYSIS, "b") is None
+        print("✓ LRU eviction works")
+
+    def test_04_version_tracks_sources(self, tmp_path):
+        """Test the analysis version changes when the DTC database changes"""
+        (tmp_path / "dtc_database.json").write_text('{"codes": {}}')
+        before = compute_analysis_version(tmp_path)
+        (tmp_path / "dtc_database.json").write_text('{"codes": {"P0420": {}}}')
+        assert compute_analysis_version(tmp_path) != before
+
+        old = AnalysisCache(version=before)
+        old.set_local(KIND_DTC_ANALYSIS, "abc", 1)
+        new = AnalysisCache(version=compute_analysis_version(tmp_path))
+        assert new.key(KIND_DTC_ANALYSIS, "abc") != old.key(KIND_DTC_ANALYSIS, "abc")
+        print("✓ Version changes with dtc_database.json")
+
+    def test_05_runtime_database_reload(self, tmp_path):
+        """Test entries stop matching once dtc_database.json changes on a running server"""
+        database = tmp_path / "dtc_database.json"
+        database.write_text('{"codes": {}}')
+        cache = AnalysisCache(root=tmp_path)
+        cache.set_local(KIND_DTC_ANALYSIS, "abc", {"detected_dtcs": []})
+        before = cache.version
+        assert cache.get_local(KIND_DTC_ANALYSIS, "abc") == {"detected_dtcs": []}
+
+        database.write_text('{"codes": {"P0420": {}}}')
+        stat = database.stat()
+        os.utime(database, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert cache.version != before and cache.version == compute_analysis_version(tmp_path)
+        assert cache.get_local(KIND_DTC_ANALYSIS, "abc") is None
+        print("✓ Version follows a reloaded dtc_database.json")
@@ -0,0 +1,158 @@
+"""
+Analysis Pool Tests
+Runs real analysis tasks in worker processes and checks timeout/backpressure handling
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from analysis_pool import (
+    AnalysisPool, AnalysisPoolBusy, AnalysisTimeout,
+    analyze_ecu, analyze_dtcs, engine_process, legacy_process, _warm_up,
+)
+from ecu_engine import ECUFileProcessor, ModificationType
+from ecu_processor import ECUProcessor
+
+SAMPLE = b"\xff" * 4096 + b"Copyright Robert Bosch GmbH EDC17C46 P0420" + b"\x00" * 4096
+
+
+def nap(seconds):
+    """Task that keeps its worker busy"""
+    time.sleep(seconds)
+    return seconds
+
+
+class TestAnalysisPool:
+    """Test the managed analysis process pool"""
+
+    def test_01_runs_in_worker(self):
+        """Test analysis results from a worker match an inline run"""
+        pool = AnalysisPool(max_workers=1)
+
+        async def run():
+            pool.start()
+            try:
+                return await pool.run(analyze_ecu, SAMPLE), await pool.run(analyze_dtcs, SAMPLE)
+            finally:
+                pool.shutdown()
+
+        info, dtcs = asyncio.run(run())
+        assert info == analyze_ecu(SAMPLE)
+        assert dtcs == analyze_dtcs(SAMPLE)
+        assert pool.stats["completed"] == 2
+        print(f"✓ Worker result matches: {info['ecu_type']}")
+
+    def test_02_backpressure(self):
+        """Test submissions beyond the pending limit are rejected"""
+        pool = AnalysisPool(max_workers=0, max_pending=0)
+        with pytest.raises(AnalysisPoolBusy):
+            asyncio.run(pool.run(analyze_ecu, SAMPLE))
+        assert pool.stats["rejected"] == 1
+        print("✓ Full queue rejected with AnalysisPoolBusy")
+
+    def test_03_timeout_recycles_pool(self):
+        """Test a task over its timeout fails and the pool keeps working"""
+        pool = AnalysisPool(max_workers=1, task_timeout=0.01)
+
+        async def run():
+            pool.start()
+            try:
+                with pytest.raises(AnalysisTimeout, match="after 0.01s"):
+                    await pool.run(_warm_up)
+                return await pool.run(analyze_ecu, SAMPLE, timeout=60)
+            finally:
+                pool.shutdown()
+
+        info = asyncio.run(run())
+        assert info["manufacturer"] == "Bosch"
+        assert pool.stats["timeouts"] == 1 and pool.stats["restarts"] == 1
+        print("✓ Timed-out worker recycled")
+
+    def test_04_recycle_resubmits_other_tasks(self):
+        """Test tasks running or queued when another task times out are resubmitted, not failed"""
+        pool = AnalysisPool(max_workers=2)
+
+        async def run():
+            pool.start()
+            await asyncio.gather(*(pool.run(nap, 0.2) for _ in range(2)))  # Both workers up
+            try:
+                stuck = pool.run(nap, 30, timeout=0.5)
+                running = pool.run(nap, 1.5, timeout=30)
+                queued = pool.run(nap, 0.1, timeout=30)
+                return await asyncio.gather(stuck, running, queued, return_exceptions=True)
+            finally:
+                pool.shutdown()
+
+        stuck, running, queued = asyncio.run(run())
+        assert isinstance(stuck, AnalysisTimeout) and (running, queued) == (1.5, 0.1)
+        assert pool.stats["timeouts"] == 1 and pool.stats["restarts"] == 1
+        assert pool.stats["retried"] >= 1 and pool.stats["crashes"] == 0 and pool.stats["completed"] == 4
+        print(f"✓ {pool.stats['retried']} tasks resubmitted after recycle")
+
+    def test_05_queued_time_not_counted(self):
+        """Test a task queued behind a long one gets its full timeout and recycles nothing"""
+        pool = AnalysisPool(max_workers=1)
+
+        async def run():
+            pool.start()
+            await pool.run(nap, 0.2)  # Worker up
+            try:
+                return await asyncio.gather(pool.run(nap, 2.0, timeout=30), pool.run(nap, 0.1, timeout=0.5))
+            finally:
+                pool.shutdown()
+
+        assert asyncio.run(run()) == [2.0, 0.1]
+        assert pool.stats["timeouts"] == 0 and pool.stats["restarts"] == 0 and pool.stats["retried"] == 0
+        print("✓ Queued task not timed out")
+
+    def test_06_legacy_processing_from_path(self):
+        """Test the legacy processor runs in a worker on a stored file's path"""
+        pool = AnalysisPool(max_workers=1)
+        services = ["dpf-removal", "checksum"]
+
+        async def run(path):
+            pool.start()
+            try:
+                return await pool.run(legacy_process, str(path), services)
+            finally:
+                pool.shutdown()
+
+        path = os.path.join(os.path.dirname(__file__), "..", "test_ecu.bin")
+        with open(path, "rb") as f:
+            expected = ECUProcessor().process_file(f.read(), services)
+        result = asyncio.run(run(path))
+        assert result["processed_file"] and result == expected
+        print(f"✓ Legacy processing in worker: {result['ecu_type']} ({result['confidence_level']})")
+
+    def test_07_thread_mode_keeps_results_apart(self, monkeypatch):
+        """Test concurrent engine tasks with the pool disabled each get their own processed file"""
+        pool = AnalysisPool(max_workers=0)
+        process_file = ECUFileProcessor.process_file
+
+        def slow_process_file(self, *args):
+            result = process_file(self, *args)
+            time.sleep(0.05)  # Leaves room for another thread to reuse the engine
+            return result
+        mods = [ModificationType.DPF_OFF, ModificationType.DTC_OFF]
+        files = []
+        for i in range(6):
+            data = bytearray(bytes([0x11 + i]) * 1_600_000)
+            data[1000:1008] = b"EDC17C54"
+            data[0x30000:0x30007] = b"DPF_REG"
+            data[0x40000:0x40005] = b"P2002"
+            files.append(bytes(data))
+
+        async def run():
+            return await asyncio.gather(*(pool.run(engine_process, data, mods) for data in files))
+
+        expected = [ECUFileProcessor().process(data, mods)[1] for data in files]
+        monkeypatch.setattr(ECUFileProcessor, "process_file", slow_process_file)
+        results = asyncio.run(run())
+        for data, expected_file, (result, processed) in zip(files, expected, results):
+            assert result.success and processed == expected_file and processed != data
+        print("✓ Thread-mode tasks keep their own processed files")
@@ -0,0 +1,74 @@
+"""
+Analysis Stages Tests
+Tests quick identification, staged analysis and the staged detector scan
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_analyzer import ANALYSIS_STAGES, IDENTIFICATION_GROUPS, ECUAnalyzer
+from ecu_engine.detectors import DETECTORS
+
+
+def sample_file():
+    data = bytearray(b"\xff" * 0x20000)
+    data[0x100:0x100 + 31] = b"Copyright Robert Bosch GmbH EGR"
+    data[0x200:0x208] = b"EDC17C54"
+    data[0x300:0x30C] = b"0281 012 345"
+    data[0x400:0x410] = b"SW: 1.23 egr EGR"
+    data[0x500:0x50B] = b"DPF_REGEN_1"
+    data[0x600:0x611] = b"WVWZZZ1KZAW123456"
+    return bytes(data)
+
+
+class TestAnalysisStages:
+    """Test quick identification and staged analysis"""
+
+    def test_01_stages_cover_display_info(self):
+        """Test the staged results add up to analyze() and get_display_info()"""
+        data = sample_file()
+        analyzer = ECUAnalyzer()
+        results = analyzer.analyze(data)
+        display = analyzer.get_display_info()
+
+        staged = ECUAnalyzer()
+        stages = list(staged.analyze_stages(data))
+        assert [stage for stage, _ in stages] == list(ANALYSIS_STAGES)
+        combined = {}
+        for _, fields in stages:
+            assert not set(fields) & set(combined)
+            combined.update(fields)
+        assert combined == display and staged.results == results
+        print("✓ Stages cover the display info")
+
+    def test_02_identify_matches_analyze(self):
+        """Test quick identification reports what the full analysis reports"""
+        data = sample_file()
+        analyzer = ECUAnalyzer()
+        analyzer.analyze(data)
+        display = analyzer.get_display_info()
+
+        identified = ECUAnalyzer().identify(data)
+        assert identified["manufacturer"] == "Bosch" and identified["ecu_type"] == display["ecu_type"]
+        assert all(display[field] == value for field, value in identified.items())
+        print("✓ Identification matches the full analysis")
+
+    def test_03_staged_scan(self):
+        """Test identification scans its groups only and the rest is scanned once, on demand"""
+        data = sample_file()
+
+        DETECTORS.reset_stats()
+        ECUAnalyzer().identify(data)
+        assert DETECTORS.stats()["scans"] == 1
+        assert all(rule.calls == 0 for group in DETECTORS.groups() if group not in IDENTIFICATION_GROUPS
+                   for rule in DETECTORS.rules(group))
+
+        DETECTORS.reset_stats()
+        list(ECUAnalyzer().analyze_stages(data))
+        assert DETECTORS.stats()["scans"] == 2
+
+        DETECTORS.reset_stats()
+        ECUAnalyzer().analyze(data)
+        assert DETECTORS.stats()["scans"] == 1
+        print("✓ Staged scan covers the groups lazily")
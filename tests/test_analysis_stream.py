@@ -0,0 +1,61 @@
+"""
+Analysis Stream Tests
+Tests the NDJSON event order of the streamed file analysis
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server
+from analysis_cache import AnalysisCache
+from upload_ingest import StoredUpload
+
+SAMPLE = b"\xff" * 4096 + b"Copyright Robert Bosch GmbH EDC17C46 P0420" + b"\x00" * 4096
+
+EVENT_ORDER = ["identification", "details", "services", "dtcs", "complete"]
+
+
+def stream_stages(monkeypatch, tmp_path, delays):
+    """Stages of the streamed events, with pool tasks finishing after the given delays"""
+    async def run(func, *args, timeout=None):
+        await asyncio.sleep(delays[func.__name__])
+        return func(*args)
+
+    monkeypatch.setattr(server.analysis_pool, "run", run)
+    monkeypatch.setattr(server, "analysis_cache", AnalysisCache(version="test"))
+    path = tmp_path / "ecu_original.bin"
+    path.write_bytes(SAMPLE)
+    upload = StoredUpload(path=path, filename="ecu.bin", size=len(SAMPLE),
+                          sha256=hashlib.sha256(SAMPLE).hexdigest())
+
+    async def collect():
+        return [json.loads(line) async for line in server.stream_file_analysis("file-id", upload)]
+
+    events = asyncio.run(collect())
+    assert events[-1]["data"]["success"]
+    return [event["stage"] for event in events]
+
+
+class TestAnalysisStream:
+    """Test the streamed analysis events"""
+
+    def test_01_dtcs_before_analysis(self, monkeypatch, tmp_path):
+        """Test a DTC scan that finishes first is held back until the services event"""
+        stages = stream_stages(monkeypatch, tmp_path,
+                               {"identify_ecu": 0.05, "analyze_ecu": 0.2, "analyze_dtcs": 0})
+        assert stages == EVENT_ORDER
+        print("✓ Early DTC scan held back")
+
+    def test_02_analysis_before_dtcs(self, monkeypatch, tmp_path):
+        """Test the documented order when the analysis (and identification) finishes first"""
+        stages = stream_stages(monkeypatch, tmp_path,
+                               {"identify_ecu": 0.05, "analyze_ecu": 0.05, "analyze_dtcs": 0.2})
+        assert stages == EVENT_ORDER
+        stages = stream_stages(monkeypatch, tmp_path,
+                               {"identify_ecu": 0.3, "analyze_ecu": 0.1, "analyze_dtcs": 0.2})
+        assert stages == EVENT_ORDER
+        print("✓ Events in documented order")
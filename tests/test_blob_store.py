@@ -0,0 +1,255 @@
+"""
+Blob Store Tests
+Tests content-addressed deduplication, named links, references, garbage collection
+and durable copies
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from starlette.datastructures import UploadFile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from blob_store import BlobStore, blob_ref, REF_DTC_FILE, REF_ORDER, REF_UPLOAD
+from migrate_file_blobs import migrate_document
+from upload_ingest import map_file, write_file
+
+SAMPLE = b"\xff" * 4096 + b"Copyright Robert Bosch GmbH EDC17C46 P0420" + b"\x00" * 4096
+
+
+class RefsCollection:
+    """The parts of a motor collection the blob store uses, in memory"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["hash"])
+        if doc is None:
+            if not upsert:
+                return
+            doc = self.docs[query["hash"]] = {"hash": query["hash"], "refs": [], **update.get("$setOnInsert", {})}
+        for ref in update.get("$addToSet", {}).values():
+            if ref not in doc["refs"]:
+                doc["refs"].append(ref)
+        for ref in update.get("$pull", {}).values():
+            doc["refs"] = [r for r in doc["refs"] if r != ref]
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["hash"])
+
+    async def distinct(self, field, query):
+        return [doc[field] for doc in self.docs.values() if doc["refs"]]
+
+    async def delete_many(self, query):
+        self.docs = {h: doc for h, doc in self.docs.items() if doc["refs"]}
+
+
+class Cursor(list):
+    async def to_list(self, length):
+        return list(self)
+
+    async def __aiter__(self):
+        for item in self:
+            yield item
+
+
+class Bucket:
+    """The parts of a motor GridFS bucket the blob store uses, in memory"""
+
+    def __init__(self):
+        self.files = {}
+
+    def find(self, query):
+        files = self.files.values()
+        if "filename" in query:
+            files = [f for f in files if f.filename == query["filename"]]
+        if "uploadDate" in query:
+            files = [f for f in files if f.uploadDate < query["uploadDate"]["$lt"]]
+        return Cursor(files)
+
+    async def upload_from_stream(self, filename, source, chunk_size_bytes=None, metadata=None):
+        file_id = len(self.files) + 1
+        self.files[file_id] = SimpleNamespace(
+            _id=file_id, filename=filename, data=source.read(), uploadDate=datetime.now(timezone.utc)
+        )
+
+    async def download_to_stream_by_name(self, filename, destination):
+        destination.write(self.find({"filename": filename})[0].data)
+
+    async def delete(self, file_id):
+        del self.files[file_id]
+
+
+class FilesCollection:
+    """A dtc_files collection of one legacy document"""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    async def find_one(self, query, projection=None):
+        if "file_content_b64" in self.doc and self.doc["id"] == query["id"]:
+            return self.doc
+
+    async def update_one(self, query, update):
+        self.doc.update(update["$set"])
+        for field in update["$unset"]:
+            del self.doc[field]
+
+
+def ingest(store, data, filename="ecu.bin"):
+    return asyncio.run(store.ingest(UploadFile(io.BytesIO(data), filename=filename)))
+
+
+class TestBlobStore:
+    """Test the content-addressed blob store"""
+
+    def test_01_duplicates_stored_once(self, tmp_path):
+        """Test the same content uploaded twice is one blob behind two names"""
+        store = BlobStore(tmp_path / "blobs")
+        first = ingest(store, SAMPLE)
+        second = ingest(store, SAMPLE, "copy.bin")
+
+        assert first.sha256 == second.sha256 == hashlib.sha256(SAMPLE).hexdigest()
+        assert first.path == second.path == store.path(first.sha256) and second.filename == "copy.bin"
+        assert store.stats["stored"] == 1 and store.stats["deduplicated"] == 1
+        assert store.stats["bytes_deduplicated"] == len(SAMPLE)
+        assert os.listdir(store.tmp_dir) == []
+
+        uploads = tmp_path / "uploads"
+        uploads.mkdir()
+        a = store.link(first.sha256, uploads / "a_original.bin")
+        b = store.link(second.sha256, uploads / "b_original.bin")
+        assert a.read_bytes() == b.read_bytes() == SAMPLE and map_file(store.path(first.sha256))[:] == SAMPLE
+        assert store.hash_of(a) == first.sha256
+        print("✓ Duplicate upload stored once")
+
+    def test_02_adopt_existing_file(self, tmp_path):
+        """Test a plain file from before the store becomes a link to a blob"""
+        store = BlobStore(tmp_path / "blobs")
+        legacy = tmp_path / "legacy_original.bin"
+        legacy.write_bytes(SAMPLE)
+        assert store.hash_of(legacy) is None
+
+        blob_hash = store.adopt(legacy)
+        assert blob_hash == hashlib.sha256(SAMPLE).hexdigest() and store.hash_of(legacy) == blob_hash
+        assert legacy.is_symlink() and legacy.read_bytes() == SAMPLE
+        assert store.adopt(legacy) == blob_hash and ingest(store, SAMPLE).sha256 == blob_hash
+        assert store.stats["stored"] == 1 and store.stats["deduplicated"] == 1
+        print("✓ Legacy file adopted")
+
+    def test_03_references_and_garbage_collection(self, tmp_path):
+        """Test referenced and recent blobs survive collection, old unreferenced ones do not"""
+        store = BlobStore(tmp_path / "blobs", RefsCollection())
+        kept = ingest(store, SAMPLE).sha256
+        dropped = ingest(store, SAMPLE + b"tuned").sha256
+
+        async def run():
+            await store.add_ref(kept, blob_ref(REF_ORDER, "o1"))
+            await store.add_ref(kept, blob_ref(REF_ORDER, "o1"))
+            await store.add_ref(kept, blob_ref(REF_DTC_FILE, "d1"))
+            await store.add_ref(dropped, blob_ref(REF_ORDER, "o2"))
+            counts = await store.ref_count(kept), await store.ref_count(dropped)
+            await store.release(dropped, blob_ref(REF_ORDER, "o2"))
+            return counts, await store.collect_garbage()
+
+        (counts, recent_removed) = asyncio.run(run())
+        assert counts == (2, 1) and recent_removed == 0
+
+        # Past the grace period only the referenced blob remains
+        old = time.time() - 7 * 24 * 3600
+        for blob_hash in (kept, dropped):
+            os.utime(store.path(blob_hash), (old, old))
+        assert asyncio.run(store.collect_garbage()) == 1
+        assert store.exists(kept) and not store.exists(dropped)
+        print("✓ Unreferenced blobs collected")
+
+    def test_04_durable_copy_restored(self, tmp_path):
+        """Test a referenced blob is copied to the bucket once and restored when the disk loses it"""
+        bucket = Bucket()
+        store = BlobStore(tmp_path / "blobs", RefsCollection(), bucket)
+        blob_hash = ingest(store, SAMPLE).sha256
+
+        async def run():
+            await store.add_ref(blob_hash, blob_ref(REF_DTC_FILE, "d1"))
+            await store.add_ref(blob_hash, blob_ref(REF_ORDER, "o1"))
+            store.path(blob_hash).unlink()  # Redeployment
+            return await store.local_path(blob_hash)
+
+        path = asyncio.run(run())
+        assert path == store.path(blob_hash) and path.read_bytes() == SAMPLE
+        assert len(bucket.files) == 1 and store.stats["persisted"] == 1 and store.stats["restored"] == 1
+
+        # Unreferenced copies are collected with the blob
+        asyncio.run(store.release(blob_hash, blob_ref(REF_DTC_FILE, "d1")))
+        asyncio.run(store.release(blob_hash, blob_ref(REF_ORDER, "o1")))
+        assert asyncio.run(store.collect_garbage(grace_hours=-1)) == 1 and bucket.files == {}
+        print("✓ Durable copy restored")
+
+    def test_05_migrate_base64_document(self, tmp_path):
+        """Test a document carrying its file as base64 is moved into the store"""
+        store = BlobStore(tmp_path / "blobs", RefsCollection(), Bucket())
+        collection = FilesCollection({"_id": 1, "id": "d1", "file_content_b64": base64.b64encode(SAMPLE).decode()})
+        ref = blob_ref(REF_DTC_FILE, "d1")
+
+        blob_hash = asyncio.run(migrate_document(store, collection, {"id": "d1"}, ref))
+        assert blob_hash == hashlib.sha256(SAMPLE).hexdigest()
+        assert collection.doc == {"_id": 1, "id": "d1", "file_hash": blob_hash}
+        assert map_file(store.path(blob_hash))[:] == SAMPLE and asyncio.run(store.ref_count(blob_hash)) == 1
+        assert asyncio.run(migrate_document(store, collection, {"id": "d1"}, ref)) is None
+        print("✓ Base64 document migrated")
+
+    def test_06_upload_links_expire(self, tmp_path):
+        """Test uploads are kept until they expire, and no link is left pointing at a collected blob"""
+        store = BlobStore(tmp_path / "blobs", RefsCollection())
+        uploads = tmp_path / "uploads"
+        uploads.mkdir()
+        ordered = ingest(store, SAMPLE).sha256
+        abandoned = ingest(store, SAMPLE + b"tuned").sha256
+        ordered_link = store.link(ordered, uploads / "f1_original.bin")
+        abandoned_link = store.link(abandoned, uploads / "f2.bin")
+
+        async def run():
+            await store.add_ref(ordered, blob_ref(REF_UPLOAD, "f1"))
+            await store.add_ref(ordered, blob_ref(REF_ORDER, "o1"))
+            await store.add_ref(abandoned, blob_ref(REF_UPLOAD, "f2"))
+            return await store.expire_links(uploads, REF_UPLOAD)
+
+        # Within the grace period the upload reference keeps the blob
+        assert asyncio.run(run()) == 0
+        assert asyncio.run(store.collect_garbage(grace_hours=-1)) == 0
+
+        old = time.time() - 7 * 24 * 3600
+        for link in (ordered_link, abandoned_link):
+            os.utime(link, (old, old), follow_symlinks=False)
+        assert asyncio.run(store.expire_links(uploads, REF_UPLOAD)) == 1
+        assert store.collection.docs[ordered]["refs"] == [blob_ref(REF_ORDER, "o1")]
+        assert asyncio.run(store.collect_garbage(grace_hours=-1)) == 1
+        assert ordered_link.read_bytes() == SAMPLE and os.listdir(uploads) == ["f1_original.bin"]
+
+        # A link whose blob is gone is removed whatever its age
+        assert not store.exists(abandoned)
+        dangling = uploads / "f3.bin"
+        os.symlink(store.path(abandoned), dangling)
+        assert asyncio.run(store.expire_links(uploads, REF_UPLOAD)) == 1 and not os.path.lexists(dangling)
+        print("✓ Upload links expired")
+
+    def test_07_write_over_link(self, tmp_path):
+        """Test writing a file over a stored name replaces the link instead of the shared blob"""
+        store = BlobStore(tmp_path / "blobs")
+        blob_hash = ingest(store, SAMPLE).sha256
+        first = store.link(blob_hash, tmp_path / "a.bin")
+        second = store.link(blob_hash, tmp_path / "b.bin")
+
+        write_file(first, b"processed")
+        assert first.read_bytes() == b"processed" and not first.is_symlink()
+        assert second.read_bytes() == store.path(blob_hash).read_bytes() == SAMPLE
+        assert sorted(os.listdir(tmp_path)) == ["a.bin", "b.bin", "blobs"]
+        print("✓ Stored blob left intact")
@@ -0,0 +1,75 @@
+"""
+Checksum Discovery Tests
+Tests checksum storage options and the search for unknown checksum definitions
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine import ChecksumAlgorithm, ChecksumCalculator, discover_checksum
+from ecu_engine.models import ChecksumType
+
+random.seed(18)
+calculator = ChecksumCalculator()
+
+
+def known_good(algorithm, count=2, size=0x20000):
+    files = []
+    for _ in range(count):
+        data = bytearray(random.randbytes(size))
+        data[0x8000:0xC000] = b"\xff" * 0x4000  # Erased area
+        calculator.update_checksum(data, algorithm)
+        files.append(bytes(data))
+    return files
+
+
+class TestChecksumDiscovery:
+    """Test checksum discovery"""
+
+    def test_01_storage_size_and_byte_order(self):
+        """Test stored checksums honour size and byte order, also inside the range"""
+        algorithm = ChecksumAlgorithm(checksum_type=ChecksumType.SUM16, name="s", offset=0x100,
+                                      checksum_size=2, byte_order="big", calc_end=0x1000)
+        data = bytearray(random.randbytes(0x2000))
+        success, value = calculator.update_checksum(data, algorithm)
+        assert success and data[0x100:0x102] == value.to_bytes(2, "big")
+        assert calculator.verify_checksum(bytes(data), algorithm) == (True, value, value)
+        print("✓ Storage size and byte order honoured")
+
+    def test_02_finds_definitions(self):
+        """Test CRC and sum definitions are found and verify on every file"""
+        for algorithm in [
+            ChecksumAlgorithm(checksum_type=ChecksumType.CRC32, name="a", offset=0x1FFFC,
+                              calc_end=0x1FFFC, initial_value=0xFFFFFFFF, xor_out=0xFFFFFFFF,
+                              reflect_in=True, reflect_out=True),
+            ChecksumAlgorithm(checksum_type=ChecksumType.BOSCH_EDC17, name="b", offset=0x10000,
+                              calc_start=0x10004, calc_end=0x20000, polynomial=0x1EDC6F41,
+                              byte_order="big"),
+            ChecksumAlgorithm(checksum_type=ChecksumType.SUM16, name="c", offset=0xFFFE,
+                              calc_end=0x10000, checksum_size=2),
+        ]:
+            files = known_good(algorithm)
+            results = discover_checksum(files, workers=0)
+            assert results and results[0].confidence > 0.99, algorithm.name
+            found = results[0].algorithm
+            assert (found.checksum_type, found.offset, found.checksum_size, found.byte_order) == (
+                algorithm.checksum_type, algorithm.offset, algorithm.checksum_size, algorithm.byte_order)
+            assert all(calculator.verify_checksum(data, found)[0] for data in files)
+        print("✓ Checksum definitions discovered")
+
+    def test_03_confidence_and_pool(self):
+        """Test a 16-bit match in one file scores lower than two and the pool gives the same results"""
+        algorithm = ChecksumAlgorithm(checksum_type=ChecksumType.CRC16, name="d", offset=0x1FFFE,
+                                      calc_end=0x1FFFE, checksum_size=2)
+        files = known_good(algorithm)
+        single = discover_checksum(files[:1], workers=0, min_confidence=0.0, limit=1000)
+        match = [d for d in single if d.algorithm.offset == 0x1FFFE and d.algorithm.calc_end == 0x1FFFE]
+        assert match and match[0].confidence < 0.99
+
+        serial = discover_checksum(files, workers=0)
+        pooled = discover_checksum(files, workers=2)
+        assert [d.to_dict() for d in pooled] == [d.to_dict() for d in serial]
+        assert serial[0].confidence > 0.99 and serial[0].algorithm.offset == 0x1FFFE
+        print("✓ Confidence reflects the evidence")
@@ -0,0 +1,80 @@
+"""
+Checksum Probe Tests
+Tests checksum location detection, correction round trips and the layout cache
+"""
+import os
+import random
+import struct
+import sys
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import dtc_engine
+from dtc_engine import ChecksumEngine, ChecksumProbe, ChecksumType
+
+random.seed(9)
+
+
+def sample(size=0x10000):
+    return bytearray(random.getrandbits(8) for _ in range(size))
+
+
+class TestChecksumProbe:
+    """Test prefix-sum checksum probing"""
+
+    def test_01_prefix_sums(self):
+        """Test any prefix sum is a lookup equal to summing the slice"""
+        data = bytes(sample(4099))
+        probe = ChecksumProbe(data)
+        for end in (0, 1, 2, 1000, 4097, 4099):
+            assert probe.prefix_sum(end) == sum(data[:end])
+            words = struct.unpack(f"<{end // 2}H", data[:end // 2 * 2])
+            assert probe.prefix_sum(end, 2) == sum(words) & 0xFFFFFFFF
+        print("✓ Prefix sums match")
+
+    def test_02_classic_locations(self):
+        """Test end-of-file CRC32 and Bosch 16-bit sums are still found first"""
+        data = sample()
+        data[-4:] = struct.pack('<I', zlib.crc32(bytes(data[:-4])))
+        assert ChecksumProbe(bytes(data)).detect()[0] == ChecksumType.CRC32
+
+        data = sample()
+        data[0x3FE:0x400] = struct.pack('<H', sum(data[:0x3FE]) & 0xFFFF)
+        checksum_type, details = ChecksumProbe(bytes(data)).detect()
+        assert checksum_type == ChecksumType.BOSCH_CUSTOM and details["checksum_offset"] == 0x3FE
+        print("✓ Classic locations detected")
+
+    def test_03_extended_locations_round_trip(self):
+        """Test region-end word sums and CRCs are detected and corrected"""
+        data = sample()
+        words = struct.unpack("<16383H", bytes(data[:0x7FFE]))
+        data[0x7FFE:0x8000] = struct.pack('<H', sum(words) & 0xFFFF)
+        checksum_type, details = ChecksumProbe(bytes(data)).detect()
+        assert checksum_type == ChecksumType.SIMPLE_SUM
+        assert details["checksum_offset"] == 0x7FFE and details["word_size"] == 2
+
+        data[0x100] ^= 0x55
+        fixed = ChecksumEngine.correct_checksum(bytes(data), checksum_type, details)
+        assert ChecksumProbe(fixed).detect() == (checksum_type, details)
+
+        data = sample()
+        data[0x3FFC:0x4000] = struct.pack('<I', zlib.crc32(bytes(data[:0x3FFC])))
+        checksum_type, details = ChecksumProbe(bytes(data)).detect()
+        assert checksum_type == ChecksumType.CRC32 and details["checksum_offset"] == 0x3FFC
+        print("✓ Extended locations detected and corrected")
+
+    def test_04_layout_cached_per_file(self, monkeypatch):
+        """Test repeated detection of the same file probes it once"""
+        data = bytes(sample(4096))
+        calls = []
+        detect = ChecksumProbe.detect
+        monkeypatch.setattr(ChecksumProbe, "detect", lambda self: calls.append(1) or detect(self))
+
+        first = ChecksumEngine.detect_checksum_type(data)
+        first[1]["error"] = "caller annotation"
+        second = ChecksumEngine.detect_checksum_type(data)
+        assert len(calls) == 1
+        assert "error" not in second[1]
+        assert dtc_engine._checksum_layouts
+        print("✓ Layout cached by file hash")
@@ -0,0 +1,127 @@
+"""
+Customer Order Lookup Tests
+Tests normalized email lookups across service_requests and orders, and the backfill
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from customer_orders import (
+    backfill_customer_email_lc, find_customer_order, find_customer_orders, normalize_email,
+)
+
+
+class Cursor(list):
+    async def to_list(self, length):
+        return list(self) if length is None else list(self)[:length]
+
+    async def __aiter__(self):
+        for item in self:
+            yield item
+
+
+class OrderCollection:
+    """The parts of a motor collection the lookups use, in memory"""
+
+    def __init__(self, db, docs):
+        self.db = db
+        self.docs = docs
+        self.aggregations = 0
+
+    def _run(self, pipeline):
+        docs = [dict(doc) for doc in self.docs]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if all(d.get(k) == v for k, v in arg.items())]
+            elif op == "$sort":
+                for key, direction in reversed(list(arg.items())):
+                    docs.sort(key=lambda d: d.get(key, ""), reverse=direction < 0)
+            elif op == "$limit":
+                docs = docs[:arg]
+            elif op == "$set":
+                docs = [{**d, **arg} for d in docs]
+            elif op == "$unionWith":
+                docs += self.db[arg["coll"]]._run(arg["pipeline"])
+            elif op == "$project":
+                docs = [{k: v for k, v in d.items() if k not in arg} for d in docs]
+        return docs
+
+    def aggregate(self, pipeline):
+        self.aggregations += 1
+        return Cursor(self._run(pipeline))
+
+    def find(self, query, projection=None):
+        return Cursor(d for d in self.docs if isinstance(d.get("customer_email"), str)
+                      and "customer_email_lc" not in d)
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            for doc in self.docs:
+                if doc["_id"] == request._filter["_id"]:
+                    doc.update(request._doc["$set"])
+        return type("BulkWriteResult", (), {"modified_count": len(requests)})
+
+
+class OrderDatabase(dict):
+    def __init__(self, **collections):
+        super().__init__({name: OrderCollection(self, docs) for name, docs in collections.items()})
+
+
+def order(_id, order_id, email, created_at):
+    return {"_id": _id, "id": order_id, "customer_email": email,
+            "customer_email_lc": normalize_email(email), "created_at": created_at}
+
+
+class TestCustomerOrders:
+    """Test portal order lookups by normalized email"""
+
+    def test_01_find_order_in_either_collection(self):
+        """Test an order is found in one query whichever collection holds it, case-insensitively"""
+        db = OrderDatabase(
+            service_requests=[order(1, "sr-1", "John.Smith+truck@Example.com", "2025-01-02")],
+            orders=[order(2, "ord-1", "john.smith+truck@example.com", "2025-01-03"),
+                    order(3, "ord-2", "other@example.com", "2025-01-04")],
+        )
+        email = " JOHN.SMITH+TRUCK@example.com "
+
+        collection, found = asyncio.run(find_customer_order(db, "sr-1", email))
+        assert collection == "service_requests" and found["id"] == "sr-1" and "_id" not in found
+        collection, found = asyncio.run(find_customer_order(db, "ord-1", email))
+        assert collection == "orders" and found["id"] == "ord-1" and "_source" not in found
+
+        # Wrong email for the order
+        assert asyncio.run(find_customer_order(db, "ord-2", email)) == (None, None)
+        assert db["service_requests"].aggregations == 3 and db["orders"].aggregations == 0
+        print("✓ Order found with one query")
+
+    def test_02_find_all_orders(self):
+        """Test all orders of an email come back, service requests first, newest first"""
+        db = OrderDatabase(
+            service_requests=[order(1, "sr-1", "a@example.com", "2025-01-01"),
+                              order(2, "sr-2", "A@Example.com", "2025-02-01")],
+            orders=[order(3, "ord-1", "a@example.com", "2025-03-01"),
+                    order(4, "ord-2", "b@example.com", "2025-04-01")],
+        )
+        orders = asyncio.run(find_customer_orders(db, "A@EXAMPLE.COM"))
+        assert [o["id"] for o in orders] == ["sr-2", "sr-1", "ord-1"]
+        assert all("_source" not in o and "_id" not in o for o in orders)
+        assert [o["id"] for o in asyncio.run(find_customer_orders(db, "a@example.com", limit=1))] == ["sr-2", "ord-1"]
+        print("✓ All orders found")
+
+    def test_03_backfill(self):
+        """Test orders written before customer_email_lc get it, others are left alone"""
+        db = OrderDatabase(
+            service_requests=[{"_id": 1, "id": "sr-1", "customer_email": " Mixed@Case.com"},
+                              order(2, "sr-2", "done@example.com", "2025-01-01")],
+            orders=[{"_id": 3, "id": "ord-1", "customer_email": "UPPER@EXAMPLE.COM"},
+                    {"_id": 4, "id": "ord-2"}],
+        )
+        assert asyncio.run(backfill_customer_email_lc(db)) == 2
+        assert db["service_requests"].docs[0]["customer_email_lc"] == "mixed@case.com"
+        assert db["orders"].docs[0]["customer_email_lc"] == "upper@example.com"
+        assert "customer_email_lc" not in db["orders"].docs[1]
+        assert asyncio.run(backfill_customer_email_lc(db)) == 0
+        print("✓ customer_email_lc backfilled")
@@ -0,0 +1,45 @@
+"""
+ECU Definition Index Tests
+Tests identification through the combined pattern index
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine import ECUDefinitionDB, ECUDefinition
+from ecu_engine.models import ECUManufacturer
+
+PADDING = b"\xff" * 1_600_000
+
+
+def pack_definition(index, patterns, size_range=(0, 0)):
+    return ECUDefinition(
+        id=f"pack_{index}", manufacturer=ECUManufacturer.BOSCH, family="EDC17",
+        variant=str(index), full_name=f"Pack {index}",
+        identification_patterns=patterns, file_size_range=size_range,
+    )
+
+
+class TestDefinitionIndex:
+    """Test ECUDefinitionDB.identify_ecu"""
+
+    def test_01_builtin_identification(self):
+        """Test the most specific builtin definition wins"""
+        db = ECUDefinitionDB()
+        assert db.identify_ecu(PADDING + b"EDC17C46").id == "bosch_edc17c46"
+        assert db.identify_ecu(PADDING + b"EDC17").id == "bosch_edc17_generic"
+        assert db.identify_ecu(b"EDC17C46") is None  # outside every size range
+        print("✓ Builtin definitions identified")
+
+    def test_02_added_definitions_are_indexed(self):
+        """Test definitions added later are found, ties keep load order"""
+        db = ECUDefinitionDB()
+        for index in range(2000):
+            db.add_definition(pack_definition(index, [f"1037{index:06d}".encode()]))
+        db.add_definition(pack_definition("dup", [b"1037000042"]))
+
+        assert db.identify_ecu(b"xx1037000042yy").id == "pack_42"
+        db.add_definition(pack_definition("two", [b"1037000042", b"yy"]))
+        assert db.identify_ecu(b"xx1037000042yy").id == "pack_two"
+        print("✓ Added definitions indexed")
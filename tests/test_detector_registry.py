@@ -0,0 +1,90 @@
+"""
+Detector Registry Tests
+Tests rule compilation, shared rules, counted queries and the analyzer wiring
+"""
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine.detectors import DETECTORS, DetectorRegistry, RuleKind
+
+
+def sample_file():
+    data = bytearray(b"\x00" * 0x4000)
+    data[0x100:0x100 + 31] = b"Copyright Robert Bosch GmbH EGR"
+    data[0x200:0x208] = b"EDC17C54"
+    data[0x300:0x310] = b"SW: 1.23 egr EGR"
+    return bytes(data)
+
+
+class TestDetectorRegistry:
+    """Test the detector registry"""
+
+    def test_01_rules_compiled_once_and_shared(self):
+        """Test table order becomes priority and equal patterns share one compiled regex"""
+        registry = DetectorRegistry()
+        family = registry.add_rules("family", [(rb"EDC17[A-Z][0-9]{2}", "Bosch", "Diesel"), (rb"EDC17", "Bosch", None)],
+                                    fields=("pattern", "label", "hint"), kind=RuleKind.REGEX)
+        types = registry.add_rules("type", [(rb"EDC17[A-Z][0-9]{2}", "EDC17Cxx")],
+                                   fields=("pattern", "product"), kind=RuleKind.REGEX)
+        markers = registry.add_rules("markers", [(b"EGR", 50), (b"egr", 45)], fields=("pattern", "score"))
+
+        assert [r.priority for r in family] == [0, 1] and family[0].hint == "Diesel"
+        assert family[0].regex is types[0].regex and types[0].product == "EDC17Cxx"
+        assert markers[1].score == 45 and markers[1].regex is None
+        assert registry.rules("family") == family and registry.groups() == ["family", "type", "markers"]
+
+        replaced = registry.add_rules("markers", [b"AGR"])
+        assert registry.rules("markers") == replaced
+        print("✓ Rules compiled once and shared")
+
+    def test_02_counted_queries(self):
+        """Test queries match re/bytes results and are counted and timed per rule"""
+        registry = DetectorRegistry()
+        family, = registry.add_rules("family", [rb"EDC17[A-Z][0-9]{2}"], kind=RuleKind.REGEX)
+        version, = registry.add_rules("version", [rb"sw[:\s]*([0-9.]+)"], kind=RuleKind.REGEX, flags=re.IGNORECASE)
+        egr, missing = registry.add_rules("markers", [b"EGR", b"DPF"])
+        data = sample_file()
+
+        scan = registry.scan(data)
+        assert scan.search(family).group() == b"EDC17C54"
+        assert scan.search(version).group(1) == re.search(rb"sw[:\s]*([0-9.]+)", data, re.IGNORECASE).group(1)
+        assert [m.start() for m in scan.finditer(family)] == [0x200]
+        assert scan.count(egr) == data.count(b"EGR") and scan.find(egr) == data.find(b"EGR")
+        assert not scan.contains(missing)
+        with pytest.raises(ValueError):
+            scan.count(family)
+
+        stats = {r["pattern"]: r for r in registry.stats()["rules"]}
+        assert (stats["EGR"]["calls"], stats["EGR"]["hits"]) == (2, 2)
+        assert (stats["DPF"]["calls"], stats["DPF"]["hits"]) == (1, 0)
+        assert (stats[family.pattern.decode()]["calls"], stats[family.pattern.decode()]["hits"]) == (2, 2)
+        assert registry.stats()["scans"] == 1 and family.seconds > 0
+
+        registry.reset_stats()
+        assert registry.stats()["scans"] == 0 and egr.calls == egr.hits == 0
+        print("✓ Queries counted and timed")
+
+    def test_03_analyzer_and_database_share_rules(self):
+        """Test ECUAnalyzer reads the ecu_database rules, and only those are registered"""
+        import ecu_analyzer
+        import ecu_database
+
+        assert ecu_analyzer.EGR_TEXT_MARKER_RULES is ecu_database.EGR_TEXT_MARKER_RULES
+        assert DETECTORS.rules("egr_text_markers") is ecu_database.EGR_TEXT_MARKER_RULES
+        registered = {"dpf_text_markers", "denso_dpf_patterns", "egr_text_markers"}
+        assert registered <= set(DETECTORS.groups())
+        assert not {"ecu_manufacturer", "ecu_type", "truck_brand", "scr_dcu", "scr_text_markers",
+                    "scr_dcu_identifiers"} & set(DETECTORS.groups())
+
+        DETECTORS.reset_stats()
+        results = ecu_analyzer.ECUAnalyzer().analyze(sample_file())
+        assert results["manufacturer"] == "Bosch" and results["ecu_type"] == "Bosch EDC17C54"
+        copyright = DETECTORS.stats("copyright")
+        assert copyright["scans"] == 1 and sum(r["hits"] for r in copyright["rules"]) == 1
+        assert any(r["hits"] for r in DETECTORS.stats("egr_text_markers")["rules"])
+        print("✓ Analyzer and database share the compiled rules")
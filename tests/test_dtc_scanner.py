@@ -0,0 +1,75 @@
+"""
+DTC Scanner Tests
+Checks the single-pass DTC scanner and deletion against per-pattern find() loops
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import dtc_engine
+from dtc_engine import DTCDatabase, DTCDeleteEngine, DTCScanner, get_dtc_scanner
+
+SAMPLE = (
+    b"\xff" * 1000 + b"P0420\x00" + bytes(range(256)) * 8
+    + b"p2002 P 0401" + b"\x24\x63\x00" + b"\x00" * 500
+)
+
+
+def naive_scan(codes, file_data):
+    found = []
+    for code in codes:
+        for pattern in DTCDatabase.dtc_to_binary(code):
+            offset = file_data.find(pattern)
+            if offset != -1:
+                found.append((code, offset, pattern))
+                break
+    return found
+
+
+class TestDTCScanner:
+    """Test the DTC pattern scanner"""
+
+    def test_01_matches_find_loop(self):
+        """Test results equal calling find() per code and pattern"""
+        codes = list(dtc_engine.DAVINCI_DATABASE or DTCDatabase.DTC_DESCRIPTIONS)
+        scanner = DTCScanner(codes)
+        scanner.CHUNK_SIZE = 512  # exercise the chunk boundaries
+        for data in (SAMPLE, SAMPLE[::-1], b"", b"P"):
+            assert scanner.scan(data) == naive_scan(codes, data)
+        print(f"✓ {len(scanner.scan(SAMPLE))} DTCs found, identical to find() loop")
+
+    def test_02_rebuilt_when_database_changes(self, tmp_path, monkeypatch):
+        """Test the scanner follows edits to dtc_database.json"""
+        db_path = tmp_path / "dtc_database.json"
+        db_path.write_text(json.dumps({"codes": {"P0420": "Catalyst"}}))
+        monkeypatch.setattr(dtc_engine, "DAVINCI_DATABASE_PATH", db_path)
+        monkeypatch.setattr(dtc_engine, "_davinci_stamp", None)
+        monkeypatch.setattr(dtc_engine, "_dtc_scanner", None)
+
+        assert [code for code, _, _ in get_dtc_scanner().scan(SAMPLE)] == ["P0420"]
+
+        db_path.write_text(json.dumps({"codes": {"P0420": "Catalyst", "P2002": "DPF"}}))
+        os.utime(db_path, ns=(0, 0))
+        assert [code for code, _, _ in get_dtc_scanner().scan(SAMPLE)] == ["P0420", "P2002"]
+        assert dtc_engine.DAVINCI_DATABASE == {"P0420": "Catalyst", "P2002": "DPF"}
+
+        monkeypatch.undo()
+        dtc_engine.load_davinci_database()
+        print("✓ Scanner rebuilt after database change")
+
+    def test_03_delete_uses_live_data(self):
+        """Test deletions see earlier deletions, like find() on the modified file"""
+        # The 2-byte pattern 04 20 is tried first; clearing its fault byte
+        # breaks the second "P0420", so only two instances are deleted
+        data = b"\x00P0420\x04\x20P0420\x00\x07\x01" + b"\x11" * 8
+        result = DTCDeleteEngine().delete_dtcs(data, ["P0420", "P0420"], correct_checksum=False)
+
+        assert [d["offset"] for d in result.dtcs_deleted] == [6, 1]
+        assert result.dtcs_deleted[0]["sub_code_hex"] == "5030"
+        assert result.dtcs_not_found == ["P0420"]
+        assert result.modified_data == (
+            b"\x00" + b"\xff" * 8 + b"0420\x00\x07\x01" + b"\x11" * 8
+        )
+        print("✓ Patch plan matches sequential deletion")
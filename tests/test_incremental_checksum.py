@@ -0,0 +1,176 @@
+"""
+Incremental Checksum Tests
+Checksums derived from the original state and a patch list must match a full recalculation
+"""
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import analysis_pool
+from ecu_engine import ChecksumAlgorithm, ChecksumCalculator, ECUFileProcessor, ModificationType, Patch, PatchPlan
+from ecu_engine.models import ChecksumType
+from ecu_engine.checksum_kernels import CRC32_IEEE_POLY, crc_patch, crc_register, word_sum, word_sum_patch
+from dtc_engine import ChecksumEngine
+from analysis_pool import engine_checksum_states, engine_process
+
+random.seed(16)
+
+ALGORITHMS = [
+    ChecksumAlgorithm(checksum_type=ChecksumType.CRC32, name="crc32", offset=0x100,
+                      initial_value=0xFFFFFFFF, xor_out=0xFFFFFFFF, reflect_in=True, reflect_out=True),
+    ChecksumAlgorithm(checksum_type=ChecksumType.CRC16, name="crc16", offset=0x2001,
+                      calc_start=0x1000, calc_end=0x9000, initial_value=0x1234, xor_out=0xFF00),
+    ChecksumAlgorithm(checksum_type=ChecksumType.BOSCH_EDC17, name="edc17", offset=0x50,
+                      polynomial=0x1EDC6F41, reflect_in=True,
+                      blocks=[(0x3000, 0x5003), (0x100, 0x2000), (0x7000, 0x20000)]),
+    ChecksumAlgorithm(checksum_type=ChecksumType.SUM16, name="sum16", offset=0x4000,
+                      blocks=[(0x1001, 0x3000), (0x3FFF, 0x8003)]),
+    ChecksumAlgorithm(checksum_type=ChecksumType.SUM32, name="sum32", offset=0x10,
+                      calc_start=3, calc_end=0x7777),
+    ChecksumAlgorithm(checksum_type=ChecksumType.XOR, name="xor", search_pattern=b"CSUM",
+                      calc_end=0x9000),
+]
+
+
+def random_patches(data, count, hit=None):
+    mod = bytearray(data)
+    patches = []
+    for _ in range(count):
+        offset = random.randrange(len(data) - 40) if hit is None else min(hit + random.randint(-6, 4), len(data) - 8)
+        new = os.urandom(random.randint(1, 40 if hit is None else 8))
+        patches.append(Patch(offset, bytes(mod[offset:offset + len(new)]), new))
+        mod[offset:offset + len(new)] = new
+    return mod, patches
+
+
+class TestIncrementalChecksum:
+    """Test checksum updates from a patch list"""
+
+    def test_01_kernels(self):
+        """Test patched CRC registers and word sums match recalculation"""
+        for width, poly in [(32, CRC32_IEEE_POLY), (16, 0x8005), (32, 0x1EDC6F41), (16, 0x1021)]:
+            for reflect_in in (False, True):
+                data = bytearray(os.urandom(3000))
+                register = crc_register(bytes(data), width, poly, 0x1234, reflect_in)
+                new = os.urandom(17)
+                old, data[1000:1017] = bytes(data[1000:1017]), new
+                assert crc_patch(register, width, poly, 3000 - 1017, old, new, reflect_in) == \
+                    crc_register(bytes(data), width, poly, 0x1234, reflect_in)
+        for word_size in (1, 2, 4):
+            for byteorder in ("little", "big"):
+                data = bytearray(os.urandom(1001))
+                total = word_sum(bytes(data), word_size, byteorder)
+                new = os.urandom(7)
+                old, data[501:508] = bytes(data[501:508]), new
+                assert total + word_sum_patch(501, old, new, word_size, byteorder) == \
+                    word_sum(bytes(data), word_size, byteorder)
+        print("✓ Incremental kernels match")
+
+    def test_02_calculator_matches_full_update(self):
+        """Test update_checksum_incremental against update_checksum"""
+        calculator = ChecksumCalculator()
+        for trial in range(6):
+            original = bytearray(os.urandom(0x10000))
+            original[0x8000:0x8004] = b"CSUM"
+            original = bytes(original)
+            for algorithm in ALGORITHMS:
+                state = calculator.checksum_state(original, algorithm)
+                plan = PatchPlan(original)
+                for _ in range(random.randint(1, 8)):
+                    plan.add(random.randrange(0x10000 - 40), os.urandom(random.randint(1, 40)))
+                if trial % 2:
+                    plan.add(state.offset + 2, b"\x01\x02\x03\x04")  # Over the stored checksum
+                plan.resolve_conflicts()
+
+                full, incremental = plan.apply(), plan.apply()
+                expected = calculator.update_checksum(full, algorithm)
+                assert calculator.update_checksum_incremental(
+                    incremental, algorithm, state, plan.merged()) == expected
+                assert incremental == full, algorithm.name
+        print("✓ Incremental updates match full updates")
+
+    def test_03_dtc_engine_uses_verified_checksum(self):
+        """Test ChecksumEngine derives verified checksums from the patches"""
+        layouts = []
+        data = bytearray(os.urandom(0x8000))
+        data[-4:] = struct.pack('<I', ChecksumEngine.crc32(bytes(data[:-4])))
+        layouts.append(bytes(data))
+        data = bytearray(os.urandom(0x8000))
+        data[-2:] = struct.pack('<H', ChecksumEngine.crc16(bytes(data[:-2])))
+        layouts.append(bytes(data))
+        data = bytearray(os.urandom(0x8000))
+        data[0x3FFE:0x4100] = bytes(0x102)
+        data[0x3FFC:0x4000] = struct.pack('<I', word_sum(bytes(data[:0x3FFC]), 4) & 0xFFFFFFFF)
+        layouts.append(bytes(data))
+
+        for data in layouts:
+            checksum_type, details = ChecksumEngine.detect_checksum_type(data)
+            assert details["verified"]
+            for hit in (None, details["checksum_offset"]):
+                modified, patches = random_patches(data, 5, hit)
+                assert ChecksumEngine.correct_checksum(modified, checksum_type, details, patches) == \
+                    ChecksumEngine.correct_checksum(bytes(modified), checksum_type, details)
+        print("✓ DTC engine checksum corrected from patches")
+
+    def test_04_overlapping_patches(self):
+        """Test agreeing overlaps between sources and repeated writes from one source"""
+        calculator = ChecksumCalculator()
+        original = bytearray(os.urandom(0x10000))
+        original[0x8000:0x8004] = b"CSUM"
+        original[0x6000:0x6005] = b"P2002"
+        original = bytes(original)
+        for algorithm in ALGORITHMS:
+            state = calculator.checksum_state(original, algorithm)
+            plan = PatchPlan(original)
+            plan.source = "dpf_off"
+            plan[0x6000:0x6005] = bytes(5)
+            plan[0x1800:0x1808] = b"\x11" * 8
+            plan.source = "dtc_off"
+            plan[0x6000:0x6005] = bytes(5)      # Agrees with dpf_off
+            plan[0x6003:0x6008] = bytes(5)      # Partly agrees
+            plan[0x1804:0x180C] = b"\x11" * 8   # Agrees on 4 bytes
+            plan.source = "egr_off"
+            plan[0x7000:0x7010] = b"\x22" * 16
+            plan[0x7008:0x7018] = b"\x33" * 16  # Same source, later write wins
+            assert plan.conflicts() == []
+
+            full, incremental = plan.apply(), plan.apply()
+            expected = calculator.update_checksum(full, algorithm)
+            assert calculator.update_checksum_incremental(
+                incremental, algorithm, state, plan.merged()) == expected, algorithm.name
+            assert incremental == full, algorithm.name
+        print("✓ Overlapping patches counted once")
+
+    def test_05_cached_state_used_by_engine(self, monkeypatch):
+        """Test processing with cached checksum states reads only the patched bytes"""
+        checksum = ChecksumAlgorithm(checksum_type=ChecksumType.CRC32, name="maps", offset=0x100,
+                                     calc_start=0x10000, calc_end=0x60000)
+        processor = ECUFileProcessor()
+        identify = processor.ecu_db.identify_ecu
+        monkeypatch.setattr(processor.ecu_db, "identify_ecu",
+                            lambda data: identify(data).model_copy(update={"checksums": [checksum]}))
+        monkeypatch.setitem(analysis_pool._worker_state, "file_processor", processor)
+
+        original = bytearray(b"\x11" * 1_600_000)
+        original[1000:1008] = b"EDC17C54"
+        original[0x30000:0x30007] = b"DPF_REG"
+        original = bytes(original)
+        states = engine_checksum_states(original)  # As stored in the analysis cache
+        assert set(states) == {"maps"}
+
+        # No full pass over the checksummed range while processing
+        passes = []
+        full_pass = ChecksumCalculator._value_without_storage
+        monkeypatch.setattr(ChecksumCalculator, "_value_without_storage",
+                            lambda self, *args: passes.append(1) or full_pass(self, *args))
+        result, processed = engine_process(original, [ModificationType.DPF_OFF], "ecu.bin", states)
+        assert result.checksum_updated and passes == []
+
+        expected = bytearray(processed)
+        assert ChecksumCalculator().update_checksum(expected, checksum)[0] and expected == processed
+        engine_process(original, [ModificationType.DPF_OFF], "ecu.bin")
+        assert passes == [1]
+        print("✓ Cached checksum state used")
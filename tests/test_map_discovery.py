@@ -0,0 +1,131 @@
+"""
+Map Discovery Tests
+Tests axis detection, table scoring and the ranked map catalogue
+"""
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_analyzer import ECUAnalyzer
+from ecu_engine import MapLocator, discover_maps
+from ecu_engine.models import MapType
+from ecu_processor import ECUType, MapLocator as LegacyMapLocator, ProcessingAction
+
+random.seed(14)
+
+# Stock Bosch EDC16C7 dump (not tuned)
+STOCK_DUMP = os.path.join(os.path.dirname(__file__), "..", "backend", "uploads",
+                          "52770f8f-219d-4cd3-9464-6541146582c1_original.bin")
+
+
+def background(size):
+    """Low-entropy filler that classifies as calibration data"""
+    return bytearray(random.choice(b"\x00\x01\x02\x40\x80\xc0") for _ in range(size))
+
+
+def encode(values, data_size, byte_order):
+    fmt = {1: "B", 2: "H"}[data_size]
+    return struct.pack(("<" if byte_order == "little" else ">") + fmt * len(values), *values)
+
+
+def smooth_map(rows, columns, layout, data_size=2, byte_order="little"):
+    x_axis = [750 + 250 * i for i in range(columns)] if data_size == 2 else [10 + 12 * i for i in range(columns)]
+    y_axis = [40 * i * i for i in range(rows)] if data_size == 2 else [3 * i * i for i in range(rows)]
+    table = [min(r * r + 3 * c, 255) for r in range(rows) for c in range(columns)]
+    if layout == "grouped":
+        values = [columns, rows] + x_axis + y_axis + table
+    else:
+        values = [columns] + x_axis + [rows] + y_axis + table
+    return encode(values, data_size, byte_order), x_axis, y_axis
+
+
+class TestMapDiscovery:
+    """Test structural 2D map discovery"""
+
+    def test_01_finds_maps_in_each_layout_and_cell_type(self):
+        """Test maps are found with their axes, shape and table offset"""
+        data = background(0x8000)
+        placed = {}
+        for offset, (rows, columns, layout, size, order) in {
+            0x1000: (8, 10, "grouped", 2, "little"),
+            0x2000: (6, 16, "inline", 2, "little"),
+            0x3000: (12, 8, "grouped", 2, "big"),
+            0x4001: (5, 9, "inline", 1, "little"),
+        }.items():
+            encoded, x_axis, y_axis = smooth_map(rows, columns, layout, size, order)
+            data[offset:offset + len(encoded)] = encoded
+            placed[offset] = (rows, columns, size, order, x_axis, y_axis,
+                              offset + len(encoded) - rows * columns * size)
+
+        found = {c.offset: c for c in discover_maps(bytes(data))}
+        for offset, (rows, columns, size, order, x_axis, y_axis, table_offset) in placed.items():
+            candidate = found[offset]
+            assert candidate.shape == (rows, columns)
+            assert (candidate.data_size, candidate.byte_order) == (size, order)
+            assert candidate.x_axis == x_axis and candidate.y_axis == y_axis
+            assert candidate.table_offset == table_offset
+        print("✓ Maps found in every layout")
+
+    def test_02_rejects_noise_and_counters(self):
+        """Test noisy tables and index sequences are not reported as maps"""
+        data = background(0x4000)
+        noisy = [8, 8] + [100 * i for i in range(1, 9)] * 2 + [random.randrange(1000, 2000) for _ in range(64)]
+        counter = list(range(6, 6 + 2 + 8 + 8 + 64))
+        data[0x1000:0x1000 + 2 * len(noisy)] = encode(noisy, 2, "little")
+        data[0x2000:0x2000 + 2 * len(counter)] = encode(counter, 2, "little")
+
+        offsets = [c.offset for c in discover_maps(bytes(data))]
+        assert not any(0x1000 <= o < 0x1000 + 2 * len(noisy) for o in offsets)
+        assert not any(0x2000 <= o < 0x2000 + 2 * len(counter) for o in offsets)
+        print("✓ Noise and counters rejected")
+
+    def test_03_catalogue_is_ranked_and_feeds_consumers(self):
+        """Test ranking, map definitions and the legacy map catalogue"""
+        data = background(0x8000)
+        for i, offset in enumerate((0x800, 0x2800, 0x4800)):
+            encoded = smooth_map(6 + 4 * i, 8, "grouped")[0]
+            data[offset:offset + len(encoded)] = encoded
+        data = bytes(data)
+
+        catalogue = MapLocator().discover_maps(data)
+        assert [c.score for c in catalogue] == sorted((c.score for c in catalogue), reverse=True)
+        definition = catalogue[0].to_map_definition(MapType.TORQUE_LIMITER)
+        assert definition.offset == catalogue[0].table_offset
+        assert (definition.rows, definition.columns) == catalogue[0].shape
+
+        legacy = LegacyMapLocator.discover_maps(data)
+        assert [m["table_offset"] for m in legacy] == [c.table_offset for c in catalogue[:5]]
+        print("✓ Ranked catalogue feeds engine and legacy locator")
+
+    def test_04_tuning_indicator_needs_well_scored_maps(self):
+        """Test a stock dump's low-scoring candidates do not raise tuning confidence, smooth maps do"""
+        with open(STOCK_DUMP, "rb") as f:
+            stock = f.read()
+        assert len(discover_maps(stock)) >= 100
+        tuning = ECUAnalyzer().analyze(stock)["detected_maps"]["tuning"]
+        assert tuning["confidence"] == "medium" and tuning["confidence_score"] == 45
+        assert not any(i.startswith("2D maps") for i in tuning["indicators"])
+
+        data = background(0x10000)
+        for i in range(12):
+            encoded = smooth_map(8, 8 + i % 3, "grouped")[0]
+            data[0x1000 * (i + 1):0x1000 * (i + 1) + len(encoded)] = encoded
+        tuning = ECUAnalyzer().analyze(bytes(data))["detected_maps"]["tuning"]
+        assert tuning["indicators"] == ["2D maps with axes: 12"] and tuning["confidence_score"] == 30
+        print("✓ Only well-scored maps indicate tuning")
+
+    def test_05_legacy_actions_never_target_discovered_maps(self):
+        """Test the legacy heuristic search keeps its chunk scan and confidence"""
+        data = background(0x8000)
+        encoded = smooth_map(8, 8, "grouped")[0]
+        data[0x2400:0x2400 + len(encoded)] = encoded
+        data = bytes(data)
+
+        assert discover_maps(data)
+        legacy = LegacyMapLocator._heuristic_search(data, ECUType.BOSCH_EDC17, ProcessingAction.DPF_REMOVAL)
+        assert legacy == [{"offset": offset, "size": 1024, "confidence": 0.60, "action": "dpf-removal"}
+                          for offset in range(0, 0x1400, 0x400)]
+        print("✓ Discovered maps stay out of legacy modifications")
@@ -0,0 +1,66 @@
+"""
+Map View Tests
+Tests lazy NumPy map reads against struct decoding
+"""
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine import MapLocator, MapView
+from ecu_engine.models import MapDefinition, MapType
+
+DATA = bytes(range(256)) * 4
+
+
+def map_def(**kwargs):
+    params = dict(name="test", map_type=MapType.DPF_SWITCH, rows=3, columns=5, data_size=2)
+    params.update(kwargs)
+    return MapDefinition(**params)
+
+
+def struct_read(offset, definition):
+    fmt = {1: "b", 2: "h", 4: "i"}[definition.data_size]
+    fmt = fmt if definition.is_signed else fmt.upper()
+    fmt = (">" if definition.byte_order == "big" else "<") + fmt
+    size = definition.data_size
+    return [
+        [struct.unpack(fmt, DATA[offset + (r * definition.columns + c) * size:][:size])[0]
+         for c in range(definition.columns)]
+        for r in range(definition.rows)
+    ]
+
+
+class TestMapView:
+    """Test lazy map views"""
+
+    def test_01_values_match_struct(self):
+        """Test every cell type decodes like struct.unpack"""
+        locator = MapLocator()
+        for data_size in (1, 2, 4):
+            for is_signed in (False, True):
+                for byte_order in ("little", "big"):
+                    definition = map_def(data_size=data_size, is_signed=is_signed,
+                                         byte_order=byte_order)
+                    view = locator._read_map_at_offset(DATA, 7, definition)
+                    assert isinstance(view, MapView)
+                    assert view.shape == (3, 5)
+                    assert view == struct_read(7, definition)
+        print("✓ Map views decode like struct")
+
+    def test_02_lazy_and_zero_copy(self):
+        """Test locating a map decodes nothing and the view shares the buffer"""
+        view = MapLocator()._read_map_at_offset(DATA, 16, map_def(rows=8, columns=8))
+        assert view._array is None
+        assert view.array.base is not None and not view.array.flags.writeable
+        assert view[0][0] == struct.unpack("<H", DATA[16:18])[0]
+        print("✓ Map view is lazy")
+
+    def test_03_out_of_bounds(self):
+        """Test maps running past the end of the file are rejected"""
+        locator = MapLocator()
+        assert locator._read_map_at_offset(DATA, len(DATA) - 29, map_def()) is None
+        assert locator._read_map_at_offset(DATA, len(DATA) - 30, map_def()) is not None
+        assert locator._read_map_at_offset(DATA, 0, map_def(data_size=3)) is None
+        print("✓ Out-of-bounds maps rejected")
@@ -0,0 +1,209 @@
+"""
+Patch Plan Tests
+Tests patch recording, conflict handling and the single-pass processors
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine import ECUFileProcessor, ModificationType, PatchConflictError, PatchPlan
+from ecu_engine.checksum import ChecksumCalculator
+from ecu_engine.models import ChecksumAlgorithm, ChecksumType
+from ecu_processor import ChecksumCalculator as LegacyChecksumCalculator, ECUProcessor
+
+random.seed(15)
+
+
+def replay(original, patches):
+    data = bytearray(original)
+    for patch in patches:
+        new = bytes.fromhex(patch["new"])
+        assert original[patch["offset"]:patch["offset"] + len(new)] == bytes.fromhex(patch["old"])
+        data[patch["offset"]:patch["offset"] + len(new)] = new
+    return bytes(data)
+
+
+def edc17_file():
+    data = bytearray(b"\x11" * 1_600_000)
+    data[0:4] = b"\x80\x00\x00\x00"
+    data[1000:1008] = b"EDC17C54"
+    data[0x20000:0x20006] = b"\xf1\x0f\x00\x00\x0f\x00"
+    data[0x30000:0x30007] = b"DPF_REG"
+    data[0x40000:0x40005] = b"P2002"
+    data[0x50000:0x50005] = b"P0401"
+    return bytes(data)
+
+
+class TestPatchPlan:
+    """Test patch plans and the processors built on them"""
+
+    def test_01_records_against_original(self):
+        """Test writes become patches while reads and find see the original"""
+        original = bytes(range(256)) * 4
+        plan = PatchPlan(original)
+        plan.source = "a"
+        plan[10:12] = b"\x00\x00"
+        plan[20] = 0xAA
+        plan[30:32] = original[30:32]  # unchanged bytes are not recorded
+        assert plan[10:12] == original[10:12]
+        assert plan.find(bytes([10, 11])) == 10
+        assert [(p.offset, p.old, p.new, p.source) for p in plan.patches] == [
+            (10, b"\x0a\x0b", b"\x00\x00", "a"), (20, b"\x14", b"\xaa", "a")]
+        assert plan.ranges() == [(10, 12), (20, 21)]
+        with pytest.raises(ValueError):
+            plan[0:2] = b"\x00"
+        data = plan.apply()
+        assert data[10:12] == b"\x00\x00" and data[20] == 0xAA and plan.original == original
+        print("✓ Patches recorded against the original")
+
+    def test_02_conflicts(self):
+        """Test disagreeing sources conflict and agreeing overlaps do not"""
+        plan = PatchPlan(bytes(64))
+        plan.source = "dpf"
+        plan[0:8] = b"\xff" * 8
+        plan.source = "dtc"
+        plan[4:6] = b"\xff\xff"
+        assert plan.conflicts() == []
+
+        plan.source = "egr"
+        plan[6:10] = b"\x01" * 4
+        with pytest.raises(PatchConflictError):
+            plan.apply()
+        (kept, dropped), = plan.resolve_conflicts()
+        assert (kept.source, dropped.source) == ("egr", "dpf")
+        assert plan.apply()[:10] == b"\x00" * 4 + b"\xff\xff" + b"\x01" * 4
+        print("✓ Conflicts detected and resolved")
+
+    def test_03_engine_single_pass(self, monkeypatch):
+        """Test the engine applies patches once and updates each checksum once"""
+        calls = []
+        update = ChecksumCalculator.update_checksum_incremental
+        monkeypatch.setattr(ChecksumCalculator, "update_checksum_incremental",
+                            lambda self, *args: calls.append(1) or update(self, *args))
+
+        # One checksum covers the patched maps, the other only untouched bytes
+        checksums = [
+            ChecksumAlgorithm(checksum_type=ChecksumType.CRC32, name="maps", offset=0x100,
+                              calc_start=0x10000, calc_end=0x60000),
+            ChecksumAlgorithm(checksum_type=ChecksumType.CRC32, name="boot", offset=0x200,
+                              calc_start=0x400, calc_end=0x10000),
+        ]
+        processor = ECUFileProcessor()
+        identify = processor.ecu_db.identify_ecu
+        monkeypatch.setattr(processor.ecu_db, "identify_ecu",
+                            lambda data: identify(data).model_copy(update={"checksums": checksums}))
+
+        original = edc17_file()
+        result = processor.process_file(
+            original, [ModificationType.DPF_OFF, ModificationType.EGR_OFF, ModificationType.DTC_OFF])
+        assert result.success and result.checksum_updated and len(calls) == 1
+        sources = {source for p in result.patches for source in p["source"].split(",")}
+        assert sources == {"dpf_off", "egr_off", "dtc_off", "checksum"}
+        assert replay(original, result.patches) == processor.get_processed_file()
+
+        # DTC_OFF overlaps DPF_OFF and EGR_OFF - the checksum still matches a full update
+        processed = bytearray(processor.get_processed_file())
+        assert ChecksumCalculator().update_checksum(processed, checksums[0])[0]
+        assert processed == processor.get_processed_file()
+        print("✓ Engine output reproduced from its patch list")
+
+    def test_04_legacy_single_checksum(self, monkeypatch):
+        """Test the legacy processor fixes the checksum once, after all actions"""
+        calls = []
+        fix = LegacyChecksumCalculator.fix_checksum
+        monkeypatch.setattr(LegacyChecksumCalculator, "fix_checksum",
+                            staticmethod(lambda data, ecu_type: calls.append(1) or fix(data, ecu_type)))
+
+        original = edc17_file()
+        result = ECUProcessor().process_file(original, ["checksum", "dtc-single", "dpf-removal"])
+        assert result["success"] and len(calls) == 1
+        assert replay(original, result["patches"]) == result["processed_file"]
+        print("✓ Legacy checksum fixed once")
+
+    def test_05_merged_overlaps(self):
+        """Test agreeing and repeated writes are reported once, from original to final bytes"""
+        original = bytes(range(64))
+        plan = PatchPlan(original)
+        plan.source = "dpf_off"
+        plan[10:15] = b"\x00" * 5
+        plan.source = "dtc_off"
+        plan[12:17] = b"\x00" * 5          # Agrees with dpf_off on 12..14
+        plan.source = "egr_off"
+        plan[30:34] = b"\x01" * 4
+        plan[32:36] = b"\x02" * 4          # Same source, later write wins
+        plan[50:52] = b"\xee\xee"
+        plan[50:52] = original[50:52]      # Written back to the original
+
+        assert len(plan.patches) == 6 and plan.conflicts() == []
+        merged = [(p.offset, p.old, p.new, p.source) for p in plan.merged()]
+        assert merged == [
+            (10, original[10:17], b"\x00" * 7, "dpf_off,dtc_off"),
+            (30, original[30:36], b"\x01\x01" + b"\x02" * 4, "egr_off"),
+        ]
+        assert [p["offset"] for p in plan.to_list()] == [10, 30]
+        assert replay(original, plan.to_list()) == bytes(plan.apply())
+        print("✓ Overlapping patches merged")
+
+    def test_06_engine_later_modification_wins(self, monkeypatch):
+        """Test conflicting modifications succeed with the later one's bytes and a warning"""
+        processor = ECUFileProcessor()
+        written = {"dpf_off": b"\x00" * 4, "egr_off": b"\xff" * 4}
+
+        def apply_modification(mod_type, ecu_definition, plan):
+            plan[0x30000:0x30004] = written[mod_type.value]  # Same map cells
+            return {"maps": [{"type": mod_type.value, "offset": 0x30000}]}
+
+        monkeypatch.setattr(processor, "_apply_modification", apply_modification)
+        original = edc17_file()
+        result = processor.process_file(original, [ModificationType.DPF_OFF, ModificationType.EGR_OFF])
+
+        assert result.success and not result.errors
+        assert result.modifications_applied == ["dpf_off", "egr_off"]
+        assert "egr_off overrides dpf_off at 1 location(s) starting 0x30000" in result.warnings
+        assert processor.get_processed_file()[0x30000:0x30004] == b"\xff" * 4
+        assert replay(original, result.patches) == processor.get_processed_file()
+        print("✓ Later modification wins with a warning")
+
+    def test_07_legacy_checksum_overrides_action_bytes(self):
+        """Test a DTC pattern in the legacy checksum bytes is overwritten by the checksum"""
+        data = bytearray(512 * 1024)
+        data[0x100:0x105] = b"EDC17"
+        data[-5:] = b"P0420"
+        original = bytes(data)
+
+        result = ECUProcessor().process_file(original, ["dtc-multiple"])
+        assert result["success"]
+        processed = result["processed_file"]
+        assert processed[-5] == 0 and processed[-4:] != original[-4:]
+        assert replay(original, result["patches"]) == processed
+        print("✓ Legacy checksum wins over DTC bytes")
+
+    def test_08_engine_checksum_overrides_modification_bytes(self, monkeypatch):
+        """Test a modification over the stored checksum still yields a valid, replayable file"""
+        checksums = [ChecksumAlgorithm(checksum_type=ChecksumType.CRC32, name="maps", offset=0x100,
+                                       calc_start=0x10000, calc_end=0x60000)]
+        processor = ECUFileProcessor()
+        identify = processor.ecu_db.identify_ecu
+        monkeypatch.setattr(processor.ecu_db, "identify_ecu",
+                            lambda data: identify(data).model_copy(update={"checksums": checksums}))
+
+        def apply_modification(mod_type, ecu_definition, plan):
+            plan[0x30000:0x30004] = b"\x00" * 4
+            plan[0xFE:0x102] = b"\xaa" * 4  # Runs into the stored checksum
+            return {"maps": [{"type": mod_type.value, "offset": 0x30000}]}
+
+        monkeypatch.setattr(processor, "_apply_modification", apply_modification)
+        original = edc17_file()
+        result = processor.process_file(original, [ModificationType.DPF_OFF])
+
+        assert result.success and result.checksum_updated and not result.errors
+        processed = bytearray(processor.get_processed_file())
+        assert processed[0xFE:0x100] == b"\xaa\xaa"
+        assert replay(original, result.patches) == processed
+        assert ChecksumCalculator().update_checksum(processed, checksums[0])[0]
+        assert processed == processor.get_processed_file()
+        print("✓ Engine checksum wins over modification bytes")
@@ -0,0 +1,52 @@
+"""
+Region Index Tests
+Tests block classification and region-restricted signature scanning
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine import RegionIndex, RegionType, SignatureScanner
+
+CODE = bytes(range(256))
+TEXT = b"Copyright Robert Bosch GmbH EDC17C46 ".ljust(256, b"X")
+MAP = bytes([0x10, 0x20, 0x30, 0x40] * 64)
+SAMPLE = b"\xff" * 512 + CODE + TEXT + b"\x00" * 256 + MAP
+
+
+class TestRegionIndex:
+    """Test the per-file region index"""
+
+    def test_01_classifies_blocks(self):
+        """Test each block gets the expected region type"""
+        regions = RegionIndex(SAMPLE)
+        assert [regions.block_type(o) for o in range(0, len(SAMPLE), 256)] == [
+            RegionType.EMPTY, RegionType.EMPTY, RegionType.CODE,
+            RegionType.ASCII, RegionType.EMPTY, RegionType.CALIBRATION,
+        ]
+        assert regions.non_empty_ranges() == [(512, 1024), (1280, 1536)]
+        assert regions.ranges(RegionType.ASCII) == [(768, 1024)]
+        assert regions.is_empty(0, 512) and not regions.is_empty(0, 600)
+        print(f"✓ Blocks classified: {regions.summary()}")
+
+    def test_02_filter_offsets(self):
+        """Test offsets in erased flash are dropped"""
+        regions = RegionIndex(SAMPLE)
+        assert regions.filter_offsets([0, 600, 1100, 1300]) == [600, 1300]
+        assert regions.filter_offsets([600, 1300], RegionType.CALIBRATION) == [1300]
+        print("✓ Offsets filtered by region")
+
+    def test_03_scan_with_regions_matches_full_scan(self):
+        """Test restricting the scanner to non-empty regions changes nothing"""
+        scanner = SignatureScanner()
+        scanner.add_literals([b"BOSCH", b"\xff\xff\xff\xff", b"\xff\x00\x01", b"\x40\x10\x20"])
+        scanner.add_pattern(rb"EDC17[A-Z][0-9]{2}")
+
+        full = scanner.scan(SAMPLE)
+        restricted = scanner.scan(SAMPLE, regions=RegionIndex(SAMPLE))
+        for literal in (b"BOSCH", b"\xff\xff\xff\xff", b"\xff\x00\x01", b"\x40\x10\x20"):
+            assert restricted.offsets(literal) == full.offsets(literal)
+        assert restricted.search(rb"EDC17[A-Z][0-9]{2}").group() == b"EDC17C46"
+        assert restricted.printable_runs() == full.printable_runs()
+        print("✓ Region-restricted scan identical to full scan")
@@ -0,0 +1,68 @@
+"""
+Sequence Search Tests
+Tests "A followed by B within N bytes" queries against a bytes.find loop
+"""
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine import MapLocator, find_followed_by, literal_offsets
+from ecu_engine.models import MapDefinition, MapType
+
+random.seed(13)
+SWITCH, FOLLOWER = struct.pack('<H', 4081), struct.pack('<H', 15)
+
+
+def ref_followed_by(data, first, second, within):
+    offsets = []
+    i = data.find(first)
+    while i != -1:
+        if second in data[i + len(first):i + len(first) + within]:
+            offsets.append(i)
+        i = data.find(first, i + 1)
+    return offsets
+
+
+def sample(size):
+    alphabet = [b"\xf1", b"\x0f", b"\x00", b"\xff", b"\x12"]
+    return b"".join(random.choice(alphabet) for _ in range(size))
+
+
+class TestSequences:
+    """Test the structural sequence search"""
+
+    def test_01_literal_offsets(self):
+        """Test overlapping literal offsets match bytes.find"""
+        data = sample(5000)
+        for literal in (b"\x0f", b"\xf1\x0f", b"\x0f\x0f\x0f", b"\x12\x00\xff\xf1"):
+            expected = ref_followed_by(data, literal, b"", 0)
+            assert literal_offsets(data, literal).tolist() == expected
+        assert literal_offsets(data, b"\x0f", 100, 200).tolist() == [
+            i for i in ref_followed_by(data, b"\x0f", b"", 0) if 100 <= i < 200]
+        print("✓ Literal offsets match")
+
+    def test_02_followed_by_matches_reference(self):
+        """Test pairing across windows, overlaps and the end of the file"""
+        for _ in range(20):
+            data = sample(3000)
+            for first, second, within in [(SWITCH, FOLLOWER, 6), (b"\x0f", b"\x0f", 1),
+                                          (b"\xf1", b"\x00\x00", 3), (SWITCH, b"\xff" * 3, 2)]:
+                expected = ref_followed_by(data, first, second, within)
+                assert find_followed_by(data, first, second, within) == expected
+                known = literal_offsets(data, first).tolist()
+                assert find_followed_by(data, first, second, within, first_offsets=known) == expected
+        print("✓ Followed-by matches reference")
+
+    def test_03_dpf_switch_whole_file(self):
+        """Test the locator finds DPF switches beyond the first 500 KB"""
+        data = bytearray(b"\xff" * 0x100000)
+        data[0x10:0x18] = SWITCH + b"\x00\x00" + FOLLOWER + b"\x00\x00"
+        data[0xC0000:0xC0008] = SWITCH + b"\x00" * 4 + FOLLOWER
+        data[0xD0000:0xD0008] = SWITCH + b"\x00" * 5 + FOLLOWER[:1]
+        definition = MapDefinition(name="switch", map_type=MapType.DPF_SWITCH)
+        found = MapLocator()._find_by_structure(bytes(data), definition)
+        assert [item["offset"] for item in found] == [0x10, 0xC0000]
+        print("✓ DPF switches found over the whole file")
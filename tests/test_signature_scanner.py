@@ -0,0 +1,106 @@
+"""
+Signature Scanner Tests
+Checks that the single-pass scanner returns exactly what re / bytes searches return
+"""
+import os
+import re
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ecu_engine.scanner import SignatureScanner, extract_printable_runs, literal_prefixes
+
+
+LITERALS = [b"DENSO", b"DEN", b"EDC17", b"P0", b"\x04\x20", b"\xff", b"AAAA", b"AA"]
+PATTERNS = [
+    (rb"EDC1[67][A-Z]{2}[0-9]{1,2}", 0),
+    (rb"(?i)copyright.*bosch", 0),
+    (rb"SW[:\s_\-]?([0-9A-Z]{6,12})", re.IGNORECASE),
+    (rb"(?:Ver|Version)[:\s]*([0-9.]+)", re.IGNORECASE),
+    (rb"([A-HJ-NPR-Z0-9]{17})", 0),
+    (rb"[68]HP[0-9]{2}", 0),
+    (rb"A*B", 0),
+]
+
+
+def _sample_data(seed: int) -> bytes:
+    rng = random.Random(seed)
+    chunks = [bytes(rng.getrandbits(8) for _ in range(2000))]
+    tokens = [b"DENSO", b"EDC17CP52", b"EDC16C39", b"Copyright Robert Bosch", b"sw:12345678",
+              b"Version 1.2.3", b"WVWZZZ1JZ3W386752", b"8HP45", b"AAAAAAB", b"P0420"]
+    for _ in range(200):
+        chunks.append(rng.choice(tokens))
+        chunks.append(bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 40))))
+    return b"".join(chunks)
+
+
+class TestSignatureScanner:
+    """Test single-pass scanner equivalence"""
+
+    def _scanner(self):
+        scanner = SignatureScanner()
+        scanner.add_literals(LITERALS)
+        for pattern, flags in PATTERNS:
+            scanner.add_pattern(pattern, flags)
+        return scanner
+
+    def test_01_literal_queries_match_bytes(self):
+        """Test find/count/contains match bytes.find/bytes.count"""
+        scanner = self._scanner()
+        for seed in range(5):
+            data = _sample_data(seed)
+            result = scanner.scan(data)
+            for literal in LITERALS:
+                assert result.find(literal) == data.find(literal), literal
+                assert result.count(literal) == data.count(literal), literal
+                assert result.contains(literal) == (literal in data), literal
+        print("✓ Literal queries match bytes.find/count")
+
+    def test_02_pattern_queries_match_re(self):
+        """Test search/finditer match re.search/re.finditer"""
+        scanner = self._scanner()
+        for seed in range(5):
+            data = _sample_data(seed)
+            result = scanner.scan(data)
+            for pattern, flags in PATTERNS:
+                expected = [m.span() for m in re.finditer(pattern, data, flags)]
+                actual = [m.span() for m in result.finditer(pattern, flags)]
+                assert actual == expected, pattern
+                first = re.search(pattern, data, flags)
+                found = result.search(pattern, flags)
+                assert (found and found.span()) == (first and first.span()), pattern
+        print("✓ Pattern queries match re.search/finditer")
+
+    def test_03_unregistered_signatures_fall_back(self):
+        """Test queries for signatures that were never registered"""
+        data = _sample_data(7)
+        result = self._scanner().scan(data)
+        assert result.count(b"EDC16") == data.count(b"EDC16")
+        assert [m.span() for m in result.finditer(rb"P0[0-9]{3}")] == \
+            [m.span() for m in re.finditer(rb"P0[0-9]{3}", data)]
+        print("✓ Unregistered signatures fall back to direct search")
+
+    def test_04_anchor_extraction(self):
+        """Test literal prefix extraction from regex patterns"""
+        assert literal_prefixes(rb"EDC1[67][A-Z]{2}") == ([b"EDC16", b"EDC17"], False)
+        assert literal_prefixes(rb"(?i)copyright.*bosch") == ([b"copyright"], True)
+        assert literal_prefixes(rb"[A-Z]{1,2}[0-9]") == ([], False)
+        print("✓ Anchors extracted from pattern prefixes")
+
+    def test_05_printable_runs(self):
+        """Test printable run extraction against a byte-by-byte reference"""
+        data = _sample_data(11) + b"TAIL"
+        expected = []
+        start = None
+        for i, byte in enumerate(data + b"\x00"):
+            if 32 <= byte <= 126:
+                if start is None:
+                    start = i
+            else:
+                if start is not None and i - start >= 4:
+                    expected.append((start, data[start:i]))
+                start = None
+        assert extract_printable_runs(data) == expected
+        assert self._scanner().scan(memoryview(data)).printable_runs() == expected
+        print(f"✓ {len(expected)} printable runs extracted")
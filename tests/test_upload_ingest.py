@@ -0,0 +1,73 @@
+"""
+Upload Ingestion Tests
+Tests chunked upload spooling, size limits and analysis of stored files by path
+"""
+import asyncio
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+from starlette.datastructures import UploadFile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import upload_ingest
+from analysis_pool import AnalysisPool, analyze_dtcs, analyze_ecu
+from upload_ingest import UploadTooLarge, map_file, spool_upload
+
+SAMPLE = b"\xff" * 4096 + b"Copyright Robert Bosch GmbH EDC17C46 P0420" + b"\x00" * 4096
+
+
+def upload(data, filename="ecu.bin", size=None):
+    return UploadFile(io.BytesIO(data), size=size, filename=filename)
+
+
+class TestUploadIngest:
+    """Test streaming uploads into storage"""
+
+    def test_01_stores_with_hash_and_size(self, tmp_path, monkeypatch):
+        """Test the upload is copied in chunks and hashed into a temporary file"""
+        monkeypatch.setattr(upload_ingest, "UPLOAD_CHUNK_SIZE", 1000)
+
+        stored = asyncio.run(spool_upload(upload(SAMPLE), tmp_path))
+        assert stored.path.parent == tmp_path and stored.filename == "ecu.bin"
+        assert stored.size == len(SAMPLE) and stored.sha256 == hashlib.sha256(SAMPLE).hexdigest()
+        assert stored.path.read_bytes() == SAMPLE and os.listdir(tmp_path) == [stored.path.name]
+        assert map_file(stored.path)[:] == SAMPLE and map_file(stored.path).find(b"EDC17") == SAMPLE.find(b"EDC17")
+        print("✓ Upload stored with hash and size")
+
+    def test_02_size_limit(self, tmp_path, monkeypatch):
+        """Test oversized uploads are rejected and leave no files behind"""
+        monkeypatch.setattr(upload_ingest, "UPLOAD_CHUNK_SIZE", 1000)
+
+        # Size unknown up front - rejected once the copy crosses the limit
+        with pytest.raises(UploadTooLarge) as error:
+            asyncio.run(spool_upload(upload(SAMPLE), tmp_path, max_size=5000))
+        assert error.value.status_code == 413
+
+        # Size sent by the client - rejected before copying
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(spool_upload(upload(SAMPLE, size=len(SAMPLE)), tmp_path, max_size=5000))
+        assert os.listdir(tmp_path) == []
+
+        stored = asyncio.run(spool_upload(upload(SAMPLE), tmp_path, max_size=len(SAMPLE)))
+        assert stored.size == len(SAMPLE)
+        print("✓ Size limit enforced")
+
+    def test_03_analysis_by_path(self, tmp_path):
+        """Test workers analyze a stored file by path exactly like its bytes"""
+        stored = asyncio.run(spool_upload(upload(SAMPLE), tmp_path))
+        pool = AnalysisPool(max_workers=1)
+
+        async def run():
+            pool.start()
+            try:
+                return await pool.run(analyze_ecu, str(stored.path)), await pool.run(analyze_dtcs, str(stored.path))
+            finally:
+                pool.shutdown()
+
+        info, dtcs = asyncio.run(run())
+        assert info == analyze_ecu(SAMPLE) and dtcs == analyze_dtcs(SAMPLE)
+        print(f"✓ Stored file analyzed by path: {info['ecu_type']}")